@@ -0,0 +1,106 @@
+import hashlib
+import json
+import logging
+import re
+import unicodedata
+from datetime import datetime, timedelta
+
+from db import async_crud
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Нормализует текст документа для вычисления ключа кэша:
+    приводит юникод к NFC, убирает хвостовые пробелы в строках
+    и схлопывает повторяющиеся пустые строки.
+    """
+    text = unicodedata.normalize("NFC", text or "")
+    lines = [line.rstrip() for line in text.replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def _sha256(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def make_cache_key(prompt_template: str, model: str, inputs: dict, is_json: bool = False) -> str:
+    """
+    Вычисляет ключ кэша по хэшу шаблона промпта, имени модели
+    и хэшам нормализованных входных текстов.
+    """
+    key_data = {
+        "prompt": _sha256(prompt_template),
+        "model": model,
+        "is_json": is_json,
+        "inputs": {name: _sha256(normalize_text(value)) for name, value in sorted(inputs.items())},
+    }
+    return _sha256(json.dumps(key_data, sort_keys=True))
+
+
+def is_cacheable(response: dict | None) -> bool:
+    """Кэшируются только успешные ответы с непустым результатом."""
+    if not response or "error" in response:
+        return False
+    return response.get("json") is not None or bool(response.get("text"))
+
+
+class ResponseCache:
+    """
+    Постоянный кэш ответов AI, адресуемый по содержимому запроса.
+
+    Записи хранятся в таблице `ai_response_cache`, устаревают через `ttl_seconds`
+    и вытесняются по принципу LRU при превышении `max_entries`. Размер кэша
+    проверяется не на каждой записи, а раз в `evict_every` записей.
+    Ответ из кэша возвращается с нулевым usage, так как токены не тратятся.
+    Обращения к БД идут через асинхронную сессию (`session_factory` создает AsyncSession)
+    и не блокируют цикл событий.
+    """
+
+    def __init__(self, session_factory, ttl_seconds: int, max_entries: int, evict_every: int = 100):
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.evict_every = max(1, evict_every)
+        self._writes_since_evict = 0
+
+    def _min_created_at(self) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+
+    async def get(self, cache_key: str) -> dict | None:
+        """Возвращает закэшированный ответ или None."""
+        try:
+            async with self.session_factory() as db:
+                entry = await async_crud.get_cached_ai_response(db, cache_key, self._min_created_at())
+                response = json.loads(entry.response) if entry else None
+                # Фиксируем счетчик обращений или удаление устаревшей записи
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Ошибка чтения кэша ответов AI: {e}")
+            return None
+        if response is None:
+            return None
+
+        logger.info(f"Ответ AI найден в кэше (ключ {cache_key[:12]}).")
+        response["usage"] = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cost": 0.0}
+        response["cached"] = True
+        return response
+
+    async def set(self, cache_key: str, response: dict) -> None:
+        """Сохраняет успешный ответ в кэш; раз в evict_every записей вытесняет лишние записи."""
+        if not is_cacheable(response):
+            return
+        stored = {key: response.get(key) for key in ("text", "json")}
+        self._writes_since_evict += 1
+        evict = self._writes_since_evict >= self.evict_every
+        if evict:
+            self._writes_since_evict = 0
+        try:
+            async with self.session_factory() as db:
+                await async_crud.save_cached_ai_response(db, cache_key, json.dumps(stored, ensure_ascii=False))
+                if evict:
+                    await async_crud.evict_ai_response_cache(db, self.max_entries, self._min_created_at())
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Ошибка записи в кэш ответов AI: {e}")
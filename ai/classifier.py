@@ -0,0 +1,170 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+RESUME = "resume"
+VACANCY = "vacancy"
+
+# Заголовки разделов (строка целиком, без двоеточия)
+_HEADERS = {
+    RESUME: {
+        "опыт работы", "образование", "о себе", "обо мне", "желаемая должность", "желаемая должность и зарплата",
+        "контакты", "контактная информация", "гражданство", "гражданство, время в пути до работы", "знание языков",
+        "повышение квалификации", "повышение квалификации, курсы", "курсы", "портфолио", "личные качества",
+        "experience", "work experience", "education", "summary", "about me", "contacts", "personal information",
+    },
+    VACANCY: {
+        "требования", "обязанности", "условия", "мы предлагаем", "что мы предлагаем", "что нужно делать",
+        "чем предстоит заниматься", "задачи", "будет плюсом", "ожидаем", "мы ожидаем", "ждем от вас", "ждём от вас",
+        "о компании", "о нас", "мы ждем", "наши ожидания", "что мы ждем", "кого мы ищем",
+        "requirements", "responsibilities", "we offer", "what you will do", "nice to have", "about us",
+    },
+}
+
+# Характерные фразы в любом месте текста
+_CUES = {
+    RESUME: [
+        re.compile(r"\b(мужчина|женщина),?\s*\d{2}\s*(год|года|лет)\b"),
+        re.compile(r"родил(ся|ась)"),
+        re.compile(r"гражданство"),
+        re.compile(r"желаемая (должность|зарплата)"),
+        re.compile(r"готов(а)? к (переезду|командировкам)"),
+        re.compile(r"(ищу|рассматриваю) (работу|предложения|вакансии)"),
+        re.compile(r"по настоящее время|настоящее время"),
+        re.compile(r"\bопыт работы\s*[—–-]?\s*\d+\s*(год|года|лет)"),
+        re.compile(r"\b(я|мой|моя|мои)\b"),
+        re.compile(r"\b(занимал|участвовал|разработал|внедрил|руководил|отвечал за)\b"),
+    ],
+    VACANCY: [
+        re.compile(r"требуемый опыт работы|опыт работы:?\s*(от\s*)?\d+[–-]?\d*\s*(год|года|лет)"),
+        re.compile(r"(полная|частичная) занятость"),
+        re.compile(r"(полный|гибкий|сменный|удаленн\w*|удалённ\w*) (рабочий )?(день|график|работа|формат)"),
+        re.compile(r"на руки|до вычета налогов|уровень дохода|заработная плата|\bз/п\b"),
+        re.compile(r"откликнуться|откликайтесь|присылайте резюме|ждем ваше резюме|ждём ваше резюме"),
+        re.compile(r"(мы ищем|ищем|в поиске|в команду требуется|требуется)\s+(\w+\s+)?"
+                   r"(разработчик|аналитик|специалист|менеджер|инженер|дизайнер|тестировщик|руководител)"),
+        re.compile(r"\bдмс\b|оформление по тк|официальное трудоустройство"),
+        re.compile(r"(тебе|вам) предстоит|вы будете|ты будешь"),
+        re.compile(r"\b(кандидат|соискател)\w*"),
+        re.compile(r"будет плюсом|будет преимуществом"),
+    ],
+}
+
+# Типичные фрагменты документов, по символьным триграммам которых оценивается сходство
+_PROTOTYPES = {
+    RESUME: """
+        опыт работы образование ключевые навыки о себе желаемая должность гражданство знание языков
+        мужчина 30 лет родился проживает готов к переезду занятость полная занятость
+        разработал внедрил участвовал руководил отвечал за оптимизировал настоящее время
+        университет факультет специальность бакалавр магистр курсы сертификат
+    """,
+    VACANCY: """
+        требования обязанности условия мы предлагаем будет плюсом требуемый опыт работы
+        ищем в команду кандидат откликнуться дмс официальное трудоустройство гибкий график
+        вам предстоит вы будете разрабатывать задачи компания команда офис удаленная работа
+        заработная плата на руки от лет опыта знание умение понимание
+    """,
+}
+
+# Слова, по которым строка похожа на название должности
+_ROLE_WORDS = re.compile(
+    r"разработчик|программист|developer|engineer|инженер|аналитик|analyst|менеджер|manager|дизайнер|designer|"
+    r"тестировщик|\bqa\b|devops|архитектор|architect|\blead\b|руководител|head of|специалист|бухгалтер|"
+    r"маркетолог|рекрутер|юрист|scientist|администратор|консультант|директор|продакт|product owner",
+    re.IGNORECASE,
+)
+
+# Минимальный перевес признаков одного типа документа для уверенного решения
+_MIN_EVIDENCE = 5.0
+_MIN_MARGIN = 3.0
+
+
+def _ngram_profile(text: str, n: int = 3) -> Counter:
+    words = re.findall(r"[a-zа-яё]+", text.lower())
+    profile = Counter()
+    for word in words:
+        padded = f" {word} "
+        profile.update(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return profile
+
+
+def _cosine(a: Counter, b: Counter) -> float:
+    if not a or not b:
+        return 0.0
+    dot = sum(count * b[gram] for gram, count in a.items() if gram in b)
+    norm = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    return dot / norm if norm else 0.0
+
+
+_PROTOTYPE_PROFILES = {label: _ngram_profile(text) for label, text in _PROTOTYPES.items()}
+
+
+@dataclass
+class Verdict:
+    """
+    Решение локального классификатора: is_valid — True/False для уверенных
+    случаев и None, если документ нужно проверить с помощью AI.
+    """
+
+    is_valid: bool | None
+    title: str | None = None
+    confidence: float = 0.0
+    scores: dict = field(default_factory=dict)
+
+
+def score_document(text: str) -> dict[str, float]:
+    """Оценки признаков резюме и вакансии: заголовки разделов, характерные фразы и сходство триграмм."""
+    lowered = text.lower()
+    lines = {line.strip().rstrip(":").strip() for line in lowered.splitlines()}
+    profile = _ngram_profile(lowered)
+    scores = {}
+    for label in (RESUME, VACANCY):
+        headers = len(lines & _HEADERS[label])
+        cues = sum(1 for pattern in _CUES[label] if pattern.search(lowered))
+        similarity = _cosine(profile, _PROTOTYPE_PROFILES[label])
+        scores[label] = 2.0 * headers + cues + 4.0 * similarity
+    return scores
+
+
+def guess_title(text: str, doc_type: str) -> str | None:
+    """
+    Эвристика названия: для резюме — желаемая должность или строка с названием
+    должности в начале текста, для вакансии — первая такая строка.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if doc_type == RESUME:
+        for i, line in enumerate(lines):
+            if line.lower().startswith("желаемая должность"):
+                value = line.split(":", 1)[1].strip() if ":" in line else ""
+                candidate = value or (lines[i + 1] if i + 1 < len(lines) else "")
+                if candidate and len(candidate) <= 80:
+                    return candidate
+    for line in lines[:8]:
+        if _ROLE_WORDS.search(line) and len(line) <= 80 and not line.endswith((".", ":")):
+            # "Ищу работу: QA инженер" -> "QA инженер"
+            label, _, value = line.partition(":")
+            if value.strip() and not _ROLE_WORDS.search(label):
+                return value.strip()
+            return line
+    return None
+
+
+def classify_document(text: str, doc_type: str) -> Verdict:
+    """
+    Быстро определяет, является ли текст документом типа doc_type ("resume"/"vacancy").
+    Уверенное решение принимается, только если признаки одного типа заметно
+    перевешивают признаки другого; для документа своего типа нужно еще и название.
+    """
+    other = VACANCY if doc_type == RESUME else RESUME
+    scores = score_document(text)
+    margin = scores[doc_type] - scores[other]
+    confidence = 1 / (1 + math.exp(-abs(margin)))
+
+    if scores[doc_type] >= _MIN_EVIDENCE and margin >= _MIN_MARGIN:
+        title = guess_title(text, doc_type)
+        if title:
+            return Verdict(is_valid=True, title=title, confidence=confidence, scores=scores)
+    elif scores[other] >= _MIN_EVIDENCE and -margin >= _MIN_MARGIN:
+        return Verdict(is_valid=False, confidence=confidence, scores=scores)
+    return Verdict(is_valid=None, confidence=confidence, scores=scores)
@@ -1,10 +1,23 @@
-from .providers.openrouter import OpenRouterProvider
-from . import prompts
+import asyncio
+import logging
 
-# Здесь можно легко переключить провайдера, изменив одну строку
-# from .providers.openai import OpenAIProvider
-# from .providers.gen_api import GenAPIProvider
-AIProvider = OpenRouterProvider
+from config import (
+    AI_CACHE_ENABLED, AI_CACHE_TTL_SECONDS, AI_CACHE_MAX_ENTRIES, AI_CACHE_EVICT_EVERY, AI_CHUNK_TOKENS, AI_MAX_CHUNKS,
+)
+from db.database import AsyncSessionLocal
+from .providers.router import RouterProvider
+from .cache import ResponseCache, make_cache_key
+from .distillation import DigestStore, digest_key, render_digest
+from .scheduler import Priority, QueueStatus, request_priority
+from .streaming import DeltaCallback, emit_response
+from . import prompts, token_budget
+
+logger = logging.getLogger(__name__)
+
+# Маршрутизатор распределяет запросы между настроенными бэкендами (AI_ROUTER_BACKENDS).
+# Здесь можно легко переключиться на одного провайдера, изменив одну строку
+# from .providers.openrouter import OpenRouterProvider
+AIProvider = RouterProvider
 
 
 class AIClient:
@@ -12,55 +25,237 @@ class AIClient:
     Абстрактный клиент для работы с нейросетью.
     Использует выбранного провайдера для выполнения запросов.
     Возвращает полный ответ от провайдера, включая статистику по токенам.
+    Все методы асинхронные: вызовы AI не блокируют цикл событий бота.
+    Если передан кэш, повторные запросы с теми же входными данными
+    возвращаются из него без обращения к провайдеру. Хранилище выжимок
+    сохраняет выжимку каждого документа, чтобы она готовилась один раз.
     """
 
-    def __init__(self):
+    def __init__(self, cache: ResponseCache | None = None, digests: DigestStore | None = None):
         self.provider = AIProvider()
+        self.cache = cache
+        self.digests = digests
+        # Выжимки, которые готовятся прямо сейчас, по ключу документа
+        self._distilling: dict[str, asyncio.Task] = {}
+
+    @property
+    def model_name(self) -> str:
+        """Имя модели провайдера, участвующее в ключе кэша."""
+        return getattr(self.provider, "model", type(self.provider).__name__)
+
+    async def _cached(
+        self, prompt_template: str, inputs: dict, is_json: bool, request, on_delta: DeltaCallback | None = None
+    ) -> dict:
+        """
+        Возвращает ответ из кэша, если он есть, иначе выполняет запрос
+        к провайдеру и сохраняет успешный ответ в кэш.
+        В потоковом режиме ответ из кэша передается в on_delta целиком.
+        """
+        if not self.cache:
+            return await request()
+
+        cache_key = make_cache_key(prompt_template, self.model_name, inputs, is_json)
+        cached = await self.cache.get(cache_key)
+        if cached:
+            if on_delta:
+                await emit_response(cached, on_delta)
+            return cached
+
+        response = await request()
+        await self.cache.set(cache_key, response)
+        return response
+
+    def queue_status(self, priority: Priority = Priority.ANALYSIS) -> QueueStatus:
+        """Глубина очереди и оценка ожидания для нового запроса с данным приоритетом."""
+        if hasattr(self.provider, "queue_status"):
+            return self.provider.queue_status(priority)
+        return QueueStatus(depth=0, estimated_wait=0.0)
+
+    async def _verify(self, prompt_template: str, text: str, action: str) -> dict:
+        """
+        Выполняет верификацию текста с использованием кэша.
+        Текст предварительно сокращается по бюджету токенов действия.
+        Верификация уступает очередь платным анализам.
+        """
+        inputs, report = token_budget.prepare_inputs(action, {"text": text})
+        text = inputs["text"]
+        with request_priority(Priority.VERIFICATION):
+            response = await self._cached(
+                prompt_template, inputs, False,
+                lambda: self.provider.verify_text(text, prompt_template),
+            )
+        token_budget.report_savings(report, prompt_template, response)
+        return response
+
+    async def _extract_facts(self, field: str, text: str) -> tuple[str, dict]:
+        """
+        Map-шаг для документа длиннее бюджета токенов: делит его на части по разделам
+        и одновременно извлекает из каждой части ключевые факты.
+        Возвращает объединенные факты (в порядке частей) и суммарную статистику.
+        """
+        chunks = token_budget.split_into_chunks(token_budget.clean_text(text), AI_CHUNK_TOKENS)
+        if len(chunks) > AI_MAX_CHUNKS:
+            logger.warning(f"Документ '{field}' разбит на {len(chunks)} частей, анализируются первые {AI_MAX_CHUNKS}.")
+            chunks = chunks[:AI_MAX_CHUNKS]
+        logger.info(f"Документ '{field}' превышает бюджет токенов: извлечение фактов из {len(chunks)} частей.")
+        responses = await asyncio.gather(*(
+            self._request(
+                prompts.EXTRACT_FACTS_PROMPTS[field], "extract_facts",
+                text=f"Часть {number} из {len(chunks)}\n{chunk}",
+            )
+            for number, chunk in enumerate(chunks, start=1)
+        ))
+        facts = []
+        for chunk, response in zip(chunks, responses):
+            if response.get("text") and "error" not in response:
+                facts.append(response["text"].strip())
+            else:
+                # Часть, из которой не удалось извлечь факты, передаем как есть
+                facts.append(chunk)
+        return "\n".join(facts), token_budget.sum_usage(*(response.get("usage") for response in responses))
+
+    async def _condense_oversized(self, inputs: dict) -> tuple[dict, dict]:
+        """Заменяет тексты, не помещающиеся в бюджет анализа, фактами, извлеченными по частям."""
+        caps = token_budget.INPUT_TOKEN_CAPS["analysis"]
+        oversized = [
+            field for field, value in inputs.items()
+            if field in prompts.EXTRACT_FACTS_PROMPTS and isinstance(value, str)
+            and token_budget.count_tokens(token_budget.clean_text(value)) > caps[field]
+        ]
+        if not oversized:
+            return inputs, {}
+        results = await asyncio.gather(*(self._extract_facts(field, inputs[field]) for field in oversized))
+        condensed = dict(inputs)
+        for field, (facts, _) in zip(oversized, results):
+            condensed[field] = facts
+        return condensed, token_budget.sum_usage(*(usage for _, usage in results))
 
-    def verify_resume(self, resume_text: str) -> dict:
+    async def _analyze(
+        self, prompt_template: str, is_json: bool = False, on_delta: DeltaCallback | None = None, **kwargs
+    ) -> dict:
+        """
+        Выполняет анализ или генерацию с использованием кэша.
+        Документы длиннее бюджета токенов сначала сжимаются до фактов по частям (map-reduce),
+        затем тексты сокращаются по бюджету токенов.
+        Если передан on_delta, ответ запрашивается в потоковом режиме.
+        """
+        kwargs, map_usage = await self._condense_oversized(kwargs)
+        response = await self._request(prompt_template, "analysis", is_json=is_json, on_delta=on_delta, **kwargs)
+        return token_budget.add_usage(response, map_usage) if map_usage else response
+
+    async def _request(
+        self, prompt_template: str, action: str, is_json: bool = False, on_delta: DeltaCallback | None = None, **kwargs
+    ) -> dict:
+        """Запрос анализа к провайдеру с бюджетом токенов действия и кэшем."""
+        kwargs, report = token_budget.prepare_inputs(action, kwargs)
+        if on_delta:
+            request = lambda: self.provider.analyze_stream(prompt_template, on_delta, is_json=is_json, **kwargs)
+        else:
+            request = lambda: self.provider.analyze(prompt_template, is_json=is_json, **kwargs)
+        with request_priority(Priority.ANALYSIS):
+            response = await self._cached(prompt_template, kwargs, is_json, request, on_delta=on_delta)
+        token_budget.report_savings(report, prompt_template, response)
+        return response
+
+    async def verify_resume(self, resume_text: str) -> dict:
         """Проверяет, является ли текст резюме."""
-        return self.provider.verify_text(resume_text, prompts.VERIFY_RESUME_PROMPT)
+        return await self._verify(prompts.VERIFY_RESUME_PROMPT, resume_text, "verify_resume")
 
-    def verify_vacancy(self, vacancy_text: str) -> dict:
+    async def verify_vacancy(self, vacancy_text: str) -> dict:
         """Проверяет, является ли текст вакансией."""
-        return self.provider.verify_text(vacancy_text, prompts.VERIFY_VACANCY_PROMPT)
+        return await self._verify(prompts.VERIFY_VACANCY_PROMPT, vacancy_text, "verify_vacancy")
 
-    def analyze_match(self, resume_text: str, vacancy_text: str) -> dict:
+    async def analyze_match(self, resume_text: str, vacancy_text: str) -> dict:
         """Анализирует соответствие резюме и вакансии."""
-        return self.provider.analyze(
+        return await self._analyze(
             prompts.ANALYZE_MATCH_PROMPT,
             resume_text=resume_text,
             vacancy_text=vacancy_text,
         )
 
-    def get_consolidated_analysis(self, resume_text: str, vacancy_text: str) -> dict:
-        """Выполняет полный анализ резюме и вакансии."""
-        return self.provider.analyze(
+    async def get_consolidated_analysis(
+        self, resume_text: str, vacancy_text: str, on_delta: DeltaCallback | None = None
+    ) -> dict:
+        """
+        Выполняет полный анализ резюме и вакансии.
+        on_delta получает фрагменты JSON-ответа по мере генерации.
+        """
+        return await self._analyze(
             prompts.CONSOLIDATED_ANALYSIS_PROMPT,
             resume_text=resume_text,
             vacancy_text=vacancy_text,
             is_json=True,
+            on_delta=on_delta,
         )
 
-    def generate_cover_letter(self, resume_text: str, vacancy_text: str) -> dict:
+    async def generate_section(
+        self, section: str, resume_text: str, vacancy_text: str, on_delta: DeltaCallback | None = None
+    ) -> dict:
+        """
+        Генерирует один раздел анализа (ключ из prompts.SECTION_PROMPTS) по его отдельному промпту.
+        on_delta получает фрагменты текста раздела по мере генерации.
+        """
+        return await self._analyze(
+            prompts.SECTION_PROMPTS[section],
+            resume_text=resume_text,
+            vacancy_text=vacancy_text,
+            on_delta=on_delta,
+        )
+
+    async def _distill(self, doc_type: str, text: str, key: str) -> dict:
+        prompt_template, field = prompts.DISTILL_PROMPTS[doc_type]
+        response = await self._analyze(prompt_template, is_json=True, **{field: text})
+        digest = response.get("json") if "error" not in response else None
+        if not isinstance(digest, dict) or not digest:
+            logger.warning(f"Не удалось подготовить выжимку документа '{doc_type}', используется полный текст.")
+            return {"text": text, "usage": response.get("usage", {}), "distilled": False}
+        if self.digests:
+            await self.digests.set(key, doc_type, digest)
+        return {"text": render_digest(digest), "usage": response.get("usage", {}), "distilled": True}
+
+    async def distill_document(self, doc_type: str, text: str) -> dict:
+        """
+        Возвращает компактную выжимку резюме или вакансии ("resume"/"vacancy") для промптов анализа:
+        {"text": str, "usage": {...}, "distilled": bool}. Выжимка готовится один раз на документ
+        и берется из хранилища по хэшу текста; одновременные запросы одного документа объединяются.
+        Если выжимку получить не удалось, возвращается исходный текст.
+        """
+        key = digest_key(doc_type, text)
+        if self.digests:
+            digest = await self.digests.get(key)
+            if digest:
+                return {"text": render_digest(digest), "usage": {}, "distilled": True}
+
+        task = self._distilling.get(key)
+        if task is None:
+            task = asyncio.create_task(self._distill(doc_type, text, key))
+            self._distilling[key] = task
+            task.add_done_callback(lambda _: self._distilling.pop(key, None))
+            return await asyncio.shield(task)
+        # Токены потратил первый запрос, присоединившиеся получают выжимку без usage
+        result = dict(await asyncio.shield(task))
+        result["usage"] = {}
+        return result
+
+    async def generate_cover_letter(self, resume_text: str, vacancy_text: str) -> dict:
         """Генерирует сопроводительное письмо."""
-        return self.provider.analyze(
+        return await self._analyze(
             prompts.GENERATE_COVER_LETTER_PROMPT,
             resume_text=resume_text,
             vacancy_text=vacancy_text,
         )
 
-    def generate_hr_call_plan(self, resume_text: str, vacancy_text: str) -> dict:
+    async def generate_hr_call_plan(self, resume_text: str, vacancy_text: str) -> dict:
         """Генерирует план для созвона с HR."""
-        return self.provider.analyze(
+        return await self._analyze(
             prompts.GENERATE_HR_CALL_PLAN_PROMPT,
             resume_text=resume_text,
             vacancy_text=vacancy_text,
         )
 
-    def generate_tech_interview_plan(self, resume_text: str, vacancy_text: str) -> dict:
+    async def generate_tech_interview_plan(self, resume_text: str, vacancy_text: str) -> dict:
         """Генерирует план для технического интервью."""
-        return self.provider.analyze(
+        return await self._analyze(
             prompts.GENERATE_TECH_INTERVIEW_PLAN_PROMPT,
             resume_text=resume_text,
             vacancy_text=vacancy_text,
@@ -78,5 +273,11 @@ def get_ai_client():
     """
     global _ai_client_instance
     if _ai_client_instance is None:
-        _ai_client_instance = AIClient()
+        cache = None
+        if AI_CACHE_ENABLED:
+            cache = ResponseCache(
+                AsyncSessionLocal, ttl_seconds=AI_CACHE_TTL_SECONDS, max_entries=AI_CACHE_MAX_ENTRIES,
+                evict_every=AI_CACHE_EVICT_EVERY,
+            )
+        _ai_client_instance = AIClient(cache=cache, digests=DigestStore(AsyncSessionLocal))
     return _ai_client_instance
@@ -0,0 +1,73 @@
+import hashlib
+import json
+import logging
+
+from db import async_crud
+from .cache import normalize_text
+from . import prompts
+
+logger = logging.getLogger(__name__)
+
+
+def digest_key(doc_type: str, text: str) -> str:
+    """Ключ выжимки: хэш типа документа, версии промпта выжимки и нормализованного текста."""
+    value = f"{doc_type}:{prompts.DISTILL_PROMPT_VERSION}:{normalize_text(text)}"
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def render_digest(digest, indent: str = "") -> str:
+    """Преобразует JSON-выжимку в компактный текст для подстановки в промпты анализа."""
+    if isinstance(digest, dict):
+        lines = []
+        for key, value in digest.items():
+            if value in (None, "", [], {}):
+                continue
+            if isinstance(value, (dict, list)):
+                lines.append(f"{indent}{key}:")
+                lines.append(render_digest(value, indent + "  "))
+            else:
+                lines.append(f"{indent}{key}: {value}")
+        return "\n".join(lines)
+    if isinstance(digest, list):
+        lines = []
+        for item in digest:
+            if isinstance(item, dict):
+                # Поля объекта списка выводим в одну строку: "- 2020–2023; Компания; Роль"
+                nested = render_digest(item, indent + "  ").splitlines()
+                lines.append(f"{indent}- {nested[0].strip()}" if nested else f"{indent}-")
+                lines.extend(nested[1:])
+            elif item not in (None, ""):
+                lines.append(f"{indent}- {item}")
+        return "\n".join(lines)
+    return f"{indent}{digest}"
+
+
+class DigestStore:
+    """
+    Постоянное хранилище выжимок документов в таблице `document_digests`.
+    Выжимка не устаревает: она меняется только вместе с текстом документа
+    или версией промпта выжимки, которые входят в ключ. Обращения к БД идут
+    через асинхронную сессию (`session_factory` создает AsyncSession).
+    """
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    async def get(self, key: str) -> dict | None:
+        """Возвращает сохраненную выжимку или None."""
+        try:
+            async with self.session_factory() as db:
+                entry = await async_crud.get_document_digest(db, key)
+                return json.loads(entry.digest) if entry else None
+        except Exception as e:
+            logger.error(f"Ошибка чтения выжимки документа: {e}")
+            return None
+
+    async def set(self, key: str, doc_type: str, digest: dict) -> None:
+        """Сохраняет выжимку документа."""
+        try:
+            async with self.session_factory() as db:
+                await async_crud.save_document_digest(db, key, doc_type, json.dumps(digest, ensure_ascii=False))
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Ошибка записи выжимки документа: {e}")
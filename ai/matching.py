@@ -0,0 +1,133 @@
+import hashlib
+import math
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+# Размер пространства хэшированных признаков текста и навыков
+FEATURE_DIM = 2 ** 14
+SKILL_DIM = 2 ** 12
+# Вклад пересечения навыков в итоговую оценку (остальное — текстовое сходство)
+SKILL_WEIGHT = 0.4
+
+_WORD_RE = re.compile(r"[a-zа-яё0-9][a-zа-яё0-9+#.]*[a-zа-яё0-9+#]|[a-zа-яё]")
+# Технологии в резюме и вакансиях почти всегда записываются латиницей: Python, SQL, C++, Node.js
+_SKILL_RE = re.compile(r"(?<![a-z0-9])[a-z][a-z0-9+#.\-]*")
+_STOP_WORDS = {
+    "и", "в", "во", "на", "с", "со", "по", "для", "от", "до", "из", "за", "к", "о", "об", "а", "но", "или", "не",
+    "что", "как", "мы", "вы", "вам", "нас", "это", "то", "же", "при", "у", "так", "их", "его", "ее", "её",
+    "the", "and", "or", "of", "to", "in", "for", "with", "on", "a", "an", "is", "are", "we", "you", "our", "be",
+}
+_SKILL_STOP_WORDS = _STOP_WORDS | {
+    "experience", "years", "year", "team", "work", "skills", "requirements", "responsibilities", "senior",
+    "junior", "middle", "lead", "developer", "engineer", "remote", "full", "time", "will", "plus", "nice", "have",
+    "about", "us", "offer", "knowledge", "good", "from", "at", "as", "by", "it", "etc",
+}
+
+
+def _bucket(feature: str, dim: int) -> int:
+    return zlib.crc32(feature.encode("utf-8")) % dim
+
+
+def _tokens(text: str) -> list[str]:
+    return [token for token in _WORD_RE.findall(text.lower()) if token not in _STOP_WORDS]
+
+
+def extract_skills(text: str) -> set[str]:
+    """Названия технологий и инструментов, записанные латиницей (python, c++, node.js)."""
+    skills = (match.strip(".-") for match in _SKILL_RE.findall(text.lower()))
+    return {skill for skill in skills if len(skill) > 1 and skill not in _SKILL_STOP_WORDS}
+
+
+@dataclass(frozen=True)
+class DocumentVector:
+    """Хэшированные частоты признаков текста (слова и символьные триграммы) и множество навыков."""
+
+    term_counts: np.ndarray
+    skills: np.ndarray
+
+
+def vectorize(text: str) -> DocumentVector:
+    """Строит хэшированный вектор частот признаков и вектор навыков документа."""
+    features = []
+    for token in _tokens(text):
+        features.append(token)
+        if len(token) > 3:
+            # Триграммы сглаживают русские словоформы: "разработчик" / "разработчика"
+            padded = f"<{token}>"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    term_counts = np.bincount(
+        np.fromiter((_bucket(feature, FEATURE_DIM) for feature in features), dtype=np.int64, count=len(features)),
+        minlength=FEATURE_DIM,
+    ).astype(np.float32)
+    skills = np.zeros(SKILL_DIM, dtype=np.float32)
+    for skill in extract_skills(text):
+        skills[_bucket(skill, SKILL_DIM)] = 1.0
+    return DocumentVector(term_counts=term_counts, skills=skills)
+
+
+class VectorCache:
+    """
+    LRU-кэш векторов документов в памяти процесса по хэшу текста:
+    измененный файл получает новый хэш, и его вектор строится заново.
+    Безопасен для вызова из нескольких потоков (оценка выполняется вне цикла событий).
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, DocumentVector] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text: str) -> DocumentVector:
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                return vector
+        # Вектор строится без блокировки: другие потоки не ждут векторизацию чужого документа
+        vector = vectorize(text)
+        with self._lock:
+            self._entries[key] = vector
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return vector
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def score_batch(resume: DocumentVector, vacancies: list[DocumentVector]) -> np.ndarray:
+    """
+    Оценки соответствия резюме каждой вакансии в диапазоне 0..1 одной матричной операцией:
+    косинусное сходство TF-IDF (IDF по резюме и вакансиям пользователя) и доля навыков
+    вакансии, найденных в резюме.
+    """
+    if not vacancies:
+        return np.zeros(0, dtype=np.float32)
+    counts = np.vstack([resume.term_counts] + [vacancy.term_counts for vacancy in vacancies])
+    documents = counts.shape[0]
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + documents) / (1 + document_frequency)) + 1.0
+    weights = np.log1p(counts) * idf
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    weights = np.divide(weights, norms, out=np.zeros_like(weights), where=norms > 0)
+    text_similarity = weights[1:] @ weights[0]
+
+    skills = np.vstack([vacancy.skills for vacancy in vacancies])
+    required = skills.sum(axis=1)
+    matched = skills @ resume.skills
+    skill_overlap = np.divide(matched, required, out=np.zeros_like(matched), where=required > 0)
+    # Для вакансии без навыков оценка строится только по тексту
+    skill_weight = np.where(required > 0, SKILL_WEIGHT, 0.0)
+    scores = ((1 - skill_weight) * text_similarity + skill_weight * skill_overlap)
+    return np.clip(scores, 0.0, 1.0)
+
+
+def to_percent(score: float) -> int:
+    """Оценка для отображения пользователю."""
+    return int(math.floor(score * 100 + 0.5))
@@ -1,4 +1,9 @@
 # ai/prompts.py
+from string import Formatter
+
+# Версия промптов: увеличивается при изменении их текста, чтобы результаты
+# разных версий не смешивались (участвует в ключе выполняющихся анализов)
+PROMPT_VERSION = "1"
 
 # --- CORE PROMPTS (Instructions only, no data placeholders) ---
 
@@ -300,6 +305,93 @@ VERIFY_VACANCY_PROMPT = """
 """
 
 
+# --- Distillation Prompts (compact per-document summaries reused across analyses) ---
+
+# Версия промптов выжимки: участвует в ключе кэша выжимок
+DISTILL_PROMPT_VERSION = "1"
+
+DISTILL_RESUME_PROMPT = """
+Сожми резюме в компактную структурированную выжимку, которая заменит полный текст резюме при анализе соответствия вакансиям.
+Сохрани все факты, важные для оценки кандидата: навыки и технологии, хронологию опыта работы, достижения с цифрами,
+образование, сертификаты, языки, желаемую должность, формат работы и зарплатные ожидания.
+Не добавляй ничего, чего нет в резюме, и не давай оценок. Пиши кратко, без повторов.
+
+Ответь в формате JSON с ключами:
+- "title": string (желаемая должность)
+- "summary": string (1–2 предложения о кандидате)
+- "skills": список строк (навыки и технологии)
+- "experience": список объектов с ключами "period", "company", "role", "highlights" (список ключевых обязанностей и достижений)
+- "education": список строк
+- "certificates": список строк
+- "languages": список строк
+- "preferences": string (формат работы, город, зарплата, если указаны)
+
+РЕЗЮМЕ:
+---
+{resume_text}
+---
+"""
+
+DISTILL_VACANCY_PROMPT = """
+Сожми вакансию в компактную структурированную выжимку, которая заменит полный текст вакансии при анализе соответствия резюме.
+Сохрани все требования дословно по смыслу, включая требования к опыту в годах, уровню, образованию и сертификатам,
+а также обязанности, стек технологий и условия работы. Не добавляй ничего, чего нет в вакансии.
+
+Ответь в формате JSON с ключами:
+- "title": string (название вакансии)
+- "company": string (компания и чем она занимается)
+- "level": string (уровень позиции, если указан)
+- "requirements": список объектов с ключами "text" и "importance" ("must" — обязательное, "preferred" — желательное)
+- "responsibilities": список строк
+- "stack": список строк (технологии и инструменты)
+- "conditions": список строк (формат работы, график, зарплата, бонусы)
+
+ВАКАНСИЯ:
++++
+{vacancy_text}
++++
+"""
+
+# Промпты выжимки и поле шаблона с текстом документа по типу документа
+DISTILL_PROMPTS = {
+    "resume": (DISTILL_RESUME_PROMPT, "resume_text"),
+    "vacancy": (DISTILL_VACANCY_PROMPT, "vacancy_text"),
+}
+
+
+# --- Chunk Extraction Prompts (map step for documents longer than the token budget) ---
+
+EXTRACT_RESUME_FACTS_PROMPT = """
+Ниже одна из частей длинного резюме. Выпиши из нее все факты, важные для оценки кандидата:
+навыки и технологии, места работы с периодами и должностями, обязанности и достижения (с цифрами),
+образование, сертификаты, языки, пожелания к работе.
+Пиши краткими пунктами списка ("- ..."), без вступлений, оценок и выводов. Не добавляй ничего, чего нет в тексте.
+
+Часть резюме:
+---
+{text}
+---
+"""
+
+EXTRACT_VACANCY_FACTS_PROMPT = """
+Ниже одна из частей длинного описания вакансии. Выпиши из нее все факты, важные для оценки кандидатов:
+требования (с пометкой "обязательно" или "желательно"), обязанности, стек технологий, уровень позиции,
+информацию о компании и условия работы.
+Пиши краткими пунктами списка ("- ..."), без вступлений, оценок и выводов. Не добавляй ничего, чего нет в тексте.
+
+Часть вакансии:
+---
+{text}
+---
+"""
+
+# Промпты извлечения фактов из частей по полю шаблона с текстом документа
+EXTRACT_FACTS_PROMPTS = {
+    "resume_text": EXTRACT_RESUME_FACTS_PROMPT,
+    "vacancy_text": EXTRACT_VACANCY_FACTS_PROMPT,
+}
+
+
 # --- FULL PROMPTS (for individual use, maintaining compatibility) ---
 
 _TEXT_INPUT_SECTION = """
@@ -320,6 +412,15 @@ GENERATE_COVER_LETTER_PROMPT = GENERATE_COVER_LETTER_PROMPT_CORE + _TEXT_INPUT_S
 GENERATE_HR_CALL_PLAN_PROMPT = GENERATE_HR_CALL_PLAN_PROMPT_CORE + _TEXT_INPUT_SECTION
 GENERATE_TECH_INTERVIEW_PLAN_PROMPT = GENERATE_TECH_INTERVIEW_PLAN_PROMPT_CORE + _TEXT_INPUT_SECTION
 
+# Отдельные промпты разделов анализа по ключам AnalysisResult
+# (для стратегий генерации "parallel" и "on_demand")
+SECTION_PROMPTS = {
+    "match_analysis": ANALYZE_MATCH_PROMPT,
+    "cover_letter": GENERATE_COVER_LETTER_PROMPT,
+    "hr_call_plan": GENERATE_HR_CALL_PLAN_PROMPT,
+    "tech_interview_plan": GENERATE_TECH_INTERVIEW_PLAN_PROMPT,
+}
+
 
 # --- CONSOLIDATED PROMPT (for combined analysis) ---
 
@@ -357,3 +458,58 @@ CONSOLIDATED_ANALYSIS_PROMPT = f"""
 {{vacancy_text}}
 +++
 """
+
+
+# --- PROMPT LAYOUT (for provider-side prefix caching) ---
+
+# Поля, которые меняются от запроса к запросу: они идут в самом конце промпта,
+# чтобы статичные инструкции и резюме образовывали общий кэшируемый префикс
+VARIABLE_FIELDS = ("vacancy_text",)
+
+
+def _split_header(literal: str) -> tuple[str, str]:
+    """Отделяет от текста последний абзац — заголовок блока данных ("РЕЗЮМЕ:\n---\n")."""
+    stripped = literal.rstrip("\n -+")
+    position = stripped.rfind("\n\n")
+    if position == -1:
+        return "", literal
+    return literal[:position], literal[position:].lstrip("\n")
+
+
+def build_messages(prompt_template: str, **kwargs) -> list[dict]:
+    """
+    Собирает сообщения чата из шаблона промпта в порядке, удобном для кэширования
+    префикса у провайдера: системное сообщение со статичными инструкциями,
+    затем стабильные данные (резюме), затем изменяемые (вакансия).
+    """
+    blocks: list[tuple[str, list[str]]] = []
+    system = None
+    for literal, field, spec, conversion in Formatter().parse(prompt_template):
+        if field is None:
+            if blocks:
+                blocks[-1][1].append(literal)
+            continue
+        if system is None:
+            system, header = _split_header(literal)
+        else:
+            if blocks:
+                # Разделитель предыдущего блока ("---") остается в нем, заголовок переходит в новый
+                tail, header = _split_header(literal)
+                blocks[-1][1].append(tail)
+            else:
+                header = literal
+        value = format(kwargs[field], spec) if spec else str(kwargs[field])
+        blocks.append((field, [header, value]))
+
+    if not blocks:
+        return [{"role": "user", "content": prompt_template.format(**kwargs)}]
+    # Изменяемые поля переносим в конец, сохраняя порядок остальных
+    blocks.sort(key=lambda block: block[0] in VARIABLE_FIELDS)
+    messages = []
+    if system and system.strip():
+        messages.append({"role": "system", "content": system.strip()})
+    for _, parts in blocks:
+        content = "".join(parts).strip()
+        if content:
+            messages.append({"role": "user", "content": content})
+    return messages
@@ -0,0 +1,30 @@
+from typing import Protocol, runtime_checkable
+
+from ai.streaming import DeltaCallback
+
+
+@runtime_checkable
+class AsyncAIProvider(Protocol):
+    """
+    Асинхронный интерфейс AI-провайдера.
+
+    Все провайдеры возвращают унифицированный словарь вида
+    {"text": str | None, "json": dict | None, "usage": {...}}.
+    Методы являются корутинами, поэтому вызовы провайдера не блокируют
+    цикл событий бота и могут выполняться параллельно.
+    """
+
+    async def verify_text(self, text: str, prompt_template: str) -> dict:
+        """Формирует промпт и вызывает AI для верификации."""
+        ...
+
+    async def analyze(self, prompt_template: str, is_json: bool = False, **kwargs) -> dict:
+        """Выполняет анализ или генерацию текста на основе шаблона и аргументов."""
+        ...
+
+    async def analyze_stream(self, prompt_template: str, on_delta: DeltaCallback, is_json: bool = False, **kwargs) -> dict:
+        """
+        Выполняет анализ, передавая фрагменты ответа в on_delta по мере генерации.
+        Возвращает тот же итоговый словарь, что и analyze.
+        """
+        ...
@@ -1,9 +1,11 @@
 import logging
-import requests
-import time
 import json
-import tiktoken
+import httpx
 from config import GEN_API_KEY
+from ai.prompts import build_messages
+from ai.token_budget import get_encoder
+from ai.streaming import DeltaCallback, emit_response
+from .gen_api_poller import AdaptiveBackoff, GenAPIPoller
 
 logger = logging.getLogger(__name__)
 
@@ -18,10 +20,12 @@ class GenAPIProvider:
 
     API_URL = f"https://api.gen-api.ru/api/v1/networks/{llm}"
     RESULT_URL = "https://api.gen-api.ru/api/v1/request/get/{request_id}"
-    POLLING_INTERVAL = 3  # Секунды
+    POLLING_INTERVAL = 3  # Начальный интервал опроса, секунды
+    MIN_POLLING_INTERVAL = 0.5  # Секунды
+    MAX_POLLING_INTERVAL = 15  # Секунды
     MAX_POLLING_ATTEMPTS = 100  # Максимальное количество попыток
 
-    def __init__(self, api_key: str = GEN_API_KEY):
+    def __init__(self, api_key: str = GEN_API_KEY, client: httpx.AsyncClient | None = None):
         if not api_key:
             logger.error("Gen-API key not found.")
             raise ValueError("Gen-API key is required.")
@@ -31,12 +35,12 @@ class GenAPIProvider:
             "Accept": "application/json",
             "Authorization": f"Bearer {self.api_key}",
         }
-        # Инициализация кодировщика токенов
-        try:
-            self.encoding = tiktoken.get_encoding("cl100k_base")
-        except Exception as e:
-            logger.error(f"Не удалось инициализировать кодировщик tiktoken: {e}")
-            self.encoding = None
+        # Общий асинхронный HTTP-клиент с пулом соединений
+        self.client = client or httpx.AsyncClient(timeout=30)
+        # Фоновый опросчик создается при первом запросе
+        self._poller: GenAPIPoller | None = None
+        # Общий кодировщик токенов (None, если tiktoken недоступен)
+        self.encoding = get_encoder()
         logger.info("Инициализирован Gen-API провайдер.")
 
     def _calculate_tokens(self, text: str) -> int:
@@ -45,11 +49,31 @@ class GenAPIProvider:
             return 0
         return len(self.encoding.encode(text))
 
+    def _get_poller(self) -> GenAPIPoller:
+        """Возвращает общий для всех запросов провайдера опросчик статусов."""
+        if self._poller is None:
+            backoff = AdaptiveBackoff(
+                initial=self.POLLING_INTERVAL,
+                minimum=min(self.MIN_POLLING_INTERVAL, self.POLLING_INTERVAL),
+                maximum=self.MAX_POLLING_INTERVAL,
+            )
+            self._poller = GenAPIPoller(
+                self._fetch_status, backoff=backoff, max_attempts=self.MAX_POLLING_ATTEMPTS
+            )
+        return self._poller
+
+    async def _fetch_status(self, request_id: str) -> dict:
+        """Запрашивает текущий статус задачи по request_id."""
+        result_response = await self.client.get(self.RESULT_URL.format(request_id=request_id), headers=self.headers)
+        result_response.raise_for_status()
+        return result_response.json()
+
     def _create_error_response(self, prompt: str, cost: float = 0.0) -> dict:
         """Создает стандартизированный ответ об ошибке."""
         prompt_tokens = self._calculate_tokens(prompt)
         return {
             "text": None,
+            "error": "Gen-API request failed",
             "usage": {
                 "cost": cost,
                 "prompt_tokens": prompt_tokens,
@@ -58,21 +82,24 @@ class GenAPIProvider:
             },
         }
 
-    def _get_completion(self, prompt: str, is_json: bool = False) -> dict:
+    async def _get_completion(self, prompt: str | list[dict], is_json: bool = False) -> dict:
         """
         Отправляет асинхронный запрос к API gen-api.ru, получает результат
         и возвращает унифицированный словарь с текстом и usage.
+        prompt — текст промпта или готовый список сообщений (см. build_messages).
         """
+        messages = [{"role": "user", "content": prompt}] if isinstance(prompt, str) else prompt
+        prompt = "\n\n".join(message["content"] for message in messages)
         logger.info(f"Отправка асинхронного запроса к Gen-API. Промпт: {prompt[:150]}...")
         payload = {
             "model": self.model,
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": messages,
         }
         if is_json:
             payload["response_format"] = {"type": "json_object"}
 
         try:
-            initial_response = requests.post(self.API_URL, json=payload, headers=self.headers)
+            initial_response = await self.client.post(self.API_URL, json=payload, headers=self.headers)
             initial_response.raise_for_status()
             initial_data = initial_response.json()
             logger.info(f"Получен ответ на создание задачи: {initial_data}")
@@ -82,81 +109,75 @@ class GenAPIProvider:
                 logger.error(f"Не удалось получить request_id из ответа: {initial_data}")
                 return self._create_error_response(prompt)
 
-            for attempt in range(self.MAX_POLLING_ATTEMPTS):
-                logger.info(f"Попытка {attempt + 1}/{self.MAX_POLLING_ATTEMPTS}: Проверка статуса для request_id {request_id}")
-                time.sleep(self.POLLING_INTERVAL)
-
-                result_response = requests.get(self.RESULT_URL.format(request_id=request_id), headers=self.headers)
-                result_response.raise_for_status()
-                result_data = result_response.json()
-
-                status = result_data.get("status")
-                logger.info(f"Текущий статус задачи: {status}")
-
-                if status == "success":
-                    logger.info(f"Задача {request_id} успешно выполнена. Ответ: {result_data}")
-                    try:
-                        content = result_data["full_response"][0]["message"]["content"]
-                        cost = result_data.get("cost", 0.0)
-
-                        prompt_tokens = self._calculate_tokens(prompt)
-                        completion_tokens = self._calculate_tokens(content)
-                        total_tokens = prompt_tokens + completion_tokens
-
-                        response_data = {
-                            "usage": {
-                                "cost": float(cost) if cost else 0.0,
-                                "prompt_tokens": prompt_tokens,
-                                "completion_tokens": completion_tokens,
-                                "total_tokens": total_tokens,
-                            }
+            result_data = await self._get_poller().wait_for(request_id)
+            status = result_data.get("status")
+
+            if status == "success":
+                logger.info(f"Задача {request_id} успешно выполнена. Ответ: {result_data}")
+                try:
+                    content = result_data["full_response"][0]["message"]["content"]
+                    cost = result_data.get("cost", 0.0)
+
+                    prompt_tokens = self._calculate_tokens(prompt)
+                    completion_tokens = self._calculate_tokens(content)
+                    total_tokens = prompt_tokens + completion_tokens
+
+                    response_data = {
+                        "usage": {
+                            "cost": float(cost) if cost else 0.0,
+                            "prompt_tokens": prompt_tokens,
+                            "completion_tokens": completion_tokens,
+                            "total_tokens": total_tokens,
                         }
-
-                        if is_json:
-                            try:
-                                response_data["json"] = json.loads(content)
-                                response_data["text"] = None
-                            except json.JSONDecodeError:
-                                logger.error("Не удалось декодировать JSON из ответа AI.")
-                                return self._create_error_response(prompt)
-                        else:
-                            response_data["text"] = content
-                            response_data["json"] = None
-
-                        return response_data
-
-                    except (KeyError, IndexError, TypeError) as e:
-                        logger.error(f"Не удалось извлечь контент из успешного ответа: {e}. Ответ: {result_data}")
-                        return self._create_error_response(prompt)
-
-                elif status == "failed":
-                    logger.error(f"Задача {request_id} провалена. Ответ: {result_data}")
-                    cost = float(result_data.get("cost", 0.0))
-                    return self._create_error_response(prompt, cost=cost)
-
-                elif status != "processing":
-                    logger.warning(f"Неизвестный статус задачи {request_id}: {status}")
-
-            logger.error(f"Превышено максимальное количество попыток для request_id {request_id}")
+                    }
+
+                    if is_json:
+                        try:
+                            response_data["json"] = json.loads(content)
+                            response_data["text"] = None
+                        except json.JSONDecodeError:
+                            logger.error("Не удалось декодировать JSON из ответа AI.")
+                            return self._create_error_response(prompt)
+                    else:
+                        response_data["text"] = content
+                        response_data["json"] = None
+
+                    return response_data
+
+                except (KeyError, IndexError, TypeError) as e:
+                    logger.error(f"Не удалось извлечь контент из успешного ответа: {e}. Ответ: {result_data}")
+                    return self._create_error_response(prompt)
+
+            logger.error(f"Задача {request_id} провалена. Ответ: {result_data}")
+            cost = float(result_data.get("cost", 0.0))
+            return self._create_error_response(prompt, cost=cost)
+
+        except TimeoutError:
             return self._create_error_response(prompt)
-
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Ошибка при запросе к Gen-API: {e}")
             return self._create_error_response(prompt)
         except json.JSONDecodeError as e:
             logger.error(f"Ошибка декодирования JSON ответа от Gen-API: {e}")
             return self._create_error_response(prompt)
 
-    def verify_text(self, text: str, prompt_template: str) -> dict:
+    async def verify_text(self, text: str, prompt_template: str) -> dict:
         """
         Формирует промпт и вызывает AI для верификации.
         """
-        prompt = prompt_template.format(text=text)
-        return self._get_completion(prompt)
+        return await self._get_completion(build_messages(prompt_template, text=text))
 
-    def analyze(self, prompt_template: str, is_json: bool = False, **kwargs) -> dict:
+    async def analyze(self, prompt_template: str, is_json: bool = False, **kwargs) -> dict:
         """
         Выполняет анализ или генерацию текста на основе шаблона и аргументов.
         """
-        prompt = prompt_template.format(**kwargs)
-        return self._get_completion(prompt, is_json)
+        return await self._get_completion(build_messages(prompt_template, **kwargs), is_json)
+
+    async def analyze_stream(self, prompt_template: str, on_delta: DeltaCallback, is_json: bool = False, **kwargs) -> dict:
+        """
+        Gen-API не поддерживает потоковую генерацию: ответ передается
+        в on_delta целиком после завершения задачи.
+        """
+        response = await self.analyze(prompt_template, is_json=is_json, **kwargs)
+        await emit_response(response, on_delta)
+        return response
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import statistics
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveBackoff:
+    """
+    Подбирает интервалы опроса статуса задач по наблюдаемому времени их выполнения.
+
+    Пока статистики нет, интервал растет экспоненциально от `initial`
+    (частые проверки в начале, редкие потом). Когда накоплены длительности
+    завершенных задач, первая проверка назначается на ожидаемый момент
+    завершения (медиана), а после него интервал снова растет от `minimum`.
+    """
+
+    def __init__(
+        self,
+        initial: float = 1.0,
+        minimum: float = 0.5,
+        maximum: float = 15.0,
+        factor: float = 1.5,
+        window: int = 50,
+    ):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.factor = factor
+        self._durations = deque(maxlen=window)
+
+    def observe(self, duration: float) -> None:
+        """Запоминает время выполнения завершенной задачи."""
+        self._durations.append(duration)
+
+    @property
+    def expected_duration(self) -> float | None:
+        """Ожидаемое время выполнения задачи (медиана последних наблюдений)."""
+        if not self._durations:
+            return None
+        return statistics.median(self._durations)
+
+    def _clamp(self, delay: float) -> float:
+        return max(self.minimum, min(self.maximum, delay))
+
+    def next_delay(self, attempt: int, elapsed: float) -> float:
+        """
+        Возвращает задержку до следующей проверки.
+
+        :param attempt: Номер уже выполненной проверки (0 - проверок еще не было).
+        :param elapsed: Сколько секунд прошло с момента создания задачи.
+        """
+        expected = self.expected_duration
+        if expected is None:
+            return min(self.maximum, self.initial * self.factor ** attempt)
+        if elapsed < expected:
+            return self._clamp(expected - elapsed)
+        overdue = elapsed - expected
+        return self._clamp(self.minimum + overdue * (self.factor - 1))
+
+
+@dataclass
+class _PendingJob:
+    request_id: str
+    future: asyncio.Future
+    submitted_at: float
+    next_check_at: float
+    attempts: int = 0
+    last_status: str | None = field(default=None)
+
+
+class GenAPIPoller:
+    """
+    Общий фоновый опросчик задач Gen-API.
+
+    Вместо отдельного цикла ожидания на каждый запрос одна корутина отслеживает
+    все незавершенные `request_id` и проверяет статусы пачками тех задач,
+    у которых подошло время проверки. Вызывающий код просто ожидает future.
+    """
+
+    def __init__(
+        self,
+        fetch_status: Callable[[str], Awaitable[dict]],
+        backoff: AdaptiveBackoff | None = None,
+        max_attempts: int = 100,
+        batch_size: int = 50,
+    ):
+        self._fetch_status = fetch_status
+        self.backoff = backoff or AdaptiveBackoff()
+        self.max_attempts = max_attempts
+        self.batch_size = batch_size
+        self._jobs: dict[str, _PendingJob] = {}
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self.status_checks = 0
+
+    @property
+    def pending(self) -> int:
+        """Количество задач, ожидающих завершения."""
+        return len(self._jobs)
+
+    def submit(self, request_id: str) -> asyncio.Future:
+        """
+        Ставит задачу на отслеживание и возвращает future с итоговым ответом
+        статуса ('success' или 'failed'). При превышении числа проверок
+        future завершается исключением TimeoutError.
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        job = _PendingJob(
+            request_id=request_id,
+            future=loop.create_future(),
+            submitted_at=now,
+            next_check_at=now + self.backoff.next_delay(0, 0.0),
+        )
+        self._jobs[request_id] = job
+        self._ensure_running(loop)
+        return job.future
+
+    async def wait_for(self, request_id: str) -> dict:
+        """Ожидает завершения задачи и возвращает ответ статуса."""
+        return await self.submit(request_id)
+
+    def _ensure_running(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+        else:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._jobs:
+            # Задачи, ожидание которых отменил вызывающий код, больше не опрашиваем
+            for job in [job for job in self._jobs.values() if job.future.cancelled()]:
+                self._jobs.pop(job.request_id, None)
+            if not self._jobs:
+                break
+
+            now = loop.time()
+            due = sorted(
+                (job for job in self._jobs.values() if job.next_check_at <= now),
+                key=lambda job: job.next_check_at,
+            )[: self.batch_size]
+
+            if not due:
+                timeout = min(job.next_check_at for job in self._jobs.values()) - now
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await asyncio.gather(*(self._check(job) for job in due))
+
+    async def _check(self, job: _PendingJob) -> None:
+        loop = asyncio.get_running_loop()
+        job.attempts += 1
+        self.status_checks += 1
+        logger.info(f"Попытка {job.attempts}/{self.max_attempts}: Проверка статуса для request_id {job.request_id}")
+
+        try:
+            result_data = await self._fetch_status(job.request_id)
+        except Exception as e:
+            self._finish(job, exception=e)
+            return
+
+        status = result_data.get("status")
+        job.last_status = status
+        elapsed = loop.time() - job.submitted_at
+
+        if status in ("success", "failed"):
+            if status == "success":
+                self.backoff.observe(elapsed)
+            self._finish(job, result=result_data)
+            return
+
+        if status != "processing":
+            logger.warning(f"Неизвестный статус задачи {job.request_id}: {status}")
+
+        if job.attempts >= self.max_attempts:
+            logger.error(f"Превышено максимальное количество попыток для request_id {job.request_id}")
+            self._finish(job, exception=TimeoutError(f"Gen-API request {job.request_id} timed out"))
+            return
+
+        job.next_check_at = loop.time() + self.backoff.next_delay(job.attempts, elapsed)
+
+    def _finish(self, job: _PendingJob, result: dict | None = None, exception: Exception | None = None) -> None:
+        self._jobs.pop(job.request_id, None)
+        if job.future.done():
+            return
+        if exception is not None:
+            job.future.set_exception(exception)
+        else:
+            job.future.set_result(result)
+
+    async def close(self) -> None:
+        """Останавливает опрос и отменяет ожидающие задачи."""
+        for job in list(self._jobs.values()):
+            job.future.cancel()
+        self._jobs.clear()
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
@@ -1,5 +1,9 @@
+import asyncio
+import json
 import logging
 
+from ai.streaming import DeltaCallback, emit_delta, response_content
+
 logger = logging.getLogger(__name__)
 
 
@@ -9,17 +13,24 @@ class MockProvider:
     Используется в тестах для изоляции от внешних сервисов.
     """
 
+    model = "mock"
+    STREAM_CHUNK_SIZE = 16
+
     def __init__(self, api_key: str = "mock_key"):
         # The key is not used, but we accept it to match the interface.
         logger.info("Инициализирован Mock AI провайдер.")
 
-    def _get_completion(self, prompt: str, is_json: bool = False) -> dict:
+    async def _get_completion(self, prompt: str, is_json: bool = False) -> dict:
         """
         Возвращает моковые данные, имитируя ответ от AI.
         """
         logger.info(f"Отправка запроса к Mock AI. Промпт: {prompt[:150]}...")
 
-        if is_json:
+        if "Сожми резюме" in prompt:
+            text_response = '{"title": "Mock Resume", "skills": ["Python", "SQL"]}'
+        elif "Сожми вакансию" in prompt:
+            text_response = '{"title": "Mock Vacancy", "requirements": [{"text": "Python", "importance": "must"}]}'
+        elif is_json:
             text_response = """
             {
                 "match_analysis": "Анализ соответствия (MOCK)",
@@ -61,16 +72,27 @@ class MockProvider:
 
         return response_data
 
-    def verify_text(self, text: str, prompt_template: str) -> dict:
+    async def verify_text(self, text: str, prompt_template: str) -> dict:
         """
         Формирует промпт и вызывает мок-AI для верификации.
         """
         prompt = prompt_template.format(text=text)
-        return self._get_completion(prompt)
+        return await self._get_completion(prompt)
 
-    def analyze(self, prompt_template: str, is_json: bool = False, **kwargs) -> dict:
+    async def analyze(self, prompt_template: str, is_json: bool = False, **kwargs) -> dict:
         """
         Выполняет мок-анализ или генерацию текста.
         """
         prompt = prompt_template.format(**kwargs)
-        return self._get_completion(prompt, is_json)
+        return await self._get_completion(prompt, is_json)
+
+    async def analyze_stream(self, prompt_template: str, on_delta: DeltaCallback, is_json: bool = False, **kwargs) -> dict:
+        """
+        Мок потоковой генерации: отдает ответ небольшими фрагментами.
+        """
+        response = await self.analyze(prompt_template, is_json=is_json, **kwargs)
+        content = response_content(response)
+        for i in range(0, len(content), self.STREAM_CHUNK_SIZE):
+            await emit_delta(on_delta, content[i:i + self.STREAM_CHUNK_SIZE])
+            await asyncio.sleep(0)
+        return response
@@ -1,82 +1,33 @@
 import logging
-import requests  # Assuming it would use requests, like the gen_api provider
 
 from config import OPENAI_API_KEY
+from .openrouter import OpenRouterProvider
 
 logger = logging.getLogger(__name__)
 
+OPENAI_API_BASE_URL = "https://api.openai.com/v1"
+OPENAI_MODEL_NAME = "gpt-4o-mini"
 
-class OpenAIProvider:
+
+class OpenAIProvider(OpenRouterProvider):
     """
     Класс для взаимодействия с API OpenAI.
+    API OpenRouter совместимо с OpenAI, поэтому провайдер переиспользует
+    его реализацию и отличается только адресом, моделью и заголовками.
     """
-    # This would be the actual API endpoint
-    API_URL = "https://api.openai.com/v1/chat/completions"
-
-    def __init__(self, api_key: str = OPENAI_API_KEY):
-        if not api_key:
-            logger.error("OpenAI API key not found.")
-            raise ValueError("OpenAI API key is required.")
-
-        self.api_key = api_key
-        self.headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}",
-        }
-        logger.info("Инициализирован OpenAI провайдер.")
-
-    def _get_completion(self, prompt: str, is_json: bool = False) -> dict:
-        """
-        Отправляет запрос к API OpenAI и возвращает ответ.
-        NOTE: This is a placeholder implementation. It does not actually call the API.
-        """
-        logger.info(f"Отправка запроса к OpenAI. Промпт: {prompt[:150]}...")
-
-        # This is where the actual API call would be made.
-        # For the purpose of this task, we don't need to implement the full OpenAI call.
-        # We just need to make sure the provider has a consistent structure.
-
-        if is_json:
-            text_response = """
-            {
-                "match_analysis": "Анализ соответствия от OpenAI",
-                "cover_letter": "Сопроводительное письмо от OpenAI",
-                "hr_call_plan": "План созвона с HR от OpenAI",
-                "tech_interview_plan": "План технического собеседования от OpenAI"
-            }
-            """
-        else:
-            text_response = "Ответ от OpenAI (не мок)"
-
-        prompt_tokens = len(prompt.split())
-        completion_tokens = len(text_response.split())
-        usage = {
-            "prompt_tokens": prompt_tokens,
-            "completion_tokens": completion_tokens,
-            "total_tokens": prompt_tokens + completion_tokens,
-        }
-
-        response_data = {"usage": usage}
-        if is_json:
-            response_data["json"] = json.loads(text_response)
-            response_data["text"] = None
-        else:
-            response_data["text"] = text_response
-            response_data["json"] = None
-
-        return response_data
-
-
-    def verify_text(self, text: str, prompt_template: str) -> dict:
-        """
-        Формирует промпт и вызывает AI для верификации.
-        """
-        prompt = prompt_template.format(text=text)
-        return self._get_completion(prompt)
 
-    def analyze(self, prompt_template: str, is_json: bool = False, **kwargs) -> dict:
-        """
-        Выполняет анализ или генерацию текста на основе шаблона и аргументов.
-        """
-        prompt = prompt_template.format(**kwargs)
-        return self._get_completion(prompt, is_json)
+    name = "OpenAI"
+    model = OPENAI_MODEL_NAME
+
+    def __init__(
+        self,
+        api_key: str = OPENAI_API_KEY,
+        base_url: str = OPENAI_API_BASE_URL,
+        model: str | None = None,
+        max_retries: int = 2,
+    ):
+        super().__init__(api_key=api_key, base_url=base_url, model=model, max_retries=max_retries)
+
+    def _build_extra_headers(self) -> dict:
+        """OpenAI не требует дополнительных заголовков."""
+        return {}
@@ -1,8 +1,10 @@
 import logging
 import json
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 from config import OPENROUTER_API_KEY
+from ai.prompts import build_messages
+from ai.streaming import DeltaCallback, emit_delta
 
 logger = logging.getLogger(__name__)
 
@@ -13,36 +15,92 @@ YOUR_SITE_NAME = "AI CV RES Analyzer"
 MODEL_NAME = "deepseek/deepseek-chat-v3.1:free"
 
 
+def _usage_dict(usage) -> dict:
+    """Статистика токенов из ответа API, включая токены промпта, взятые из кэша провайдера."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", None)
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+        "cached_prompt_tokens": cached_tokens if isinstance(cached_tokens, int) else 0,
+    }
+
+
 class OpenRouterProvider:
     """
     Класс для взаимодействия с API OpenRouter.
     """
 
-    def __init__(self, api_key: str = OPENROUTER_API_KEY):
-        if not api_key:
-            logger.error("OpenRouter API key not found.")
-            raise ValueError("OpenRouter API key is required.")
+    name = "OpenRouter"
+    model = MODEL_NAME
 
-        self.client = OpenAI(
-            base_url=OPENROUTER_API_BASE_URL,
+    def __init__(
+        self,
+        api_key: str = OPENROUTER_API_KEY,
+        base_url: str = OPENROUTER_API_BASE_URL,
+        model: str | None = None,
+        max_retries: int = 2,
+    ):
+        if not api_key:
+            logger.error(f"{self.name} API key not found.")
+            raise ValueError(f"{self.name} API key is required.")
+
+        if model:
+            self.model = model
+        # Асинхронный клиент разделяет пул соединений между всеми запросами,
+        # поэтому сотни анализов могут выполняться одновременно.
+        # base_url позволяет направить запросы на другой OpenAI-совместимый сервер.
+        self.client = AsyncOpenAI(
+            base_url=base_url,
             api_key=api_key,
+            max_retries=max_retries,
         )
-        self.extra_headers = {
+        self.extra_headers = self._build_extra_headers()
+        logger.info(f"Инициализирован {self.name} провайдер.")
+
+    def _build_extra_headers(self) -> dict:
+        """Дополнительные заголовки, которые OpenRouter использует для атрибуции приложения."""
+        return {
             "HTTP-Referer": YOUR_SITE_URL,
             "X-Title": YOUR_SITE_NAME,
         }
-        logger.info("Инициализирован OpenRouter провайдер.")
 
-    def _get_completion(self, prompt: str, is_json: bool = False) -> dict:
+    async def _stream_completion(self, request_params: dict, on_delta: DeltaCallback) -> tuple[str, dict]:
+        """
+        Выполняет потоковый запрос, передавая фрагменты текста в on_delta.
+        Возвращает полный текст ответа и статистику по токенам.
+        """
+        stream = await self.client.chat.completions.create(
+            **request_params,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        parts = []
+        usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_prompt_tokens": 0}
+        async for chunk in stream:
+            if chunk.choices:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    await emit_delta(on_delta, delta)
+            if chunk.usage:
+                usage = _usage_dict(chunk.usage)
+        return "".join(parts), usage
+
+    async def _get_completion(
+        self, prompt: str | list[dict], is_json: bool = False, on_delta: DeltaCallback | None = None
+    ) -> dict:
         """
         Отправляет запрос к API OpenRouter и возвращает ответ.
+        prompt — текст промпта или готовый список сообщений (см. build_messages).
+        Если передан on_delta, ответ запрашивается в потоковом режиме.
         """
-        logger.info(f"Отправка запроса к OpenRouter. Промпт: {prompt[:150]}...")
-
-        messages = [{"role": "user", "content": prompt}]
+        messages = [{"role": "user", "content": prompt}] if isinstance(prompt, str) else prompt
+        logger.info(f"Отправка запроса к {self.name}. Промпт: {messages[0]['content'][:150]}...")
 
         request_params = {
-            "model": MODEL_NAME,
+            "model": self.model,
             "messages": messages,
             "extra_headers": self.extra_headers,
         }
@@ -51,16 +109,14 @@ class OpenRouterProvider:
             request_params["response_format"] = {"type": "json_object"}
 
         try:
-            completion = self.client.chat.completions.create(**request_params)
-
-            usage = {
-                "prompt_tokens": completion.usage.prompt_tokens,
-                "completion_tokens": completion.usage.completion_tokens,
-                "total_tokens": completion.usage.total_tokens,
-            }
+            if on_delta:
+                message_content, usage = await self._stream_completion(request_params, on_delta)
+            else:
+                completion = await self.client.chat.completions.create(**request_params)
+                usage = _usage_dict(completion.usage)
+                message_content = completion.choices[0].message.content
 
             response_data = {"usage": usage}
-            message_content = completion.choices[0].message.content
 
             if not message_content:
                 raise ValueError("API returned an empty response content.")
@@ -80,23 +136,29 @@ class OpenRouterProvider:
             return response_data
 
         except Exception as e:
-            logger.error(f"Ошибка при вызове API OpenRouter: {e}")
+            logger.error(f"Ошибка при вызове API {self.name}: {e}")
             return {
-                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
-                "text": f"Error from OpenRouter: {e}",
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_prompt_tokens": 0},
+                "text": f"Error from {self.name}: {e}",
                 "json": None,
+                "error": str(e),
             }
 
-    def verify_text(self, text: str, prompt_template: str) -> dict:
+    async def verify_text(self, text: str, prompt_template: str) -> dict:
         """
         Формирует промпт и вызывает AI для верификации.
         """
-        prompt = prompt_template.format(text=text)
-        return self._get_completion(prompt)
+        return await self._get_completion(build_messages(prompt_template, text=text))
 
-    def analyze(self, prompt_template: str, is_json: bool = False, **kwargs) -> dict:
+    async def analyze(self, prompt_template: str, is_json: bool = False, **kwargs) -> dict:
         """
         Выполняет анализ или генерацию текста на основе шаблона и аргументов.
         """
-        prompt = prompt_template.format(**kwargs)
-        return self._get_completion(prompt, is_json)
+        return await self._get_completion(build_messages(prompt_template, **kwargs), is_json)
+
+    async def analyze_stream(self, prompt_template: str, on_delta: DeltaCallback, is_json: bool = False, **kwargs) -> dict:
+        """
+        Выполняет анализ в потоковом режиме: фрагменты ответа передаются
+        в on_delta по мере генерации, итоговый ответ возвращается как в analyze.
+        """
+        return await self._get_completion(build_messages(prompt_template, **kwargs), is_json, on_delta=on_delta)
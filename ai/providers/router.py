@@ -0,0 +1,341 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+from config import (
+    AI_ROUTER_BACKENDS, AI_ROUTER_CACHE_ID, AI_ROUTER_HEDGE_MIN_DELAY, AI_ROUTER_EJECTION_SECONDS, AI_PROVIDER_LIMITS,
+)
+from ai.scheduler import Priority, QueueStatus, RequestScheduler, ScheduledProvider
+from ai.streaming import DeltaCallback, emit_delta
+
+logger = logging.getLogger(__name__)
+
+
+def request_kind(method: str, prompt_template: str) -> str:
+    """
+    Вид запроса для статистики задержек: метод провайдера и шаблон промпта.
+    Задержки разных видов (проверка документа, один раздел, полный анализ) несравнимы.
+    """
+    digest = hashlib.sha1(prompt_template.encode("utf-8")).hexdigest()[:12]
+    return f"{method}:{digest}"
+
+
+def _percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class BackendHealth:
+    """
+    Скользящая статистика задержек и ошибок одного бэкенда.
+
+    Бэкенд исключается из маршрутизации, если доля ошибок в окне превышает
+    `error_threshold` или подряд случилось `max_consecutive_failures` ошибок.
+    По истечении времени исключения бэкенд снова получает запросы; первая же
+    ошибка после возвращения исключает его повторно на удвоенный срок.
+    Задержки дополнительно учитываются по видам запросов (request_kind): по ним
+    выбирается задержка, после которой запрос дублируется.
+    """
+
+    def __init__(
+        self,
+        window: int = 50,
+        min_samples: int = 5,
+        error_threshold: float = 0.5,
+        max_consecutive_failures: int = 3,
+        ejection_seconds: float = 30.0,
+        max_ejection_seconds: float = 600.0,
+        default_latency: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_samples = min_samples
+        self.error_threshold = error_threshold
+        self.max_consecutive_failures = max_consecutive_failures
+        self.ejection_seconds = ejection_seconds
+        self.max_ejection_seconds = max_ejection_seconds
+        self.default_latency = default_latency
+        self._clock = clock
+        self._window = window
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._kind_latencies: dict[str, deque[float]] = {}
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._consecutive_failures = 0
+        self._ejections = 0
+        self.ejected_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        """Может ли бэкенд получать запросы."""
+        return self._clock() >= self.ejected_until
+
+    @property
+    def error_rate(self) -> float:
+        """Доля неудачных запросов в окне."""
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def percentile(self, q: float) -> float:
+        """Перцентиль задержки успешных запросов; до накопления статистики — значение по умолчанию."""
+        if len(self._latencies) < self.min_samples:
+            return self.default_latency
+        return _percentile(self._latencies, q)
+
+    def hedge_delay(self, kind: str) -> float | None:
+        """
+        p95-задержка успешных запросов этого вида. None, пока их меньше min_samples:
+        без статистики вида неизвестно, считать ли запрос медленным, и он не дублируется.
+        """
+        samples = self._kind_latencies.get(kind)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        return _percentile(samples, 0.95)
+
+    @property
+    def p95(self) -> float:
+        return self.percentile(0.95)
+
+    @property
+    def score(self) -> float:
+        """Оценка для выбора бэкенда: медианная задержка с поправкой на ошибки (меньше — лучше)."""
+        return self.percentile(0.5) * (1 + 4 * self.error_rate)
+
+    def record_success(self, latency: float, kind: str | None = None) -> None:
+        self._latencies.append(latency)
+        if kind is not None:
+            self._kind_latencies.setdefault(kind, deque(maxlen=self._window)).append(latency)
+        self._outcomes.append(True)
+        self._consecutive_failures = 0
+        self._ejections = 0
+
+    def record_failure(self) -> None:
+        self._outcomes.append(False)
+        self._consecutive_failures += 1
+        too_many_errors = len(self._outcomes) >= self.min_samples and self.error_rate >= self.error_threshold
+        if too_many_errors or self._consecutive_failures >= self.max_consecutive_failures:
+            self._eject()
+
+    def _eject(self) -> None:
+        duration = min(self.ejection_seconds * 2 ** self._ejections, self.max_ejection_seconds)
+        self.ejected_until = self._clock() + duration
+        self._ejections += 1
+        # После возвращения бэкенд проверяется заново: одна ошибка снова исключает его
+        self._outcomes.clear()
+        self._consecutive_failures = self.max_consecutive_failures - 1
+
+
+class Backend:
+    """Провайдер, включенный в маршрутизацию, вместе с его статистикой."""
+
+    def __init__(self, name: str, provider, health: BackendHealth):
+        self.name = name
+        self.provider = provider
+        self.health = health
+
+
+def _is_error(response: dict | None) -> bool:
+    """Считается ли ответ провайдера неудачным."""
+    if not response or "error" in response:
+        return True
+    return response.get("json") is None and not response.get("text")
+
+
+def _error_response(error: str) -> dict:
+    return {
+        "text": None,
+        "json": None,
+        "error": error,
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+def _default_providers() -> dict:
+    """
+    Создает провайдеры из AI_ROUTER_BACKENDS, пропуская те, для которых нет ключа.
+    Запросы к каждому провайдеру проходят через его планировщик с лимитами из AI_PROVIDER_LIMITS.
+    """
+    from .gen_api import GenAPIProvider
+    from .openai import OpenAIProvider
+    from .openrouter import OpenRouterProvider
+
+    factories = {"openrouter": OpenRouterProvider, "gen_api": GenAPIProvider, "openai": OpenAIProvider}
+    providers = {}
+    for name in AI_ROUTER_BACKENDS:
+        factory = factories.get(name)
+        if factory is None:
+            logger.warning(f"Неизвестный AI-бэкенд '{name}' пропущен.")
+            continue
+        try:
+            # Повторы выполняет маршрутизатор, переключаясь на другой бэкенд
+            provider = factory(max_retries=0) if name != "gen_api" else factory()
+        except ValueError:
+            logger.info(f"AI-бэкенд '{name}' не настроен, пропускаем.")
+            continue
+        scheduler = RequestScheduler(name, **AI_PROVIDER_LIMITS.get(name, {}))
+        providers[name] = ScheduledProvider(provider, scheduler)
+    return providers
+
+
+class RouterProvider:
+    """
+    Провайдер, распределяющий запросы между несколькими бэкендами.
+
+    Для каждого бэкенда ведется скользящая статистика задержек и ошибок.
+    Запрос отправляется лучшему доступному бэкенду; если он не ответил за
+    свою p95-задержку для запросов того же вида, дублирующий запрос уходит
+    следующему, и используется первый успешный ответ. Пока статистики вида
+    недостаточно, запрос не дублируется. При ошибке запрос переходит к следующему бэкенду.
+    Потоковые запросы не дублируются: переключение возможно только до
+    первого фрагмента ответа.
+    """
+
+    name = "Router"
+
+    def __init__(
+        self,
+        providers: dict | None = None,
+        hedge_min_delay: float = AI_ROUTER_HEDGE_MIN_DELAY,
+        ejection_seconds: float = AI_ROUTER_EJECTION_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        cache_id: str = AI_ROUTER_CACHE_ID,
+    ):
+        providers = providers if providers is not None else _default_providers()
+        if not providers:
+            logger.error("Не настроен ни один AI-бэкенд.")
+            raise ValueError("At least one AI backend is required.")
+        self.hedge_min_delay = hedge_min_delay
+        self.cache_id = cache_id
+        self._clock = clock
+        self.backends = [
+            Backend(name, provider, BackendHealth(ejection_seconds=ejection_seconds, clock=clock))
+            for name, provider in providers.items()
+        ]
+        self.hedged_requests = 0
+        logger.info(f"Инициализирован маршрутизатор AI-провайдеров: {', '.join(providers)}.")
+
+    @property
+    def model(self) -> str:
+        """
+        Имя для ключа кэша ответов. Ответ может дать любой бэкенд, поэтому имя не зависит
+        от их списка: добавление или отключение бэкенда не сбрасывает кэш.
+        """
+        return self.cache_id
+
+    def queue_status(self, priority: Priority | None = None) -> QueueStatus:
+        """Состояние очереди бэкенда, которому будет отправлен следующий запрос."""
+        backend = self.ranked_backends()[0]
+        if hasattr(backend.provider, "queue_status"):
+            return backend.provider.queue_status(priority)
+        return QueueStatus(depth=0, estimated_wait=0.0)
+
+    def ranked_backends(self) -> list[Backend]:
+        """
+        Доступные бэкенды в порядке предпочтения. Если исключены все,
+        возвращаются все, начиная с тех, что раньше вернутся в работу.
+        """
+        available = [b for b in self.backends if b.health.available]
+        if available:
+            return sorted(available, key=lambda b: b.health.score)
+        return sorted(self.backends, key=lambda b: b.health.ejected_until)
+
+    async def _attempt(self, backend: Backend, call: Callable[[object], Awaitable[dict]], kind: str) -> dict:
+        """Выполняет запрос к бэкенду и обновляет его статистику."""
+        started = self._clock()
+        try:
+            response = await call(backend.provider)
+        except Exception as e:
+            logger.error(f"AI-бэкенд '{backend.name}' завершился с ошибкой: {e}")
+            response = _error_response(str(e))
+        if _is_error(response):
+            backend.health.record_failure()
+            if not backend.health.available:
+                logger.warning(f"AI-бэкенд '{backend.name}' временно исключен из маршрутизации.")
+        else:
+            backend.health.record_success(self._clock() - started, kind)
+        return response
+
+    async def _route(self, call: Callable[[object], Awaitable[dict]], kind: str) -> dict:
+        """Выполняет запрос с дублированием медленных и переключением неудачных попыток."""
+        candidates = self.ranked_backends()
+        pending: dict[asyncio.Task, Backend] = {}
+        last_response = None
+        next_index = 0
+
+        def launch() -> None:
+            nonlocal next_index
+            backend = candidates[next_index]
+            next_index += 1
+            pending[asyncio.create_task(self._attempt(backend, call, kind))] = backend
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if len(pending) == 1 and next_index < len(candidates):
+                    primary = next(iter(pending.values()))
+                    delay = primary.health.hedge_delay(kind)
+                    if delay is not None:
+                        timeout = max(self.hedge_min_delay, delay)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.hedged_requests += 1
+                    logger.info(f"AI-бэкенд '{primary.name}' отвечает дольше {timeout:.1f} с, дублируем запрос.")
+                    launch()
+                    continue
+                for task in done:
+                    pending.pop(task)
+                    response = task.result()
+                    if not _is_error(response):
+                        return response
+                    last_response = response
+                if not pending and next_index < len(candidates):
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        return last_response
+
+    async def verify_text(self, text: str, prompt_template: str) -> dict:
+        """
+        Формирует промпт и вызывает AI для верификации.
+        """
+        return await self._route(
+            lambda provider: provider.verify_text(text, prompt_template), request_kind("verify_text", prompt_template)
+        )
+
+    async def analyze(self, prompt_template: str, is_json: bool = False, **kwargs) -> dict:
+        """
+        Выполняет анализ или генерацию текста на основе шаблона и аргументов.
+        """
+        return await self._route(
+            lambda provider: provider.analyze(prompt_template, is_json=is_json, **kwargs),
+            request_kind("analyze", prompt_template),
+        )
+
+    async def analyze_stream(self, prompt_template: str, on_delta: DeltaCallback, is_json: bool = False, **kwargs) -> dict:
+        """
+        Выполняет анализ в потоковом режиме. При ошибке до первого фрагмента
+        запрос переходит к следующему бэкенду; после начала вывода — нет,
+        чтобы пользователь не получил смесь двух ответов.
+        """
+        emitted = False
+
+        async def forward(delta: str) -> None:
+            nonlocal emitted
+            emitted = True
+            await emit_delta(on_delta, delta)
+
+        response = None
+        kind = request_kind("analyze_stream", prompt_template)
+        for backend in self.ranked_backends():
+            response = await self._attempt(
+                backend,
+                lambda provider: provider.analyze_stream(prompt_template, forward, is_json=is_json, **kwargs),
+                kind,
+            )
+            if not _is_error(response) or emitted:
+                return response
+        return response
@@ -0,0 +1,266 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Awaitable, Callable
+
+from ai.streaming import DeltaCallback
+from ai.token_budget import count_tokens, template_tokens
+
+logger = logging.getLogger(__name__)
+
+# Среднее время запроса, пока не накоплена статистика (секунды)
+DEFAULT_REQUEST_DURATION = 10.0
+# Запас токенов на ответ модели при оценке размера запроса
+COMPLETION_TOKEN_RESERVE = 1000
+
+
+class Priority(IntEnum):
+    """Приоритет запроса к AI: меньшее значение обслуживается раньше."""
+
+    ANALYSIS = 0
+    VERIFICATION = 1
+
+
+_current_priority: ContextVar[Priority] = ContextVar("ai_request_priority", default=Priority.ANALYSIS)
+
+
+def current_priority() -> Priority:
+    """Приоритет запросов в текущем контексте выполнения."""
+    return _current_priority.get()
+
+
+@contextmanager
+def request_priority(priority: Priority):
+    """Задает приоритет всех запросов к AI внутри блока, включая порожденные задачи."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+@dataclass
+class QueueStatus:
+    """Состояние очереди запросов к провайдеру."""
+
+    depth: int
+    estimated_wait: float
+
+
+class TokenBucket:
+    """
+    Корзина токенов, пополняемая равномерно с заданной скоростью в минуту.
+    Баланс может уходить в минус, если фактический расход превысил оценку.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = per_minute
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self) -> float:
+        """Текущее количество токенов в корзине."""
+        self._refill()
+        return self.tokens
+
+    def delay_for(self, amount: float) -> float:
+        """Через сколько секунд в корзине будет `amount` токенов."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount
+
+    def adjust(self, amount: float) -> None:
+        """Возвращает (или дополнительно списывает) токены после уточнения расхода."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RequestScheduler:
+    """
+    Планировщик запросов к одному провайдеру.
+
+    Ограничивает число одновременных запросов, запросы в минуту и токены
+    в минуту (0 — без ограничения). Запросы, которые нельзя выполнить сразу,
+    ждут в очереди по приоритету, а при равном приоритете — в порядке поступления.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int = 0,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._clock = clock
+        self._requests = TokenBucket(requests_per_minute, clock) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute, clock) if tokens_per_minute > 0 else None
+        self._queue: list[tuple[int, int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self._average_duration: float | None = None
+        self.active = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for *_, future in self._queue if not future.cancelled())
+
+    def _has_free_slot(self) -> bool:
+        return not self.max_concurrency or self.active < self.max_concurrency
+
+    def _rate_delay(self, tokens: int) -> float:
+        delays = [0.0]
+        if self._requests:
+            delays.append(self._requests.delay_for(1))
+        if self._tokens:
+            delays.append(self._tokens.delay_for(tokens))
+        return max(delays)
+
+    def status(self, priority: Priority | None = None) -> QueueStatus:
+        """
+        Глубина очереди и оценка ожидания для нового запроса с данным приоритетом:
+        учитываются только запросы, которые будут обслужены раньше него.
+        """
+        ahead = sum(
+            1 for queued_priority, _, _, future in self._queue
+            if not future.cancelled() and (priority is None or queued_priority <= priority)
+        )
+        average = self._average_duration or DEFAULT_REQUEST_DURATION
+        wait = 0.0
+        if self.max_concurrency and (ahead or not self._has_free_slot()):
+            wait = (ahead // self.max_concurrency + 1) * average
+        if self._requests:
+            wait = max(wait, (ahead + 1 - self._requests.available()) / self._requests.rate)
+        return QueueStatus(depth=ahead, estimated_wait=wait)
+
+    def _dispatch(self) -> None:
+        """Запускает запросы из очереди, пока позволяют лимиты."""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue:
+            _, _, tokens, future = self._queue[0]
+            if future.cancelled():
+                heapq.heappop(self._queue)
+                continue
+            if not self._has_free_slot():
+                return
+            delay = self._rate_delay(tokens)
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._queue)
+            if self._requests:
+                self._requests.consume(1)
+            if self._tokens:
+                self._tokens.consume(tokens)
+            self.active += 1
+            future.set_result(None)
+
+    async def _acquire(self, priority: int, tokens: int) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), tokens, future))
+        self._dispatch()
+        if not future.done():
+            logger.info(f"Запрос к '{self.name}' ожидает в очереди (глубина {self.queue_depth}).")
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Слот уже выделен, но запрос отменили до начала выполнения
+                self._release(0.0, tokens, None)
+            else:
+                future.cancel()
+            raise
+
+    def _release(self, duration: float, estimated_tokens: int, actual_tokens: int | None) -> None:
+        self.active -= 1
+        if duration > 0:
+            if self._average_duration is None:
+                self._average_duration = duration
+            else:
+                self._average_duration = 0.8 * self._average_duration + 0.2 * duration
+        if self._tokens and actual_tokens is not None:
+            self._tokens.adjust(estimated_tokens - actual_tokens)
+        self._dispatch()
+
+    async def run(self, request: Callable[[], Awaitable[dict]], priority: int, estimated_tokens: int) -> dict:
+        """Выполняет запрос, дождавшись своей очереди и свободных лимитов."""
+        await self._acquire(priority, estimated_tokens)
+        started = self._clock()
+        actual_tokens = None
+        try:
+            response = await request()
+            actual_tokens = ((response or {}).get("usage") or {}).get("total_tokens") or None
+            return response
+        finally:
+            self._release(self._clock() - started, estimated_tokens, actual_tokens)
+
+
+def estimate_tokens(prompt_template: str, inputs: dict) -> int:
+    """Оценка размера запроса в токенах общим кодировщиком с запасом на ответ."""
+    return template_tokens(prompt_template) + sum(count_tokens(str(value)) for value in inputs.values()) + COMPLETION_TOKEN_RESERVE
+
+
+class ScheduledProvider:
+    """
+    Обертка над провайдером, пропускающая все его запросы через планировщик.
+    Приоритет берется из контекста (см. request_priority).
+    """
+
+    def __init__(self, provider, scheduler: RequestScheduler):
+        self.provider = provider
+        self.scheduler = scheduler
+
+    @property
+    def name(self) -> str:
+        return getattr(self.provider, "name", self.scheduler.name)
+
+    @property
+    def model(self) -> str:
+        return getattr(self.provider, "model", self.scheduler.name)
+
+    def queue_status(self, priority: Priority | None = None) -> QueueStatus:
+        return self.scheduler.status(priority)
+
+    async def verify_text(self, text: str, prompt_template: str) -> dict:
+        """Верификация текста через очередь провайдера."""
+        return await self.scheduler.run(
+            lambda: self.provider.verify_text(text, prompt_template),
+            current_priority(), estimate_tokens(prompt_template, {"text": text}),
+        )
+
+    async def analyze(self, prompt_template: str, is_json: bool = False, **kwargs) -> dict:
+        """Анализ через очередь провайдера."""
+        return await self.scheduler.run(
+            lambda: self.provider.analyze(prompt_template, is_json=is_json, **kwargs),
+            current_priority(), estimate_tokens(prompt_template, kwargs),
+        )
+
+    async def analyze_stream(self, prompt_template: str, on_delta: DeltaCallback, is_json: bool = False, **kwargs) -> dict:
+        """Потоковый анализ через очередь провайдера."""
+        return await self.scheduler.run(
+            lambda: self.provider.analyze_stream(prompt_template, on_delta, is_json=is_json, **kwargs),
+            current_priority(), estimate_tokens(prompt_template, kwargs),
+        )
@@ -0,0 +1,224 @@
+import inspect
+import json
+import re
+from typing import Awaitable, Callable, Union
+
+# Обработчик фрагментов потокового ответа: получает очередной кусок текста
+DeltaCallback = Callable[[str], Union[Awaitable[None], None]]
+
+_JSON_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+async def emit_delta(on_delta: DeltaCallback, delta: str) -> None:
+    """Передает фрагмент обработчику, поддерживая синхронные и асинхронные функции."""
+    result = on_delta(delta)
+    if inspect.isawaitable(result):
+        await result
+
+
+def response_content(response: dict) -> str:
+    """Возвращает содержимое унифицированного ответа провайдера в виде строки."""
+    if response.get("json") is not None:
+        return json.dumps(response["json"], ensure_ascii=False)
+    return response.get("text") or ""
+
+
+async def emit_response(response: dict, on_delta: DeltaCallback) -> None:
+    """
+    Отдает готовый ответ одним фрагментом. Используется провайдерами
+    без поддержки потоковой генерации и для ответов из кэша.
+    """
+    if "error" in response:
+        return
+    content = response_content(response)
+    if content:
+        await emit_delta(on_delta, content)
+
+
+def extract_partial_json_string(buffer: str, key: str) -> str | None:
+    """
+    Извлекает из незавершенного JSON текущее (возможно, неполное) строковое
+    значение ключа верхнего уровня. Возвращает None, если значение еще не началось.
+    """
+    match = re.search(r'"%s"\s*:\s*"' % re.escape(key), buffer)
+    if not match:
+        return None
+
+    end = buffer.find('"', match.end())
+    while end != -1 and _is_escaped(buffer, end):
+        end = buffer.find('"', end + 1)
+    return _decode_partial_json_string(buffer[match.end():] if end == -1 else buffer[match.end():end])
+
+
+def _is_escaped(text: str, index: int) -> bool:
+    """Проверяет, экранирован ли символ с позицией index обратной косой чертой."""
+    backslashes = 0
+    while index - backslashes - 1 >= 0 and text[index - backslashes - 1] == "\\":
+        backslashes += 1
+    return backslashes % 2 == 1
+
+
+def _decode_partial_json_string(raw: str) -> str:
+    """
+    Декодирует содержимое JSON-строки без кавычек, возможно, оборванное посередине.
+    Незавершенная escape-последовательность в конце отбрасывается.
+    """
+    chars = []
+    i = 0
+    while i < len(raw):
+        char = raw[i]
+        if char != "\\":
+            chars.append(char)
+            i += 1
+            continue
+        if i + 1 >= len(raw):
+            break
+        escaped = raw[i + 1]
+        if escaped == "u":
+            code = raw[i + 2:i + 6]
+            if len(code) < 4:
+                break
+            chars.append(chr(int(code, 16)))
+            i += 6
+        else:
+            chars.append(_JSON_ESCAPES.get(escaped, escaped))
+            i += 2
+    return "".join(chars)
+
+
+class JSONSectionParser:
+    """
+    Инкрементальный разбор потокового JSON-объекта верхнего уровня.
+
+    Фрагменты передаются в `feed` по мере поступления; как только значение
+    очередного ключа закрывается, пара (ключ, значение) возвращается из `feed`
+    и сохраняется в `sections`. Строковые значения декодируются, прочие значения
+    возвращаются в виде исходного JSON-текста. Обрамление ```json игнорируется.
+    """
+
+    def __init__(self):
+        self.sections: dict[str, str] = {}
+        self._state = "start"
+        self._key_chars: list[str] = []
+        self._value_chars: list[str] = []
+        self._current_key: str | None = None
+        self._escape = False
+        self._depth = 0
+        self._in_nested_string = False
+
+    @property
+    def done(self) -> bool:
+        """Завершен ли разбор объекта."""
+        return self._state == "done"
+
+    def partial(self, key: str) -> str | None:
+        """Возвращает значение ключа: полное, если оно закрыто, или уже полученную часть."""
+        if key in self.sections:
+            return self.sections[key]
+        if key == self._current_key and self._state == "string_value":
+            return _decode_partial_json_string("".join(self._value_chars))
+        return None
+
+    def feed(self, chunk: str) -> list[tuple[str, str]]:
+        """Обрабатывает очередной фрагмент и возвращает разделы, завершенные в нем."""
+        completed = []
+        for char in chunk:
+            section = self._consume(char)
+            if section:
+                completed.append(section)
+        return completed
+
+    def _finish_value(self, value: str) -> tuple[str, str]:
+        key = self._current_key
+        self.sections[key] = value
+        self._current_key = None
+        self._value_chars = []
+        self._state = "after_value"
+        return key, value
+
+    def _consume(self, char: str) -> tuple[str, str] | None:
+        state = self._state
+
+        if state == "start":
+            if char == "{":
+                self._state = "key_or_end"
+        elif state in ("key_or_end", "key"):
+            if char == '"':
+                self._key_chars = []
+                self._state = "key_string"
+            elif char == "}" and state == "key_or_end":
+                self._state = "done"
+        elif state == "key_string":
+            if self._escape:
+                self._key_chars.append(char)
+                self._escape = False
+            elif char == "\\":
+                self._key_chars.append(char)
+                self._escape = True
+            elif char == '"':
+                self._current_key = json.loads('"' + "".join(self._key_chars) + '"')
+                self._state = "colon"
+            else:
+                self._key_chars.append(char)
+        elif state == "colon":
+            if char == ":":
+                self._state = "value"
+        elif state == "value":
+            if char == '"':
+                self._value_chars = []
+                self._state = "string_value"
+            elif not char.isspace():
+                self._value_chars = [char]
+                self._depth = 1 if char in "[{" else 0
+                self._in_nested_string = False
+                self._state = "other_value"
+        elif state == "string_value":
+            if self._escape:
+                self._value_chars.append(char)
+                self._escape = False
+            elif char == "\\":
+                self._value_chars.append(char)
+                self._escape = True
+            elif char == '"':
+                return self._finish_value(json.loads('"' + "".join(self._value_chars) + '"'))
+            else:
+                self._value_chars.append(char)
+        elif state == "other_value":
+            return self._consume_other_value(char)
+        elif state == "after_value":
+            if char == ",":
+                self._state = "key"
+            elif char == "}":
+                self._state = "done"
+        return None
+
+    def _consume_other_value(self, char: str) -> tuple[str, str] | None:
+        """Обрабатывает нестроковое значение (число, литерал, массив или объект)."""
+        if self._in_nested_string:
+            self._value_chars.append(char)
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_nested_string = False
+            return None
+
+        if self._depth == 0 and (char in ",}" or char.isspace()):
+            section = self._finish_value("".join(self._value_chars).strip())
+            if char == "}":
+                self._state = "done"
+            elif char == ",":
+                self._state = "key"
+            return section
+
+        self._value_chars.append(char)
+        if char == '"':
+            self._in_nested_string = True
+        elif char in "[{":
+            self._depth += 1
+        elif char in "]}":
+            self._depth -= 1
+            if self._depth == 0:
+                return self._finish_value("".join(self._value_chars))
+        return None
@@ -0,0 +1,228 @@
+import functools
+import logging
+import re
+from dataclasses import dataclass, field
+
+import tiktoken
+
+from config import AI_RESUME_TOKEN_CAP, AI_VACANCY_TOKEN_CAP, AI_CHUNK_TOKENS
+
+logger = logging.getLogger(__name__)
+
+ENCODING_NAME = "cl100k_base"
+# Примерное число символов на токен, если кодировщик недоступен
+CHARS_PER_TOKEN = 4
+
+# Лимиты входных данных в токенах по действиям: {действие: {поле шаблона: лимит}}
+INPUT_TOKEN_CAPS = {
+    "verify_resume": {"text": AI_RESUME_TOKEN_CAP},
+    "verify_vacancy": {"text": AI_VACANCY_TOKEN_CAP},
+    "analysis": {"resume_text": AI_RESUME_TOKEN_CAP, "vacancy_text": AI_VACANCY_TOKEN_CAP},
+    # Извлечение фактов из части длинного документа (с запасом на заголовок части)
+    "extract_facts": {"text": AI_CHUNK_TOKENS + 100},
+}
+
+# Повторы строк короче этой длины (заголовки разделов, пункты списков) не удаляются:
+# в резюме и вакансиях они законно встречаются несколько раз
+_MIN_DUPLICATE_CHARS = 40
+
+# Заголовки разделов резюме и вакансий, по которым длинный документ делится на части
+_SECTION_HEADINGS = re.compile(
+    r"^(Опыт работы|Образование|Ключевые навыки|Навыки|О себе|Обо мне|Проекты|Сертификаты|Курсы|Языки|"
+    r"Дополнительная информация|Требования|Обязанности|Условия|Мы предлагаем|Задачи|О компании|"
+    r"Experience|Work experience|Education|Skills|Projects|Requirements|Responsibilities)\b"
+    r"|^[^.!?]{1,60}:$",
+    re.IGNORECASE,
+)
+
+
+@functools.lru_cache(maxsize=1)
+def get_encoder():
+    """Общий кодировщик токенов (загружается один раз). None, если tiktoken недоступен."""
+    try:
+        return tiktoken.get_encoding(ENCODING_NAME)
+    except Exception as e:
+        logger.warning(f"Кодировщик tiktoken недоступен, токены оцениваются по длине текста: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Количество токенов в тексте."""
+    if not text:
+        return 0
+    encoder = get_encoder()
+    if encoder is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoder.encode(text))
+
+
+@functools.lru_cache(maxsize=64)
+def template_tokens(prompt_template: str) -> int:
+    """Количество токенов шаблона промпта (шаблонов немного, поэтому результат кэшируется)."""
+    return count_tokens(prompt_template)
+
+
+def normalize_lines(text: str) -> str:
+    """Схлопывает пробелы в строках и удаляет пустые строки."""
+    lines = (re.sub(r"\s+", " ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def deduplicate_lines(text: str) -> str:
+    """Удаляет повторы длинных строк, сохраняя первое вхождение; короткие строки не трогает."""
+    seen = set()
+    lines = []
+    for line in text.splitlines():
+        key = line.strip().casefold()
+        if len(key) >= _MIN_DUPLICATE_CHARS:
+            if key in seen:
+                continue
+            seen.add(key)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def clean_text(text: str) -> str:
+    """
+    Схлопывает пробелы и удаляет повторы длинных строк. Содержимое не вырезается:
+    навигация и подвал страниц удаляются при скрейпинге (scraper.extractors.strip_page_chrome).
+    """
+    return deduplicate_lines(normalize_lines(text))
+
+
+def split_sections(text: str) -> list[str]:
+    """Делит текст на разделы по строкам-заголовкам."""
+    sections: list[list[str]] = [[]]
+    for line in text.splitlines():
+        if _SECTION_HEADINGS.match(line.strip()) and sections[-1]:
+            sections.append([])
+        sections[-1].append(line)
+    return ["\n".join(lines) for lines in sections if lines]
+
+
+def _split_oversized(text: str, max_tokens: int) -> list[str]:
+    """Делит раздел длиннее max_tokens по строкам, а слишком длинные строки — по токенам."""
+    pieces = []
+    for line in text.splitlines():
+        tokens = count_tokens(line)
+        if tokens <= max_tokens:
+            pieces.append(line)
+            continue
+        # Длину куска в символах оцениваем по средней длине токена в строке
+        step = max(1, len(line) * max_tokens // tokens)
+        pieces.extend(line[i:i + step] for i in range(0, len(line), step))
+    return pieces
+
+
+def split_into_chunks(text: str, max_tokens: int) -> list[str]:
+    """
+    Делит длинный текст на части не больше max_tokens токенов.
+    Части собираются из целых разделов; раздел, который не помещается в часть,
+    делится по строкам.
+    """
+    chunks: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+    for section in split_sections(text):
+        pieces = [section] if count_tokens(section) <= max_tokens else _split_oversized(section, max_tokens)
+        for piece in pieces:
+            tokens = count_tokens(piece) + 1
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def sum_usage(*usages: dict | None) -> dict:
+    """Суммирует числовые поля статистики (токены, стоимость) нескольких запросов."""
+    total: dict = {}
+    for usage in usages:
+        for key, value in (usage or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                total[key] = (total.get(key) or 0) + value
+    return total
+
+
+def add_usage(response: dict | None, *extra: dict) -> dict | None:
+    """Добавляет к статистике ответа токены и стоимость вспомогательных запросов."""
+    if not response:
+        return response
+    return {**response, "usage": {**(response.get("usage") or {}), **sum_usage(response.get("usage"), *extra)}}
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Обрезает текст до max_tokens токенов по границе строки."""
+    if max_tokens <= 0 or count_tokens(text) <= max_tokens:
+        return text
+    encoder = get_encoder()
+    if encoder is None:
+        truncated = text[:max_tokens * CHARS_PER_TOKEN]
+    else:
+        truncated = encoder.decode(encoder.encode(text)[:max_tokens])
+    if "\n" in truncated:
+        truncated = truncated[:truncated.rfind("\n")]
+    return truncated.rstrip()
+
+
+@dataclass
+class BudgetReport:
+    """Сколько токенов входных данных удалось сэкономить для одного запроса к AI."""
+
+    action: str
+    original_tokens: int = 0
+    final_tokens: int = 0
+    truncated: list[str] = field(default_factory=list)
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.final_tokens
+
+
+def prepare_inputs(action: str, inputs: dict) -> tuple[dict, BudgetReport]:
+    """
+    Готовит входные тексты к отправке в промпт: удаляет шаблонный мусор и дубли строк,
+    затем обрезает поля до лимитов действия (INPUT_TOKEN_CAPS).
+    Возвращает новые входные данные и отчет о сэкономленных токенах.
+    """
+    caps = INPUT_TOKEN_CAPS.get(action, {})
+    report = BudgetReport(action=action)
+    prepared = dict(inputs)
+    for name, value in inputs.items():
+        if not isinstance(value, str):
+            continue
+        text = clean_text(value)
+        cap = caps.get(name)
+        if cap:
+            trimmed = truncate_to_tokens(text, cap)
+            if trimmed != text:
+                report.truncated.append(name)
+            text = trimmed
+        report.original_tokens += count_tokens(value)
+        report.final_tokens += count_tokens(text)
+        prepared[name] = text
+    return prepared, report
+
+
+def report_savings(report: BudgetReport, prompt_template: str, response: dict | None) -> None:
+    """
+    Логирует оценку сэкономленных токенов и фактическую экономию по usage провайдера
+    (оценка полного промпта без сокращения минус фактические токены промпта),
+    добавляя обе величины в usage ответа.
+    """
+    usage = (response or {}).get("usage")
+    actual = None
+    if isinstance(usage, dict):
+        usage["estimated_tokens_saved"] = report.saved_tokens
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        if prompt_tokens:
+            actual = template_tokens(prompt_template) + report.original_tokens - prompt_tokens
+            usage["tokens_saved"] = actual
+    logger.info(
+        f"Бюджет токенов '{report.action}': вход {report.original_tokens} -> {report.final_tokens} "
+        f"(оценка экономии {report.saved_tokens}, фактически {actual if actual is not None else 'н/д'}"
+        f"{', обрезаны: ' + ', '.join(report.truncated) if report.truncated else ''})."
+    )
@@ -0,0 +1,30 @@
+"""add cached_prompt_tokens to ai_usage_logs
+
+Revision ID: a9d3e6b1c074
+Revises: f7c2a9d4e315
+Create Date: 2026-10-18 16:42:10.318254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d3e6b1c074'
+down_revision: Union[str, Sequence[str], None] = 'f7c2a9d4e315'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('ai_usage_logs') as batch_op:
+        batch_op.add_column(sa.Column('cached_prompt_tokens', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('ai_usage_logs') as batch_op:
+        batch_op.drop_column('cached_prompt_tokens')
@@ -0,0 +1,40 @@
+"""add document_digests table
+
+Revision ID: b5e1f08c3d27
+Revises: a9d3e6b1c074
+Create Date: 2026-10-18 17:55:03.214870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e1f08c3d27'
+down_revision: Union[str, Sequence[str], None] = 'a9d3e6b1c074'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'document_digests',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('doc_type', sa.String(length=16), nullable=False),
+        sa.Column('digest', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_document_digests_id'), 'document_digests', ['id'], unique=False)
+    op.create_index(op.f('ix_document_digests_content_hash'), 'document_digests', ['content_hash'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_document_digests_content_hash'), table_name='document_digests')
+    op.drop_index(op.f('ix_document_digests_id'), table_name='document_digests')
+    op.drop_table('document_digests')
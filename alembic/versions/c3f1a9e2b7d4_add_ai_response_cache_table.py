@@ -0,0 +1,43 @@
+"""add ai_response_cache table
+
+Revision ID: c3f1a9e2b7d4
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-18 10:12:41.503112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f1a9e2b7d4'
+down_revision: Union[str, Sequence[str], None] = 'a1b2c3d4e5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'ai_response_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('response', sa.Text(), nullable=False),
+        sa.Column('hits', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('last_accessed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_ai_response_cache_id'), 'ai_response_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_ai_response_cache_cache_key'), 'ai_response_cache', ['cache_key'], unique=True)
+    op.create_index(op.f('ix_ai_response_cache_last_accessed_at'), 'ai_response_cache', ['last_accessed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_ai_response_cache_last_accessed_at'), table_name='ai_response_cache')
+    op.drop_index(op.f('ix_ai_response_cache_cache_key'), table_name='ai_response_cache')
+    op.drop_index(op.f('ix_ai_response_cache_id'), table_name='ai_response_cache')
+    op.drop_table('ai_response_cache')
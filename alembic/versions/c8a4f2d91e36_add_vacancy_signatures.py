@@ -0,0 +1,54 @@
+"""add vacancy signatures for duplicate detection
+
+Revision ID: c8a4f2d91e36
+Revises: b5e1f08c3d27
+Create Date: 2026-10-18 19:12:40.551203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8a4f2d91e36'
+down_revision: Union[str, Sequence[str], None] = 'b5e1f08c3d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('vacancies') as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('simhash', sa.BigInteger(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_vacancies_content_hash'), ['content_hash'], unique=False)
+
+    op.create_table(
+        'vacancy_signature_bands',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('vacancy_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('band', sa.Integer(), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['vacancy_id'], ['vacancies.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_vacancy_signature_bands_id'), 'vacancy_signature_bands', ['id'], unique=False)
+    op.create_index(op.f('ix_vacancy_signature_bands_vacancy_id'), 'vacancy_signature_bands', ['vacancy_id'], unique=False)
+    op.create_index('ix_vacancy_signature_bands_lookup', 'vacancy_signature_bands', ['user_id', 'band', 'value'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_vacancy_signature_bands_lookup', table_name='vacancy_signature_bands')
+    op.drop_index(op.f('ix_vacancy_signature_bands_vacancy_id'), table_name='vacancy_signature_bands')
+    op.drop_index(op.f('ix_vacancy_signature_bands_id'), table_name='vacancy_signature_bands')
+    op.drop_table('vacancy_signature_bands')
+
+    with op.batch_alter_table('vacancies') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_vacancies_content_hash'))
+        batch_op.drop_column('simhash')
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,56 @@
+"""add canonical_vacancies table
+
+Revision ID: d2b7e5a03f81
+Revises: c8a4f2d91e36
+Create Date: 2026-10-18 20:03:17.902145
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2b7e5a03f81'
+down_revision: Union[str, Sequence[str], None] = 'c8a4f2d91e36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'canonical_vacancies',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('hh_id', sa.String(length=32), nullable=True),
+        sa.Column('content_hash', sa.String(length=64), nullable=True),
+        sa.Column('title', sa.String(length=255), nullable=True),
+        sa.Column('file_path', sa.String(length=255), nullable=False),
+        sa.Column('source', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_canonical_vacancies_id'), 'canonical_vacancies', ['id'], unique=False)
+    op.create_index(op.f('ix_canonical_vacancies_hh_id'), 'canonical_vacancies', ['hh_id'], unique=True)
+    op.create_index(op.f('ix_canonical_vacancies_content_hash'), 'canonical_vacancies', ['content_hash'], unique=True)
+
+    with op.batch_alter_table('vacancies') as batch_op:
+        batch_op.add_column(sa.Column('canonical_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_vacancies_canonical_id'), ['canonical_id'], unique=False)
+        batch_op.create_foreign_key(
+            'fk_vacancies_canonical_id_canonical_vacancies', 'canonical_vacancies', ['canonical_id'], ['id']
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('vacancies') as batch_op:
+        batch_op.drop_constraint('fk_vacancies_canonical_id_canonical_vacancies', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_vacancies_canonical_id'))
+        batch_op.drop_column('canonical_id')
+
+    op.drop_index(op.f('ix_canonical_vacancies_content_hash'), table_name='canonical_vacancies')
+    op.drop_index(op.f('ix_canonical_vacancies_hh_id'), table_name='canonical_vacancies')
+    op.drop_index(op.f('ix_canonical_vacancies_id'), table_name='canonical_vacancies')
+    op.drop_table('canonical_vacancies')
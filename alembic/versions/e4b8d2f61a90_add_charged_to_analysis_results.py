@@ -0,0 +1,31 @@
+"""add charged flag to analysis_results
+
+Revision ID: e4b8d2f61a90
+Revises: c3f1a9e2b7d4
+Create Date: 2026-10-18 14:03:17.220415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b8d2f61a90'
+down_revision: Union[str, Sequence[str], None] = 'c3f1a9e2b7d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Существующие результаты были оплачены при создании
+    with op.batch_alter_table('analysis_results') as batch_op:
+        batch_op.add_column(sa.Column('charged', sa.Boolean(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('analysis_results') as batch_op:
+        batch_op.drop_column('charged')
@@ -0,0 +1,32 @@
+"""add strategy and latency_ms to ai_usage_logs
+
+Revision ID: f7c2a9d4e315
+Revises: e4b8d2f61a90
+Create Date: 2026-10-18 15:21:48.907113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7c2a9d4e315'
+down_revision: Union[str, Sequence[str], None] = 'e4b8d2f61a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('ai_usage_logs') as batch_op:
+        batch_op.add_column(sa.Column('strategy', sa.String(length=32), nullable=True))
+        batch_op.add_column(sa.Column('latency_ms', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('ai_usage_logs') as batch_op:
+        batch_op.drop_column('latency_ms')
+        batch_op.drop_column('strategy')
@@ -1,23 +1,150 @@
 import logging
 import os
 import uuid
+from sqlalchemy.exc import IntegrityError
 from telegram import Update
 from telegram.ext import ContextTypes, CallbackQueryHandler
 
 from bot.file_utils import save_text_to_file, read_text_from_file
 from .resume import MAIN_MENU
 from bot import messages
-from db import crud, models
-from db.database import get_db
+from db import async_crud as crud, models
+from db.database import unit_of_work
 from ai.client import get_ai_client
 from ai.actions import ACTION_REGISTRY
+from config import ANALYSIS_STRATEGY, ANALYSIS_DISTILLATION_ENABLED
+from bot.stream_sink import TelegramStreamSink
+from services import analysis_service
 
 logger = logging.getLogger(__name__)
 
 
+async def _send_response(query, sink: TelegramStreamSink | None, header: str, response_text: str) -> None:
+    """
+    Отправляет результат пользователю, разбивая длинный текст на части.
+    Если ответ уже выводился потоково, первая часть заменяет промежуточный текст,
+    а если заменить его не удалось, отправляется отдельным сообщением.
+    """
+    message_text = f"{header}\n\n{response_text}"
+    message_text_parts = [message_text[i:i + 4000] for i in range(0, len(message_text), 4000)]
+    if sink and sink.has_output and await sink.finish(message_text_parts[0]):
+        message_text_parts.pop(0)
+    for part in message_text_parts:
+        await query.message.reply_text(text=part)
+
+
+def _read_documents(resume: models.Resume, vacancy: models.Vacancy) -> tuple[str, str]:
+    """Читает тексты резюме и вакансии. Бросает FileNotFoundError, если файла нет."""
+    with open(resume.file_path, 'r', encoding='utf-8') as f:
+        resume_text = f.read()
+    with open(vacancy.file_path, 'r', encoding='utf-8') as f:
+        vacancy_text = f.read()
+    return resume_text, vacancy_text
+
+
+async def _ensure_analysis_result(db, resume_id: int, vacancy_id: int) -> models.AnalysisResult:
+    """
+    Возвращает запись AnalysisResult пары, создавая и фиксируя ее до запуска анализа:
+    параллельные запуски (например, разных разделов по запросу) работают с одной записью.
+    Вставка выполняется в SAVEPOINT: если запись одновременно создал другой запрос,
+    откатывается только она, а загруженные в сессию объекты (резюме, вакансия) остаются доступны.
+    Поиск выполняется до SAVEPOINT: чтение внутри транзакции SQLite с последующей записью
+    приводит к немедленному "database is locked" при параллельной вставке.
+    """
+    analysis_result = await crud.get_analysis_result(db, resume_id, vacancy_id)
+    if analysis_result:
+        return analysis_result
+    try:
+        async with db.begin_nested():
+            analysis_result = models.AnalysisResult(resume_id=resume_id, vacancy_id=vacancy_id)
+            db.add(analysis_result)
+    except IntegrityError:
+        # Запись одновременно создал другой запуск
+        analysis_result = await crud.get_analysis_result(db, resume_id, vacancy_id)
+    await db.commit()
+    return analysis_result
+
+
+def _start_analysis(
+    db, resume: models.Resume, vacancy: models.Vacancy, analysis_result: models.AnalysisResult,
+    resume_text: str, vacancy_text: str, strategy: str, scope: str,
+) -> analysis_service.AnalysisRun:
+    """
+    Запускает анализ выбранной стратегией в фоне. Каждый раздел сохраняется
+    в отдельный файл и привязывается к записи AnalysisResult сразу после генерации.
+    Запись должна уже существовать в БД (см. _ensure_analysis_result).
+    """
+    async def persist(sections: dict) -> None:
+        saved = {}
+        for key, value in sections.items():
+            if not hasattr(analysis_result, key) or not value:
+                continue
+            file_path = save_text_to_file(value, "analysis_results")
+            if file_path:
+                saved[key] = file_path
+        if not saved:
+            return
+        # Фоновая задача пишет через собственную сессию: сессию обработчика в это время
+        # использует он сам, а AsyncSession не допускает параллельных операций
+        async with unit_of_work() as session:
+            await crud.create_analysis_result(session, resume.id, vacancy.id, saved)
+        for key, file_path in saved.items():
+            setattr(analysis_result, key, file_path)
+
+    request = analysis_service.build_request(
+        strategy, get_ai_client(), resume_text, vacancy_text, analysis_service.scope_sections(scope),
+        distill=ANALYSIS_DISTILLATION_ENABLED,
+    )
+    run = analysis_service.start_analysis(resume.id, vacancy.id, request, persist, scope=scope, strategy=strategy)
+    # Повторная генерация уже оплаченного анализа (например, другого раздела по запросу) не списывает балл
+    run.charged = run.charged or analysis_result.charged is True
+    return run
+
+
+async def _log_analysis_usage(db, user_id: int, resume_id: int, vacancy_id: int, run: analysis_service.AnalysisRun, prefetch: bool = False) -> None:
+    """Логирует использование AI анализом вместе со стратегией и временем выполнения."""
+    action = "consolidated_analysis" if run.strategy == analysis_service.CONSOLIDATED else "section_analysis"
+    if prefetch:
+        action += "_prefetch"
+    usage = (run.response or {}).get("usage", {})
+    await crud.create_ai_usage_log(
+        db=db, user_id=user_id,
+        prompt_tokens=usage.get("prompt_tokens", 0),
+        completion_tokens=usage.get("completion_tokens", 0),
+        total_tokens=usage.get("total_tokens", 0),
+        cost=usage.get("cost", 0.0),
+        action=action,
+        resume_id=resume_id, vacancy_id=vacancy_id,
+        strategy=run.strategy,
+        latency_ms=run.latency_ms,
+        cached_prompt_tokens=usage.get("cached_prompt_tokens", 0),
+    )
+
+
+async def _charge_for_analysis(query, db, user_id: int, resume_id: int, vacancy_id: int, action: str) -> bool:
+    """
+    Списывает балл за анализ пары резюме/вакансия. Возвращает False, если баланса не хватает.
+    Если анализ уже оплачен другим запросом, повторного списания не происходит.
+    """
+    balance = await crud.get_user_balance(db, user_id=user_id)
+    if not balance or balance.balance < 1:
+        await query.message.reply_text(messages.OUT_OF_RUNS)
+        return False
+    if not await crud.mark_analysis_charged(db, resume_id, vacancy_id):
+        return True
+    await crud.update_user_balance(db, user_id=user_id, amount=-1, description=f"Анализ: {action}")
+    # Списание фиксируется сразу: анализ может генерироваться еще долго, а до commit
+    # параллельный запрос ждал бы блокировку на отметке об оплате
+    await db.commit()
+    await query.message.reply_text(f"С вашего баланса списан 1 балл. Текущий баланс: {balance.balance} баллов.")
+    return True
+
+
 async def _perform_analysis(update: Update, context: ContextTypes.DEFAULT_TYPE, action: str) -> int:
     """
     Общий обработчик для всех действий анализа из главного меню.
+    Балл списывается один раз за пару резюме/вакансия — когда пользователь
+    впервые получает любой из разделов анализа.
     """
     query = update.callback_query
     await query.answer()
@@ -29,114 +156,189 @@ async def _perform_analysis(update: Update, context: ContextTypes.DEFAULT_TYPE,
         await query.message.reply_text(text=messages.CHOOSE_VACANCY_FOR_ACTION)
         return MAIN_MENU
 
-    db_session_gen = get_db()
-    db = next(db_session_gen)
-    try:
-        user = crud.get_or_create_user(db, chat_id=chat_id)
-        resume = crud.get_user_resume(db, user_id=user.id)
-        vacancy = crud.get_vacancy_by_id(db, vacancy_id=vacancy_id)
+    async with unit_of_work() as db:
+        try:
+            user = await crud.get_or_create_user(db, chat_id=chat_id)
+            resume = await crud.get_user_resume(db, user_id=user.id)
+            vacancy = await crud.get_vacancy_by_id(db, vacancy_id=vacancy_id)
 
-        if not resume or not vacancy:
-            await query.message.reply_text(text=messages.ERROR_MESSAGE)
-            return MAIN_MENU
+            if not resume or not vacancy:
+                await query.message.reply_text(text=messages.ERROR_MESSAGE)
+                return MAIN_MENU
 
-        analysis_result = crud.get_analysis_result(db, resume.id, vacancy.id)
-        action_details = ACTION_REGISTRY.get(action)
-        db_field = action_details.get("db_field")
+            analysis_result = await crud.get_analysis_result(db, resume.id, vacancy.id)
+            action_details = ACTION_REGISTRY.get(action)
+            db_field = action_details.get("db_field")
 
-        response_text = None
-        # Проверяем, есть ли уже результат для этого действия (и он не None)
-        if analysis_result and getattr(analysis_result, db_field):
-            file_path = getattr(analysis_result, db_field)
-            response_text = read_text_from_file(file_path)
-            if response_text:
-                logger.info(f"Найден кэшированный результат для action='{action}', user_id={user.id}")
+            response_text = None
+            sink = None
+            delivered = False
+            # Проверяем, есть ли уже результат для этого действия (и он не None)
+            if analysis_result and getattr(analysis_result, db_field):
+                file_path = getattr(analysis_result, db_field)
+                response_text = read_text_from_file(file_path)
+                if response_text:
+                    logger.info(f"Найден кэшированный результат для action='{action}', user_id={user.id}")
+                    # Анализ, подготовленный заранее, оплачивается при первом открытии
+                    if not analysis_result.charged and not await _charge_for_analysis(
+                        query, db, user.id, resume.id, vacancy.id, action
+                    ):
+                        return MAIN_MENU
 
-        if not response_text:
-            # --- Проверка баланса перед вызовом AI ---
-            balance = crud.get_user_balance(db, user_id=user.id)
-            if not balance or balance.balance < 1:
-                await query.message.reply_text(messages.OUT_OF_RUNS)
-                return MAIN_MENU
+            if not response_text:
+                # Если анализ этой пары уже выполняется (пользователь нажал другую кнопку,
+                # не дождавшись ответа, или анализ подготавливается заранее),
+                # подключаемся к нему без второго запроса к AI
+                strategy = analysis_service.resolve_strategy(ANALYSIS_STRATEGY)
+                scope = analysis_service.analysis_scope(strategy, db_field)
+                run = analysis_service.get_running_analysis(resume.id, vacancy.id, scope)
+                started_here = run is None
+                already_paid = bool(analysis_result) and analysis_result.charged is True
+                progress_text = messages.ANALYSIS_IN_PROGRESS
 
-            # Если кэша нет или поле пустое, запускаем полный анализ
-            await query.message.reply_text(text=messages.ANALYSIS_IN_PROGRESS)
+                if not already_paid and (started_here or not run.charged):
+                    # --- Проверка баланса перед вызовом AI ---
+                    balance = await crud.get_user_balance(db, user_id=user.id)
+                    if not balance or balance.balance < 1:
+                        await query.message.reply_text(messages.OUT_OF_RUNS)
+                        return MAIN_MENU
 
-            try:
-                with open(resume.file_path, 'r', encoding='utf-8') as f:
-                    resume_text = f.read()
-                with open(vacancy.file_path, 'r', encoding='utf-8') as f:
-                    vacancy_text = f.read()
-            except FileNotFoundError:
-                logger.error(f"Файл резюме или вакансии не найден для пользователя {chat_id}.")
-                await query.message.reply_text(text=messages.ERROR_MESSAGE)
-                return MAIN_MENU
+                if started_here:
+                    try:
+                        resume_text, vacancy_text = _read_documents(resume, vacancy)
+                    except FileNotFoundError:
+                        logger.error(f"Файл резюме или вакансии не найден для пользователя {chat_id}.")
+                        await query.message.reply_text(text=messages.ERROR_MESSAGE)
+                        return MAIN_MENU
 
-            ai_client = get_ai_client()
-            response = ai_client.get_consolidated_analysis(resume_text, vacancy_text)
+                    # При загруженных провайдерах показываем место в очереди и оценку ожидания
+                    queue_status = get_ai_client().queue_status()
+                    if queue_status.depth:
+                        progress_text = messages.ANALYSIS_QUEUED.format(
+                            depth=queue_status.depth, wait=round(queue_status.estimated_wait)
+                        )
+                    analysis_result = analysis_result or await _ensure_analysis_result(db, resume.id, vacancy.id)
+                    # Пока фиксировалась запись, анализ пары мог запустить параллельный запрос:
+                    # между этой проверкой и регистрацией нового запуска нет await
+                    run = analysis_service.get_running_analysis(resume.id, vacancy.id, scope)
+                    started_here = run is None
+                    if started_here:
+                        run = _start_analysis(db, resume, vacancy, analysis_result, resume_text, vacancy_text, strategy, scope)
+                if not started_here:
+                    logger.info(f"Анализ резюме {resume.id} и вакансии {vacancy.id} уже выполняется, ожидаем его.")
 
-            if not response or not response.get("json"):
-                logger.error(f"Ошибка при получении полного анализа от AI: {response}")
-                await query.message.reply_text(text=messages.AI_ERROR_RESPONSE)
-                return MAIN_MENU
+                progress_message = await query.message.reply_text(text=progress_text)
 
-            analysis_data = response["json"]
-
-            # Явно обновляем или создаем запись
-            if not analysis_result:
-                analysis_result = models.AnalysisResult(resume_id=resume.id, vacancy_id=vacancy.id)
-                db.add(analysis_result)
-
-            # Сохраняем каждое поле в отдельный файл
-            for key, value in analysis_data.items():
-                if hasattr(analysis_result, key) and value:
-                    file_path = save_text_to_file(value, "analysis_results")
-                    if file_path:
-                        setattr(analysis_result, key, file_path)
-
-            db.commit()
-            db.refresh(analysis_result)
-
-            # Получаем текст для текущего действия
-            response_text = read_text_from_file(getattr(analysis_result, db_field))
-
-
-            # --- Списание балла ---
-            crud.update_user_balance(db, user_id=user.id, amount=-1, description=f"Анализ: {action}")
-            await query.message.reply_text(f"С вашего баланса списан 1 балл. Текущий баланс: {balance.balance} баллов.")
-
-            # Логирование использования AI
-            usage = response.get("usage", {})
-            crud.create_ai_usage_log(
-                db=db, user_id=user.id,
-                prompt_tokens=usage.get("prompt_tokens", 0),
-                completion_tokens=usage.get("completion_tokens", 0),
-                total_tokens=usage.get("total_tokens", 0),
-                cost=usage.get("cost", 0.0),
-                action="consolidated_analysis",
-                resume_id=resume.id, vacancy_id=vacancy.id
-            )
+                # Разделы приходят по мере генерации: каждый сохраняется сразу,
+                # а запрошенный отправляется, не дожидаясь остальных
+                header = action_details["response_header"]
+                sink = TelegramStreamSink(progress_message, header=header)
 
-        # Отправка результата пользователю
-        if response_text:
-            header = action_details["response_header"]
-            message_text = f"{header}\n\n{response_text}"
-            message_text_parts = [message_text[i:i + 4000] for i in range(0, len(message_text), 4000)]
-            for part in message_text_parts:
-                await query.message.reply_text(text=part)
-        else:
-            logger.error(f"Не удалось получить текст для '{action}' после анализа.")
-            await query.message.reply_text(text=messages.ERROR_MESSAGE)
+                async def on_section(key: str, value: str) -> None:
+                    nonlocal response_text
+                    if key != db_field or response_text is not None or not value:
+                        return
+                    if not run.charged:
+                        # --- Списание балла: ровно один раз, когда пользователь получает результат ---
+                        run.charged = True
+                        try:
+                            charged = await _charge_for_analysis(query, db, user.id, resume.id, vacancy.id, action)
+                        except Exception:
+                            run.charged = False
+                            raise
+                        if not charged:
+                            run.charged = False
+                            return
+                    response_text = value
+                    await _send_response(query, sink, header, response_text)
+
+                async def on_progress() -> None:
+                    if response_text is None and sink.ready():
+                        await sink.update(run.partial(db_field))
+
+                await run.subscribe(on_section, on_progress)
+                response = await run.wait()
+                delivered = response_text is not None
+
+                if not delivered and (not response or not response.get("json")):
+                    logger.error(f"Ошибка при получении полного анализа от AI: {response}")
+                    await query.message.reply_text(text=messages.AI_ERROR_RESPONSE)
+                    return MAIN_MENU
+
+                if started_here and response_text:
+                    await _log_analysis_usage(db, user.id, resume.id, vacancy.id, run)
+
+            # Отправка результата пользователю
+            if response_text:
+                if not delivered:
+                    await _send_response(query, sink, action_details["response_header"], response_text)
+            else:
+                logger.error(f"Не удалось получить текст для '{action}' после анализа.")
+                await query.message.reply_text(text=messages.ERROR_MESSAGE)
 
-    except Exception as e:
-        logger.error(f"Ошибка во время выполнения действия '{action}' для пользователя {chat_id}: {e}", exc_info=True)
-        await query.message.reply_text(text=messages.ERROR_MESSAGE)
-    finally:
-        db.close()
+        except Exception as e:
+            logger.error(f"Ошибка во время выполнения действия '{action}' для пользователя {chat_id}: {e}", exc_info=True)
+            await query.message.reply_text(text=messages.ERROR_MESSAGE)
 
     return MAIN_MENU
 
 
+async def prefetch_analysis(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Задача JobQueue: заранее выполняет консолидированный анализ только что
+    загруженной вакансии. Результат сохраняется неоплаченным — балл списывается,
+    когда пользователь впервые откроет любой раздел.
+    """
+    user_id = context.job.data["user_id"]
+    vacancy_id = context.job.data["vacancy_id"]
+
+    async with unit_of_work() as db:
+        try:
+            resume = await crud.get_user_resume(db, user_id=user_id)
+            vacancy = await crud.get_vacancy_by_id(db, vacancy_id=vacancy_id)
+            if not resume or not vacancy:
+                return
+            if analysis_service.get_running_analysis(resume.id, vacancy.id) or await crud.get_analysis_result(db, resume.id, vacancy.id):
+                return
+            # Не тратим запрос к AI, если пользователь не сможет открыть результат
+            balance = await crud.get_user_balance(db, user_id=user_id)
+            if not balance or balance.balance < 1:
+                return
+
+            resume_text, vacancy_text = _read_documents(resume, vacancy)
+            # Генерация по запросу не готовит разделы заранее, поэтому prefetch генерирует все разделы
+            strategy = analysis_service.resolve_strategy(ANALYSIS_STRATEGY)
+            if strategy == analysis_service.ON_DEMAND:
+                strategy = analysis_service.PARALLEL
+            analysis_result = await _ensure_analysis_result(db, resume.id, vacancy.id)
+            # Пока фиксировалась запись, анализ мог запустить пользователь: второй запрос к AI не нужен
+            if analysis_service.get_running_analysis(resume.id, vacancy.id):
+                return
+            run = _start_analysis(
+                db, resume, vacancy, analysis_result, resume_text, vacancy_text, strategy, analysis_service.ALL_SECTIONS
+            )
+            logger.info(f"Заблаговременный анализ резюме {resume.id} и вакансии {vacancy.id} запущен ({strategy}).")
+            response = await run.wait()
+            if response and response.get("json"):
+                await _log_analysis_usage(db, user_id, resume.id, vacancy.id, run, prefetch=True)
+        except Exception as e:
+            logger.error(f"Ошибка заблаговременного анализа вакансии {vacancy_id} для пользователя {user_id}: {e}", exc_info=True)
+
+
+def schedule_analysis_prefetch(context: ContextTypes.DEFAULT_TYPE, user_id: int, vacancy_id: int) -> bool:
+    """Ставит заблаговременный анализ вакансии в JobQueue. Возвращает False, если JobQueue недоступна."""
+    if not context.job_queue:
+        logger.warning("JobQueue недоступна, заблаговременный анализ не запланирован.")
+        return False
+    context.job_queue.run_once(
+        prefetch_analysis,
+        when=0,
+        data={"user_id": user_id, "vacancy_id": vacancy_id},
+        name=f"analysis_prefetch_{user_id}_{vacancy_id}",
+    )
+    return True
+
+
 # Создаем обработчики для каждой кнопки, используя лямбда-функцию для передачи названия действия
 analyze_match_handler = CallbackQueryHandler(
     lambda u, c: _perform_analysis(u, c, "analyze_match"), pattern="^analyze_match$"
@@ -7,8 +7,8 @@ from telegram.ext import (
 )
 
 from bot import messages, keyboards
-from db import crud
-from db.database import get_db
+from db import async_crud as crud
+from db.database import unit_of_work
 
 logger = logging.getLogger(__name__)
 
@@ -23,18 +23,14 @@ POINT_PACKAGES = {
 async def balance(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Отправляет пользователю его текущий баланс."""
     chat_id = update.effective_chat.id
-    db_session_gen = get_db()
-    db = next(db_session_gen)
-    try:
-        user = crud.get_or_create_user(db, chat_id=chat_id)
-        user_balance = crud.get_user_balance(db, user_id=user.id)
+    async with unit_of_work() as db:
+        user = await crud.get_or_create_user(db, chat_id=chat_id)
+        user_balance = await crud.get_user_balance(db, user_id=user.id)
 
         balance_value = user_balance.balance if user_balance else 0
         message = messages.BALANCE_MESSAGE.format(balance=balance_value)
 
         await update.message.reply_text(message)
-    finally:
-        db.close()
 
 
 async def buy(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -59,35 +55,32 @@ async def handle_package_selection(update: Update, context: ContextTypes.DEFAULT
         return
 
     chat_id = query.effective_chat.id
-    db_session_gen = get_db()
-    db = next(db_session_gen)
-    try:
-        user = crud.get_or_create_user(db, chat_id=chat_id)
-
-        # Эмуляция успешной покупки
-        crud.update_user_balance(
-            db,
-            user_id=user.id,
-            amount=package["points"],
-            description=f"Покупка пакета: {package['points']} баллов",
-            cost=package["price"]
-        )
-
-        await query.edit_message_text(
-            messages.PURCHASE_SUCCESS.format(points_count=package["points"])
-        )
-
-        # Показываем новый баланс
-        user_balance = crud.get_user_balance(db, user_id=user.id)
-        await query.message.reply_text(
-            messages.BALANCE_MESSAGE.format(balance=user_balance.balance)
-        )
-
-    except Exception as e:
-        logger.error(f"Ошибка при покупке пакета: {e}", exc_info=True)
-        await query.edit_message_text(messages.PURCHASE_ERROR)
-    finally:
-        db.close()
+    async with unit_of_work() as db:
+        try:
+            user = await crud.get_or_create_user(db, chat_id=chat_id)
+
+            # Эмуляция успешной покупки
+            await crud.update_user_balance(
+                db,
+                user_id=user.id,
+                amount=package["points"],
+                description=f"Покупка пакета: {package['points']} баллов",
+                cost=package["price"]
+            )
+
+            await query.edit_message_text(
+                messages.PURCHASE_SUCCESS.format(points_count=package["points"])
+            )
+
+            # Показываем новый баланс
+            user_balance = await crud.get_user_balance(db, user_id=user.id)
+            await query.message.reply_text(
+                messages.BALANCE_MESSAGE.format(balance=user_balance.balance)
+            )
+
+        except Exception as e:
+            logger.error(f"Ошибка при покупке пакета: {e}", exc_info=True)
+            await query.edit_message_text(messages.PURCHASE_ERROR)
 
 
 balance_handler = CommandHandler("balance", balance)
@@ -3,8 +3,8 @@ from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 
 from bot import messages, keyboards
-from db import crud
-from db.database import get_db
+from db import async_crud as crud
+from db.database import unit_of_work
 from .resume import MAIN_MENU
 
 logger = logging.getLogger(__name__)
@@ -41,12 +41,10 @@ async def global_fallback_handler(update: Update, context: ContextTypes.DEFAULT_
     chat_id = update.effective_chat.id
     logger.warning(f"User {chat_id} sent an unhandled message: {update.message.text}")
 
-    db_session_gen = get_db()
-    db = next(db_session_gen)
-    try:
-        user = crud.get_or_create_user(db, chat_id=chat_id)
-        resumes = crud.get_user_resumes(db, user_id=user.id)
-        vacancies = crud.get_user_vacancies(db, user_id=user.id)
+    async with unit_of_work() as db:
+        user = await crud.get_or_create_user(db, chat_id=chat_id)
+        resumes = await crud.get_user_resumes(db, user_id=user.id)
+        vacancies = await crud.get_user_vacancies(db, user_id=user.id)
 
         # Для простоты предполагаем, что у пользователя одно резюме
         resume = resumes[0] if resumes else None
@@ -68,6 +66,3 @@ async def global_fallback_handler(update: Update, context: ContextTypes.DEFAULT_
             # Возвращаем состояние ожидания резюме
             from .resume import AWAITING_RESUME_UPLOAD
             return AWAITING_RESUME_UPLOAD
-
-    finally:
-        db.close()
@@ -3,8 +3,8 @@ from telegram import Update
 from telegram.ext import ContextTypes
 
 from bot import messages, keyboards
-from db import crud, models
-from db.database import get_db
+from db import async_crud as crud
+from db.database import unit_of_work
 from .states import AWAITING_RESUME_UPLOAD
 
 logger = logging.getLogger(__name__)
@@ -16,21 +16,17 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     chat_id = update.effective_chat.id or (query and query.message.chat.id)
 
-    db_session_gen = get_db()
-    db = next(db_session_gen)
-    try:
-        user = crud.get_or_create_user(db, chat_id=chat_id)
-        resume = crud.get_user_resume(db, user_id=user.id)
-        vacancies = crud.get_user_vacancies(db, user_id=user.id)
+    async with unit_of_work() as db:
+        user = await crud.get_or_create_user(db, chat_id=chat_id)
+        resume = await crud.get_user_resume(db, user_id=user.id)
+        vacancies = await crud.get_user_vacancies(db, user_id=user.id)
         selected_vacancy_id = context.user_data.get('selected_vacancy_id')
 
         # Логика для опроса
         show_survey_button = False
-        active_survey = crud.get_active_survey(db)
+        active_survey = await crud.get_active_survey(db)
         if active_survey:
-            existing_answer = db.query(models.SurveyAnswer).filter_by(
-                user_id=user.id, survey_id=active_survey.id
-            ).first()
+            existing_answer = await crud.get_survey_answer(db, user_id=user.id, survey_id=active_survey.id)
             if not existing_answer:
                 show_survey_button = True
 
@@ -45,13 +41,13 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         resume_title = resume.title or "ваше резюме"
 
-        balance = crud.get_user_balance(db, user_id=user.id)
+        balance = await crud.get_user_balance(db, user_id=user.id)
         balance_text = messages.BALANCE_MESSAGE.format(
             balance=balance.balance if balance else 0
         )
 
         if selected_vacancy_id:
-            selected_vacancy = crud.get_vacancy_by_id(db, vacancy_id=selected_vacancy_id)
+            selected_vacancy = await crud.get_vacancy_by_id(db, vacancy_id=selected_vacancy_id)
             if selected_vacancy:
                 message_text = messages.MAIN_MENU_WITH_VACANCY_MESSAGE.format(
                     vacancy_title=selected_vacancy.title,
@@ -100,6 +96,3 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await query.edit_message_text(message_text, reply_markup=keyboard)
         else:
             await update.effective_message.reply_text(message_text, reply_markup=keyboard)
-
-    finally:
-        db.close()
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from telegram import Update
 from telegram.ext import ContextTypes, CallbackQueryHandler
@@ -9,8 +10,9 @@ from bot.handlers.states import (
     UPDATE_RESUME,
     SELECTING_VACANCY,
 )
-from db import crud
-from db.database import get_db
+from db import async_crud as crud
+from db.database import unit_of_work
+from services.matching_service import score_vacancies
 
 logger = logging.getLogger(__name__)
 
@@ -46,11 +48,9 @@ async def select_vacancy(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     await query.answer()
 
     chat_id = update.effective_chat.id
-    db_session_gen = get_db()
-    db = next(db_session_gen)
-    try:
-        user = crud.get_or_create_user(db, chat_id=chat_id)
-        vacancies = crud.get_user_vacancies(db, user_id=user.id)
+    async with unit_of_work() as db:
+        user = await crud.get_or_create_user(db, chat_id=chat_id)
+        vacancies = await crud.get_user_vacancies(db, user_id=user.id)
 
         # Эта проверка на случай, если вакансии были удалены с момента последней отрисовки меню
         if not vacancies:
@@ -60,13 +60,16 @@ async def select_vacancy(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             await show_main_menu(update, context)
             return MAIN_MENU
 
+        # Локальная оценка соответствия резюме без запроса к AI: лучшие вакансии показываются первыми.
+        # Чтение файлов и векторизация выполняются в потоке, чтобы не блокировать цикл событий
+        resume = await crud.get_user_resume(db, user_id=user.id)
+        scores = await asyncio.to_thread(score_vacancies, resume, vacancies) if resume else {}
+
         await query.edit_message_text(
             messages.CHOOSE_VACANCY_FOR_ACTION,
-            reply_markup=keyboards.vacancy_selection_keyboard(vacancies)
+            reply_markup=keyboards.vacancy_selection_keyboard(vacancies, scores=scores)
         )
         return SELECTING_VACANCY
-    finally:
-        db.close()
 
 
 from .main_menu_helpers import show_main_menu
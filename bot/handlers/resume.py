@@ -6,13 +6,15 @@ from telegram.ext import (
     filters,
 )
 
-from db.database import get_db
-from db import crud
+from db.database import unit_of_work
+from db import async_crud as crud
 from bot import messages, keyboards
-from scraper.hh_scraper import scrape_hh_url
+from scraper.async_scraper import scrape_url
+from scraper.streaming import PayloadTooLarge, decode_upload
 from bot.handlers.states import AWAITING_RESUME_UPLOAD, MAIN_MENU, AWAITING_VACANCY_UPLOAD
 from bot.handlers.main_menu_helpers import show_main_menu
 from services.document_service import process_document
+from config import UPLOAD_MAX_FILE_BYTES
 
 logger = logging.getLogger(__name__)
 
@@ -25,20 +27,18 @@ async def _process_and_reply(update: Update, context: ContextTypes.DEFAULT_TYPE,
     message = update.effective_message
     await message.reply_text(messages.RESUME_PROCESSING)
 
-    db_session_gen = get_db()
-    db = next(db_session_gen)
-    try:
-        user = crud.get_or_create_user(db, chat_id=chat_id)
+    async with unit_of_work() as db:
+        user = await crud.get_or_create_user(db, chat_id=chat_id)
 
         # Проверка баланса
-        balance = crud.get_user_balance(db, user_id=user.id)
+        balance = await crud.get_user_balance(db, user_id=user.id)
         if not balance or balance.balance < 1:
             await message.reply_text(messages.OUT_OF_RUNS)
             # TODO: Предложить пополнить баланс
             return MAIN_MENU # или другое состояние
 
         # Списываем балл
-        crud.update_user_balance(db, user_id=user.id, amount=-1, description="Загрузка резюме")
+        await crud.update_user_balance(db, user_id=user.id, amount=-1, description="Загрузка резюме")
 
         success, _ = await process_document(
             update=update,
@@ -55,7 +55,7 @@ async def _process_and_reply(update: Update, context: ContextTypes.DEFAULT_TYPE,
             await message.reply_text(messages.RESUME_UPLOADED_SUCCESS)
 
             # После успешной загрузки резюме, проверяем наличие вакансий
-            vacancies = crud.get_user_vacancies(db, user_id=user.id)
+            vacancies = await crud.get_user_vacancies(db, user_id=user.id)
             if not vacancies:
                 await message.reply_text(
                     messages.ASK_FOR_VACANCY,
@@ -72,8 +72,6 @@ async def _process_and_reply(update: Update, context: ContextTypes.DEFAULT_TYPE,
                 reply_markup=keyboards.cancel_keyboard(),
             )
             return AWAITING_RESUME_UPLOAD
-    finally:
-        db.close()
 
 
 # --- Обработчики состояния AWAITING_RESUME_UPLOAD ---
@@ -87,6 +85,14 @@ async def handle_resume_file(update: Update, context: ContextTypes.DEFAULT_TYPE)
         )
         return AWAITING_RESUME_UPLOAD
 
+    # Размер файла известен заранее: слишком большой файл даже не скачивается
+    if document.file_size and document.file_size > UPLOAD_MAX_FILE_BYTES:
+        await update.message.reply_text(
+            messages.FILE_TOO_LARGE.format(max_kb=UPLOAD_MAX_FILE_BYTES // 1024),
+            reply_markup=keyboards.cancel_keyboard(),
+        )
+        return AWAITING_RESUME_UPLOAD
+
     try:
         file = await document.get_file()
         file_content_bytes = await file.download_as_bytearray()
@@ -99,7 +105,13 @@ async def handle_resume_file(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return AWAITING_RESUME_UPLOAD
 
     try:
-        resume_text = file_content_bytes.decode("utf-8")
+        resume_text = decode_upload(bytes(file_content_bytes), UPLOAD_MAX_FILE_BYTES)
+    except PayloadTooLarge:
+        await update.message.reply_text(
+            messages.FILE_TOO_LARGE.format(max_kb=UPLOAD_MAX_FILE_BYTES // 1024),
+            reply_markup=keyboards.cancel_keyboard(),
+        )
+        return AWAITING_RESUME_UPLOAD
     except UnicodeDecodeError:
         await update.message.reply_text(
             messages.FILE_DECODE_ERROR,
@@ -121,7 +133,7 @@ async def handle_resume_url(update: Update, context: ContextTypes.DEFAULT_TYPE)
         )
         return AWAITING_RESUME_UPLOAD
 
-    resume_text = scrape_hh_url(url)
+    resume_text = await scrape_url(url)
     if not resume_text:
         await update.message.reply_text(
             messages.ERROR_MESSAGE,
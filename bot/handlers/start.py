@@ -2,8 +2,8 @@ import logging
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from db.database import get_db
-from db import crud
+from db.database import unit_of_work
+from db import async_crud as crud
 from bot import messages, keyboards
 from bot.handlers.states import AWAITING_RESUME_UPLOAD, AWAITING_VACANCY_UPLOAD, MAIN_MENU
 from .main_menu_helpers import show_main_menu
@@ -21,19 +21,16 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     chat_id = update.effective_chat.id
     logger.info(f"Conversation started for user {chat_id}")
 
-    db_session_gen = get_db()
-    db = next(db_session_gen)
-
-    try:
-        user = crud.get_or_create_user(db, chat_id=chat_id)
+    async with unit_of_work() as db:
+        user = await crud.get_or_create_user(db, chat_id=chat_id)
 
         # Обработка deeplink
         if context.args:
             utm_source = context.args[0]
             logger.info(f"User {chat_id} came from UTM source: {utm_source}")
-            crud.create_utm_track(db, user_id=user.id, utm_source=utm_source)
+            await crud.create_utm_track(db, user_id=user.id, utm_source=utm_source)
 
-        resume = crud.get_user_resume(db, user_id=user.id)
+        resume = await crud.get_user_resume(db, user_id=user.id)
 
         # 1. Если нет резюме, просим загрузить
         if not resume:
@@ -45,9 +42,9 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
             return AWAITING_RESUME_UPLOAD
 
         # 2. Если есть резюме, но нет вакансий
-        vacancies = crud.get_user_vacancies(db, user_id=user.id)
+        vacancies = await crud.get_user_vacancies(db, user_id=user.id)
         if not vacancies:
-            balance = crud.get_user_balance(db, user_id=user.id)
+            balance = await crud.get_user_balance(db, user_id=user.id)
             balance_text = messages.BALANCE_MESSAGE.format(
                 balance=balance.balance if balance else 0
             )
@@ -69,6 +66,3 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         context.user_data['selected_vacancy_id'] = vacancies[0].id
         await show_main_menu(update, context)
         return MAIN_MENU
-
-    finally:
-        db.close()
@@ -10,8 +10,8 @@ from telegram.ext import (
 
 from bot.handlers.states import AWAITING_SURVEY_ANSWER, MAIN_MENU
 from bot.handlers.main_menu_helpers import show_main_menu
-from db import crud
-from db.database import get_db
+from db import async_crud as crud
+from db.database import unit_of_work
 
 logger = logging.getLogger(__name__)
 
@@ -21,10 +21,8 @@ async def start_survey(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     query = update.callback_query
     await query.answer()
 
-    db_gen = get_db()
-    db = next(db_gen)
-    try:
-        active_survey = crud.get_active_survey(db)
+    async with unit_of_work() as db:
+        active_survey = await crud.get_active_survey(db)
         if not active_survey:
             await query.edit_message_text("Спасибо, но сейчас нет активных опросов.")
             await show_main_menu(update, context)
@@ -39,8 +37,6 @@ async def start_survey(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
             reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True, resize_keyboard=True),
         )
         return AWAITING_SURVEY_ANSWER
-    finally:
-        db.close()
 
 
 async def handle_survey_answer(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -54,15 +50,11 @@ async def handle_survey_answer(update: Update, context: ContextTypes.DEFAULT_TYP
         await show_main_menu(update, context)
         return MAIN_MENU
 
-    db_gen = get_db()
-    db = next(db_gen)
-    try:
-        user = crud.get_or_create_user(db, chat_id)
-        crud.create_survey_answer(db, user_id=user.id, survey_id=survey_id, answer=user_answer)
+    async with unit_of_work() as db:
+        user = await crud.get_or_create_user(db, chat_id)
+        await crud.create_survey_answer(db, user_id=user.id, survey_id=survey_id, answer=user_answer)
 
         await update.message.reply_text("Спасибо за ваш ответ!", reply_markup=ReplyKeyboardRemove())
-    finally:
-        db.close()
 
     context.user_data.pop("active_survey_id", None)
     await show_main_menu(update, context)
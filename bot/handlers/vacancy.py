@@ -1,5 +1,7 @@
 import logging
-from telegram import Update
+import time
+from telegram import Message, Update
+from telegram.error import TelegramError
 from telegram.ext import (
     ContextTypes,
     MessageHandler,
@@ -9,34 +11,75 @@ from telegram.ext import (
 from bot.handlers.states import MAIN_MENU, AWAITING_VACANCY_UPLOAD
 from .main_menu_helpers import show_main_menu
 from bot import messages, keyboards
-from db import crud
-from db.database import get_db
-from scraper.hh_scraper import scrape_hh_url
+from db import async_crud as crud
+from db.database import unit_of_work
+from scraper.async_scraper import scrape_url
+from scraper.hh_api import fetch_hh_vacancy
+from scraper.hh_scraper import parse_hh_vacancy_id
+from scraper.streaming import PayloadTooLarge, decode_upload
+from bot.file_utils import read_text_from_file
+from db.fingerprints import content_hash
 from services.document_service import process_document
+from services import bulk_ingestion
+from services.bulk_ingestion import extract_vacancy_urls, ingest_vacancies, is_url_list
+from config import ANALYSIS_PREFETCH_ENABLED, BULK_PROGRESS_INTERVAL, HH_API_ENABLED, UPLOAD_MAX_FILE_BYTES
+from .analysis import schedule_analysis_prefetch
 
 logger = logging.getLogger(__name__)
 
 
-async def _process_and_reply(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str, source: str) -> int:
+async def _process_and_reply(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, text: str | None, source: str, hh_id: str | None = None
+) -> int:
     """
     Внутренняя функция для вызова сервиса обработки и отправки ответа пользователю.
     Здесь же происходит проверка и списание прогонов.
+    Если text не передан, вакансия скачивается по ссылке source, но только когда
+    ее еще нет среди канонических вакансий, проверенных для других пользователей.
+    Вакансии hh.ru сначала запрашиваются через API, и только при неудаче скачивается страница.
     """
     chat_id = update.effective_chat.id
     message = update.effective_message
     await message.reply_text(messages.VACANCY_PROCESSING)
 
-    db_session_gen = get_db()
-    db = next(db_session_gen)
-    try:
-        user = crud.get_or_create_user(db, chat_id=chat_id)
-        resume = crud.get_user_resume(db, user_id=user.id)
+    async with unit_of_work() as db:
+        user = await crud.get_or_create_user(db, chat_id=chat_id)
+        resume = await crud.get_user_resume(db, user_id=user.id)
         if not resume:
             await message.reply_text(messages.ERROR_NO_RESUME)
             return AWAITING_VACANCY_UPLOAD # Or some other appropriate state
 
+        # --- Общая проверенная вакансия: повторный скрейпинг и проверка AI не нужны ---
+        canonical = await crud.get_canonical_vacancy(db, hh_id=hh_id, content_hash=content_hash(text) if text else None)
+        if canonical:
+            canonical_text = read_text_from_file(canonical.file_path)
+            if canonical_text:
+                logger.info(f"Вакансия пользователя {user.id} найдена среди канонических: {canonical.id}")
+                text = canonical_text
+            else:
+                canonical = None
+        known_title = None
+        if text is None and hh_id and HH_API_ENABLED:
+            api_vacancy = await fetch_hh_vacancy(hh_id)
+            if api_vacancy:
+                text, known_title = api_vacancy.text, api_vacancy.title
+        if text is None:
+            text = await scrape_url(source)
+            if not text:
+                await message.reply_text(messages.ERROR_MESSAGE, reply_markup=keyboards.cancel_keyboard())
+                return AWAITING_VACANCY_UPLOAD
+
+        # --- Поиск дубликата среди уже загруженных вакансий ---
+        duplicate = await crud.find_duplicate_vacancy(db, user_id=user.id, text=text)
+        if duplicate:
+            logger.info(f"Вакансия пользователя {user.id} совпадает с загруженной ранее вакансией {duplicate.id}")
+            context.user_data['selected_vacancy_id'] = duplicate.id
+            await message.reply_text(messages.VACANCY_DUPLICATE.format(title=duplicate.title))
+            await show_main_menu(update, context)
+            return MAIN_MENU
+
         # --- Проверка баланса ---
-        balance = crud.get_user_balance(db, user_id=user.id)
+        balance = await crud.get_user_balance(db, user_id=user.id)
         if not balance or balance.balance < 1:
             await message.reply_text(messages.OUT_OF_RUNS)
             return AWAITING_VACANCY_UPLOAD
@@ -50,13 +93,21 @@ async def _process_and_reply(update: Update, context: ContextTypes.DEFAULT_TYPE,
             text=text,
             source=source,
             doc_type="vacancy",
+            hh_id=hh_id,
+            canonical=canonical,
+            known_title=known_title,
         )
 
         if success:
             # --- Списание балла ---
-            crud.update_user_balance(db, user_id=user.id, amount=-1, description="Загрузка вакансии")
+            await crud.update_user_balance(db, user_id=user.id, amount=-1, description="Загрузка вакансии")
             await message.reply_text(f"С вашего баланса списан 1 балл. Текущий баланс: {balance.balance} баллов.")
             await message.reply_text(messages.VACANCY_UPLOADED_SUCCESS)
+            # Пользователь почти всегда сразу открывает анализ: готовим его заранее
+            if ANALYSIS_PREFETCH_ENABLED and context.user_data.get('selected_vacancy_id'):
+                # Задача JobQueue работает в своей сессии и должна увидеть новую вакансию
+                await db.commit()
+                schedule_analysis_prefetch(context, user_id=user.id, vacancy_id=context.user_data['selected_vacancy_id'])
             await show_main_menu(update, context)
             return MAIN_MENU
         else:
@@ -66,8 +117,77 @@ async def _process_and_reply(update: Update, context: ContextTypes.DEFAULT_TYPE,
                 reply_markup=keyboards.cancel_keyboard(),
             )
             return AWAITING_VACANCY_UPLOAD
-    finally:
-        db.close()
+
+
+class _ProgressMessage:
+    """Одно сообщение о прогрессе пакетной загрузки, редактируемое не чаще раза в interval секунд."""
+
+    _STAGES = {
+        bulk_ingestion.STAGE_DOWNLOAD: messages.BULK_STAGE_DOWNLOAD,
+        bulk_ingestion.STAGE_VERIFY: messages.BULK_STAGE_VERIFY,
+    }
+
+    def __init__(self, message: Message, interval: float = BULK_PROGRESS_INTERVAL):
+        self.message = message
+        self.interval = interval
+        self._last_edit = 0.0
+
+    async def update(self, stage: str, done: int, total: int) -> None:
+        now = time.monotonic()
+        if done < total and now - self._last_edit < self.interval:
+            return
+        self._last_edit = now
+        await self.edit(messages.BULK_PROGRESS.format(stage=self._STAGES.get(stage, stage), done=done, total=total))
+
+    async def edit(self, text: str) -> None:
+        try:
+            await self.message.edit_text(text)
+        except TelegramError as e:
+            logger.warning(f"Не удалось обновить сообщение о прогрессе: {e}")
+
+
+def _bulk_report(items: list[bulk_ingestion.BulkVacancy]) -> str:
+    templates = {
+        bulk_ingestion.ADDED: messages.BULK_ITEM_ADDED,
+        bulk_ingestion.DUPLICATE: messages.BULK_ITEM_DUPLICATE,
+        bulk_ingestion.REJECTED: messages.BULK_ITEM_REJECTED,
+        bulk_ingestion.FAILED: messages.BULK_ITEM_FAILED,
+        bulk_ingestion.NO_BALANCE: messages.BULK_ITEM_NO_BALANCE,
+    }
+    added = sum(item.status == bulk_ingestion.ADDED for item in items)
+    lines = [messages.BULK_VACANCIES_RESULT.format(total=len(items), added=added)]
+    lines.extend(templates[item.status].format(title=item.title or item.url, url=item.url) for item in items)
+    return "\n".join(lines)
+
+
+async def _process_bulk(update: Update, context: ContextTypes.DEFAULT_TYPE, urls: list[str]) -> int:
+    """
+    Пакетная загрузка вакансий по нескольким ссылкам: прогресс показывается в одном
+    редактируемом сообщении, которое в конце заменяется итоговым отчетом.
+    """
+    chat_id = update.effective_chat.id
+    message = update.effective_message
+    progress = _ProgressMessage(await message.reply_text(messages.BULK_VACANCIES_STARTED.format(count=len(urls))))
+
+    async with unit_of_work() as db:
+        user = await crud.get_or_create_user(db, chat_id=chat_id)
+        resume = await crud.get_user_resume(db, user_id=user.id)
+        if not resume:
+            await message.reply_text(messages.ERROR_NO_RESUME)
+            return AWAITING_VACANCY_UPLOAD
+        items = await ingest_vacancies(db, user_id=user.id, urls=urls, on_progress=progress.update)
+
+    await progress.edit(_bulk_report(items))
+    # Выбранной становится последняя добавленная вакансия, а если новых нет — последняя из уже загруженных
+    selected = [item.vacancy_id for item in items if item.status == bulk_ingestion.ADDED] or [
+        item.vacancy_id for item in items if item.vacancy_id
+    ]
+    if not selected:
+        await message.reply_text(messages.ASK_FOR_VACANCY, reply_markup=keyboards.cancel_keyboard())
+        return AWAITING_VACANCY_UPLOAD
+    context.user_data['selected_vacancy_id'] = selected[-1]
+    await show_main_menu(update, context)
+    return MAIN_MENU
 
 
 async def handle_vacancy_file(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -80,6 +200,14 @@ async def handle_vacancy_file(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
         return AWAITING_VACANCY_UPLOAD
 
+    # Размер файла известен заранее: слишком большой файл даже не скачивается
+    if document.file_size and document.file_size > UPLOAD_MAX_FILE_BYTES:
+        await update.message.reply_text(
+            messages.FILE_TOO_LARGE.format(max_kb=UPLOAD_MAX_FILE_BYTES // 1024),
+            reply_markup=keyboards.cancel_keyboard(),
+        )
+        return AWAITING_VACANCY_UPLOAD
+
     try:
         file = await document.get_file()
         file_content_bytes = await file.download_as_bytearray()
@@ -92,7 +220,13 @@ async def handle_vacancy_file(update: Update, context: ContextTypes.DEFAULT_TYPE
         return AWAITING_VACANCY_UPLOAD
 
     try:
-        vacancy_text = file_content_bytes.decode("utf-8")
+        vacancy_text = decode_upload(bytes(file_content_bytes), UPLOAD_MAX_FILE_BYTES)
+    except PayloadTooLarge:
+        await update.message.reply_text(
+            messages.FILE_TOO_LARGE.format(max_kb=UPLOAD_MAX_FILE_BYTES // 1024),
+            reply_markup=keyboards.cancel_keyboard(),
+        )
+        return AWAITING_VACANCY_UPLOAD
     except UnicodeDecodeError:
         await update.message.reply_text(
             messages.FILE_DECODE_ERROR,
@@ -100,6 +234,12 @@ async def handle_vacancy_file(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
         return AWAITING_VACANCY_UPLOAD
 
+    # Файл со списком ссылок загружается пакетом
+    if is_url_list(vacancy_text):
+        urls = extract_vacancy_urls(vacancy_text)
+        if urls:
+            return await _process_bulk(update, context, urls)
+
     return await _process_and_reply(update, context, vacancy_text, source=document.file_name)
 
 
@@ -113,15 +253,12 @@ async def handle_vacancy_url(update: Update, context: ContextTypes.DEFAULT_TYPE)
         )
         return AWAITING_VACANCY_UPLOAD
 
-    vacancy_text = scrape_hh_url(url)
-    if not vacancy_text:
-        await update.message.reply_text(
-            messages.ERROR_MESSAGE,
-            reply_markup=keyboards.cancel_keyboard(),
-        )
-        return AWAITING_VACANCY_UPLOAD
+    urls = extract_vacancy_urls(url)
+    if len(urls) > 1:
+        return await _process_bulk(update, context, urls)
 
-    return await _process_and_reply(update, context, vacancy_text, source=url)
+    # Текст скачивается в _process_and_reply, если вакансии еще нет среди канонических
+    return await _process_and_reply(update, context, None, source=url, hh_id=parse_hh_vacancy_id(url))
 
 
 async def handle_invalid_vacancy_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -1,6 +1,6 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from db.models import Vacancy
-from typing import List
+from typing import Dict, List, Optional
 
 # --- Main Menu Keyboards ---
 def main_menu_keyboard(
@@ -34,12 +34,22 @@ def main_menu_keyboard(
     return InlineKeyboardMarkup(buttons)
 
 # --- Vacancy Selection Keyboard ---
-def vacancy_selection_keyboard(vacancies: List[Vacancy]) -> InlineKeyboardMarkup:
-    """Генерирует клавиатуру для выбора вакансии."""
+def vacancy_selection_keyboard(vacancies: List[Vacancy], scores: Optional[Dict[int, int]] = None) -> InlineKeyboardMarkup:
+    """
+    Генерирует клавиатуру для выбора вакансии.
+    Если переданы оценки соответствия резюме (ID вакансии -> проценты),
+    вакансии упорядочиваются по убыванию оценки, и она показывается на кнопке.
+    """
+    scores = scores or {}
+    if scores:
+        vacancies = sorted(vacancies, key=lambda vacancy: scores.get(vacancy.id, -1), reverse=True)
     buttons = []
     for vacancy in vacancies:
+        title = vacancy.title
+        if vacancy.id in scores:
+            title = f"{scores[vacancy.id]}% · {title}"
         # callback_data will be like 'vacancy_select_123'
-        buttons.append([InlineKeyboardButton(vacancy.title, callback_data=f"vacancy_select_{vacancy.id}")])
+        buttons.append([InlineKeyboardButton(title, callback_data=f"vacancy_select_{vacancy.id}")])
 
     buttons.append([InlineKeyboardButton("Загрузить новую вакансию", callback_data="upload_vacancy")])
     buttons.append([InlineKeyboardButton("Отмена", callback_data="cancel_action")])
@@ -19,11 +19,24 @@ RESUME_VERIFICATION_FAILED = "❌ Текст не похож на резюме.
 RESUME_PROCESSING = "⏳ Обрабатываю ваше резюме..."
 
 # Vacancy messages
-ASK_FOR_VACANCY = "Теперь загрузите вакансию, которая вас интересует (текстовым файлом .txt или ссылкой на hh.ru)."
+ASK_FOR_VACANCY = "Теперь загрузите вакансию, которая вас интересует (текстовым файлом .txt или ссылкой на hh.ru). Можно отправить сразу несколько ссылок."
 VACANCY_UPLOADED_SUCCESS = "✅ Вакансия успешно добавлена."
 VACANCY_INVALID_FORMAT = "❌ Неверный формат. Пожалуйста, отправьте файл в формате .txt или корректную ссылку на hh.ru."
 VACANCY_VERIFICATION_FAILED = "❌ Текст не похож на вакансию. Пожалуйста, попробуйте еще раз."
 VACANCY_PROCESSING = "⏳ Обрабатываю вакансию..."
+VACANCY_DUPLICATE = "♻️ Эта вакансия уже загружена: «{title}». Выбрал ее, баллы не списаны."
+
+# Bulk vacancy upload
+BULK_VACANCIES_STARTED = "⏳ Получил ссылок: {count}. Начинаю загрузку..."
+BULK_STAGE_DOWNLOAD = "Загружаю вакансии"
+BULK_STAGE_VERIFY = "Проверяю вакансии"
+BULK_PROGRESS = "⏳ {stage}: {done} из {total}"
+BULK_VACANCIES_RESULT = "📦 Обработано ссылок: {total}. Добавлено вакансий: {added}, списано баллов: {added}."
+BULK_ITEM_ADDED = "✅ {title}"
+BULK_ITEM_DUPLICATE = "♻️ {title} — уже загружена"
+BULK_ITEM_REJECTED = "❌ {url} — не похоже на вакансию"
+BULK_ITEM_FAILED = "❌ {url} — не удалось загрузить"
+BULK_ITEM_NO_BALANCE = "💰 {url} — не хватило баллов"
 
 # Vacancy messages
 ERROR_NO_RESUME = "🚫 Не могу найти ваше резюме. Пожалуйста, загрузите его сначала командой /start."
@@ -55,6 +68,7 @@ MAIN_MENU_NO_VACANCIES = """
 
 # Analysis messages
 ANALYSIS_IN_PROGRESS = "⏳ Анализ выполняется, это может занять несколько минут..."
+ANALYSIS_QUEUED = "⏳ Ваш запрос в очереди: перед вами {depth}, ожидание около {wait} с. Анализ начнется автоматически."
 ANALYSIS_COMPLETE = "🔍 Анализ завершен:"
 ANALYSIS_ERROR = "❌ Произошла ошибка во время анализа. Попробуйте еще раз."
 AI_ERROR_RESPONSE = "🤖 AI-сервис временно недоступен. Пожалуйста, попробуйте позже."
@@ -67,6 +81,7 @@ CHOOSE_VACANCY_FOR_ACTION = "Выберите вакансию для дейст
 ERROR_MESSAGE = "Что-то пошло не так. Попробуйте еще раз."
 FILE_DOWNLOAD_ERROR = "❌ Произошла ошибка при загрузке файла. Пожалуйста, попробуйте еще раз."
 FILE_DECODE_ERROR = "❌ Ошибка кодировки файла. Пожалуйста, используйте UTF-8."
+FILE_TOO_LARGE = "❌ Файл слишком большой. Максимальный размер — {max_kb} КБ."
 ACTION_CANCELED = "Действие отменено."
 NOT_IMPLEMENTED = "Этот функционал еще в разработке."
 GLOBAL_FALLBACK_MESSAGE = "Я не совсем понял ваш запрос. Давайте вернемся в главное меню, чтобы вы могли выбрать доступное действие."
@@ -0,0 +1,90 @@
+import logging
+import time
+
+from telegram import Message
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+logger = logging.getLogger(__name__)
+
+# Максимальная длина текста сообщения Telegram с запасом на заголовок
+MAX_MESSAGE_LENGTH = 4000
+
+
+class TelegramStreamSink:
+    """
+    Показывает потоковый ответ AI, редактируя одно сообщение Telegram.
+
+    Правки ограничиваются по частоте (не чаще `min_interval` секунд),
+    чтобы не упираться в лимиты Telegram на редактирование сообщений.
+    Промежуточный текст обрезается до длины одного сообщения.
+    """
+
+    def __init__(self, message: Message, header: str = "", min_interval: float = 1.5, clock=time.monotonic):
+        self.message = message
+        self.header = header
+        self.min_interval = min_interval
+        self._clock = clock
+        self._next_edit_at = 0.0
+        self._shown_text: str | None = None
+
+    @property
+    def has_output(self) -> bool:
+        """Было ли в сообщении показано хотя бы что-то из ответа."""
+        return self._shown_text is not None
+
+    def ready(self) -> bool:
+        """Можно ли редактировать сообщение прямо сейчас, не превышая лимит частоты."""
+        return self._clock() >= self._next_edit_at
+
+    def _render(self, text: str) -> str:
+        rendered = f"{self.header}\n\n{text}" if self.header else text
+        if len(rendered) > MAX_MESSAGE_LENGTH:
+            rendered = rendered[: MAX_MESSAGE_LENGTH - 1] + "…"
+        return rendered
+
+    async def _edit(self, rendered: str) -> bool:
+        """Редактирует сообщение. Возвращает True, если в сообщении показан именно этот текст."""
+        if rendered == self._shown_text:
+            return True
+        shown = False
+        try:
+            await self.message.edit_text(rendered)
+            self._shown_text = rendered
+            shown = True
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            if hasattr(retry_after, "total_seconds"):
+                retry_after = retry_after.total_seconds()
+            self._next_edit_at = self._clock() + retry_after
+            logger.warning(f"Telegram ограничил частоту правок, пауза {retry_after} с.")
+            return False
+        except BadRequest as e:
+            # "Message is not modified" и подобные ошибки не критичны для промежуточного вывода
+            logger.debug(f"Не удалось отредактировать сообщение: {e}")
+            shown = "not modified" in str(e).lower()
+        except TelegramError as e:
+            logger.warning(f"Ошибка Telegram при обновлении потокового сообщения: {e}")
+        self._next_edit_at = self._clock() + self.min_interval
+        return shown
+
+    async def update(self, text: str | None) -> None:
+        """
+        Показывает промежуточный текст, если не превышен лимит частоты правок.
+        Пустой текст тоже считается попыткой обновления, чтобы вызывающий код
+        не вычислял промежуточный текст чаще, чем его можно показать.
+        """
+        if not self.ready():
+            return
+        if not text:
+            self._next_edit_at = self._clock() + self.min_interval
+            return
+        await self._edit(self._render(text))
+
+    async def finish(self, text: str) -> bool:
+        """
+        Заменяет содержимое сообщения итоговым текстом (без заголовка) независимо от лимита частоты.
+        Возвращает False, если текст показать не удалось: тогда его нужно отправить отдельным сообщением.
+        """
+        if not text:
+            return True
+        return await self._edit(text[:MAX_MESSAGE_LENGTH])
@@ -20,5 +20,77 @@ OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 # Название файла базы данных
 DB_NAME = "bot_database.sqlite"
 
+# Кэш ответов AI: включение, время жизни записи (секунды), максимальное число записей
+# и через сколько записей в кэш проверять его размер и вытеснять лишнее
+AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "1") == "1"
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", 10000))
+AI_CACHE_EVICT_EVERY = int(os.getenv("AI_CACHE_EVICT_EVERY", 100))
+
+# Стратегия генерации анализа: "consolidated" (один JSON-промпт на все разделы),
+# "parallel" (четыре промпта разделов одновременно) или "on_demand" (только запрошенный раздел)
+ANALYSIS_STRATEGY = os.getenv("ANALYSIS_STRATEGY", "consolidated")
+
+# Анализ по компактным выжимкам резюме и вакансии (готовятся один раз на документ) вместо полных текстов
+ANALYSIS_DISTILLATION_ENABLED = os.getenv("ANALYSIS_DISTILLATION_ENABLED", "1") == "1"
+
+# Заблаговременный консолидированный анализ сразу после загрузки вакансии (балл списывается при первом открытии)
+ANALYSIS_PREFETCH_ENABLED = os.getenv("ANALYSIS_PREFETCH_ENABLED", "0") == "1"
+
+# Лимиты входного текста для промптов в токенах (после удаления шаблонного мусора и дублей)
+AI_RESUME_TOKEN_CAP = int(os.getenv("AI_RESUME_TOKEN_CAP", 6000))
+AI_VACANCY_TOKEN_CAP = int(os.getenv("AI_VACANCY_TOKEN_CAP", 4000))
+# Документы длиннее лимита анализируются по частям (map-reduce): размер части в токенах и максимум частей
+AI_CHUNK_TOKENS = int(os.getenv("AI_CHUNK_TOKENS", 3000))
+AI_MAX_CHUNKS = int(os.getenv("AI_MAX_CHUNKS", 12))
+
+# Локальная предварительная классификация загружаемых документов: очевидные резюме и вакансии не проверяются AI
+DOCUMENT_PRECLASSIFIER_ENABLED = os.getenv("DOCUMENT_PRECLASSIFIER_ENABLED", "1") == "1"
+
+# Скрейпер: общий пул соединений, одновременные запросы к одному хосту, таймаут (секунды)
+# и каталог дискового кэша ответов с ETag/Last-Modified
+SCRAPER_MAX_CONNECTIONS = int(os.getenv("SCRAPER_MAX_CONNECTIONS", 20))
+SCRAPER_PER_HOST_LIMIT = int(os.getenv("SCRAPER_PER_HOST_LIMIT", 4))
+SCRAPER_TIMEOUT = float(os.getenv("SCRAPER_TIMEOUT", 15))
+SCRAPER_CACHE_DIR = os.getenv("SCRAPER_CACHE_DIR", os.path.join("storage", "http_cache"))
+# Лимиты размера загружаемых данных (байты): страница прерывается при превышении,
+# файл от пользователя отклоняется еще до скачивания
+SCRAPER_MAX_PAGE_BYTES = int(os.getenv("SCRAPER_MAX_PAGE_BYTES", 5 * 1024 * 1024))
+UPLOAD_MAX_FILE_BYTES = int(os.getenv("UPLOAD_MAX_FILE_BYTES", 1024 * 1024))
+# Публичный API hh.ru: вакансии по ссылкам на hh.ru загружаются из него, а не со страницы
+HH_API_ENABLED = os.getenv("HH_API_ENABLED", "1") == "1"
+HH_API_BASE_URL = os.getenv("HH_API_BASE_URL", "https://api.hh.ru")
+# API hh.ru требует идентифицировать приложение: "Название/версия (контактный email)"
+HH_API_USER_AGENT = os.getenv("HH_API_USER_AGENT", "resume-assistant-bot/1.0")
+# Пакетная загрузка вакансий: максимум ссылок в одном сообщении, число одновременно
+# обрабатываемых вакансий и минимальный интервал между обновлениями сообщения о прогрессе (секунды)
+BULK_INGEST_MAX_URLS = int(os.getenv("BULK_INGEST_MAX_URLS", 20))
+BULK_INGEST_CONCURRENCY = int(os.getenv("BULK_INGEST_CONCURRENCY", 5))
+BULK_PROGRESS_INTERVAL = float(os.getenv("BULK_PROGRESS_INTERVAL", 1.0))
+
+# Маршрутизатор AI-провайдеров: порядок бэкендов по умолчанию, минимальная задержка
+# перед дублирующим (hedged) запросом и время исключения нездорового бэкенда (секунды)
+AI_ROUTER_BACKENDS = [name.strip() for name in os.getenv("AI_ROUTER_BACKENDS", "openrouter,gen_api,openai").split(",") if name.strip()]
+AI_ROUTER_HEDGE_MIN_DELAY = float(os.getenv("AI_ROUTER_HEDGE_MIN_DELAY", 2.0))
+AI_ROUTER_EJECTION_SECONDS = float(os.getenv("AI_ROUTER_EJECTION_SECONDS", 30.0))
+# Имя маршрутизатора в ключе кэша ответов AI: не зависит от списка бэкендов,
+# поэтому их смена не сбрасывает кэш; изменить значение — сбросить кэш вручную
+AI_ROUTER_CACHE_ID = os.getenv("AI_ROUTER_CACHE_ID", "router")
+
+# Лимиты запросов к AI-бэкендам: одновременные запросы, запросы в минуту и токены в минуту (0 — без ограничения)
+def _provider_limits(prefix: str, max_concurrency: int, requests_per_minute: int, tokens_per_minute: int) -> dict:
+    return {
+        "max_concurrency": int(os.getenv(f"{prefix}_MAX_CONCURRENCY", max_concurrency)),
+        "requests_per_minute": int(os.getenv(f"{prefix}_REQUESTS_PER_MINUTE", requests_per_minute)),
+        "tokens_per_minute": int(os.getenv(f"{prefix}_TOKENS_PER_MINUTE", tokens_per_minute)),
+    }
+
+
+AI_PROVIDER_LIMITS = {
+    "openrouter": _provider_limits("OPENROUTER", 8, 20, 0),
+    "gen_api": _provider_limits("GEN_API", 20, 60, 0),
+    "openai": _provider_limits("OPENAI", 16, 500, 200000),
+}
+
 # Проверка на наличие токенов перенесена в модули, которые их непосредственно используют (bot.py и openai.py),
 # чтобы не вызывать ошибку при импорте во время тестов.
@@ -0,0 +1,73 @@
+"""
+Асинхронные варианты функций db/crud.py для AsyncSession.
+
+Каждая функция выполняет синхронную реализацию из crud через AsyncSession.run_sync:
+запросы идут через асинхронный драйвер (aiosqlite, asyncpg) и не блокируют цикл
+событий, а логика запросов остается в одном месте. Сигнатуры совпадают с crud,
+только первым аргументом передается AsyncSession, а вызов нужно ожидать (await).
+"""
+import functools
+from typing import Awaitable, Callable, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud
+
+R = TypeVar("R")
+
+
+def _async_variant(func: Callable[..., R]) -> Callable[..., Awaitable[R]]:
+    @functools.wraps(func)
+    async def wrapper(db: AsyncSession, *args, **kwargs) -> R:
+        return await db.run_sync(lambda session: func(session, *args, **kwargs))
+
+    return wrapper
+
+
+# User functions
+get_or_create_user = _async_variant(crud.get_or_create_user)
+get_or_create_balance = _async_variant(crud.get_or_create_balance)
+get_user_balance = _async_variant(crud.get_user_balance)
+update_user_balance = _async_variant(crud.update_user_balance)
+create_transaction = _async_variant(crud.create_transaction)
+
+# AI Usage Log functions
+create_ai_usage_log = _async_variant(crud.create_ai_usage_log)
+
+# Resume functions
+get_user_resume = _async_variant(crud.get_user_resume)
+create_resume = _async_variant(crud.create_resume)
+
+# Vacancy functions
+get_user_vacancies = _async_variant(crud.get_user_vacancies)
+get_vacancy_by_id = _async_variant(crud.get_vacancy_by_id)
+find_duplicate_vacancy = _async_variant(crud.find_duplicate_vacancy)
+create_vacancy = _async_variant(crud.create_vacancy)
+create_vacancies_batch = _async_variant(crud.create_vacancies_batch)
+
+# Canonical vacancy functions
+get_canonical_vacancy = _async_variant(crud.get_canonical_vacancy)
+get_or_create_canonical_vacancy = _async_variant(crud.get_or_create_canonical_vacancy)
+
+# AnalysisResult functions
+get_analysis_result = _async_variant(crud.get_analysis_result)
+create_analysis_result = _async_variant(crud.create_analysis_result)
+mark_analysis_charged = _async_variant(crud.mark_analysis_charged)
+
+# AI response cache functions
+get_cached_ai_response = _async_variant(crud.get_cached_ai_response)
+save_cached_ai_response = _async_variant(crud.save_cached_ai_response)
+evict_ai_response_cache = _async_variant(crud.evict_ai_response_cache)
+
+# Survey functions
+get_active_survey = _async_variant(crud.get_active_survey)
+create_survey = _async_variant(crud.create_survey)
+get_survey_answer = _async_variant(crud.get_survey_answer)
+create_survey_answer = _async_variant(crud.create_survey_answer)
+
+# UTMTrack functions
+create_utm_track = _async_variant(crud.create_utm_track)
+
+# Document digest functions
+get_document_digest = _async_variant(crud.get_document_digest)
+save_document_digest = _async_variant(crud.save_document_digest)
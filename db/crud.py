@@ -1,7 +1,12 @@
+from datetime import datetime
 from typing import Optional
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 
-from . import models
+from . import fingerprints, models
+
+# Функции не фиксируют транзакцию: изменения отправляются в БД через flush (чтобы получить
+# ID новых записей), а commit один раз выполняет вызывающий код — см. database.unit_of_work.
 
 
 # User functions
@@ -14,8 +19,7 @@ def get_or_create_user(db: Session, chat_id: int) -> models.User:
     if not user:
         user = models.User(chat_id=chat_id)
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        db.flush()
         # Начисляем приветственные баллы
         get_or_create_balance(db, user_id=user.id, initial_balance=6)
     return user
@@ -28,8 +32,7 @@ def get_or_create_balance(db: Session, user_id: int, initial_balance: int = 0) -
     if not balance:
         balance = models.UserBalance(user_id=user_id, balance=initial_balance)
         db.add(balance)
-        db.commit()
-        db.refresh(balance)
+        db.flush()
         # Создаем транзакцию о начислении приветственных баллов
         if initial_balance > 0:
             create_transaction(
@@ -66,8 +69,7 @@ def update_user_balance(db: Session, user_id: int, amount: int, description: str
         cost=cost,
     )
 
-    db.commit()
-    db.refresh(balance)
+    db.flush()
     return balance
 
 
@@ -90,8 +92,7 @@ def create_transaction(
         external_id=external_id,
     )
     db.add(transaction)
-    db.commit()
-    db.refresh(transaction)
+    db.flush()
     return transaction
 
 
@@ -106,6 +107,9 @@ def create_ai_usage_log(
     action: str,
     resume_id: Optional[int] = None,
     vacancy_id: Optional[int] = None,
+    strategy: Optional[str] = None,
+    latency_ms: Optional[int] = None,
+    cached_prompt_tokens: Optional[int] = None,
 ) -> models.AIUsageLog:
     """Создает запись о использовании AI."""
     new_log = models.AIUsageLog(
@@ -117,10 +121,12 @@ def create_ai_usage_log(
         action=action,
         resume_id=resume_id,
         vacancy_id=vacancy_id,
+        strategy=strategy,
+        latency_ms=latency_ms,
+        cached_prompt_tokens=cached_prompt_tokens,
     )
     db.add(new_log)
-    db.commit()
-    db.refresh(new_log)
+    db.flush()
     return new_log
 
 
@@ -136,12 +142,12 @@ def create_resume(db: Session, user_id: int, file_path: str, source: str, title:
     existing_resume = get_user_resume(db, user_id)
     if existing_resume:
         db.delete(existing_resume)
-        db.commit()
+        # Старое резюме удаляется до вставки нового
+        db.flush()
 
     new_resume = models.Resume(user_id=user_id, file_path=file_path, source=source, title=title)
     db.add(new_resume)
-    db.commit()
-    db.refresh(new_resume)
+    db.flush()
     return new_resume
 
 
@@ -156,15 +162,185 @@ def get_vacancy_by_id(db: Session, vacancy_id: int) -> Optional[models.Vacancy]:
     return db.query(models.Vacancy).filter(models.Vacancy.id == vacancy_id).first()
 
 
-def create_vacancy(db: Session, user_id: int, file_path: str, source: str, title: Optional[str] = None) -> models.Vacancy:
-    """Создает новую вакансию для пользователя."""
-    new_vacancy = models.Vacancy(user_id=user_id, file_path=file_path, source=source, title=title)
+def find_duplicate_vacancy(db: Session, user_id: int, text: str) -> Optional[models.Vacancy]:
+    """
+    Ищет среди вакансий пользователя точный или почти точный дубликат текста.
+    Кандидаты выбираются по индексу полос SimHash, а не перебором всех вакансий.
+    """
+    fingerprint = fingerprints.Fingerprint.of(text)
+    exact = (
+        db.query(models.Vacancy)
+        .filter_by(user_id=user_id, content_hash=fingerprint.content_hash)
+        .order_by(models.Vacancy.id.asc())
+        .first()
+    )
+    if exact:
+        return exact
+
+    band_filters = [
+        and_(models.VacancySignatureBand.band == band, models.VacancySignatureBand.value == value)
+        for band, value in enumerate(fingerprints.bands(fingerprint.simhash))
+    ]
+    candidates = (
+        db.query(models.Vacancy)
+        .join(models.VacancySignatureBand)
+        .filter(models.VacancySignatureBand.user_id == user_id, or_(*band_filters))
+        .distinct()
+        .all()
+    )
+    # Ближайший по расстоянию Хэмминга кандидат; при равенстве — загруженный раньше
+    matches = [
+        (fingerprints.hamming_distance(fingerprint.simhash, fingerprints.to_unsigned(candidate.simhash)), candidate.id, candidate)
+        for candidate in candidates
+    ]
+    matches = [match for match in matches if match[0] <= fingerprints.MAX_DISTANCE]
+    return min(matches, key=lambda match: match[:2])[2] if matches else None
+
+
+def create_vacancy(
+    db: Session,
+    user_id: int,
+    file_path: str,
+    source: str,
+    title: Optional[str] = None,
+    text: Optional[str] = None,
+    canonical_id: Optional[int] = None,
+) -> models.Vacancy:
+    """
+    Создает новую вакансию для пользователя.
+    Если передан текст вакансии, для нее сохраняются сигнатуры, а для дубликата
+    уже загруженной вакансии возвращается существующая запись (вместе с ее анализами).
+    """
+    if text is not None:
+        duplicate = find_duplicate_vacancy(db, user_id, text)
+        if duplicate:
+            return duplicate
+
+    new_vacancy = _new_vacancy(user_id, file_path, source, title, text, canonical_id)
     db.add(new_vacancy)
-    db.commit()
-    db.refresh(new_vacancy)
+    db.flush()
     return new_vacancy
 
 
+def _new_vacancy(
+    user_id: int,
+    file_path: str,
+    source: str,
+    title: Optional[str],
+    text: Optional[str],
+    canonical_id: Optional[int] = None,
+) -> models.Vacancy:
+    """Создает объект вакансии с сигнатурами текста, не добавляя его в сессию."""
+    new_vacancy = models.Vacancy(
+        user_id=user_id, file_path=file_path, source=source, title=title, canonical_id=canonical_id
+    )
+    if text is not None:
+        fingerprint = fingerprints.Fingerprint.of(text)
+        new_vacancy.content_hash = fingerprint.content_hash
+        new_vacancy.simhash = fingerprints.to_signed(fingerprint.simhash)
+        new_vacancy.signature_bands = [
+            models.VacancySignatureBand(user_id=user_id, band=band, value=value)
+            for band, value in enumerate(fingerprints.bands(fingerprint.simhash))
+        ]
+    return new_vacancy
+
+
+def create_vacancies_batch(
+    db: Session,
+    user_id: int,
+    vacancies: list[dict],
+    usage_logs: Optional[list[dict]] = None,
+    charge_description: Optional[str] = None,
+) -> list[models.Vacancy]:
+    """
+    Создает несколько вакансий пользователя: канонические вакансии, вакансии
+    с сигнатурами, логи использования AI и, если передано charge_description,
+    списание по одному баллу за вакансию. Все записывается в транзакции вызывающего
+    кода, поэтому при ошибке она откатывается целиком.
+
+    Элемент vacancies — словарь с ключами file_path, source, title, text и необязательными
+    hh_id и canonical_id (уже существующая каноническая вакансия). Без canonical_id
+    каноническая вакансия ищется по hh_id и хэшу текста: найденная (например, с нечитаемым
+    файлом) переводится на новый файл, иначе создается новая.
+    Проверка дубликатов — задача вызывающего кода.
+    """
+    created = []
+    for item in vacancies:
+        canonical_id = item.get("canonical_id")
+        if canonical_id is None:
+            text_hash = fingerprints.content_hash(item["text"])
+            canonical = get_canonical_vacancy(db, hh_id=item.get("hh_id"), content_hash=text_hash)
+            if canonical:
+                canonical.hh_id = canonical.hh_id or item.get("hh_id")
+                canonical.content_hash = text_hash
+                canonical.title = item["title"]
+                canonical.file_path = item["file_path"]
+                canonical.source = item["source"]
+            else:
+                canonical = models.CanonicalVacancy(
+                    hh_id=item.get("hh_id"),
+                    content_hash=text_hash,
+                    title=item["title"],
+                    file_path=item["file_path"],
+                    source=item["source"],
+                )
+                db.add(canonical)
+            db.flush()
+            canonical_id = canonical.id
+        vacancy = _new_vacancy(user_id, item["file_path"], item["source"], item["title"], item["text"], canonical_id)
+        db.add(vacancy)
+        created.append(vacancy)
+
+    db.flush()
+
+    for log in usage_logs or []:
+        create_ai_usage_log(db, user_id=user_id, **log)
+
+    if charge_description and created:
+        if get_user_balance(db, user_id) is None:
+            raise ValueError(f"У пользователя {user_id} нет баланса для списания")
+        for _ in created:
+            update_user_balance(db, user_id=user_id, amount=-1, description=charge_description)
+    return created
+
+
+# Canonical vacancy functions
+def get_canonical_vacancy(
+    db: Session, hh_id: Optional[str] = None, content_hash: Optional[str] = None
+) -> Optional[models.CanonicalVacancy]:
+    """Ищет каноническую вакансию по ID на hh.ru, а затем по хэшу текста."""
+    if hh_id:
+        canonical = db.query(models.CanonicalVacancy).filter_by(hh_id=hh_id).first()
+        if canonical:
+            return canonical
+    if content_hash:
+        return db.query(models.CanonicalVacancy).filter_by(content_hash=content_hash).first()
+    return None
+
+
+def get_or_create_canonical_vacancy(
+    db: Session,
+    file_path: str,
+    title: Optional[str],
+    source: Optional[str],
+    hh_id: Optional[str] = None,
+    content_hash: Optional[str] = None,
+) -> models.CanonicalVacancy:
+    """
+    Возвращает каноническую вакансию с данным ID на hh.ru или хэшем текста,
+    создавая ее, если такой еще нет.
+    """
+    canonical = get_canonical_vacancy(db, hh_id=hh_id, content_hash=content_hash)
+    if canonical:
+        return canonical
+    canonical = models.CanonicalVacancy(
+        hh_id=hh_id, content_hash=content_hash, title=title, file_path=file_path, source=source
+    )
+    db.add(canonical)
+    db.flush()
+    return canonical
+
+
 # AnalysisResult functions
 def get_analysis_result(db: Session, resume_id: int, vacancy_id: int) -> Optional[models.AnalysisResult]:
     """Получает результат анализа по ID резюме и вакансии."""
@@ -177,8 +353,7 @@ def create_analysis_result(db: Session, resume_id: int, vacancy_id: int, analysi
     if existing_analysis:
         for key, value in analysis_data.items():
             setattr(existing_analysis, key, value)
-        db.commit()
-        db.refresh(existing_analysis)
+        db.flush()
         return existing_analysis
     else:
         new_analysis = models.AnalysisResult(
@@ -187,11 +362,94 @@ def create_analysis_result(db: Session, resume_id: int, vacancy_id: int, analysi
             **analysis_data,
         )
         db.add(new_analysis)
-        db.commit()
-        db.refresh(new_analysis)
+        db.flush()
         return new_analysis
 
 
+def mark_analysis_charged(db: Session, resume_id: int, vacancy_id: int) -> bool:
+    """
+    Отмечает, что за анализ пары резюме/вакансия списан балл.
+    Возвращает True, только если анализ еще не был оплачен: отметка
+    выполняется одним UPDATE, поэтому параллельные запросы не спишут балл дважды.
+    Если записи анализа еще нет, она создается сразу оплаченной.
+    """
+    # autoflush выключен: запись, добавленная в сессию без flush, иначе не видна для UPDATE
+    db.flush()
+    updated = (
+        db.query(models.AnalysisResult)
+        .filter_by(resume_id=resume_id, vacancy_id=vacancy_id, charged=False)
+        .update({"charged": True})
+    )
+    if updated > 0:
+        return True
+    if get_analysis_result(db, resume_id, vacancy_id):
+        # Запись есть, значит, анализ уже оплачен
+        return False
+    db.add(models.AnalysisResult(resume_id=resume_id, vacancy_id=vacancy_id, charged=True))
+    db.flush()
+    return True
+
+
+# AI response cache functions
+def get_cached_ai_response(db: Session, cache_key: str, min_created_at: datetime) -> Optional[models.AIResponseCache]:
+    """
+    Возвращает запись кэша по ключу и отмечает обращение к ней.
+    Устаревшие записи (созданные раньше min_created_at) удаляются.
+    """
+    entry = db.query(models.AIResponseCache).filter_by(cache_key=cache_key).first()
+    if not entry:
+        return None
+    if entry.created_at < min_created_at:
+        db.delete(entry)
+        db.flush()
+        return None
+    entry.hits += 1
+    entry.last_accessed_at = datetime.utcnow()
+    db.flush()
+    return entry
+
+
+def save_cached_ai_response(db: Session, cache_key: str, response: str) -> models.AIResponseCache:
+    """Создает или обновляет запись кэша ответов AI."""
+    now = datetime.utcnow()
+    entry = db.query(models.AIResponseCache).filter_by(cache_key=cache_key).first()
+    if entry:
+        entry.response = response
+        entry.created_at = now
+        entry.last_accessed_at = now
+    else:
+        entry = models.AIResponseCache(
+            cache_key=cache_key, response=response, hits=0, created_at=now, last_accessed_at=now
+        )
+        db.add(entry)
+    db.flush()
+    return entry
+
+
+def evict_ai_response_cache(db: Session, max_entries: int, min_created_at: datetime) -> int:
+    """
+    Удаляет устаревшие записи кэша и самые давно использованные записи сверх max_entries (LRU).
+    Возвращает количество удаленных записей.
+    """
+    deleted = db.query(models.AIResponseCache).filter(
+        models.AIResponseCache.created_at < min_created_at
+    ).delete(synchronize_session=False)
+
+    overflow = db.query(models.AIResponseCache).count() - max_entries
+    if overflow > 0:
+        stale_ids = [
+            row.id for row in db.query(models.AIResponseCache.id)
+            .order_by(models.AIResponseCache.last_accessed_at.asc(), models.AIResponseCache.id.asc())
+            .limit(overflow)
+        ]
+        deleted += db.query(models.AIResponseCache).filter(
+            models.AIResponseCache.id.in_(stale_ids)
+        ).delete(synchronize_session=False)
+
+    db.flush()
+    return deleted
+
+
 # Survey functions
 def get_active_survey(db: Session) -> Optional[models.Survey]:
     """Возвращает первый активный опрос."""
@@ -210,11 +468,15 @@ def create_survey(db: Session, question: str, options: list[str]) -> models.Surv
         is_active=True
     )
     db.add(new_survey)
-    db.commit()
-    db.refresh(new_survey)
+    db.flush()
     return new_survey
 
 
+def get_survey_answer(db: Session, user_id: int, survey_id: int) -> Optional[models.SurveyAnswer]:
+    """Возвращает ответ пользователя на опрос, если он уже отвечал."""
+    return db.query(models.SurveyAnswer).filter_by(user_id=user_id, survey_id=survey_id).first()
+
+
 def create_survey_answer(db: Session, user_id: int, survey_id: int, answer: str) -> models.SurveyAnswer:
     """Создает ответ пользователя на опрос."""
     new_answer = models.SurveyAnswer(
@@ -223,8 +485,7 @@ def create_survey_answer(db: Session, user_id: int, survey_id: int, answer: str)
         answer=answer
     )
     db.add(new_answer)
-    db.commit()
-    db.refresh(new_answer)
+    db.flush()
     return new_answer
 
 
@@ -233,6 +494,23 @@ def create_utm_track(db: Session, user_id: int, utm_source: str) -> models.UTMTr
     """Создает запись об источнике UTM."""
     new_track = models.UTMTrack(user_id=user_id, utm_source=utm_source)
     db.add(new_track)
-    db.commit()
-    db.refresh(new_track)
+    db.flush()
     return new_track
+
+
+# Document digest functions
+def get_document_digest(db: Session, content_hash: str) -> Optional[models.DocumentDigest]:
+    """Возвращает выжимку документа по хэшу его текста."""
+    return db.query(models.DocumentDigest).filter_by(content_hash=content_hash).first()
+
+
+def save_document_digest(db: Session, content_hash: str, doc_type: str, digest: str) -> models.DocumentDigest:
+    """Создает или обновляет выжимку документа."""
+    entry = get_document_digest(db, content_hash)
+    if entry:
+        entry.digest = digest
+    else:
+        entry = models.DocumentDigest(content_hash=content_hash, doc_type=doc_type, digest=digest)
+        db.add(entry)
+    db.flush()
+    return entry
@@ -1,6 +1,13 @@
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator
+
 from alembic import command
 from alembic.config import Config
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from config import DB_NAME
@@ -19,6 +26,32 @@ engine = create_engine(
 # Создаем класс для сессий
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронные драйверы для синхронных строк подключения
+_ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
+
+
+def to_async_url(url: str) -> str:
+    """
+    Строка подключения с асинхронным драйвером: sqlite:///db.sqlite -> sqlite+aiosqlite:///db.sqlite,
+    postgresql://... -> postgresql+asyncpg://... Явно указанный драйвер не меняется.
+    """
+    parsed = make_url(url)
+    if "+" in parsed.drivername or parsed.drivername not in _ASYNC_DRIVERS:
+        return url
+    return parsed.set(drivername=f"{parsed.drivername}+{_ASYNC_DRIVERS[parsed.drivername]}").render_as_string(
+        hide_password=False
+    )
+
+
+ASYNC_DATABASE_URL = to_async_url(DATABASE_URL)
+
+# Асинхронный движок для обработчиков бота: запросы к БД не блокируют цикл событий
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+
+# Объекты остаются доступными после commit: повторная загрузка атрибутов
+# вне await в асинхронной сессии невозможна
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 def init_db():
     """
@@ -40,3 +73,48 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_async_db() -> AsyncSession:
+    """
+    Создает асинхронную сессию базы данных.
+    Вызывающий код сам фиксирует изменения и закрывает ее: await db.close() в блоке finally.
+    """
+    return AsyncSessionLocal()
+
+
+# Сессия открытой единицы работы текущего обработчика
+_current_unit_of_work: ContextVar[AsyncSession | None] = ContextVar("current_unit_of_work", default=None)
+_UNIT_OF_WORK_TASK = "unit_of_work_task"
+
+
+@asynccontextmanager
+async def unit_of_work() -> AsyncIterator[AsyncSession]:
+    """
+    Сессия на один вызов обработчика. Функции crud только отправляют изменения
+    через flush, а фиксируются они одним commit при выходе из блока;
+    при исключении транзакция откатывается.
+    Вложенный вызов (например, показ главного меню из обработчика) работает в транзакции
+    внешнего: отдельная сессия не увидела бы незафиксированных изменений, а в SQLite
+    еще и ждала бы блокировку записи, которую держит внешняя.
+    """
+    outer = _current_unit_of_work.get()
+    # Задачи, созданные внутри блока (например, JobQueue), наследуют контекст,
+    # но работают параллельно обработчику или после него — им нужна своя сессия
+    if outer is not None and outer.info.get(_UNIT_OF_WORK_TASK) is asyncio.current_task():
+        yield outer
+        return
+
+    db = get_async_db()
+    db.info[_UNIT_OF_WORK_TASK] = asyncio.current_task()
+    token = _current_unit_of_work.set(db)
+    try:
+        yield db
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+    finally:
+        db.info.pop(_UNIT_OF_WORK_TASK, None)
+        _current_unit_of_work.reset(token)
+        await db.close()
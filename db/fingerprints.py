@@ -0,0 +1,83 @@
+import hashlib
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+# Параметры SimHash: 64-битная сигнатура делится на BANDS полос по BAND_BITS бит.
+# Сигнатуры, отличающиеся менее чем в BANDS битах, по принципу Дирихле совпадают
+# хотя бы в одной полосе; при расстоянии до MAX_DISTANCE — с высокой вероятностью.
+# Поэтому кандидаты ищутся по индексу полос, а не перебором всех вакансий.
+SIGNATURE_BITS = 64
+BANDS = 8
+BAND_BITS = SIGNATURE_BITS // BANDS
+MAX_DISTANCE = 10
+SHINGLE_SIZE = 3
+
+_WORD_RE = re.compile(r"[a-zа-яё0-9]+")
+_BIT_WEIGHTS = np.uint64(1) << np.arange(SIGNATURE_BITS, dtype=np.uint64)
+
+
+def normalize_text(text: str) -> str:
+    """Текст без регистра, пунктуации и различий в пробелах."""
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def content_hash(text: str) -> str:
+    """Хэш нормализованного текста для поиска точных дубликатов."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text: str) -> int:
+    """64-битный SimHash по шинглам из SHINGLE_SIZE слов."""
+    words = normalize_text(text).split()
+    if not words:
+        return 0
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))}
+    hashes = np.fromiter((_hash64(shingle) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+    # Каждый шингл голосует за 1 или 0 в каждом бите сигнатуры
+    bits = (hashes[:, None] & _BIT_WEIGHTS) != 0
+    votes = bits.sum(axis=0) * 2 - len(shingles)
+    return int(_BIT_WEIGHTS[votes > 0].sum())
+
+
+def bands(signature: int) -> list[int]:
+    """Значения полос сигнатуры (по BAND_BITS бит)."""
+    mask = (1 << BAND_BITS) - 1
+    return [(signature >> (band * BAND_BITS)) & mask for band in range(BANDS)]
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def to_signed(signature: int) -> int:
+    """Беззнаковая 64-битная сигнатура в виде, пригодном для колонки BIGINT."""
+    return signature - (1 << SIGNATURE_BITS) if signature >= 1 << (SIGNATURE_BITS - 1) else signature
+
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << SIGNATURE_BITS) if value < 0 else value
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    """Сигнатуры документа для поиска точных и почти точных дубликатов."""
+
+    content_hash: str
+    simhash: int
+
+    @classmethod
+    def of(cls, text: str) -> "Fingerprint":
+        return cls(content_hash=content_hash(text), simhash=simhash(text))
+
+    def is_near_duplicate(self, other: "Fingerprint") -> bool:
+        """Тексты совпадают после нормализации или их SimHash отличается не более чем в MAX_DISTANCE битах."""
+        return (
+            self.content_hash == other.content_hash
+            or hamming_distance(self.simhash, other.simhash) <= MAX_DISTANCE
+        )
@@ -9,6 +9,7 @@ from sqlalchemy import (
     Float,
     UniqueConstraint,
     Boolean,
+    Index,
 )
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.sql import func
@@ -64,9 +65,16 @@ class Vacancy(Base):
     title = Column(String(255), nullable=True)  # The title of the vacancy
     file_path = Column(String(255), nullable=False)
     source = Column(String(255), nullable=True)
+    # Сигнатуры текста для поиска точных и почти точных дубликатов (см. db/fingerprints.py)
+    content_hash = Column(String(64), nullable=True, index=True)
+    simhash = Column(BigInteger, nullable=True)
+    # Общая для всех пользователей проверенная вакансия, текст которой использует эта запись
+    canonical_id = Column(Integer, ForeignKey("canonical_vacancies.id"), nullable=True, index=True)
 
     user = relationship("User", back_populates="vacancies")
+    canonical = relationship("CanonicalVacancy", back_populates="vacancies")
     analysis_results = relationship("AnalysisResult", back_populates="vacancy", cascade="all, delete-orphan")
+    signature_bands = relationship("VacancySignatureBand", back_populates="vacancy", cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"<Vacancy(id={self.id}, title='{self.title}', user_id={self.user_id})>"
@@ -86,6 +94,9 @@ class AIUsageLog(Base):
     completion_tokens = Column(Integer, nullable=False)
     total_tokens = Column(Integer, nullable=False)
     cost = Column(Float, nullable=True)  # Добавлено поле стоимости
+    strategy = Column(String(32), nullable=True)  # Стратегия генерации анализа
+    latency_ms = Column(Integer, nullable=True)  # Время выполнения запроса к AI
+    cached_prompt_tokens = Column(Integer, nullable=True)  # Токены промпта из кэша провайдера
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("User", back_populates="ai_usage_logs")
@@ -110,6 +121,9 @@ class AnalysisResult(Base):
     cover_letter = Column(String(255), nullable=True)
     hr_call_plan = Column(String(255), nullable=True)
     tech_interview_plan = Column(String(255), nullable=True)
+    # Списан ли балл за анализ. Анализ, подготовленный заранее (prefetch),
+    # оплачивается при первом открытии любого раздела.
+    charged = Column(Boolean, nullable=False, default=False, server_default="1")
 
     resume = relationship("Resume", back_populates="analysis_results")
     vacancy = relationship("Vacancy", back_populates="analysis_results")
@@ -212,3 +226,78 @@ class Transaction(Base):
 
     def __repr__(self):
         return f"<Transaction(user_id={self.user_id}, type='{self.type}', amount={self.amount})>"
+
+
+class AIResponseCache(Base):
+    """Модель постоянного кэша ответов AI, адресуемого по содержимому запроса."""
+
+    __tablename__ = "ai_response_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), nullable=False, unique=True, index=True)
+    response = Column(Text, nullable=False)  # JSON-представление ответа провайдера
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False)
+    last_accessed_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<AIResponseCache(id={self.id}, cache_key='{self.cache_key[:12]}', hits={self.hits})>"
+
+
+class DocumentDigest(Base):
+    """Модель компактной выжимки резюме или вакансии, адресуемой по хэшу текста документа."""
+
+    __tablename__ = "document_digests"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), nullable=False, unique=True, index=True)
+    doc_type = Column(String(16), nullable=False)  # "resume" или "vacancy"
+    digest = Column(Text, nullable=False)  # JSON-выжимка от AI
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<DocumentDigest(id={self.id}, doc_type='{self.doc_type}', content_hash='{self.content_hash[:12]}')>"
+
+
+class CanonicalVacancy(Base):
+    """
+    Модель канонической вакансии: текст и проверенное название одной вакансии,
+    общие для всех пользователей. Вакансии с hh.ru адресуются по ID вакансии,
+    загруженные текстом — по хэшу нормализованного текста.
+    """
+
+    __tablename__ = "canonical_vacancies"
+
+    id = Column(Integer, primary_key=True, index=True)
+    hh_id = Column(String(32), nullable=True, unique=True, index=True)  # ID вакансии на hh.ru
+    content_hash = Column(String(64), nullable=True, unique=True, index=True)
+    title = Column(String(255), nullable=True)
+    file_path = Column(String(255), nullable=False)  # Текст вакансии; по нему же кэшируется ее выжимка
+    source = Column(String(255), nullable=True)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    vacancies = relationship("Vacancy", back_populates="canonical")
+
+    def __repr__(self):
+        return f"<CanonicalVacancy(id={self.id}, hh_id='{self.hh_id}', title='{self.title}')>"
+
+
+class VacancySignatureBand(Base):
+    """Полоса SimHash-сигнатуры вакансии: индекс для поиска почти точных дубликатов среди вакансий пользователя."""
+
+    __tablename__ = "vacancy_signature_bands"
+
+    id = Column(Integer, primary_key=True, index=True)
+    vacancy_id = Column(Integer, ForeignKey("vacancies.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    band = Column(Integer, nullable=False)  # Номер полосы сигнатуры
+    value = Column(Integer, nullable=False)  # Значение бит полосы
+
+    vacancy = relationship("Vacancy", back_populates="signature_bands")
+
+    __table_args__ = (
+        Index("ix_vacancy_signature_bands_lookup", "user_id", "band", "value"),
+    )
+
+    def __repr__(self):
+        return f"<VacancySignatureBand(vacancy_id={self.vacancy_id}, band={self.band}, value={self.value})>"
@@ -6,6 +6,7 @@ import signal
 
 from bot.bot import create_application
 from db.database import init_db
+from scraper.async_scraper import close_scraper
 
 # Настройка логирования
 logging.basicConfig(
@@ -57,6 +58,7 @@ async def main():
                 await application.updater.stop()
                 await application.stop()
                 await application.shutdown()
+                await close_scraper()
                 logger.info("Бот успешно остановлен.")
             except Exception as e:
                 logger.error(f"Ошибка при остановке бота: {e}")
@@ -0,0 +1,242 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from dataclasses import asdict, dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import httpx
+
+from config import (
+    SCRAPER_CACHE_DIR,
+    SCRAPER_MAX_CONNECTIONS,
+    SCRAPER_MAX_PAGE_BYTES,
+    SCRAPER_PER_HOST_LIMIT,
+    SCRAPER_TIMEOUT,
+)
+from .extractors import extract_page_text
+from .hh_scraper import HEADERS
+from .streaming import CHUNK_SIZE, PayloadTooLarge, ensure_size, read_stream
+
+logger = logging.getLogger(__name__)
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+@dataclass
+class CachedPage:
+    """Сохраненный ответ сервера с валидаторами для условного запроса."""
+
+    url: str
+    body: str
+    etag: str | None = None
+    last_modified: str | None = None
+    expires_at: float | None = None  # До этого момента страница не перезапрашивается (Cache-Control: max-age)
+
+    def is_fresh(self, now: float) -> bool:
+        return self.expires_at is not None and now < self.expires_at
+
+
+class PageCache:
+    """
+    Дисковый кэш страниц: по одному JSON-файлу на URL (имя — хэш URL).
+    Чтение и запись выполняются в отдельном потоке, чтобы не блокировать цикл событий.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def _path(self, url: str) -> Path:
+        return self.directory / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+
+    def _read(self, url: str) -> CachedPage | None:
+        try:
+            with open(self._path(url), encoding="utf-8") as f:
+                return CachedPage(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Поврежденная запись кэша страниц для {url}: {e}")
+            return None
+
+    def _write(self, page: CachedPage) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(page.url)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(page), f, ensure_ascii=False)
+        tmp_path.replace(path)
+
+    async def get(self, url: str) -> CachedPage | None:
+        return await asyncio.to_thread(self._read, url)
+
+    async def set(self, page: CachedPage) -> None:
+        try:
+            await asyncio.to_thread(self._write, page)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить страницу {page.url} в кэш: {e}")
+
+
+def _expires_at(response: httpx.Response, now: float) -> float | None:
+    cache_control = response.headers.get("Cache-Control", "").lower()
+    if "no-cache" in cache_control:
+        return None
+    match = _MAX_AGE_RE.search(cache_control)
+    if match:
+        return now + int(match.group(1))
+    expires = response.headers.get("Expires")
+    if expires:
+        try:
+            return parsedate_to_datetime(expires).timestamp()
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+class AsyncScraper:
+    """
+    Асинхронный скрейпер страниц с общим пулом keep-alive соединений,
+    ограничением одновременных запросов к одному хосту и дисковым кэшем.
+    Закэшированная страница перезапрашивается условным запросом (If-None-Match /
+    If-Modified-Since), и при ответе 304 возвращается сохраненный текст.
+    Тело ответа читается потоком и не больше max_bytes.
+    """
+
+    def __init__(
+        self,
+        cache: PageCache | None = None,
+        per_host_limit: int = SCRAPER_PER_HOST_LIMIT,
+        max_connections: int = SCRAPER_MAX_CONNECTIONS,
+        timeout: float = SCRAPER_TIMEOUT,
+        transport: httpx.AsyncBaseTransport | None = None,
+        max_bytes: int = SCRAPER_MAX_PAGE_BYTES,
+    ):
+        self.cache = cache
+        self.per_host_limit = per_host_limit
+        self.max_bytes = max_bytes
+        self._client_kwargs = {
+            "headers": {key: value for key, value in HEADERS.items() if key != "Accept-Encoding"},
+            "timeout": timeout,
+            "follow_redirects": True,
+            "limits": httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            "transport": transport,
+        }
+        self._client: httpx.AsyncClient | None = None
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+        # Статистика для логов и тестов: свежие попадания в кэш, ответы 304 и полные загрузки
+        self.stats = {"fresh": 0, "not_modified": 0, "downloaded": 0}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(**self._client_kwargs)
+        return self._client
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_limits[host]
+
+    async def fetch(self, url: str, headers: dict[str, str] | None = None) -> str | None:
+        """
+        Возвращает HTML страницы (из кэша, по ответу 304 или загруженный заново) или None при ошибке.
+        headers дополняют и переопределяют заголовки браузера по умолчанию.
+        """
+        if not url.startswith(("http://", "https://")):
+            logger.warning(f"Некорректный URL: {url}")
+            return None
+
+        cached = await self.cache.get(url) if self.cache else None
+        if cached and cached.is_fresh(time.time()):
+            self.stats["fresh"] += 1
+            return cached.body
+
+        headers = dict(headers or {})
+        if cached and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached and cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+
+        body = None
+        try:
+            async with self._host_limit(url):
+                async with self.client.stream("GET", url, headers=headers) as response:
+                    if response.status_code != 304 or not cached:
+                        response.raise_for_status()
+                        ensure_size(response.headers.get("Content-Length"), self.max_bytes)
+                        body = await read_stream(
+                            response.aiter_bytes(CHUNK_SIZE),
+                            self.max_bytes,
+                            response.headers.get("Content-Type"),
+                            sniff_meta=True,
+                        )
+        except httpx.HTTPError as e:
+            logger.error(f"Ошибка при запросе к URL {url}: {e}")
+            return None
+        except PayloadTooLarge as e:
+            logger.warning(f"Страница {url} не загружена: {e}")
+            return None
+
+        if body is None:
+            self.stats["not_modified"] += 1
+            cached.expires_at = _expires_at(response, time.time())
+            await self.cache.set(cached)
+            return cached.body
+
+        self.stats["downloaded"] += 1
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        expires_at = _expires_at(response, time.time())
+        if self.cache and "no-store" not in response.headers.get("Cache-Control", "").lower() and (
+            etag or last_modified or expires_at
+        ):
+            await self.cache.set(CachedPage(url, body, etag, last_modified, expires_at))
+        return body
+
+    async def scrape(self, url: str) -> str | None:
+        """Скачивает страницу и извлекает ее текст (разбор HTML выполняется вне цикла событий)."""
+        logger.info(f"Начинаю скрейпинг URL: {url}")
+        html = await self.fetch(url)
+        if not html:
+            return None
+        try:
+            text = await asyncio.to_thread(extract_page_text, html, url)
+        except Exception as e:
+            logger.error(f"Непредвиденная ошибка при разборе страницы {url}: {e}")
+            return None
+        if text:
+            logger.info(f"Скрейпинг успешно завершен. Длина текста: {len(text)} символов.")
+        return text
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Глобальная переменная для хранения синглтон-экземпляра
+_scraper_instance = None
+
+
+def get_scraper() -> AsyncScraper:
+    """Возвращает общий экземпляр скрейпера (один пул соединений на процесс)."""
+    global _scraper_instance
+    if _scraper_instance is None:
+        _scraper_instance = AsyncScraper(cache=PageCache(SCRAPER_CACHE_DIR))
+    return _scraper_instance
+
+
+async def scrape_url(url: str) -> str | None:
+    """Асинхронно скрейпит текст страницы по URL через общий скрейпер."""
+    return await get_scraper().scrape(url)
+
+
+async def close_scraper() -> None:
+    """Закрывает соединения общего скрейпера при остановке бота."""
+    if _scraper_instance is not None:
+        await _scraper_instance.aclose()
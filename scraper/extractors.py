@@ -0,0 +1,215 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+from .hh_scraper import extract_text
+
+try:
+    import lxml.html
+except ImportError:  # lxml необязателен: без него используется BeautifulSoup
+    lxml = None
+
+logger = logging.getLogger(__name__)
+
+# Парсер для BeautifulSoup: lxml заметно быстрее встроенного html.parser
+BS4_PARSER = "lxml" if lxml else "html.parser"
+
+_SPACES_RE = re.compile(r"[ \t\r\f\v\xa0]+")
+
+
+def _clean(text: str) -> str:
+    lines = (_SPACES_RE.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+# Заголовки блоков страниц hh.ru, после которых идет только посторонний контент
+# (учитываются, только если перед ними уже есть основной текст)
+_TAIL_MARKERS = re.compile(
+    r"^(Похожие вакансии|Вакансии дня|Другие вакансии компании|Похожие резюме|Вас также могут заинтересовать)\b",
+    re.IGNORECASE,
+)
+
+_MIN_CONTENT_LINES = 5
+
+# Строки навигации, кнопок, баннера cookie и подвала страниц hh.ru (строка целиком)
+_PAGE_CHROME_LINES = re.compile(
+    r"(Войти|Вход|Создать резюме|Разместить вакансию|Поиск работы|Найти|Помощь|Соискателям|Работодателям|"
+    r"Откликнуться|Показать контакты|Показать телефон|Написать|В избранное|Пожаловаться|Поделиться|Подписаться|"
+    r"Мобильное приложение|Скачать приложение|Политика конфиденциальности|Пользовательское соглашение|"
+    r"Условия использования|Карта сайта|О компании hh\.ru|Реклама на сайте|Все сервисы|Меню|Вернуться назад|"
+    r"Показать еще|Подробнее|Свернуть|Развернуть"
+    r"|(Мы используем|Сайт использует|Этот сайт использует)( файлы)? (cookie|куки)\b.*"
+    r"|©.*)",
+    re.IGNORECASE,
+)
+
+
+def strip_page_chrome(text: str) -> str:
+    """Удаляет из текста страницы навигацию, кнопки, подвал и блоки похожих вакансий."""
+    lines = []
+    for line in _clean(text).splitlines():
+        if len(lines) >= _MIN_CONTENT_LINES and _TAIL_MARKERS.match(line):
+            break
+        if len(line) < 80 and _PAGE_CHROME_LINES.fullmatch(line):
+            continue
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class _LxmlDocument:
+    def __init__(self, html: str):
+        self._tree = lxml.html.fromstring(html)
+
+    def texts(self, qa: str) -> list[str]:
+        result = []
+        for element in self._tree.xpath(f'//*[@data-qa="{qa}"]'):
+            # Блочные теги разделяются переводами строк, как get_text(separator="\n") в BeautifulSoup
+            for br in element.xpath(".//br"):
+                br.tail = "\n" + (br.tail or "")
+            parts = [part.strip() for part in element.xpath(".//text()")]
+            result.append(_clean("\n".join(part for part in parts if part)))
+        return [text for text in result if text]
+
+
+class _SoupDocument:
+    def __init__(self, html: str):
+        from bs4 import BeautifulSoup
+
+        self._soup = BeautifulSoup(html, BS4_PARSER)
+
+    def texts(self, qa: str) -> list[str]:
+        result = [_clean(element.get_text(separator="\n", strip=True)) for element in self._soup.select(f'[data-qa="{qa}"]')]
+        return [text for text in result if text]
+
+
+def _parse(html: str):
+    return _LxmlDocument(html) if lxml else _SoupDocument(html)
+
+
+@dataclass
+class ExtractedPage:
+    """Ключевые поля страницы вакансии или резюме."""
+
+    title: str
+    fields: list[tuple[str, str]] = field(default_factory=list)
+    description: str = ""
+    skills: list[str] = field(default_factory=list)
+
+    def to_text(self) -> str:
+        lines = [self.title]
+        lines.extend(f"{label}: {value}" for label, value in self.fields if value)
+        if self.description:
+            lines.append(self.description)
+        if self.skills:
+            lines.append("Ключевые навыки: " + ", ".join(self.skills))
+        return "\n".join(lines)
+
+
+class Extractor:
+    """Извлекатель текста страницы: matches определяет, подходит ли он для URL."""
+
+    name = "base"
+
+    def matches(self, url: str) -> bool:
+        raise NotImplementedError
+
+    def extract(self, html: str, url: str) -> str | None:
+        raise NotImplementedError
+
+
+class HHExtractor(Extractor):
+    """
+    Извлекает со страниц hh.ru только описание вакансии или резюме и ключевые поля
+    (название, зарплата, навыки) по атрибутам data-qa, без меню, подвала и похожих вакансий.
+    """
+
+    name = "hh"
+
+    def matches(self, url: str) -> bool:
+        host = urlsplit(url).netloc.lower()
+        return host == "hh.ru" or host.endswith(".hh.ru")
+
+    @staticmethod
+    def _first(document, qa: str) -> str:
+        texts = document.texts(qa)
+        return texts[0] if texts else ""
+
+    def _vacancy(self, document) -> ExtractedPage | None:
+        title = self._first(document, "vacancy-title")
+        description = self._first(document, "vacancy-description")
+        if not title or not description:
+            return None
+        return ExtractedPage(
+            title=title,
+            fields=[
+                ("Компания", self._first(document, "vacancy-company-name")),
+                ("Зарплата", self._first(document, "vacancy-salary").replace("\n", " ")),
+                ("Требуемый опыт работы", self._first(document, "vacancy-experience")),
+                ("Занятость", self._first(document, "vacancy-view-employment-mode").replace("\n", " ")),
+            ],
+            description=description,
+            skills=document.texts("skills-element"),
+        )
+
+    def _resume(self, document) -> ExtractedPage | None:
+        title = self._first(document, "resume-block-title-position")
+        experience = self._first(document, "resume-block-experience")
+        if not title or not experience:
+            return None
+        personal = ", ".join(
+            filter(None, (self._first(document, qa) for qa in (
+                "resume-personal-gender", "resume-personal-age", "resume-personal-address",
+            )))
+        )
+        sections = [experience] + [
+            text for text in (
+                self._first(document, "resume-block-education"),
+                self._first(document, "resume-block-skills"),
+            ) if text
+        ]
+        return ExtractedPage(
+            title=title,
+            fields=[("О кандидате", personal), ("Зарплата", self._first(document, "resume-block-salary"))],
+            description="\n".join(sections),
+            skills=document.texts("bloko-tag__text"),
+        )
+
+    def extract(self, html: str, url: str) -> str | None:
+        document = _parse(html)
+        path = urlsplit(url).path
+        page = self._resume(document) if path.startswith("/resume") else self._vacancy(document)
+        return page.to_text() if page else None
+
+
+class GenericExtractor(Extractor):
+    """Текст основного содержимого любой страницы (main или body) без навигации и подвала."""
+
+    name = "generic"
+
+    def matches(self, url: str) -> bool:
+        return True
+
+    def extract(self, html: str, url: str) -> str | None:
+        text = extract_text(html, url, parser=BS4_PARSER)
+        return strip_page_chrome(text) if text else None
+
+
+# Извлекатели в порядке приоритета: первый подходящий, вернувший текст, побеждает
+EXTRACTORS: list[Extractor] = [HHExtractor(), GenericExtractor()]
+
+
+def extract_page_text(html: str, url: str, extractors: list[Extractor] | None = None) -> str | None:
+    """Извлекает текст страницы первым подходящим извлекателем; при неудаче пробует следующий."""
+    for extractor in extractors or EXTRACTORS:
+        if not extractor.matches(url):
+            continue
+        try:
+            text = extractor.extract(html, url)
+        except Exception as e:
+            logger.warning(f"Извлекатель '{extractor.name}' не смог разобрать {url}: {e}")
+            continue
+        if text:
+            logger.info(f"Текст страницы {url} извлечен извлекателем '{extractor.name}'.")
+            return text
+    return None
@@ -0,0 +1,94 @@
+import json
+import logging
+from dataclasses import dataclass
+
+from bs4 import BeautifulSoup
+
+from config import HH_API_BASE_URL, HH_API_USER_AGENT
+from .async_scraper import AsyncScraper, get_scraper
+from .extractors import BS4_PARSER, ExtractedPage
+
+logger = logging.getLogger(__name__)
+
+# Заголовки API вместо браузерных: JSON и идентификатор приложения, которого требует hh.ru
+API_HEADERS = {"Accept": "application/json", "HH-User-Agent": HH_API_USER_AGENT}
+
+_CURRENCIES = {"RUR": "₽", "RUB": "₽", "USD": "$", "EUR": "€", "KZT": "₸", "BYR": "Br", "UAH": "₴"}
+
+
+@dataclass
+class HHVacancy:
+    """Вакансия, полученная из API hh.ru: ID, название и текст для сохранения."""
+
+    hh_id: str
+    title: str
+    text: str
+
+
+def _format_number(value: int) -> str:
+    return f"{value:,}".replace(",", " ")
+
+
+def format_salary(salary: dict | None) -> str:
+    """Зарплата из API в виде "от 300 000 до 400 000 ₽ на руки"."""
+    if not salary or not (salary.get("from") or salary.get("to")):
+        return ""
+    parts = []
+    if salary.get("from"):
+        parts.append(f"от {_format_number(salary['from'])}")
+    if salary.get("to"):
+        parts.append(f"до {_format_number(salary['to'])}")
+    currency = salary.get("currency") or ""
+    parts.append(_CURRENCIES.get(currency, currency))
+    if salary.get("gross") is not None:
+        parts.append("до вычета налогов" if salary["gross"] else "на руки")
+    return " ".join(part for part in parts if part)
+
+
+def _name(value: dict | None) -> str:
+    return (value or {}).get("name") or ""
+
+
+def vacancy_to_text(payload: dict) -> HHVacancy | None:
+    """Преобразует JSON вакансии из API hh.ru в название и компактный текст вакансии."""
+    title = (payload.get("name") or "").strip()
+    description_html = payload.get("description") or ""
+    if not title or not description_html:
+        return None
+    description = BeautifulSoup(description_html, BS4_PARSER).get_text(separator="\n", strip=True)
+    employment = ", ".join(filter(None, (_name(payload.get("employment")), _name(payload.get("schedule")))))
+    page = ExtractedPage(
+        title=title,
+        fields=[
+            ("Компания", _name(payload.get("employer"))),
+            ("Город", _name(payload.get("area"))),
+            ("Зарплата", format_salary(payload.get("salary"))),
+            ("Требуемый опыт работы", _name(payload.get("experience"))),
+            ("Занятость", employment),
+        ],
+        description=description,
+        skills=[skill["name"] for skill in payload.get("key_skills") or [] if skill.get("name")],
+    )
+    return HHVacancy(hh_id=str(payload.get("id", "")), title=title, text=page.to_text())
+
+
+async def fetch_hh_vacancy(
+    hh_id: str, scraper: AsyncScraper | None = None, base_url: str = HH_API_BASE_URL
+) -> HHVacancy | None:
+    """
+    Загружает вакансию из публичного API hh.ru через общий пул соединений скрейпера
+    (с его дисковым кэшем и условными запросами). Возвращает None, если вакансию
+    получить не удалось — тогда вызывающий код может скачать страницу вакансии.
+    """
+    url = f"{base_url.rstrip('/')}/vacancies/{hh_id}"
+    body = await (scraper or get_scraper()).fetch(url, headers=API_HEADERS)
+    if not body:
+        return None
+    try:
+        vacancy = vacancy_to_text(json.loads(body))
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        logger.error(f"Некорректный ответ API hh.ru для вакансии {hh_id}: {e}")
+        return None
+    if vacancy:
+        logger.info(f"Вакансия {hh_id} загружена из API hh.ru: '{vacancy.title}'")
+    return vacancy
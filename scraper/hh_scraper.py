@@ -1,4 +1,4 @@
-import requests
+import re
 from bs4 import BeautifulSoup
 import logging
 
@@ -12,49 +12,33 @@ HEADERS = {
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8",
 }
 
+# Ссылки вида https://hh.ru/vacancy/123456 и https://spb.hh.ru/vacancy/123456?from=...
+HH_VACANCY_URL_RE = re.compile(r"^https?://(?:[\w-]+\.)*hh\.ru/vacancy/(\d+)")
 
-def scrape_hh_url(url: str) -> str | None:
-    """
-    Скрейпит текстовое содержимое со страницы по URL.
-    Предназначен для hh.ru, но может работать и с другими сайтами.
-    Возвращает текст страницы или None в случае ошибки.
-    """
-    if not url.startswith(('http://', 'https://')):
-        logger.warning(f"Некорректный URL: {url}")
-        return None
-
-    try:
-        logger.info(f"Начинаю скрейпинг URL: {url}")
-        response = requests.get(url, headers=HEADERS, timeout=15)
-        response.raise_for_status()  # Проверка на HTTP ошибки (4xx или 5xx)
 
-        # Устанавливаем кодировку, чтобы избежать проблем с кириллицей
-        response.encoding = response.apparent_encoding
+def parse_hh_vacancy_id(url: str) -> str | None:
+    """Возвращает ID вакансии из ссылки на hh.ru или None, если это не ссылка на вакансию."""
+    match = HH_VACANCY_URL_RE.match(url.strip())
+    return match.group(1) if match else None
 
-        soup = BeautifulSoup(response.text, "html.parser")
 
-        # Удаляем теги <script> и <style>, так как они не содержат полезного текста
-        for script_or_style in soup(["script", "style"]):
-            script_or_style.decompose()
+def extract_text(html: str, url: str = "", parser: str = "html.parser") -> str | None:
+    """Извлекает текст основного содержимого HTML-страницы без скриптов и стилей."""
+    soup = BeautifulSoup(html, parser)
 
-        # Ищем основной контент. Селекторы могут потребовать обновления, если hh.ru изменит верстку.
-        # Это более общий подход, чем поиск одного конкретного класса.
-        # Попробуем найти тег main, body или корневой div.
-        content_area = soup.find("main") or soup.find("body")
+    # Удаляем теги <script> и <style>, так как они не содержат полезного текста
+    for script_or_style in soup(["script", "style"]):
+        script_or_style.decompose()
 
-        if not content_area:
-            logger.warning(f"Не удалось найти основной контент на странице {url}")
-            return None
+    # Ищем основной контент. Селекторы могут потребовать обновления, если hh.ru изменит верстку.
+    # Это более общий подход, чем поиск одного конкретного класса.
+    # Попробуем найти тег main, body или корневой div.
+    content_area = soup.find("main") or soup.find("body")
 
-        # Извлекаем текст, очищая от лишних пробелов и пустых строк
-        text = content_area.get_text(separator="\n", strip=True)
+    if not content_area:
+        logger.warning(f"Не удалось найти основной контент на странице {url}")
+        return None
 
-        logger.info(f"Скрейпинг успешно завершен. Длина текста: {len(text)} символов.")
-        return text
+    # Извлекаем текст, очищая от лишних пробелов и пустых строк
+    return content_area.get_text(separator="\n", strip=True)
 
-    except requests.RequestException as e:
-        logger.error(f"Ошибка при запросе к URL {url}: {e}")
-        return None
-    except Exception as e:
-        logger.error(f"Непредвиденная ошибка при скрейпинге {url}: {e}")
-        return None
@@ -0,0 +1,134 @@
+import codecs
+import re
+from typing import AsyncIterable, Iterable
+
+# Размер фрагмента при пошаговом чтении и декодировании
+CHUNK_SIZE = 64 * 1024
+# Сколько первых байт HTML просматривается в поисках <meta charset>
+META_SNIFF_BYTES = 2048
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+_CONTENT_TYPE_CHARSET_RE = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.IGNORECASE)
+_META_CHARSET_RE = re.compile(rb"<meta[^>]*charset\s*=\s*[\"']?\s*([\w.:-]+)", re.IGNORECASE)
+
+
+class PayloadTooLarge(Exception):
+    """Размер страницы или файла превышает допустимый."""
+
+
+def _known_encoding(name: str | bytes | None) -> str | None:
+    if isinstance(name, bytes):
+        name = name.decode("ascii", "ignore")
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def charset_from_content_type(content_type: str | None) -> str | None:
+    """Кодировка из заголовка Content-Type или None, если она не указана или неизвестна."""
+    match = _CONTENT_TYPE_CHARSET_RE.search(content_type or "")
+    return _known_encoding(match.group(1)) if match else None
+
+
+def ensure_size(length: int | str | None, max_bytes: int) -> None:
+    """Прерывает загрузку заранее, если заявленный размер (Content-Length, размер файла) больше max_bytes."""
+    try:
+        size = int(length) if length is not None else None
+    except (TypeError, ValueError):
+        return
+    if size is not None and size > max_bytes:
+        raise PayloadTooLarge(f"Размер {size} байт превышает лимит {max_bytes} байт")
+
+
+class BoundedDecoder:
+    """
+    Пошаговый декодер с ограничением размера: превышение max_bytes прерывает чтение
+    исключением PayloadTooLarge, не дожидаясь конца ответа.
+    Кодировка определяется по BOM, затем по заголовку Content-Type, затем (если
+    sniff_meta) по <meta charset> в начале HTML, иначе используется default —
+    без статистического угадывания кодировки по всему телу.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        content_type: str | None = None,
+        default: str = "utf-8",
+        errors: str = "replace",
+        sniff_meta: bool = False,
+    ):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.encoding: str | None = None
+        self._header_charset = charset_from_content_type(content_type)
+        self._default = default
+        self._errors = errors
+        self._sniff_bytes = META_SNIFF_BYTES if sniff_meta and not self._header_charset else 4
+        self._head = b""
+        self._decoder = None
+        self._parts: list[str] = []
+
+    def _start(self) -> None:
+        head = self._head
+        for bom, encoding in _BOMS:
+            if head.startswith(bom):
+                self.encoding, head = encoding, head[len(bom):]
+                break
+        else:
+            meta = _META_CHARSET_RE.search(head) if self._sniff_bytes > 4 else None
+            self.encoding = self._header_charset or _known_encoding(meta and meta.group(1)) or self._default
+        self._decoder = codecs.getincrementaldecoder(self.encoding)(errors=self._errors)
+        self._head = b""
+        self._parts.append(self._decoder.decode(head))
+
+    def feed(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise PayloadTooLarge(f"Размер превышает лимит {self.max_bytes} байт")
+        if self._decoder is None:
+            self._head += chunk
+            if len(self._head) >= self._sniff_bytes:
+                self._start()
+            return
+        self._parts.append(self._decoder.decode(chunk))
+
+    def finish(self) -> str:
+        if self._decoder is None:
+            self._start()
+        self._parts.append(self._decoder.decode(b"", final=True))
+        return "".join(self._parts)
+
+
+async def read_stream(chunks: AsyncIterable[bytes], max_bytes: int, content_type: str | None = None, **kwargs) -> str:
+    """Читает и декодирует асинхронный поток байт, не больше max_bytes."""
+    decoder = BoundedDecoder(max_bytes, content_type, **kwargs)
+    async for chunk in chunks:
+        decoder.feed(chunk)
+    return decoder.finish()
+
+
+def read_chunks(chunks: Iterable[bytes], max_bytes: int, content_type: str | None = None, **kwargs) -> str:
+    """Читает и декодирует поток байт, не больше max_bytes."""
+    decoder = BoundedDecoder(max_bytes, content_type, **kwargs)
+    for chunk in chunks:
+        decoder.feed(chunk)
+    return decoder.finish()
+
+
+def decode_upload(data: bytes, max_bytes: int) -> str:
+    """
+    Декодирует загруженный пользователем текстовый файл: UTF-8 или UTF-16 с BOM, иначе UTF-8.
+    Некорректные байты вызывают UnicodeDecodeError, а файл больше max_bytes — PayloadTooLarge.
+    """
+    ensure_size(len(data), max_bytes)
+    view = memoryview(data)
+    return read_chunks(
+        (bytes(view[i:i + CHUNK_SIZE]) for i in range(0, len(data), CHUNK_SIZE)), max_bytes, errors="strict"
+    )
@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# Добавляем корневую директорию проекта в sys.path
+# python .\scripts\benchmark_classifier.py -c tests/fixtures/classifier_corpus.jsonl
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai.classifier import RESUME, VACANCY, classify_document
+
+
+def load_corpus(path: str) -> list[dict]:
+    """Читает размеченный корпус: по одному JSON {"text": ..., "label": "resume"|"vacancy"|"other"} в строке."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(corpus: list[dict], doc_type: str) -> dict:
+    """
+    Прогоняет классификатор по корпусу так, будто каждый документ загружен как doc_type.
+    Точность и полнота считаются только по уверенным решениям, неуверенные уходят в AI.
+    """
+    true_pos = false_pos = false_neg = true_neg = ambiguous = 0
+    started = time.perf_counter()
+    for item in corpus:
+        verdict = classify_document(item["text"], doc_type)
+        expected = item["label"] == doc_type
+        if verdict.is_valid is None:
+            ambiguous += 1
+        elif verdict.is_valid:
+            true_pos += expected
+            false_pos += not expected
+        else:
+            false_neg += expected
+            true_neg += not expected
+    elapsed = time.perf_counter() - started
+
+    positives = sum(1 for item in corpus if item["label"] == doc_type)
+    confident = len(corpus) - ambiguous
+    return {
+        "precision": true_pos / (true_pos + false_pos) if true_pos + false_pos else 1.0,
+        "recall": true_pos / positives if positives else 0.0,
+        "rejection_precision": true_neg / (true_neg + false_neg) if true_neg + false_neg else 1.0,
+        "llm_calls_avoided": confident / len(corpus) if corpus else 0.0,
+        "ms_per_document": elapsed * 1000 / len(corpus) if corpus else 0.0,
+    }
+
+
+def main():
+    """Оценивает локальный классификатор документов на размеченном корпусе."""
+    parser = argparse.ArgumentParser(description="Бенчмарк локального классификатора резюме и вакансий.")
+    parser.add_argument(
+        "-c", "--corpus",
+        default=os.path.join(os.path.dirname(__file__), "..", "tests", "fixtures", "classifier_corpus.jsonl"),
+        help="Путь к размеченному корпусу в формате JSONL.",
+    )
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    print(f"Документов в корпусе: {len(corpus)}")
+    for doc_type in (RESUME, VACANCY):
+        stats = evaluate(corpus, doc_type)
+        print(f"\nПроверка как '{doc_type}':")
+        print(f"  Точность (принято верно): {stats['precision']:.2%}")
+        print(f"  Полнота (принято без AI): {stats['recall']:.2%}")
+        print(f"  Точность отклонений:      {stats['rejection_precision']:.2%}")
+        print(f"  Запросов к AI не нужно:   {stats['llm_calls_avoided']:.2%}")
+        print(f"  Время на документ:        {stats['ms_per_document']:.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Добавляем корневую директорию проекта в sys.path
+# python .\scripts\benchmark_db_commits.py -n 50
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+
+from db import crud, models
+from db.models import Base
+
+VACANCY_TEXT = (
+    "Python-разработчик\nРазработка микросервисов на FastAPI, PostgreSQL, Redis. "
+    "Опыт коммерческой разработки от 3 лет, код-ревью, тестирование. Вакансия №{n}."
+)
+USAGE = {"prompt_tokens": 1200, "completion_tokens": 800, "total_tokens": 2000, "cost": 0.01}
+
+
+class PerCallCommitSession(Session):
+    """
+    Сессия, фиксирующая транзакцию на каждом flush, — так работали функции crud до unit_of_work.
+    Дает нижнюю оценку прежнего числа commit: изменения без flush (UPDATE в mark_analysis_charged)
+    фиксируются вместе со следующими.
+    """
+
+    _committing = False
+
+    def flush(self, objects=None):
+        super().flush(objects)
+        if not self._committing:
+            self._committing = True
+            try:
+                self.commit()
+            finally:
+                self._committing = False
+
+
+def no_preparation(db: Session, n: int) -> dict:
+    """Сценарию не нужны заранее созданные данные."""
+    return {}
+
+
+def start_new_user(db: Session, n: int) -> None:
+    """/start по ссылке с UTM-меткой от нового пользователя."""
+    user = crud.get_or_create_user(db, chat_id=n)
+    crud.create_utm_track(db, user_id=user.id, utm_source="promo")
+    crud.get_user_resume(db, user_id=user.id)
+
+
+def upload_vacancy(db: Session, n: int) -> None:
+    """Загрузка проверенной AI вакансии со списанием балла."""
+    user = crud.get_or_create_user(db, chat_id=n)
+    crud.get_user_resume(db, user_id=user.id)
+    text = VACANCY_TEXT.format(n=n)
+    crud.find_duplicate_vacancy(db, user_id=user.id, text=text)
+    crud.get_user_balance(db, user_id=user.id)
+    crud.create_ai_usage_log(db, user_id=user.id, action="verify_vacancy", **USAGE)
+    canonical = crud.get_or_create_canonical_vacancy(db, file_path=f"/v{n}.txt", title="Python", source="file")
+    crud.create_vacancy(db, user_id=user.id, file_path=f"/v{n}.txt", source="file", title="Python", text=text, canonical_id=canonical.id)
+    crud.update_user_balance(db, user_id=user.id, amount=-1, description="Загрузка вакансии")
+
+
+def prepare_analysis(db: Session, n: int) -> dict:
+    """Пользователь с резюме и вакансией, для которых запрашивается анализ."""
+    user = crud.get_or_create_user(db, chat_id=n)
+    resume = crud.create_resume(db, user_id=user.id, file_path=f"/r{n}.txt", source="file", title="Резюме")
+    vacancy = crud.create_vacancy(db, user_id=user.id, file_path=f"/v{n}.txt", source="file", title="Python")
+    return {"user": user, "resume": resume, "vacancy": vacancy}
+
+
+def paid_analysis(db: Session, n: int, user: models.User, resume: models.Resume, vacancy: models.Vacancy) -> None:
+    """Платный анализ пары резюме/вакансия: сохранение результата, списание балла и лог AI."""
+    crud.get_or_create_user(db, chat_id=n)
+    crud.get_analysis_result(db, resume.id, vacancy.id)
+    crud.create_analysis_result(db, resume.id, vacancy.id, {"match_analysis": f"/a{n}.txt"})
+    crud.mark_analysis_charged(db, resume.id, vacancy.id)
+    crud.update_user_balance(db, user_id=user.id, amount=-1, description="Анализ: analyze_match")
+    crud.create_ai_usage_log(
+        db, user_id=user.id, action="consolidated_analysis", resume_id=resume.id, vacancy_id=vacancy.id, **USAGE
+    )
+
+
+# Сценарий: подготовка данных (не входит в замер) и работа обработчика с БД
+SCENARIOS = {
+    "/start нового пользователя": (no_preparation, start_new_user),
+    "Загрузка вакансии": (no_preparation, upload_vacancy),
+    "Платный анализ": (prepare_analysis, paid_analysis),
+}
+
+
+def measure(session_factory, scenario, commits: list, repeats: int, offset: int) -> tuple[float, float]:
+    """Медианное время обработчика в миллисекундах и среднее число commit на один вызов."""
+    timings = []
+    counted = 0
+    prepare, handler = scenario
+    for i in range(repeats):
+        db = session_factory()
+        try:
+            prepared = prepare(db, offset + i)
+            db.commit()
+            scenario_started = len(commits)
+            started = time.perf_counter()
+            handler(db, offset + i, **prepared)
+            db.commit()
+            timings.append((time.perf_counter() - started) * 1000)
+            counted += len(commits) - scenario_started
+        finally:
+            db.close()
+    return statistics.median(timings), counted / repeats
+
+
+def main():
+    """Сравнивает число commit и время обработчиков: commit в каждой функции crud против одного commit на обработчик."""
+    parser = argparse.ArgumentParser(description="Бенчмарк фиксации транзакций в обработчиках бота.")
+    parser.add_argument("-n", "--repeats", type=int, default=30, help="Количество вызовов каждого сценария.")
+    parser.add_argument(
+        "--synchronous", default="FULL", choices=["OFF", "NORMAL", "FULL"],
+        help="Режим PRAGMA synchronous SQLite (FULL — fsync на каждый commit, как по умолчанию).",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'benchmark.db')}")
+        commits = []
+        event.listen(engine, "commit", lambda conn: commits.append(conn))
+
+        @event.listens_for(engine, "connect")
+        def set_synchronous(dbapi_connection, connection_record):
+            dbapi_connection.execute(f"PRAGMA synchronous = {args.synchronous}")
+
+        Base.metadata.create_all(engine)
+        modes = {
+            "commit в каждой функции": sessionmaker(engine, class_=PerCallCommitSession, autoflush=False),
+            "unit_of_work":            sessionmaker(engine, autoflush=False),
+        }
+
+        print(f"SQLite, PRAGMA synchronous = {args.synchronous}, {args.repeats} вызовов на сценарий")
+        for number, (name, scenario) in enumerate(SCENARIOS.items()):
+            print(f"\n{name}:")
+            results = {}
+            for mode_number, (mode, session_factory) in enumerate(modes.items()):
+                offset = (number * len(modes) + mode_number) * args.repeats + 1
+                results[mode] = measure(session_factory, scenario, commits, args.repeats, offset)
+                median_ms, commits_per_call = results[mode]
+                print(f"  {mode:24s} {commits_per_call:5.1f} commit, {median_ms:8.2f} мс")
+            (before_ms, _), (after_ms, _) = results.values()
+            if after_ms:
+                print(f"  Ускорение: x{before_ms / after_ms:.1f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+
+# Добавляем корневую директорию проекта в sys.path
+# python .\scripts\benchmark_extractors.py -n 20
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai.token_budget import count_tokens
+from scraper.extractors import BS4_PARSER, extract_page_text
+from scraper.hh_scraper import extract_text
+
+# URL, с которым разбирается сохраненная страница: от него зависит выбор извлекателя
+FIXTURE_URLS = {
+    "hh_vacancy.html": "https://hh.ru/vacancy/100000001",
+    "hh_resume.html": "https://hh.ru/resume/0123456789abcdef",
+}
+
+
+def measure(function, html: str, url: str, repeats: int) -> tuple[float, str]:
+    """Медианное время разбора страницы в миллисекундах и полученный текст."""
+    timings = []
+    text = ""
+    for _ in range(repeats):
+        started = time.perf_counter()
+        text = function(html, url) or ""
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), text
+
+
+def main():
+    """Сравнивает прежний разбор страниц (BeautifulSoup + html.parser) с извлекателями на сохраненных HTML."""
+    parser = argparse.ArgumentParser(description="Бенчмарк извлечения текста со страниц hh.ru.")
+    parser.add_argument(
+        "-d", "--fixtures",
+        default=os.path.join(os.path.dirname(__file__), "..", "tests", "fixtures", "html"),
+        help="Каталог с сохраненными HTML-страницами.",
+    )
+    parser.add_argument("-n", "--repeats", type=int, default=10, help="Количество повторов для каждой страницы.")
+    args = parser.parse_args()
+
+    print(f"Парсер для общего извлекателя: {BS4_PARSER}")
+    for path in sorted(glob.glob(os.path.join(args.fixtures, "*.html"))):
+        name = os.path.basename(path)
+        url = FIXTURE_URLS.get(name, "https://example.com/")
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+
+        old_ms, old_text = measure(extract_text, html, url, args.repeats)
+        new_ms, new_text = measure(extract_page_text, html, url, args.repeats)
+        print(f"\n{name} ({len(html) // 1024} КБ HTML):")
+        print(f"  Прежний разбор: {old_ms:8.1f} мс, {len(old_text):6d} символов, {count_tokens(old_text):6d} токенов")
+        print(f"  Извлекатели:    {new_ms:8.1f} мс, {len(new_text):6d} символов, {count_tokens(new_text):6d} токенов")
+        if new_ms:
+            print(f"  Ускорение: x{old_ms / new_ms:.1f}, текст меньше в {len(old_text) / max(len(new_text), 1):.1f} раза")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,7 @@ def main():
 
     try:
         survey = crud.create_survey(db, question=args.question, options=args.options)
+        db.commit()
         print(f"Опрос успешно создан с ID: {survey.id}")
         print(f"  Вопрос: {survey.question}")
         print(f"  Варианты: {survey.options}")
@@ -0,0 +1,262 @@
+import asyncio
+import inspect
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Union
+
+from ai import prompts
+from ai.streaming import JSONSectionParser
+from ai.token_budget import add_usage
+
+logger = logging.getLogger(__name__)
+
+# Получает завершенный раздел анализа: ключ и текст
+SectionCallback = Callable[[str, str], Union[Awaitable[None], None]]
+# Вызывается после каждого фрагмента потокового ответа
+ProgressCallback = Callable[[], Union[Awaitable[None], None]]
+# Сохраняет пачку завершенных разделов {ключ: текст}
+PersistCallback = Callable[[dict], Union[Awaitable[None], None]]
+# Выполняет запросы к AI, передавая в AnalysisRun фрагменты и готовые разделы
+AnalysisRequest = Callable[["AnalysisRun"], Awaitable[dict]]
+
+# Стратегии генерации анализа
+CONSOLIDATED = "consolidated"
+PARALLEL = "parallel"
+ON_DEMAND = "on_demand"
+STRATEGIES = (CONSOLIDATED, PARALLEL, ON_DEMAND)
+
+# Область выполняющегося анализа, охватывающего все разделы
+ALL_SECTIONS = "all"
+
+
+def _as_text(value) -> str:
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+
+async def _notify(callback, *args) -> None:
+    """Вызывает подписчика; его ошибка не должна прерывать общий анализ."""
+    try:
+        result = callback(*args)
+        if inspect.isawaitable(result):
+            await result
+    except Exception as e:
+        logger.error(f"Ошибка в подписчике анализа: {e}", exc_info=True)
+
+
+class AnalysisRun:
+    """
+    Консолидированный анализ пары резюме/вакансия, общий для всех, кто его ждет.
+
+    Разделы разбираются из потокового ответа по мере генерации: persist
+    сохраняет каждый раздел один раз, а все подписчики получают завершенные
+    разделы и уведомления о прогрессе. Флаг charged отмечает, что за анализ
+    уже списан балл, чтобы подписчики не списывали его повторно.
+
+    Сохранение разделов и их доставка подписчикам выполняются под общей блокировкой:
+    при параллельной генерации разделы завершаются одновременно, а подписчики
+    списывают балл через сессию БД, не допускающую параллельных операций.
+    """
+
+    def __init__(self, persist: PersistCallback, strategy: str = CONSOLIDATED):
+        self.strategy = strategy
+        self.parser = JSONSectionParser()
+        self.sections: dict[str, str] = {}
+        self.response: dict | None = None
+        self.charged = False
+        self.latency_ms: int | None = None
+        self._started_at = time.monotonic()
+        self._section_buffers: dict[str, list[str]] = {}
+        self._persist = persist
+        self._section_listeners: list[SectionCallback] = []
+        self._progress_listeners: list[ProgressCallback] = []
+        self._task: asyncio.Task | None = None
+        self._write_lock = asyncio.Lock()
+
+    def partial(self, key: str) -> str | None:
+        """Текущий (возможно, неполный) текст раздела."""
+        if key in self.sections:
+            return self.sections[key]
+        if key in self._section_buffers:
+            return "".join(self._section_buffers[key])
+        return self.parser.partial(key)
+
+    async def subscribe(self, on_section: SectionCallback, on_progress: ProgressCallback | None = None) -> None:
+        """Подписывается на разделы анализа; уже завершенные разделы передаются сразу."""
+        completed = dict(self.sections)
+        self._section_listeners.append(on_section)
+        if on_progress:
+            self._progress_listeners.append(on_progress)
+        async with self._write_lock:
+            for key, value in completed.items():
+                await _notify(on_section, key, value)
+
+    async def wait(self) -> dict | None:
+        """Ожидает итоговый ответ AI. Отмена ожидающего не отменяет сам анализ."""
+        return await asyncio.shield(self._task)
+
+    async def _publish(self, sections: dict) -> None:
+        async with self._write_lock:
+            try:
+                result = self._persist(sections)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Не удалось сохранить разделы анализа {list(sections)}: {e}", exc_info=True)
+            for key, value in sections.items():
+                self.sections[key] = value
+                for listener in list(self._section_listeners):
+                    await _notify(listener, key, value)
+
+    async def _progress(self) -> None:
+        for listener in list(self._progress_listeners):
+            await _notify(listener)
+
+    async def feed(self, delta: str) -> None:
+        """Обрабатывает фрагмент потокового JSON-ответа со всеми разделами."""
+        completed = self.parser.feed(delta)
+        if completed:
+            await self._publish(dict(completed))
+        await self._progress()
+
+    async def feed_section(self, key: str, delta: str) -> None:
+        """Обрабатывает фрагмент текста одного раздела, генерируемого отдельным запросом."""
+        self._section_buffers.setdefault(key, []).append(delta)
+        await self._progress()
+
+    async def complete_section(self, key: str, value: str) -> None:
+        """Публикует раздел, сгенерированный отдельным запросом."""
+        self._section_buffers.pop(key, None)
+        await self._publish({key: value})
+
+    async def _execute(self, request: AnalysisRequest) -> dict | None:
+        try:
+            self.response = await request(self)
+        finally:
+            self.latency_ms = int((time.monotonic() - self._started_at) * 1000)
+        if self.response and self.response.get("json"):
+            # Разделы, которые не удалось разобрать из потока (например, провайдер без стриминга)
+            remaining = {
+                key: _as_text(value) for key, value in self.response["json"].items()
+                if key not in self.sections and value
+            }
+            if remaining:
+                await self._publish(remaining)
+        return self.response
+
+
+def _combine_responses(responses: dict[str, dict]) -> dict:
+    """Объединяет ответы по отдельным разделам в один ответ с JSON и суммарной статистикой."""
+    usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_prompt_tokens": 0, "cost": 0.0}
+    for response in responses.values():
+        for key in usage:
+            usage[key] += (response.get("usage") or {}).get(key) or 0
+    sections = {
+        key: response["text"] for key, response in responses.items()
+        if response.get("text") and "error" not in response
+    }
+    combined = {"text": None, "json": sections or None, "usage": usage}
+    if not sections:
+        combined["error"] = "; ".join(str(r.get("error")) for r in responses.values() if r.get("error")) or "empty response"
+    return combined
+
+
+def resolve_strategy(strategy: str) -> str:
+    """Проверяет название стратегии; неизвестная стратегия заменяется на consolidated."""
+    if strategy in STRATEGIES:
+        return strategy
+    logger.warning(f"Неизвестная стратегия анализа '{strategy}', используется '{CONSOLIDATED}'.")
+    return CONSOLIDATED
+
+
+def build_request(
+    strategy: str, ai_client, resume_text: str, vacancy_text: str, sections: list[str], distill: bool = False
+) -> AnalysisRequest:
+    """
+    Возвращает функцию, выполняющую анализ выбранной стратегией:
+    consolidated — один JSON-промпт на все разделы; parallel и on_demand —
+    отдельные промпты для каждого раздела из sections, выполняемые одновременно.
+    При distill промпты получают выжимки документов (ai_client.distill_document)
+    вместо полных текстов, а токены выжимок добавляются к статистике анализа.
+    """
+    async def generate_consolidated(run: AnalysisRun, resume: str, vacancy: str) -> dict:
+        return await ai_client.get_consolidated_analysis(resume, vacancy, on_delta=run.feed)
+
+    async def generate_sections(run: AnalysisRun, resume: str, vacancy: str) -> dict:
+        async def generate(section: str) -> dict:
+            response = await ai_client.generate_section(
+                section, resume, vacancy, on_delta=lambda delta: run.feed_section(section, delta)
+            )
+            if response and response.get("text") and "error" not in response:
+                await run.complete_section(section, response["text"])
+            return response or {}
+
+        responses = await asyncio.gather(*(generate(section) for section in sections))
+        return _combine_responses(dict(zip(sections, responses)))
+
+    generate = generate_consolidated if strategy == CONSOLIDATED else generate_sections
+    if not distill:
+        return lambda run: generate(run, resume_text, vacancy_text)
+
+    async def generate_from_digests(run: AnalysisRun) -> dict:
+        resume, vacancy = await asyncio.gather(
+            ai_client.distill_document("resume", resume_text),
+            ai_client.distill_document("vacancy", vacancy_text),
+        )
+        response = await generate(run, resume["text"], vacancy["text"])
+        return add_usage(response, resume["usage"], vacancy["usage"])
+
+    return generate_from_digests
+
+
+def analysis_scope(strategy: str, section: str) -> str:
+    """Область анализа: при генерации по запросу — один раздел, иначе все разделы."""
+    return section if strategy == ON_DEMAND else ALL_SECTIONS
+
+
+def scope_sections(scope: str) -> list[str]:
+    """Разделы, которые генерируются в рамках области анализа."""
+    return list(prompts.SECTION_PROMPTS) if scope == ALL_SECTIONS else [scope]
+
+
+# Выполняющиеся анализы по ключу (resume_id, vacancy_id, область, версия промптов)
+_running: dict[tuple, AnalysisRun] = {}
+
+
+def analysis_key(resume_id: int, vacancy_id: int, scope: str = ALL_SECTIONS) -> tuple:
+    return resume_id, vacancy_id, scope, prompts.PROMPT_VERSION
+
+
+def get_running_analysis(resume_id: int, vacancy_id: int, scope: str = ALL_SECTIONS) -> AnalysisRun | None:
+    """
+    Возвращает выполняющийся анализ пары резюме/вакансия в заданной области, если он есть.
+    Анализ всех разделов (например, заблаговременный) подходит для любой области.
+    """
+    run = _running.get(analysis_key(resume_id, vacancy_id, scope))
+    if run is None and scope != ALL_SECTIONS:
+        run = _running.get(analysis_key(resume_id, vacancy_id, ALL_SECTIONS))
+    return run
+
+
+def start_analysis(
+    resume_id: int,
+    vacancy_id: int,
+    request: AnalysisRequest,
+    persist: PersistCallback,
+    scope: str = ALL_SECTIONS,
+    strategy: str = CONSOLIDATED,
+) -> AnalysisRun:
+    """
+    Запускает анализ пары резюме/вакансия в фоне.
+    Если такой анализ уже выполняется, возвращает его вместо нового запроса к AI.
+    """
+    key = analysis_key(resume_id, vacancy_id, scope)
+    run = _running.get(key)
+    if run:
+        return run
+
+    run = AnalysisRun(persist, strategy=strategy)
+    run._task = asyncio.create_task(run._execute(request))
+    _running[key] = run
+    run._task.add_done_callback(lambda _: _running.pop(key, None))
+    return run
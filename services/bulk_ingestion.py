@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.file_utils import read_text_from_file, save_text_to_file
+from config import BULK_INGEST_CONCURRENCY, BULK_INGEST_MAX_URLS, HH_API_ENABLED
+from db import async_crud as crud
+from db.fingerprints import Fingerprint
+from scraper.async_scraper import scrape_url
+from scraper.hh_api import fetch_hh_vacancy
+from scraper.hh_scraper import parse_hh_vacancy_id
+from services.document_service import verify_vacancy_text
+
+logger = logging.getLogger(__name__)
+
+_URL_RE = re.compile(r"https?://[^\s<>\"']+")
+
+# Итоговые статусы вакансий пакета
+ADDED = "added"
+DUPLICATE = "duplicate"
+FAILED = "failed"
+REJECTED = "rejected"
+NO_BALANCE = "no_balance"
+
+# Этапы пакетной загрузки для отчета о прогрессе
+STAGE_DOWNLOAD = "download"
+STAGE_VERIFY = "verify"
+
+ProgressCallback = Callable[[str, int, int], Awaitable[None]]
+
+
+@dataclass
+class BulkVacancy:
+    """Вакансия из пакета ссылок и ее состояние по мере обработки."""
+
+    url: str
+    hh_id: str | None = None
+    text: str | None = None
+    title: str | None = None  # Заполнено — вакансия уже проверена (каноническая, из API или AI)
+    body: str | None = None
+    file_path: str | None = None
+    canonical_id: int | None = None
+    usage_log: dict | None = None
+    status: str | None = None
+    vacancy_id: int | None = None
+
+
+def extract_vacancy_urls(text: str, max_urls: int = BULK_INGEST_MAX_URLS) -> list[str]:
+    """Ссылки на hh.ru из текста сообщения или файла без повторов, не больше max_urls."""
+    urls = []
+    for url in _URL_RE.findall(text):
+        url = url.rstrip(".,;)")
+        if "hh.ru" in url and url not in urls:
+            urls.append(url)
+    return urls[:max_urls]
+
+
+def is_url_list(text: str) -> bool:
+    """Каждая непустая строка текста — ссылка (файл со списком вакансий, а не текст вакансии)."""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return bool(lines) and all(_URL_RE.fullmatch(line) for line in lines)
+
+
+async def _run_stage(
+    stage: str,
+    items: list[BulkVacancy],
+    worker: Callable[[BulkVacancy], Awaitable[None]],
+    semaphore: asyncio.Semaphore,
+    on_progress: ProgressCallback | None,
+) -> None:
+    """Выполняет этап для всех вакансий параллельно (не больше, чем позволяет semaphore)."""
+    done = 0
+
+    async def run(item: BulkVacancy) -> None:
+        nonlocal done
+        try:
+            async with semaphore:
+                await worker(item)
+        except Exception as e:
+            logger.error(f"Ошибка на этапе '{stage}' для {item.url}: {e}", exc_info=True)
+            item.status = FAILED
+        done += 1
+        if on_progress:
+            await on_progress(stage, done, len(items))
+
+    await asyncio.gather(*(run(item) for item in items))
+
+
+async def _download(item: BulkVacancy) -> None:
+    if item.hh_id and HH_API_ENABLED:
+        api_vacancy = await fetch_hh_vacancy(item.hh_id)
+        if api_vacancy:
+            item.text, item.title = api_vacancy.text, api_vacancy.title
+            return
+    item.text = await scrape_url(item.url)
+    if not item.text:
+        item.status = FAILED
+
+
+async def ingest_vacancies(
+    db: AsyncSession,
+    user_id: int,
+    urls: list[str],
+    on_progress: ProgressCallback | None = None,
+    concurrency: int = BULK_INGEST_CONCURRENCY,
+) -> list[BulkVacancy]:
+    """
+    Загружает пакет вакансий по ссылкам: скачивание и проверка выполняются параллельно
+    (не больше concurrency одновременно), а все вакансии, логи AI и списание баллов
+    записываются в БД одной транзакцией в конце.
+    Дубликаты загруженных ранее вакансий не списывают баллы; вакансии, на которые
+    баллов не хватило, не проверяются AI.
+    """
+    items = []
+    seen_ids = set()
+    for url in urls:
+        hh_id = parse_hh_vacancy_id(url)
+        if hh_id:
+            if hh_id in seen_ids:
+                continue
+            seen_ids.add(hh_id)
+        items.append(BulkVacancy(url=url, hh_id=hh_id))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    # 1. Канонические вакансии читаются с диска, остальные скачиваются из API hh.ru или со страницы
+    for item in items:
+        canonical = await crud.get_canonical_vacancy(db, hh_id=item.hh_id) if item.hh_id else None
+        text = read_text_from_file(canonical.file_path) if canonical else None
+        if text:
+            item.text, item.title, item.file_path, item.canonical_id = text, canonical.title, canonical.file_path, canonical.id
+    await _run_stage(STAGE_DOWNLOAD, [item for item in items if item.text is None], _download, semaphore, on_progress)
+
+    # 2. Дубликаты (в пакете и среди загруженных) и резервирование баллов
+    balance = await crud.get_user_balance(db, user_id=user_id)
+    available = balance.balance if balance else 0
+    # Вакансии пакета сравниваются между собой по тем же правилам, что и с загруженными:
+    # точное совпадение нормализованного текста или близкий SimHash
+    seen = []
+    for item in items:
+        if item.status:
+            continue
+        fingerprint = Fingerprint.of(item.text)
+        duplicate = await crud.find_duplicate_vacancy(db, user_id=user_id, text=item.text)
+        if duplicate or any(fingerprint.is_near_duplicate(other) for other in seen):
+            item.status = DUPLICATE
+            if duplicate:
+                item.title, item.vacancy_id = duplicate.title, duplicate.id
+            continue
+        seen.append(fingerprint)
+        if item.canonical_id is None:
+            canonical = await crud.get_canonical_vacancy(db, content_hash=fingerprint.content_hash)
+            if canonical:
+                item.title, item.file_path, item.canonical_id = canonical.title, canonical.file_path, canonical.id
+        if available < 1:
+            item.status = NO_BALANCE
+            continue
+        available -= 1
+
+    # 3. Проверка вакансий, еще не проверенных ранее
+    async def verify(item: BulkVacancy) -> None:
+        is_valid, title, body, item.usage_log = await verify_vacancy_text(user_id, item.text)
+        if not is_valid:
+            item.status = REJECTED
+        else:
+            item.title, item.body = title, body
+
+    unverified = [item for item in items if item.status is None and item.title is None]
+    await _run_stage(STAGE_VERIFY, unverified, verify, semaphore, on_progress)
+
+    accepted = []
+    for item in items:
+        if item.status is None and item.file_path is None:
+            item.file_path = save_text_to_file(item.body or item.text, "vacancies")
+            if not item.file_path:
+                item.status = FAILED
+        if item.status is None:
+            accepted.append(item)
+
+    # 4. Одна транзакция на весь пакет
+    usage_logs = [item.usage_log for item in items if item.usage_log]
+    if accepted or usage_logs:
+        vacancies = await crud.create_vacancies_batch(
+            db,
+            user_id=user_id,
+            vacancies=[
+                {
+                    "file_path": item.file_path,
+                    "source": item.url,
+                    "title": item.title,
+                    "text": item.text,
+                    "hh_id": item.hh_id,
+                    "canonical_id": item.canonical_id,
+                }
+                for item in accepted
+            ],
+            usage_logs=usage_logs,
+            charge_description="Загрузка вакансии",
+        )
+        for item, vacancy in zip(accepted, vacancies):
+            item.status, item.vacancy_id = ADDED, vacancy.id
+    logger.info(f"Пакетная загрузка для пользователя {user_id}: добавлено {len(accepted)} из {len(items)} вакансий")
+    return items
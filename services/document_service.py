@@ -2,21 +2,102 @@ import logging
 import json
 from telegram import Update
 from telegram.ext import ContextTypes
-from sqlalchemy.orm import Session
-from db import crud
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import async_crud as crud, models
+from db.fingerprints import content_hash
 from ai.client import get_ai_client
 from bot.file_utils import save_text_to_file
+from ai.classifier import classify_document
+from ai.token_budget import clean_text
+from config import DOCUMENT_PRECLASSIFIER_ENABLED
 
 logger = logging.getLogger(__name__)
 
+
+def _usage_log_fields(usage: dict, action_name: str) -> dict:
+    """Поля записи AIUsageLog для расхода токенов из ответа AI."""
+    return {
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "completion_tokens": usage.get("completion_tokens", 0),
+        "total_tokens": usage.get("total_tokens", 0),
+        "cost": usage.get("cost", 0.0),
+        "action": action_name,
+        "cached_prompt_tokens": usage.get("cached_prompt_tokens", 0),
+    }
+
+
+async def _request_verification(
+    user_id: int, text: str, verify_method, json_key_check: str
+) -> tuple[bool, str | None, str | None, dict]:
+    """Проверяет документ с помощью AI без записи в БД. Возвращает (валиден, заголовок, текст, расход токенов)."""
+    # Валидация с помощью AI
+    response_data = await verify_method(text)
+    usage = response_data.get("usage", {})
+
+    # Обработка ответа AI
+    response_text = response_data.get("text", "{}")
+    if not response_text or "error" in response_data:
+        logger.error(f"AI verification failed for user {user_id}. Response: {response_data}")
+        return False, None, None, usage
+
+    try:
+        if isinstance(response_text, str):
+            response_text = response_text.strip()
+            if response_text.startswith("```json"):
+                response_text = response_text[7:-4].strip()
+            elif response_text.startswith("```"):
+                response_text = response_text[3:-3].strip()
+            response_json = json.loads(response_text)
+        else:
+            response_json = response_text
+
+        is_valid_doc = response_json.get(json_key_check, False)
+        title = response_json.get("title")
+        body = response_json.get("body")
+    except (json.JSONDecodeError, AttributeError, KeyError, IndexError, TypeError) as e:
+        logger.error(f"Failed to parse AI response: {response_data}. Error: {e}")
+        is_valid_doc = False
+        title = None
+        body = None
+    return is_valid_doc, title, body, usage
+
+
+async def _verify_with_ai(
+    db: AsyncSession, user_id: int, text: str, verify_method, action_name: str, json_key_check: str
+) -> tuple[bool, str | None, str | None]:
+    """Проверяет документ с помощью AI и логирует расход токенов. Возвращает (валиден, заголовок, текст)."""
+    is_valid_doc, title, body, usage = await _request_verification(user_id, text, verify_method, json_key_check)
+    # Логирование использования AI
+    await crud.create_ai_usage_log(db=db, user_id=user_id, **_usage_log_fields(usage, action_name))
+    return is_valid_doc, title, body
+
+
+async def verify_vacancy_text(user_id: int, text: str) -> tuple[bool, str | None, str | None, dict | None]:
+    """
+    Проверяет текст вакансии локальным классификатором, а при неоднозначном результате — AI,
+    ничего не записывая в БД. Возвращает (валиден, заголовок, текст, поля лога AIUsageLog
+    или None, если AI не вызывался). Без AI текст очищается дешево (clean_text).
+    """
+    verdict = classify_document(text, "vacancy") if DOCUMENT_PRECLASSIFIER_ENABLED else None
+    if verdict and verdict.is_valid is not None:
+        return verdict.is_valid, verdict.title, clean_text(text) if verdict.is_valid else None, None
+    is_valid_doc, title, body, usage = await _request_verification(
+        user_id, text, get_ai_client().verify_vacancy, "is_vacancy"
+    )
+    return is_valid_doc, title, body, _usage_log_fields(usage, "verify_vacancy")
+
+
 async def process_document(
     update: Update,
     context: ContextTypes.DEFAULT_TYPE,
-    db: Session,
+    db: AsyncSession,
     user_id: int,
     text: str,
     source: str,
     doc_type: str,
+    hh_id: str | None = None,
+    canonical: models.CanonicalVacancy | None = None,
+    known_title: str | None = None,
 ) -> tuple[bool, str | None]:
     """
     Универсальная функция для обработки документов (резюме и вакансий).
@@ -28,6 +109,15 @@ async def process_document(
     :param text: Текст документа.
     :param source: Источник документа (имя файла или URL).
     :param doc_type: Тип документа ('resume' или 'vacancy').
+    :param hh_id: ID вакансии на hh.ru, если вакансия загружена по ссылке.
+    :param canonical: Уже проверенная каноническая вакансия: ее текст и название
+        используются без повторной проверки AI.
+    :param known_title: Название из структурированного источника (API hh.ru):
+        такой документ не проверяется ни локально, ни с помощью AI.
+
+    Документ, проверенный AI, сохраняется в очищенном AI виде. Документ, принятый локальным
+    классификатором, сохраняется после дешевой очистки (clean_text): лишние пробелы и повторы
+    строк удаляются, но посторонние фрагменты, которые вырезал бы AI, остаются.
     :return: Кортеж (успех, заголовок документа или None).
     """
     ai_client = get_ai_client()
@@ -49,60 +139,47 @@ async def process_document(
         logger.error(f"Unknown document type: {doc_type}")
         return False, None
 
-    # 2. Валидация с помощью AI
-    response_data = verify_method(text)
-
-    # 3. Логирование использования AI
-    usage = response_data.get("usage", {})
-    crud.create_ai_usage_log(
-        db=db,
-        user_id=user_id,
-        prompt_tokens=usage.get("prompt_tokens", 0),
-        completion_tokens=usage.get("completion_tokens", 0),
-        total_tokens=usage.get("total_tokens", 0),
-        cost=usage.get("cost", 0.0),
-        action=action_name,
-    )
-
-    # 4. Обработка ответа AI
-    response_text = response_data.get("text", "{}")
-    if not response_text or "error" in response_data:
-        logger.error(f"AI verification failed for user {user_id}. Response: {response_data}")
-        return False, None
-
-    try:
-        if isinstance(response_text, str):
-            response_text = response_text.strip()
-            if response_text.startswith("```json"):
-                response_text = response_text[7:-4].strip()
-            elif response_text.startswith("```"):
-                response_text = response_text[3:-3].strip()
-            response_json = json.loads(response_text)
+    if canonical is not None:
+        # 2. Каноническая вакансия уже проверена: файл и название общие для всех пользователей
+        title = canonical.title
+        file_path = canonical.file_path
+    else:
+        # 2. Быстрая локальная классификация: очевидные документы и документы из API не проверяются AI
+        verdict = classify_document(text, doc_type) if DOCUMENT_PRECLASSIFIER_ENABLED and not known_title else None
+        if known_title:
+            is_valid_doc, title, body = True, known_title, None
+        elif verdict and verdict.is_valid is False:
+            logger.info(f"Document rejected by pre-classifier for user {user_id}: {doc_type}, scores {verdict.scores}")
+            return False, None
+        elif verdict and verdict.is_valid:
+            logger.info(f"Document accepted by pre-classifier for user {user_id}: {doc_type} '{verdict.title}'")
+            # Без AI сохраняется исходный текст с дешевой очисткой: пробелы, пустые строки и повторы
+            is_valid_doc, title, body = True, verdict.title, clean_text(text)
         else:
-            response_json = response_text
+            is_valid_doc, title, body = await _verify_with_ai(
+                db, user_id, text, verify_method, action_name, json_key_check
+            )
 
-        is_valid_doc = response_json.get(json_key_check, False)
-        title = response_json.get("title")
-        body = response_json.get("body")
-    except (json.JSONDecodeError, AttributeError, KeyError, IndexError, TypeError) as e:
-        logger.error(f"Failed to parse AI response: {response_data}. Error: {e}")
-        is_valid_doc = False
-        title = None
-        body = None
-
-    if not is_valid_doc:
-        return False, None
+        if not is_valid_doc:
+            return False, None
 
-    # 5. Сохранение файла
-    file_path = save_text_to_file(body or text, folder_name)
-    if not file_path:
-        return False, None
+        # 3. Сохранение файла
+        file_path = save_text_to_file(body or text, folder_name)
+        if not file_path:
+            return False, None
 
-    # 6. Сохранение в БД
+    # 4. Сохранение в БД
     if doc_type == "resume":
-        crud.create_resume(db, user_id=user_id, file_path=file_path, source=source, title=title)
+        await crud.create_resume(db, user_id=user_id, file_path=file_path, source=source, title=title)
     elif doc_type == "vacancy":
-        vacancy = create_crud_method(db, user_id=user_id, title=title, file_path=file_path, source=source)
+        # Проверенная вакансия регистрируется как каноническая: другие пользователи получат ее без скрейпинга и AI
+        if canonical is None:
+            canonical = await crud.get_or_create_canonical_vacancy(
+                db, file_path=file_path, title=title, source=source, hh_id=hh_id, content_hash=content_hash(text)
+            )
+        vacancy = await create_crud_method(
+            db, user_id=user_id, title=title, file_path=file_path, source=source, text=text, canonical_id=canonical.id
+        )
         # Сохраняем ID новой вакансии как выбранной по умолчанию
         context.user_data['selected_vacancy_id'] = vacancy.id
 
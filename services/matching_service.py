@@ -0,0 +1,33 @@
+import logging
+
+from ai.matching import VectorCache, score_batch, to_percent
+from bot.file_utils import read_text_from_file
+from db import models
+
+logger = logging.getLogger(__name__)
+
+# Векторы документов кэшируются по хэшу текста файла
+_vector_cache = VectorCache()
+
+
+def score_vacancies(resume: models.Resume, vacancies: list[models.Vacancy]) -> dict[int, int]:
+    """
+    Оценивает соответствие резюме каждой вакансии пользователя локально, без запроса к AI.
+    Возвращает словарь ID вакансии -> оценка в процентах; вакансии, файл которых
+    не удалось прочитать, не оцениваются.
+    """
+    resume_text = read_text_from_file(resume.file_path)
+    if not resume_text:
+        return {}
+
+    readable = []
+    for vacancy in vacancies:
+        text = read_text_from_file(vacancy.file_path)
+        if text:
+            readable.append((vacancy, _vector_cache.get(text)))
+    if not readable:
+        return {}
+
+    scores = score_batch(_vector_cache.get(resume_text), [vector for _, vector in readable])
+    logger.info(f"Локальная оценка соответствия для {len(readable)} вакансий резюме {resume.id}.")
+    return {vacancy.id: to_percent(score) for (vacancy, _), score in zip(readable, scores)}
@@ -1,8 +1,11 @@
 import pytest
 import os
 from unittest.mock import MagicMock, AsyncMock
+import pytest_asyncio
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from telegram import Update
 from telegram.ext import ContextTypes
 from alembic.config import Config
@@ -12,6 +15,7 @@ from db.models import Base
 
 # Используем in-memory SQLite для тестов
 TEST_DATABASE_URL = "sqlite:///:memory:"
+TEST_ASYNC_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
 
 @pytest.fixture(scope="function")
@@ -31,6 +35,23 @@ def db_session():
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest_asyncio.fixture
+async def async_db_session():
+    """
+    Асинхронная сессия БД (aiosqlite) для каждой тестовой функции.
+    StaticPool держит одно соединение, чтобы in-memory база жила весь тест.
+    """
+    engine = create_async_engine(TEST_ASYNC_DATABASE_URL, poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)()
+    try:
+        yield db
+    finally:
+        await db.close()
+        await engine.dispose()
+
+
 @pytest.fixture
 def update_mock():
     """Фикстура для мока Update."""
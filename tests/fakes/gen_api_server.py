@@ -0,0 +1,114 @@
+"""
+Локальный HTTP-сервер, имитирующий асинхронный API gen-api.ru.
+
+Задача, созданная через POST /api/v1/networks/<llm>, переходит в статус
+'success' через `latency` секунд; GET /api/v1/request/get/<request_id>
+возвращает текущий статус. Используется в тестах для проверки сотен
+одновременных задач без обращения к внешнему сервису.
+"""
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Очередь соединений рассчитана на сотни одновременных клиентов
+    request_queue_size = 512
+
+
+class FakeGenAPIServer:
+    """Фейковый сервер Gen-API с настраиваемой задержкой выполнения задач."""
+
+    def __init__(self, latency: float = 0.3, jitter: float = 0.0, cost: float = 0.001):
+        self.latency = latency
+        self.jitter = jitter
+        self.cost = cost
+        self.jobs: dict[str, dict] = {}
+        self.status_requests = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def configure(self, provider) -> None:
+        """Направляет запросы провайдера на этот сервер."""
+        provider.API_URL = f"{self.base_url}/api/v1/networks/{provider.llm}"
+        provider.RESULT_URL = f"{self.base_url}/api/v1/request/get/{{request_id}}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _create_job(self, payload: dict) -> str:
+        with self._lock:
+            request_id = str(next(self._ids))
+            delay = self.latency + random.uniform(0, self.jitter)
+            self.jobs[request_id] = {
+                "ready_at": time.monotonic() + delay,
+                "content": payload["messages"][-1]["content"],
+            }
+        return request_id
+
+    def _job_status(self, request_id: str) -> dict | None:
+        with self._lock:
+            self.status_requests += 1
+            job = self.jobs.get(request_id)
+        if job is None:
+            return None
+        if time.monotonic() < job["ready_at"]:
+            return {"status": "processing"}
+        return {
+            "status": "success",
+            "cost": self.cost,
+            "full_response": [{"message": {"content": f"ECHO: {job['content']}"}}],
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, data: dict) -> None:
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if not re.fullmatch(r"/api/v1/networks/[\w.-]+", self.path):
+                    self._send_json(404, {"error": "not found"})
+                    return
+                request_id = server._create_job(payload)
+                self._send_json(200, {"request_id": request_id, "status": "starting"})
+
+            def do_GET(self):
+                match = re.fullmatch(r"/api/v1/request/get/(\w+)", self.path)
+                data = server._job_status(match.group(1)) if match else None
+                if data is None:
+                    self._send_json(404, {"error": "not found"})
+                    return
+                self._send_json(200, data)
+
+        return Handler
@@ -0,0 +1,77 @@
+"""
+Локальный HTTP-сервер, имитирующий публичный API hh.ru: GET /vacancies/<id>
+отдает записанный ответ из tests/fixtures/hh_api/vacancy_<id>.json
+с ETag и поддержкой If-None-Match, для остальных ID — 404.
+"""
+import hashlib
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "fixtures" / "hh_api"
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class FakeHHAPIServer:
+    """Фейковый API hh.ru с записанными ответами."""
+
+    def __init__(self, fixtures_dir: Path = FIXTURES_DIR):
+        self.fixtures_dir = fixtures_dir
+        self.requests: list[dict] = []
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests.append({"path": self.path, "headers": dict(self.headers)})
+                match = re.fullmatch(r"/vacancies/(\d+)", self.path)
+                path = server.fixtures_dir / f"vacancy_{match.group(1)}.json" if match else None
+                if not path or not path.exists():
+                    body = b'{"errors": [{"type": "not_found"}]}'
+                    self.send_response(404)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                body = path.read_bytes()
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
@@ -0,0 +1,134 @@
+"""
+Локальный HTTP-сервер, имитирующий OpenAI-совместимый endpoint
+POST /v1/chat/completions (обычный и потоковый режимы).
+
+Задержка ответа и доля ошибок настраиваются, что позволяет проверять
+маршрутизацию между провайдерами без обращения к внешним сервисам.
+Сервер имитирует кэш префикса промпта: совпадающие с прошлыми запросами
+начальные сообщения учитываются в usage.prompt_tokens_details.cached_tokens
+(около 4 символов на токен).
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512
+
+
+class FakeOpenAIServer:
+    """Фейковый OpenAI-совместимый сервер с внедряемыми задержками и ошибками."""
+
+    def __init__(self, content: str = "OK", latency: float = 0.0, failure_rate: float = 0.0, stream_chunks: int = 3):
+        self.content = content
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.stream_chunks = stream_chunks
+        self.requests = 0
+        self.payloads: list[dict] = []
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _cached_tokens(self, messages: list[dict]) -> int:
+        """Размер самого длинного префикса сообщений, уже встречавшегося в прошлых запросах."""
+        best = 0
+        for previous in self.payloads:
+            shared = 0
+            for seen, message in zip(previous.get("messages", []), messages):
+                if seen != message:
+                    break
+                shared += len(message["content"]) // 4
+            best = max(best, shared)
+        return best
+
+    def _usage(self, messages: list[dict]) -> dict:
+        prompt_tokens = sum(len(message["content"]) // 4 for message in messages) or 5
+        return {
+            "prompt_tokens": prompt_tokens, "completion_tokens": 7, "total_tokens": prompt_tokens + 7,
+            "prompt_tokens_details": {"cached_tokens": self._cached_tokens(messages)},
+        }
+
+    def _completion(self, usage: dict) -> dict:
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "fake",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": self.content}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    def _stream_events(self, usage: dict) -> list[dict]:
+        size = max(1, len(self.content) // self.stream_chunks)
+        events = []
+        for i in range(0, len(self.content), size):
+            events.append({
+                "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": "fake",
+                "choices": [{"index": 0, "delta": {"content": self.content[i:i + size]}, "finish_reason": None}],
+            })
+        events.append({
+            "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": "fake",
+            "choices": [], "usage": usage,
+        })
+        return events
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status: int, payload: dict) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                    usage = server._usage(payload.get("messages", []))
+                    server.payloads.append(payload)
+                time.sleep(server.latency)
+
+                if random.random() < server.failure_rate:
+                    self._send_json(500, {"error": {"message": "injected failure", "type": "server_error"}})
+                    return
+
+                if not payload.get("stream"):
+                    self._send_json(200, server._completion(usage))
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for event in server._stream_events(usage):
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
@@ -0,0 +1,142 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from ai.cache import ResponseCache, make_cache_key, normalize_text
+from ai.client import AIClient
+from ai.providers.mock import MockProvider
+from db import models
+
+
+@pytest.fixture
+def cache(async_db_session):
+    """Кэш ответов поверх тестовой in-memory БД; размер проверяется на каждой записи."""
+    session_factory = async_sessionmaker(async_db_session.bind, expire_on_commit=False)
+    return ResponseCache(session_factory, ttl_seconds=3600, max_entries=3, evict_every=1)
+
+
+async def cached_entries(db) -> dict:
+    """Записи кэша по ключу."""
+    entries = (await db.scalars(select(models.AIResponseCache))).all()
+    return {entry.cache_key: entry for entry in entries}
+
+
+@pytest.fixture
+def counting_provider(monkeypatch):
+    """Подменяет провайдера на MockProvider и считает обращения к нему."""
+    calls = []
+    original = MockProvider._get_completion
+
+    async def counting_completion(self, prompt, is_json=False):
+        calls.append(prompt)
+        return await original(self, prompt, is_json)
+
+    monkeypatch.setattr("ai.client.AIProvider", MockProvider)
+    monkeypatch.setattr(MockProvider, "_get_completion", counting_completion)
+    return calls
+
+
+def test_cache_key_ignores_insignificant_whitespace():
+    """Ключ не зависит от хвостовых пробелов, переводов строк и лишних пустых строк."""
+    key1 = make_cache_key("template", "model", {"text": "Python\r\nSQL  \n\n\n\nGit"})
+    key2 = make_cache_key("template", "model", {"text": "  Python\nSQL\n\nGit\n"})
+
+    assert normalize_text("a  \r\n\n\n\nb") == "a\n\nb"
+    assert key1 == key2
+
+
+def test_cache_key_depends_on_template_model_and_inputs():
+    """Ключ меняется при изменении шаблона, модели или входных данных."""
+    base = make_cache_key("template", "model", {"text": "resume"})
+
+    assert make_cache_key("other template", "model", {"text": "resume"}) != base
+    assert make_cache_key("template", "other-model", {"text": "resume"}) != base
+    assert make_cache_key("template", "model", {"text": "another resume"}) != base
+    assert make_cache_key("template", "model", {"text": "resume"}, is_json=True) != base
+
+
+async def test_cache_hit_returns_zero_usage(cache):
+    """Ответ из кэша помечается как cached и не содержит затрат."""
+    await cache.set("key", {"text": "answer", "json": None, "usage": {"total_tokens": 100, "cost": 0.5}})
+
+    cached = await cache.get("key")
+
+    assert cached["text"] == "answer"
+    assert cached["cached"] is True
+    assert cached["usage"]["total_tokens"] == 0
+    assert cached["usage"]["cost"] == 0.0
+
+
+async def test_cache_skips_error_responses(cache):
+    """Ответы с ошибкой и пустые ответы не кэшируются."""
+    await cache.set("error", {"text": "Error from OpenRouter: boom", "json": None, "error": "boom"})
+    await cache.set("empty", {"text": None, "json": None})
+
+    assert await cache.get("error") is None
+    assert await cache.get("empty") is None
+
+
+async def test_cache_expires_entries_by_ttl(cache, async_db_session):
+    """Записи старше TTL считаются промахом и удаляются."""
+    await cache.set("key", {"text": "answer"})
+    entry = (await cached_entries(async_db_session))["key"]
+    entry.created_at = datetime.utcnow() - timedelta(hours=2)
+    await async_db_session.commit()
+
+    assert await cache.get("key") is None
+    assert await cached_entries(async_db_session) == {}
+
+
+async def test_cache_evicts_least_recently_used(cache, async_db_session):
+    """При превышении max_entries вытесняются давно неиспользуемые записи."""
+    for key in ("a", "b", "c"):
+        await cache.set(key, {"text": key})
+    past = datetime.utcnow() - timedelta(minutes=10)
+    entries = await cached_entries(async_db_session)
+    for key, minutes in (("a", 1), ("b", 3), ("c", 2)):
+        entries[key].last_accessed_at = past + timedelta(minutes=minutes)
+    await async_db_session.commit()
+
+    await cache.get("a")  # "a" становится самой свежей записью
+    await cache.set("d", {"text": "d"})
+
+    assert set(await cached_entries(async_db_session)) == {"a", "b", "d"}
+
+
+async def test_cache_checks_size_every_n_writes(cache, async_db_session):
+    """Размер кэша проверяется раз в evict_every записей, а не на каждой записи."""
+    cache.evict_every = 3
+    for key in ("a", "b", "c", "d", "e"):
+        await cache.set(key, {"text": key})
+    assert len(await cached_entries(async_db_session)) == 5
+    await async_db_session.commit()
+
+    await cache.set("f", {"text": "f"})
+
+    assert len(await cached_entries(async_db_session)) == 3
+
+
+async def test_client_reuses_cached_responses(cache, counting_provider):
+    """Повторные запросы с теми же данными не обращаются к провайдеру."""
+    client = AIClient(cache=cache)
+
+    first = await client.get_consolidated_analysis("Resume text", "Vacancy text")
+    second = await client.get_consolidated_analysis("Resume text  \n", "Vacancy text")
+    await client.verify_resume("Resume text")
+    await client.verify_resume("Resume text")
+
+    assert len(counting_provider) == 2
+    assert second["json"] == first["json"]
+    assert second["cached"] is True
+    assert "cached" not in first
+
+
+async def test_client_without_cache_always_calls_provider(counting_provider):
+    """Без кэша каждый вызов идет к провайдеру."""
+    client = AIClient()
+
+    await client.verify_vacancy("Vacancy text")
+    await client.verify_vacancy("Vacancy text")
+
+    assert len(counting_provider) == 2
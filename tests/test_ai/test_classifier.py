@@ -0,0 +1,52 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from ai.classifier import RESUME, VACANCY, classify_document, guess_title
+
+CORPUS_PATH = Path(__file__).resolve().parent.parent / "fixtures" / "classifier_corpus.jsonl"
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.mark.parametrize("doc_type", [RESUME, VACANCY])
+def test_confident_verdicts_are_correct_on_corpus(corpus, doc_type):
+    """Уверенные решения классификатора не ошибаются, а большая часть документов обходится без AI."""
+    confident = 0
+    for item in corpus:
+        verdict = classify_document(item["text"], doc_type)
+        if verdict.is_valid is None:
+            continue
+        confident += 1
+        assert verdict.is_valid == (item["label"] == doc_type), item["text"][:60]
+    assert confident / len(corpus) >= 0.5
+
+
+def test_ambiguous_documents_are_left_to_ai(corpus):
+    """Короткие тексты и документы других типов без явных признаков отправляются на проверку AI."""
+    assert classify_document("Resume text", RESUME).is_valid is None
+    for item in corpus:
+        if item["label"] == "other":
+            assert classify_document(item["text"], RESUME).is_valid is None
+            assert classify_document(item["text"], VACANCY).is_valid is None
+
+
+def test_accepted_document_has_title(corpus):
+    resume = next(item["text"] for item in corpus if item["label"] == RESUME)
+    verdict = classify_document(resume, RESUME)
+
+    assert verdict.is_valid is True
+    assert verdict.title == "Senior Python Developer"
+    assert verdict.confidence > 0.9
+
+
+def test_guess_title_heuristics():
+    assert guess_title("Иванов Иван\nЖелаемая должность: Аналитик данных\nОпыт работы", RESUME) == "Аналитик данных"
+    assert guess_title("Мария\nИщу работу: QA инженер\nОпыт работы", RESUME) == "QA инженер"
+    assert guess_title("Senior Go-разработчик\nТребования:\nОпыт от 3 лет", VACANCY) == "Senior Go-разработчик"
+    assert guess_title("Рецепт борща\nСвекла, капуста", VACANCY) is None
@@ -14,12 +14,12 @@ def mock_ai_provider(monkeypatch):
 
 import json
 
-def test_verify_resume_returns_mock_response():
+async def test_verify_resume_returns_mock_response():
     """
     Тестирует, что `verify_resume` возвращает корректный JSON-ответ от `MockProvider`.
     """
     client = AIClient()
-    response = client.verify_resume("some resume text")
+    response = await client.verify_resume("some resume text")
 
     # Проверяем, что ответ является валидным JSON
     try:
@@ -39,12 +39,12 @@ def test_verify_resume_returns_mock_response():
     assert "usage" in response
     assert response["usage"]["total_tokens"] > 0
 
-def test_verify_vacancy_returns_mock_response():
+async def test_verify_vacancy_returns_mock_response():
     """
     Тестирует, что `verify_vacancy` возвращает корректный ответ от `MockProvider`.
     """
     client = AIClient()
-    response = client.verify_vacancy("some vacancy text")
+    response = await client.verify_vacancy("some vacancy text")
     try:
         data = json.loads(response["text"])
         assert "is_vacancy" in data
@@ -52,34 +52,62 @@ def test_verify_vacancy_returns_mock_response():
     except (json.JSONDecodeError, KeyError):
         pytest.fail("Ответ от AI не является валидным JSON с ожидаемыми ключами")
 
-def test_analyze_match_returns_mock_response():
+async def test_analyze_match_returns_mock_response():
     """
     Тестирует, что `analyze_match` возвращает корректный ответ от `MockProvider`.
     """
     client = AIClient()
-    response = client.analyze_match("resume", "vacancy")
+    response = await client.analyze_match("resume", "vacancy")
     assert "Анализ соответствия (MOCK)" in response["text"]
 
-def test_generate_cover_letter_returns_mock_response():
+async def test_generate_cover_letter_returns_mock_response():
     """
     Тестирует, что `generate_cover_letter` возвращает корректный ответ от `MockProvider`.
     """
     client = AIClient()
-    response = client.generate_cover_letter("resume", "vacancy")
+    response = await client.generate_cover_letter("resume", "vacancy")
     assert "Ответ от Mock AI" in response["text"]
 
-def test_generate_hr_call_plan_returns_mock_response():
+async def test_generate_hr_call_plan_returns_mock_response():
     """
     Тестирует, что `generate_hr_call_plan` возвращает корректный ответ от `MockProvider`.
     """
     client = AIClient()
-    response = client.generate_hr_call_plan("resume", "vacancy")
+    response = await client.generate_hr_call_plan("resume", "vacancy")
     assert "Ответ от Mock AI" in response["text"]
 
-def test_generate_tech_interview_plan_returns_mock_response():
+async def test_generate_tech_interview_plan_returns_mock_response():
     """
     Тестирует, что `generate_tech_interview_plan` возвращает корректный ответ от `MockProvider`.
     """
     client = AIClient()
-    response = client.generate_tech_interview_plan("resume", "vacancy")
+    response = await client.generate_tech_interview_plan("resume", "vacancy")
     assert "Ответ от Mock AI" in response["text"]
+
+
+async def test_concurrent_requests_do_not_block_each_other(monkeypatch):
+    """
+    Тестирует, что сотни запросов через `AIClient` выполняются параллельно,
+    а не последовательно: общее время близко к задержке одного запроса.
+    """
+    import asyncio
+    import time
+
+    original = MockProvider._get_completion
+
+    async def slow_completion(self, prompt, is_json=False):
+        await asyncio.sleep(0.2)
+        return await original(self, prompt, is_json)
+
+    monkeypatch.setattr(MockProvider, "_get_completion", slow_completion)
+    client = AIClient()
+
+    started = time.monotonic()
+    responses = await asyncio.gather(
+        *(client.get_consolidated_analysis("resume", "vacancy") for _ in range(200))
+    )
+    elapsed = time.monotonic() - started
+
+    assert len(responses) == 200
+    assert all(response["json"]["match_analysis"] for response in responses)
+    assert elapsed < 2
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from ai.client import AIClient
+from ai.distillation import DigestStore, digest_key, render_digest
+from ai.providers.mock import MockProvider
+from services import analysis_service
+
+RESUME = "Иван Иванов\nPython-разработчик\nОпыт работы: 5 лет"
+
+
+@pytest.fixture
+def digests(async_db_session):
+    """Хранилище выжимок поверх тестовой in-memory БД."""
+    return DigestStore(async_sessionmaker(async_db_session.bind, expire_on_commit=False))
+
+
+@pytest.fixture
+def counting_provider(monkeypatch):
+    """Подменяет провайдера на MockProvider и считает обращения к нему."""
+    calls = []
+    original = MockProvider._get_completion
+
+    async def counting_completion(self, prompt, is_json=False):
+        calls.append(prompt)
+        await asyncio.sleep(0.01)
+        return await original(self, prompt, is_json)
+
+    monkeypatch.setattr("ai.client.AIProvider", MockProvider)
+    monkeypatch.setattr(MockProvider, "_get_completion", counting_completion)
+    return calls
+
+
+def test_render_digest_is_compact_text():
+    digest = {
+        "title": "Python-разработчик",
+        "skills": ["Python", "SQL"],
+        "experience": [{"period": "2020–2024", "company": "ACME", "highlights": ["API", "CI"]}],
+        "certificates": [],
+    }
+
+    assert render_digest(digest) == (
+        "title: Python-разработчик\n"
+        "skills:\n  - Python\n  - SQL\n"
+        "experience:\n  - period: 2020–2024\n    company: ACME\n    highlights:\n      - API\n      - CI"
+    )
+
+
+def test_digest_key_depends_on_type_and_normalized_text():
+    assert digest_key("resume", "Python\r\nSQL  ") == digest_key("resume", "Python\nSQL")
+    assert digest_key("resume", RESUME) != digest_key("vacancy", RESUME)
+
+
+async def test_document_is_distilled_once(counting_provider, digests):
+    """Выжимка готовится одним запросом к AI и затем берется из хранилища, в том числе новым клиентом."""
+    client = AIClient(digests=digests)
+
+    first, second = await asyncio.gather(
+        client.distill_document("resume", RESUME), client.distill_document("resume", RESUME)
+    )
+    third = await AIClient(digests=digests).distill_document("resume", RESUME + "\n")
+
+    assert len(counting_provider) == 1
+    assert first["distilled"] and first["text"] == "title: Mock Resume\nskills:\n  - Python\n  - SQL"
+    assert first["usage"]["total_tokens"] > 0
+    assert second["text"] == first["text"] and second["usage"] == {}
+    assert third["text"] == first["text"] and third["usage"] == {}
+
+
+async def test_failed_distillation_falls_back_to_full_text(monkeypatch, digests):
+    monkeypatch.setattr("ai.client.AIProvider", MockProvider)
+
+    async def failing(self, prompt, is_json=False):
+        return {"text": None, "json": None, "error": "boom", "usage": {"total_tokens": 0}}
+
+    monkeypatch.setattr(MockProvider, "_get_completion", failing)
+
+    result = await AIClient(digests=digests).distill_document("vacancy", "Текст вакансии")
+
+    assert result["text"] == "Текст вакансии"
+    assert result["distilled"] is False
+    assert await digests.get(digest_key("vacancy", "Текст вакансии")) is None
+
+
+async def test_analysis_uses_digests_instead_of_full_texts(counting_provider, digests):
+    """Промпт анализа получает выжимки, а токены выжимок добавляются к статистике анализа."""
+    client = AIClient(digests=digests)
+    request = analysis_service.build_request(
+        analysis_service.CONSOLIDATED, client, RESUME, "Полный текст вакансии", [], distill=True
+    )
+    run = analysis_service.start_analysis(31, 32, request, lambda sections: None)
+
+    response = await run.wait()
+
+    analysis_prompt = counting_provider[-1]
+    assert "Mock Resume" in analysis_prompt and "Mock Vacancy" in analysis_prompt
+    assert "Иван Иванов" not in analysis_prompt and "Полный текст вакансии" not in analysis_prompt
+    assert len(counting_provider) == 3
+    assert response["usage"]["total_tokens"] > 0
+    assert run.sections["cover_letter"] == "Сопроводительное письмо (MOCK)"
@@ -0,0 +1,106 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+import httpx
+
+from ai.providers.gen_api import GenAPIProvider
+from ai.providers.gen_api_poller import AdaptiveBackoff, GenAPIPoller
+from tests.fakes.gen_api_server import FakeGenAPIServer
+
+
+@pytest.fixture(autouse=True)
+def no_tiktoken():
+    """Отключает загрузку кодировщика tiktoken."""
+    with patch('ai.providers.gen_api.get_encoder', return_value=None):
+        yield
+
+
+def make_provider(server: FakeGenAPIServer) -> GenAPIProvider:
+    """Создает провайдера, направленного на локальный фейковый сервер."""
+    client = httpx.AsyncClient(limits=httpx.Limits(max_connections=50))
+    provider = GenAPIProvider(api_key="test_key", client=client)
+    provider.POLLING_INTERVAL = 0.05
+    provider.MIN_POLLING_INTERVAL = 0.02
+    provider.MAX_POLLING_INTERVAL = 0.2
+    server.configure(provider)
+    return provider
+
+
+def test_backoff_grows_without_statistics():
+    """Без статистики интервалы растут экспоненциально и ограничены максимумом."""
+    backoff = AdaptiveBackoff(initial=1.0, minimum=0.5, maximum=5.0, factor=2.0)
+
+    delays = [backoff.next_delay(attempt, 0.0) for attempt in range(5)]
+
+    assert delays == [1.0, 2.0, 4.0, 5.0, 5.0]
+
+
+def test_backoff_targets_observed_completion_time():
+    """После наблюдений первая проверка назначается на ожидаемое время завершения."""
+    backoff = AdaptiveBackoff(initial=1.0, minimum=0.5, maximum=30.0)
+    for duration in (9.0, 10.0, 11.0):
+        backoff.observe(duration)
+
+    assert backoff.expected_duration == 10.0
+    assert backoff.next_delay(0, 0.0) == 10.0
+    assert backoff.next_delay(1, 8.0) == 2.0
+    # После ожидаемого момента опрашиваем часто, постепенно замедляясь
+    assert backoff.next_delay(2, 10.0) == 0.5
+    assert backoff.next_delay(5, 20.0) > backoff.next_delay(3, 12.0)
+
+
+async def test_poller_times_out_after_max_attempts():
+    """Задача, не завершившаяся за max_attempts проверок, завершается TimeoutError."""
+    calls = []
+
+    async def fetch_status(request_id):
+        calls.append(request_id)
+        return {"status": "processing"}
+
+    poller = GenAPIPoller(fetch_status, AdaptiveBackoff(initial=0, minimum=0, maximum=0), max_attempts=3)
+
+    with pytest.raises(TimeoutError):
+        await poller.wait_for("job-1")
+    assert calls == ["job-1"] * 3
+    assert poller.pending == 0
+
+
+async def test_hundreds_of_concurrent_jobs_share_one_poller():
+    """
+    Сотни одновременных запросов обслуживаются одним опросчиком,
+    цикл событий при этом не блокируется.
+    """
+    jobs = 200
+    with FakeGenAPIServer(latency=0.3, jitter=0.1) as server:
+        provider = make_provider(server)
+        ticks = 0
+        done = asyncio.Event()
+
+        async def ticker():
+            nonlocal ticks
+            while not done.is_set():
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker_task = asyncio.create_task(ticker())
+        results = await asyncio.gather(
+            *(provider._get_completion(f"prompt {i}") for i in range(jobs))
+        )
+        done.set()
+        await ticker_task
+
+        assert all(result["text"] == f"ECHO: prompt {i}" for i, result in enumerate(results))
+        assert all(result["usage"]["cost"] == 0.001 for result in results)
+        assert provider._get_poller().pending == 0
+        assert ticks > 10
+        first_wave_checks = server.status_requests
+
+        assert first_wave_checks <= jobs * 6
+
+        # Вторая волна использует накопленную статистику о времени выполнения
+        assert provider._get_poller().backoff.expected_duration is not None
+        await asyncio.gather(*(provider._get_completion(f"again {i}") for i in range(jobs)))
+        second_wave_checks = server.status_requests - first_wave_checks
+
+        assert second_wave_checks <= jobs * 3
+        await provider.client.aclose()
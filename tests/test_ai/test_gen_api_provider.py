@@ -1,7 +1,6 @@
 import pytest
-from unittest.mock import patch, MagicMock, call
-import requests
-import json
+from unittest.mock import patch, MagicMock
+import httpx
 
 from ai.providers.gen_api import GenAPIProvider
 
@@ -10,61 +9,85 @@ SUCCESS_CONTENT = '{"is_vacancy": true, "title": "Software Engineer"}'
 REQUEST_ID = "test_request_123"
 PROMPT_TEXT = "some prompt"
 
+
+# --- Helper Functions ---
+class FakeGenAPI:
+    """
+    Хелпер, имитирующий HTTP API gen-api.ru через httpx.MockTransport.
+    post_response / get_responses могут быть dict, исключением или списком.
+    """
+
+    def __init__(self, post_response=None, get_responses=None):
+        self.post_response = post_response
+        self.get_responses = get_responses
+        self.post_calls = []
+        self.get_calls = []
+
+    def _reply(self, value, request):
+        if isinstance(value, Exception):
+            raise value
+        return httpx.Response(200, json=value, request=request)
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            self.post_calls.append(request)
+            return self._reply(self.post_response, request)
+        self.get_calls.append(request)
+        if isinstance(self.get_responses, list):
+            return self._reply(self.get_responses.pop(0), request)
+        return self._reply(self.get_responses, request)
+
+
+def make_provider(fake: FakeGenAPI) -> GenAPIProvider:
+    """Создает провайдера с мок-транспортом и нулевым интервалом опроса."""
+    client = httpx.AsyncClient(transport=httpx.MockTransport(fake.handler))
+    provider = GenAPIProvider(api_key="test_key", client=client)
+    provider.POLLING_INTERVAL = 0
+    return provider
+
+
 # --- Fixtures ---
-@pytest.fixture
-def provider():
-    """Фикстура для создания экземпляра GenAPIProvider с тестовым ключом."""
-    # Используем мок для tiktoken, чтобы избежать реальной загрузки
-    with patch('tiktoken.get_encoding') as mock_get_encoding:
+@pytest.fixture(autouse=True)
+def mock_encoding():
+    """Мок для tiktoken, чтобы избежать реальной загрузки."""
+    with patch('ai.providers.gen_api.get_encoder') as mock_get_encoding:
         mock_encoder = MagicMock()
         # "some prompt" -> 2 tokens
         # SUCCESS_CONTENT -> 15 tokens
         mock_encoder.encode.side_effect = lambda text: list(range(2)) if text == PROMPT_TEXT else list(range(15))
         mock_get_encoding.return_value = mock_encoder
-        yield GenAPIProvider(api_key="test_key")
+        yield
 
 
-# --- Helper Functions ---
-def mock_response(status_code=200, json_content=None, text_content=""):
-    """Хелпер для создания мока ответа requests."""
-    mock_res = MagicMock()
-    if status_code >= 400:
-        mock_res.raise_for_status.side_effect = requests.exceptions.HTTPError(f"Error {status_code}", response=mock_res)
-    else:
-        mock_res.raise_for_status.return_value = None
-    mock_res.status_code = status_code
-    mock_res.json.return_value = json_content
-    mock_res.text = text_content if json_content is None else json.dumps(json_content)
-    return mock_res
-
 # --- Tests ---
 
-@patch('time.sleep', return_value=None)
-@patch('requests.get')
-@patch('requests.post')
-def test_get_completion_success_flow(mock_post, mock_get, mock_sleep, provider):
+async def test_get_completion_success_flow():
     """
     Тест полного успешного сценария:
     1. POST запрос для создания задачи -> request_id
     2. Первый GET запрос -> status: processing
     3. Второй GET запрос -> status: success с результатом.
     """
-    mock_post.return_value = mock_response(200, {"request_id": REQUEST_ID})
-    mock_get.side_effect = [
-        mock_response(200, {"status": "processing"}),
-        mock_response(200, {
-            "status": "success",
-            "cost": 0.0015,
-            "full_response": [{"message": {"content": SUCCESS_CONTENT}}]
-        })
-    ]
-
-    result = provider._get_completion(PROMPT_TEXT)
-
-    assert mock_post.call_count == 1
-    assert mock_get.call_count == 2
+    fake = FakeGenAPI(
+        post_response={"request_id": REQUEST_ID},
+        get_responses=[
+            {"status": "processing"},
+            {
+                "status": "success",
+                "cost": 0.0015,
+                "full_response": [{"message": {"content": SUCCESS_CONTENT}}]
+            },
+        ],
+    )
+    provider = make_provider(fake)
+
+    result = await provider._get_completion(PROMPT_TEXT)
+
+    assert len(fake.post_calls) == 1
+    assert len(fake.get_calls) == 2
     expected_get_url = provider.RESULT_URL.format(request_id=REQUEST_ID)
-    mock_get.assert_has_calls([call(expected_get_url, headers=provider.headers)] * 2)
+    assert all(str(request.url) == expected_get_url for request in fake.get_calls)
+    assert all(request.headers["Authorization"] == "Bearer test_key" for request in fake.get_calls)
 
     assert result["text"] == SUCCESS_CONTENT
     assert result["usage"]["cost"] == 0.0015
@@ -72,19 +95,20 @@ def test_get_completion_success_flow(mock_post, mock_get, mock_sleep, provider):
     assert result["usage"]["completion_tokens"] == 15
     assert result["usage"]["total_tokens"] == 17
 
-@patch('time.sleep', return_value=None)
-@patch('requests.get')
-@patch('requests.post')
-def test_get_completion_failed_status(mock_post, mock_get, mock_sleep, provider):
-    """Тест сценария, когда задача завершается со статусом 'failed'."""
-    mock_post.return_value = mock_response(200, {"request_id": REQUEST_ID})
-    mock_get.return_value = mock_response(200, {
-        "status": "failed",
-        "cost": 0.0001,
-        "error_message": "Something went wrong"
-    })
 
-    result = provider._get_completion(PROMPT_TEXT)
+async def test_get_completion_failed_status():
+    """Тест сценария, когда задача завершается со статусом 'failed'."""
+    fake = FakeGenAPI(
+        post_response={"request_id": REQUEST_ID},
+        get_responses={
+            "status": "failed",
+            "cost": 0.0001,
+            "error_message": "Something went wrong"
+        },
+    )
+    provider = make_provider(fake)
+
+    result = await provider._get_completion(PROMPT_TEXT)
 
     assert result["text"] is None
     assert result["usage"]["cost"] == 0.0001
@@ -92,61 +116,62 @@ def test_get_completion_failed_status(mock_post, mock_get, mock_sleep, provider)
     assert result["usage"]["completion_tokens"] == 0
     assert result["usage"]["total_tokens"] == 2
 
-@patch('time.sleep', return_value=None)
-@patch('requests.get')
-@patch('requests.post')
-def test_get_completion_polling_timeout(mock_post, mock_get, mock_sleep, provider):
+
+async def test_get_completion_polling_timeout():
     """Тест сценария, когда превышено максимальное количество попыток опроса."""
-    mock_post.return_value = mock_response(200, {"request_id": REQUEST_ID})
-    mock_get.return_value = mock_response(200, {"status": "processing"})
+    fake = FakeGenAPI(post_response={"request_id": REQUEST_ID}, get_responses={"status": "processing"})
+    provider = make_provider(fake)
 
-    result = provider._get_completion(PROMPT_TEXT)
+    result = await provider._get_completion(PROMPT_TEXT)
 
-    assert mock_get.call_count == provider.MAX_POLLING_ATTEMPTS
+    assert len(fake.get_calls) == provider.MAX_POLLING_ATTEMPTS
     assert result["text"] is None
     assert result["usage"]["cost"] == 0.0
     assert result["usage"]["prompt_tokens"] == 2
     assert result["usage"]["total_tokens"] == 2
 
-@patch('requests.post')
-def test_get_completion_initial_post_fails(mock_post, provider):
+
+async def test_get_completion_initial_post_fails():
     """Тест сценария, когда первоначальный POST запрос падает."""
-    mock_post.side_effect = requests.exceptions.RequestException("Network Error")
+    fake = FakeGenAPI(post_response=httpx.ConnectError("Network Error"))
+    provider = make_provider(fake)
 
-    result = provider._get_completion(PROMPT_TEXT)
+    result = await provider._get_completion(PROMPT_TEXT)
 
     assert result["text"] is None
     assert result["usage"]["cost"] == 0.0
     assert result["usage"]["prompt_tokens"] == 2
     assert result["usage"]["total_tokens"] == 2
 
-@patch('time.sleep', return_value=None)
-@patch('requests.get')
-@patch('requests.post')
-def test_get_completion_polling_get_fails(mock_post, mock_get, mock_sleep, provider):
+
+async def test_get_completion_polling_get_fails():
     """Тест сценария, когда GET запрос при опросе падает."""
-    mock_post.return_value = mock_response(200, {"request_id": REQUEST_ID})
-    mock_get.side_effect = requests.exceptions.RequestException("Network Error")
+    fake = FakeGenAPI(
+        post_response={"request_id": REQUEST_ID},
+        get_responses=httpx.ConnectError("Network Error"),
+    )
+    provider = make_provider(fake)
 
-    result = provider._get_completion(PROMPT_TEXT)
+    result = await provider._get_completion(PROMPT_TEXT)
 
     assert result["text"] is None
     assert result["usage"]["cost"] == 0.0
     assert result["usage"]["prompt_tokens"] == 2
     assert result["usage"]["total_tokens"] == 2
 
-@patch('time.sleep', return_value=None)
-@patch('requests.get')
-@patch('requests.post')
-def test_get_completion_bad_success_response(mock_post, mock_get, mock_sleep, provider):
+
+async def test_get_completion_bad_success_response():
     """Тест, когда статус 'success', но структура ответа некорректна."""
-    mock_post.return_value = mock_response(200, {"request_id": REQUEST_ID})
-    mock_get.return_value = mock_response(200, {
-        "status": "success",
-        "full_response": [{"message": {"wrong_key": "no content here"}}]
-    })
+    fake = FakeGenAPI(
+        post_response={"request_id": REQUEST_ID},
+        get_responses={
+            "status": "success",
+            "full_response": [{"message": {"wrong_key": "no content here"}}]
+        },
+    )
+    provider = make_provider(fake)
 
-    result = provider._get_completion(PROMPT_TEXT)
+    result = await provider._get_completion(PROMPT_TEXT)
 
     assert result["text"] is None
     assert result["usage"]["cost"] == 0.0
@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+import pytest
+
+from ai import prompts, token_budget
+from ai.client import AIClient
+
+
+class RecordingProvider:
+    """Провайдер, записывающий промпты; извлечение фактов занимает фиксированное время."""
+
+    model = "recording"
+
+    def __init__(self, delay: float = 0.05, failing_part: int | None = None):
+        self.delay = delay
+        self.failing_part = failing_part
+        self.calls = []
+
+    async def analyze(self, prompt_template, is_json=False, **kwargs):
+        self.calls.append((prompt_template, kwargs))
+        usage = {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12, "cost": 0.001}
+        if prompt_template in prompts.EXTRACT_FACTS_PROMPTS.values():
+            await asyncio.sleep(self.delay)
+            number = int(kwargs["text"].split()[1])
+            if number == self.failing_part:
+                return {"text": None, "json": None, "error": "boom", "usage": {}}
+            return {"text": f"- факт из части {number}", "json": None, "usage": usage}
+        return {"text": "итог", "json": None, "usage": usage}
+
+
+@pytest.fixture
+def small_budget(monkeypatch):
+    """Лимиты в символах: документ — 200, часть — 60."""
+    monkeypatch.setattr(token_budget, "get_encoder", lambda: None)
+    monkeypatch.setattr(token_budget, "CHARS_PER_TOKEN", 1)
+    monkeypatch.setitem(token_budget.INPUT_TOKEN_CAPS, "analysis", {"resume_text": 200, "vacancy_text": 200})
+    monkeypatch.setitem(token_budget.INPUT_TOKEN_CAPS, "extract_facts", {"text": 100})
+    monkeypatch.setattr("ai.client.AI_CHUNK_TOKENS", 60)
+
+
+@pytest.fixture
+def make_client(monkeypatch):
+    """Создает клиента поверх переданного провайдера."""
+    def factory(provider) -> AIClient:
+        monkeypatch.setattr("ai.client.AIProvider", lambda: provider)
+        return AIClient()
+    return factory
+
+
+def long_resume(sections: int) -> str:
+    return "\n".join(f"Проект {i}:\n" + f"Описание проекта номер {i} с деталями" for i in range(sections))
+
+
+async def test_short_documents_skip_map_step(small_budget, make_client):
+    provider = RecordingProvider()
+
+    response = await make_client(provider).analyze_match("короткое резюме", "короткая вакансия")
+
+    assert response["text"] == "итог"
+    assert len(provider.calls) == 1
+
+
+async def test_long_document_is_mapped_concurrently_and_reduced(small_budget, make_client):
+    """Части длинного резюме обрабатываются одновременно, итоговый промпт получает объединенные факты."""
+    provider = RecordingProvider(delay=0.1)
+    resume = long_resume(8)
+
+    started = time.monotonic()
+    response = await make_client(provider).analyze_match(resume, "короткая вакансия")
+    elapsed = time.monotonic() - started
+
+    extract_calls = [kwargs for template, kwargs in provider.calls if template == prompts.EXTRACT_RESUME_FACTS_PROMPT]
+    parts = len(extract_calls)
+    assert parts > 2
+    assert elapsed < 0.1 * parts
+    assert all(len(kwargs["text"]) <= 100 for kwargs in extract_calls)
+
+    final_template, final_kwargs = provider.calls[-1]
+    assert final_template == prompts.ANALYZE_MATCH_PROMPT
+    assert final_kwargs["resume_text"] == "\n".join(f"- факт из части {i}" for i in range(1, parts + 1))
+    assert final_kwargs["vacancy_text"] == "короткая вакансия"
+    assert response["usage"]["total_tokens"] == 12 * (parts + 1)
+
+
+async def test_failed_chunk_falls_back_to_its_text(small_budget, make_client):
+    provider = RecordingProvider(delay=0, failing_part=1)
+
+    await make_client(provider).analyze_match(long_resume(12), "короткая вакансия")
+
+    final_resume = provider.calls[-1][1]["resume_text"]
+    assert final_resume.startswith("Проект 0:")
+    assert "- факт из части 2" in final_resume
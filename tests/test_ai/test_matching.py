@@ -0,0 +1,58 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+from ai.matching import VectorCache, extract_skills, score_batch, to_percent, vectorize
+
+CORPUS_PATH = Path(__file__).resolve().parent.parent / "fixtures" / "classifier_corpus.jsonl"
+
+
+def _corpus(label: str) -> list[str]:
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        return [item["text"] for item in map(json.loads, f) if item["label"] == label]
+
+
+def test_extract_skills_keeps_technologies():
+    skills = extract_skills("Опыт с Python, Django и C++. Знание Node.js, PostgreSQL. Experience with Kafka.")
+
+    assert skills == {"python", "django", "c++", "node.js", "postgresql", "kafka"}
+
+
+def test_resume_ranks_matching_vacancy_first():
+    """Резюме Python-разработчика ближе всего к вакансии Python-разработчика."""
+    python_resume = _corpus("resume")[0]
+    vacancies = _corpus("vacancy")
+
+    scores = score_batch(vectorize(python_resume), [vectorize(text) for text in vacancies])
+
+    assert scores.shape == (len(vacancies),)
+    assert vacancies[int(np.argmax(scores))].startswith("Senior Python-разработчик")
+    assert np.all((scores >= 0) & (scores <= 1))
+
+
+def test_identical_documents_score_highest():
+    vacancy = _corpus("vacancy")[0]
+    other = _corpus("vacancy")[3]
+
+    scores = score_batch(vectorize(vacancy), [vectorize(vacancy), vectorize(other)])
+
+    assert to_percent(scores[0]) == 100
+    assert scores[1] < scores[0]
+
+
+def test_score_batch_without_vacancies():
+    assert score_batch(vectorize("Python"), []).shape == (0,)
+
+
+def test_vector_cache_reuses_vectors_by_content_hash():
+    cache = VectorCache(max_entries=2)
+
+    first = cache.get("Python developer")
+    assert cache.get("Python developer") is first
+    # Измененный текст получает новый вектор
+    assert cache.get("Python developer, Django") is not first
+
+    cache.get("Go developer")
+    assert len(cache) == 2
+    assert cache.get("Python developer") is not first
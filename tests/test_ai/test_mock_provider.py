@@ -37,12 +37,12 @@ test_cases = [
 ]
 
 @pytest.mark.parametrize("prompt, expected_response_part, description", test_cases)
-def test_mock_provider_responses(prompt, expected_response_part, description):
+async def test_mock_provider_responses(prompt, expected_response_part, description):
     """
     Тестирует, что мок-провайдер возвращает ожидаемые ответы для разных промптов.
     """
     provider = MockProvider()
-    response = provider._get_completion(prompt)
+    response = await provider._get_completion(prompt)
 
     # Для JSON-ответов проверяем точное совпадение, для остальных - вхождение подстроки.
     if expected_response_part.startswith('{'):
@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import json
 
 from ai.providers.openrouter import OpenRouterProvider, MODEL_NAME
@@ -13,8 +13,9 @@ PROMPT_TEXT = "some prompt"
 @pytest.fixture
 def provider():
     """Фикстура для создания экземпляра OpenRouterProvider с тестовым ключом."""
-    with patch('ai.providers.openrouter.OpenAI') as mock_openai:
+    with patch('ai.providers.openrouter.AsyncOpenAI') as mock_openai:
         mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock()
         mock_openai.return_value = mock_client
         yield OpenRouterProvider(api_key="test_key")
 
@@ -37,70 +38,70 @@ def mock_completion(content: str):
 
 # --- Tests ---
 
-def test_get_completion_json_clean(provider):
+async def test_get_completion_json_clean(provider):
     """Тест для чистого JSON ответа."""
     provider.client.chat.completions.create.return_value = mock_completion(SUCCESS_JSON_STRING)
 
-    result = provider._get_completion(PROMPT_TEXT, is_json=True)
+    result = await provider._get_completion(PROMPT_TEXT, is_json=True)
 
     assert result["json"] == SUCCESS_JSON_CONTENT
     assert result["text"] is None
     provider.client.chat.completions.create.assert_called_once()
 
-def test_get_completion_json_with_backticks(provider):
+async def test_get_completion_json_with_backticks(provider):
     """Тест для JSON, обернутого в ```...```."""
     formatted_json = f"```{SUCCESS_JSON_STRING}```"
     provider.client.chat.completions.create.return_value = mock_completion(formatted_json)
 
-    result = provider._get_completion(PROMPT_TEXT, is_json=True)
+    result = await provider._get_completion(PROMPT_TEXT, is_json=True)
 
     assert result["json"] == SUCCESS_JSON_CONTENT
     assert result["text"] is None
 
-def test_get_completion_json_with_json_prefix_and_backticks(provider):
+async def test_get_completion_json_with_json_prefix_and_backticks(provider):
     """Тест для JSON, обернутого в ```json...```."""
     formatted_json = f"```json\n{SUCCESS_JSON_STRING}\n```"
     provider.client.chat.completions.create.return_value = mock_completion(formatted_json)
 
-    result = provider._get_completion(PROMPT_TEXT, is_json=True)
+    result = await provider._get_completion(PROMPT_TEXT, is_json=True)
 
     assert result["json"] == SUCCESS_JSON_CONTENT
     assert result["text"] is None
 
-def test_get_completion_empty_response(provider):
+async def test_get_completion_empty_response(provider):
     """Тест для пустого ответа от API."""
     provider.client.chat.completions.create.return_value = mock_completion("")
 
-    result = provider._get_completion(PROMPT_TEXT, is_json=True)
+    result = await provider._get_completion(PROMPT_TEXT, is_json=True)
 
     assert result["json"] is None
     assert "API returned an empty response content." in result["text"]
 
-def test_get_completion_invalid_json(provider):
+async def test_get_completion_invalid_json(provider):
     """Тест для невалидного JSON."""
     provider.client.chat.completions.create.return_value = mock_completion("not a json")
 
-    result = provider._get_completion(PROMPT_TEXT, is_json=True)
+    result = await provider._get_completion(PROMPT_TEXT, is_json=True)
 
     assert result["json"] is None
     assert "Expecting value" in result["text"]
 
-def test_get_completion_non_json_request(provider):
+async def test_get_completion_non_json_request(provider):
     """Тест для обычного текстового запроса."""
     text_content = "This is a simple text response."
     provider.client.chat.completions.create.return_value = mock_completion(text_content)
 
-    result = provider._get_completion(PROMPT_TEXT, is_json=False)
+    result = await provider._get_completion(PROMPT_TEXT, is_json=False)
 
     assert result["text"] == text_content
     assert result["json"] is None
 
-def test_get_completion_api_error(provider):
+async def test_get_completion_api_error(provider):
     """Тест на случай ошибки при вызове API."""
     error_message = "API Key is invalid"
     provider.client.chat.completions.create.side_effect = Exception(error_message)
 
-    result = provider._get_completion(PROMPT_TEXT, is_json=True)
+    result = await provider._get_completion(PROMPT_TEXT, is_json=True)
 
     assert result["json"] is None
     assert f"Error from OpenRouter: {error_message}" in result["text"]
@@ -111,3 +112,32 @@ def test_init_no_api_key():
     with patch('ai.providers.openrouter.OPENROUTER_API_KEY', None):
         with pytest.raises(ValueError, match="OpenRouter API key is required."):
             OpenRouterProvider(api_key=None)
+
+async def test_get_completion_streaming(provider):
+    """Тест потокового ответа: фрагменты передаются в on_delta, usage берется из последнего чанка."""
+    def chunk(content=None, usage=None):
+        mock_chunk = MagicMock()
+        if content is None:
+            mock_chunk.choices = []
+        else:
+            mock_chunk.choices = [MagicMock()]
+            mock_chunk.choices[0].delta.content = content
+        mock_chunk.usage = usage
+        return mock_chunk
+
+    async def stream():
+        for part in ['{"key": ', '"val', 'ue"}']:
+            yield chunk(part)
+        yield chunk(usage=MagicMock(prompt_tokens=5, completion_tokens=3, total_tokens=8))
+
+    provider.client.chat.completions.create.return_value = stream()
+    deltas = []
+
+    result = await provider.analyze_stream("{text}", deltas.append, is_json=True, text=PROMPT_TEXT)
+
+    assert deltas == ['{"key": ', '"val', 'ue"}']
+    assert result["json"] == SUCCESS_JSON_CONTENT
+    assert result["usage"]["total_tokens"] == 8
+    call_kwargs = provider.client.chat.completions.create.call_args.kwargs
+    assert call_kwargs["stream"] is True
+    assert call_kwargs["stream_options"] == {"include_usage": True}
@@ -0,0 +1,62 @@
+import pytest
+
+from ai import prompts
+from ai.providers.openai import OpenAIProvider
+from tests.fakes.openai_server import FakeOpenAIServer
+
+
+def test_build_messages_puts_instructions_resume_and_vacancy_in_order():
+    """Инструкции идут системным сообщением, затем резюме, затем вакансия."""
+    messages = prompts.build_messages(
+        prompts.CONSOLIDATED_ANALYSIS_PROMPT, resume_text="Текст резюме", vacancy_text="Текст вакансии"
+    )
+
+    assert [message["role"] for message in messages] == ["system", "user", "user"]
+    assert "{" not in messages[0]["content"].replace("{{", "")
+    assert "Текст резюме" not in messages[0]["content"]
+    assert messages[1]["content"] == "РЕЗЮМЕ:\n---\nТекст резюме\n---"
+    assert messages[2]["content"] == "ВАКАНСИЯ:\n+++\nТекст вакансии\n+++"
+
+
+def test_build_messages_moves_variable_fields_last():
+    """Вакансия попадает в конец, даже если в шаблоне она идет раньше резюме."""
+    template = "Инструкция.\n\nВАКАНСИЯ:\n{vacancy_text}\n\nРЕЗЮМЕ:\n{resume_text}\n"
+
+    messages = prompts.build_messages(template, resume_text="R", vacancy_text="V")
+
+    assert messages == [
+        {"role": "system", "content": "Инструкция."},
+        {"role": "user", "content": "РЕЗЮМЕ:\nR"},
+        {"role": "user", "content": "ВАКАНСИЯ:\nV"},
+    ]
+
+
+def test_build_messages_without_instructions_or_fields():
+    assert prompts.build_messages("{text}", text="T") == [{"role": "user", "content": "T"}]
+    assert prompts.build_messages("Просто текст") == [{"role": "user", "content": "Просто текст"}]
+
+
+@pytest.mark.parametrize("section", list(prompts.SECTION_PROMPTS))
+def test_section_prompts_keep_full_text(section):
+    """Сообщения содержат весь текст промпта — меняется только порядок и разбиение."""
+    template = prompts.SECTION_PROMPTS[section]
+    messages = prompts.build_messages(template, resume_text="R", vacancy_text="V")
+    joined = "".join(message["content"] for message in messages)
+
+    assert "".join(template.format(resume_text="R", vacancy_text="V").split()) == "".join(joined.split())
+
+
+async def test_shared_resume_prefix_is_reported_as_cached():
+    """Повторный анализ того же резюме с другой вакансией использует кэш префикса провайдера."""
+    resume = "Опыт работы: Python, PostgreSQL, Kubernetes. " * 50
+    with FakeOpenAIServer(content="OK") as server:
+        provider = OpenAIProvider(api_key="test", base_url=server.base_url, max_retries=0)
+
+        first = await provider.analyze(prompts.ANALYZE_MATCH_PROMPT, resume_text=resume, vacancy_text="Вакансия 1")
+        second = await provider.analyze(prompts.ANALYZE_MATCH_PROMPT, resume_text=resume, vacancy_text="Вакансия 2")
+
+    assert first["usage"]["cached_prompt_tokens"] == 0
+    system, resume_message, _ = server.payloads[1]["messages"]
+    expected = (len(system["content"]) + len(resume_message["content"])) // 4
+    assert abs(second["usage"]["cached_prompt_tokens"] - expected) <= 1
+    assert second["usage"]["cached_prompt_tokens"] < second["usage"]["prompt_tokens"]
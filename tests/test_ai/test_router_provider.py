@@ -0,0 +1,192 @@
+import time
+
+import pytest
+
+from ai.providers.openai import OpenAIProvider
+from ai.providers.openrouter import OpenRouterProvider
+from ai.providers.router import BackendHealth, RouterProvider, request_kind
+from config import AI_ROUTER_CACHE_ID
+from tests.fakes.openai_server import FakeOpenAIServer
+
+PROMPT = "Проверь: {text}"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_router(servers: dict, **kwargs) -> RouterProvider:
+    """Создает маршрутизатор над фейковыми серверами, по одному бэкенду на сервер."""
+    providers = {
+        name: OpenAIProvider(api_key="test", base_url=server.base_url, max_retries=0)
+        for name, server in servers.items()
+    }
+    return RouterProvider(providers=providers, **kwargs)
+
+
+def warm_up(router: RouterProvider, name: str, latency: float, kind: str = request_kind("analyze", PROMPT)) -> None:
+    """Накапливает статистику задержек бэкенда для запросов вида kind."""
+    backend = next(b for b in router.backends if b.name == name)
+    for _ in range(10):
+        backend.health.record_success(latency, kind)
+
+
+def test_backend_health_ejects_and_readmits():
+    """Бэкенд исключается после серии ошибок и возвращается по истечении срока."""
+    clock = FakeClock()
+    health = BackendHealth(ejection_seconds=10, max_consecutive_failures=3, clock=clock)
+
+    health.record_failure()
+    health.record_failure()
+    assert health.available
+    health.record_failure()
+    assert not health.available
+
+    clock.now = 10
+    assert health.available
+    # Первая же ошибка после возвращения исключает бэкенд на удвоенный срок
+    health.record_failure()
+    assert not health.available
+    assert health.ejected_until == 30
+
+    clock.now = 30
+    health.record_success(0.1)
+    health.record_failure()
+    assert health.available
+
+
+def test_backend_health_percentiles_use_default_until_enough_samples():
+    """До накопления статистики p95 равна задержке по умолчанию."""
+    health = BackendHealth(min_samples=5, default_latency=7.0)
+    for latency in (0.1, 0.2, 0.3, 0.4):
+        health.record_success(latency)
+    assert health.p95 == 7.0
+
+    health.record_success(0.5)
+    assert health.p95 == 0.5
+    assert health.percentile(0.5) == 0.3
+
+
+def test_hedge_delay_is_tracked_per_request_kind():
+    """Задержка дублирования считается по своему виду запросов и не задается до накопления статистики."""
+    health = BackendHealth(min_samples=3)
+    for _ in range(3):
+        health.record_success(0.2, "verify")
+        health.record_success(30.0, "analysis")
+
+    assert health.hedge_delay("verify") == 0.2
+    assert health.hedge_delay("analysis") == 30.0
+    assert health.hedge_delay("section") is None
+
+
+async def test_router_fails_over_to_healthy_backend():
+    """Ошибка первого бэкенда не видна пользователю: отвечает следующий."""
+    with FakeOpenAIServer(content="primary", failure_rate=1.0) as broken, \
+            FakeOpenAIServer(content="secondary") as healthy:
+        router = make_router({"broken": broken, "healthy": healthy})
+
+        response = await router.verify_text("текст", PROMPT)
+
+        assert response["text"] == "secondary"
+        assert "error" not in response
+        assert broken.requests == 1
+        assert router.backends[0].health.error_rate == 1.0
+
+
+async def test_router_hedges_slow_backend():
+    """Если бэкенд не ответил за свою p95, запрос дублируется на второй бэкенд."""
+    with FakeOpenAIServer(content="slow", latency=1.5) as slow, FakeOpenAIServer(content="fast") as fast:
+        router = make_router({"slow": slow, "fast": fast}, hedge_min_delay=0.1)
+        warm_up(router, "slow", 0.01)
+        warm_up(router, "fast", 0.05)
+        assert router.ranked_backends()[0].name == "slow"
+
+        started = time.monotonic()
+        response = await router.analyze(PROMPT, text="текст")
+
+        assert response["text"] == "fast"
+        assert time.monotonic() - started < 1.0
+        assert router.hedged_requests == 1
+        assert slow.requests == 1 and fast.requests == 1
+
+
+async def test_router_does_not_hedge_without_stats_for_request_kind():
+    """Статистика других видов запросов не используется: без своей статистики запрос не дублируется."""
+    with FakeOpenAIServer(content="slow", latency=0.3) as slow, FakeOpenAIServer(content="fast") as fast:
+        router = make_router({"slow": slow, "fast": fast}, hedge_min_delay=0.1)
+        for name, latency in (("slow", 0.01), ("fast", 0.05)):
+            warm_up(router, name, latency, kind=request_kind("verify_text", PROMPT))
+
+        response = await router.analyze(PROMPT, text="текст")
+
+        assert response["text"] == "slow"
+        assert router.hedged_requests == 0
+        assert fast.requests == 0
+
+
+async def test_router_ejects_failing_backend_and_readmits_it():
+    """Исключенный бэкенд не получает запросов, пока не истечет срок исключения."""
+    clock = FakeClock()
+    with FakeOpenAIServer(content="flaky", failure_rate=1.0) as flaky, FakeOpenAIServer(content="stable") as stable:
+        router = make_router({"flaky": flaky, "stable": stable}, ejection_seconds=60, clock=clock)
+        warm_up(router, "flaky", 0.0)
+
+        for _ in range(3):
+            assert (await router.verify_text("текст", PROMPT))["text"] == "stable"
+        assert flaky.requests == 3
+
+        for _ in range(5):
+            await router.verify_text("текст", PROMPT)
+        assert flaky.requests == 3
+
+        flaky.failure_rate = 0.0
+        clock.now = 61
+        response = await router.verify_text("текст", PROMPT)
+        assert response["text"] == "flaky"
+        assert flaky.requests == 4
+
+
+async def test_router_stream_fails_over_before_first_delta():
+    """Потоковый запрос переходит к другому бэкенду, если первый упал до начала вывода."""
+    with FakeOpenAIServer(failure_rate=1.0) as broken, FakeOpenAIServer(content="потоковый ответ") as healthy:
+        router = make_router({"broken": broken, "healthy": healthy})
+        deltas = []
+
+        response = await router.analyze_stream(PROMPT, deltas.append, text="текст")
+
+        assert response["text"] == "потоковый ответ"
+        assert "".join(deltas) == "потоковый ответ"
+        assert broken.requests == 1
+
+
+async def test_router_returns_last_error_when_all_backends_fail():
+    """Если не ответил ни один бэкенд, возвращается ответ с ошибкой."""
+    with FakeOpenAIServer(failure_rate=1.0) as first, FakeOpenAIServer(failure_rate=1.0) as second:
+        router = make_router({"first": first, "second": second})
+
+        response = await router.verify_text("текст", PROMPT)
+
+        assert "error" in response
+        assert first.requests == 1 and second.requests == 1
+
+
+def test_router_requires_backends():
+    """Без настроенных бэкендов маршрутизатор не создается."""
+    with pytest.raises(ValueError):
+        RouterProvider(providers={})
+
+
+def test_router_model_does_not_depend_on_backends():
+    """Имя модели маршрутизатора в ключе кэша не меняется при смене списка бэкендов."""
+    both = RouterProvider(providers={
+        "openrouter": OpenRouterProvider(api_key="test"),
+        "openai": OpenAIProvider(api_key="test", model="gpt-test"),
+    })
+    single = RouterProvider(providers={"openai": OpenAIProvider(api_key="test", model="gpt-other")})
+
+    assert both.model == single.model == AI_ROUTER_CACHE_ID
+    assert RouterProvider(providers={"openai": OpenAIProvider(api_key="test")}, cache_id="router-v2").model == "router-v2"
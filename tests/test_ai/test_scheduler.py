@@ -0,0 +1,169 @@
+import asyncio
+import time
+
+import pytest
+
+from ai.providers.mock import MockProvider
+from ai.scheduler import (
+    Priority, RequestScheduler, ScheduledProvider, TokenBucket, current_priority, request_priority,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def response(total_tokens: int = 0) -> dict:
+    return {"text": "ok", "json": None, "usage": {"total_tokens": total_tokens}}
+
+
+def test_token_bucket_refills_over_time():
+    """Корзина пополняется равномерно и не превышает емкость."""
+    clock = FakeClock()
+    bucket = TokenBucket(per_minute=60, clock=clock)
+
+    bucket.consume(60)
+    assert bucket.delay_for(1) == pytest.approx(1.0)
+
+    clock.now = 30
+    assert bucket.available() == pytest.approx(30)
+    clock.now = 1000
+    assert bucket.available() == 60
+
+
+async def test_scheduler_limits_concurrency():
+    """Одновременно выполняется не больше max_concurrency запросов."""
+    scheduler = RequestScheduler("test", max_concurrency=2)
+    running = 0
+    peak = 0
+
+    async def request():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        return response()
+
+    await asyncio.gather(*(scheduler.run(request, Priority.ANALYSIS, 10) for _ in range(8)))
+
+    assert peak == 2
+    assert scheduler.active == 0
+    assert scheduler.queue_depth == 0
+
+
+async def test_scheduler_serves_analyses_before_verification():
+    """Из очереди первыми выходят запросы с более высоким приоритетом."""
+    scheduler = RequestScheduler("test", max_concurrency=1)
+    release = asyncio.Event()
+    order = []
+
+    async def blocker():
+        await release.wait()
+        return response()
+
+    def make_request(label):
+        async def request():
+            order.append(label)
+            return response()
+        return request
+
+    first = asyncio.create_task(scheduler.run(blocker, Priority.ANALYSIS, 10))
+    await asyncio.sleep(0)
+    queued = [
+        asyncio.create_task(scheduler.run(make_request("verify-1"), Priority.VERIFICATION, 10)),
+        asyncio.create_task(scheduler.run(make_request("analysis"), Priority.ANALYSIS, 10)),
+        asyncio.create_task(scheduler.run(make_request("verify-2"), Priority.VERIFICATION, 10)),
+    ]
+    await asyncio.sleep(0)
+
+    assert scheduler.queue_depth == 3
+    assert scheduler.status(Priority.ANALYSIS).depth == 1
+    assert scheduler.status(Priority.VERIFICATION).depth == 3
+    assert scheduler.status(Priority.VERIFICATION).estimated_wait > scheduler.status(Priority.ANALYSIS).estimated_wait
+
+    release.set()
+    await asyncio.gather(first, *queued)
+    assert order == ["analysis", "verify-1", "verify-2"]
+
+
+async def test_scheduler_waits_for_request_rate_limit():
+    """При исчерпанном лимите запросов в минуту запрос ждет пополнения корзины."""
+    scheduler = RequestScheduler("test", requests_per_minute=600)
+    scheduler._requests.tokens = 0
+
+    async def request():
+        return response()
+
+    started = time.monotonic()
+    task = asyncio.create_task(scheduler.run(request, Priority.ANALYSIS, 10))
+    await asyncio.sleep(0)
+    assert scheduler.queue_depth == 1
+    assert scheduler.status().estimated_wait > 0
+
+    await task
+    assert time.monotonic() - started >= 0.09
+
+
+async def test_scheduler_reconciles_token_estimate_with_actual_usage():
+    """После ответа оценка токенов заменяется фактическим расходом."""
+    scheduler = RequestScheduler("test", tokens_per_minute=10_000)
+
+    async def request():
+        return response(total_tokens=300)
+
+    await scheduler.run(request, Priority.ANALYSIS, 2_000)
+
+    assert scheduler._tokens.available() == pytest.approx(10_000 - 300, abs=5)
+
+
+async def test_cancelled_request_leaves_queue_and_frees_slot():
+    """Отмененный запрос не занимает место в очереди и не блокирует следующие."""
+    scheduler = RequestScheduler("test", max_concurrency=1)
+    release = asyncio.Event()
+
+    async def blocker():
+        await release.wait()
+        return response()
+
+    async def request():
+        return response()
+
+    first = asyncio.create_task(scheduler.run(blocker, Priority.ANALYSIS, 10))
+    await asyncio.sleep(0)
+    cancelled = asyncio.create_task(scheduler.run(request, Priority.ANALYSIS, 10))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    assert scheduler.queue_depth == 0
+
+    release.set()
+    await first
+    assert await scheduler.run(request, Priority.ANALYSIS, 10) == response()
+    assert scheduler.active == 0
+
+
+async def test_scheduled_provider_takes_priority_from_context():
+    """Обертка провайдера ставит запросы в очередь с приоритетом из контекста."""
+    scheduler = RequestScheduler("mock", max_concurrency=1)
+    provider = ScheduledProvider(MockProvider(), scheduler)
+    seen = []
+    original_run = scheduler.run
+
+    async def tracking_run(request, priority, estimated_tokens):
+        seen.append(priority)
+        return await original_run(request, priority, estimated_tokens)
+
+    scheduler.run = tracking_run
+
+    with request_priority(Priority.VERIFICATION):
+        assert current_priority() == Priority.VERIFICATION
+        await provider.verify_text("text", "{text}")
+    await provider.analyze("{resume_text}", resume_text="resume")
+
+    assert seen == [Priority.VERIFICATION, Priority.ANALYSIS]
+    assert provider.model == MockProvider.model
@@ -0,0 +1,65 @@
+import json
+import pytest
+
+from ai.client import AIClient
+from ai.providers.mock import MockProvider
+from ai.streaming import JSONSectionParser, extract_partial_json_string
+
+
+@pytest.fixture(autouse=True)
+def mock_ai_provider(monkeypatch):
+    """Заменяет AIProvider на MockProvider."""
+    monkeypatch.setattr("ai.client.AIProvider", MockProvider)
+
+
+def test_extract_partial_value_of_unfinished_json():
+    """Возвращается уже сгенерированная часть строкового значения ключа."""
+    buffer = '{"match_analysis": "Готово", "cover_letter": "Уважаемый\\nработода'
+
+    assert extract_partial_json_string(buffer, "match_analysis") == "Готово"
+    assert extract_partial_json_string(buffer, "cover_letter") == "Уважаемый\nработода"
+    assert extract_partial_json_string(buffer, "hr_call_plan") is None
+
+
+def test_extract_partial_value_handles_incomplete_escapes():
+    """Незавершенная escape-последовательность в конце буфера не выводится."""
+    assert extract_partial_json_string('{"a": "x\\', "a") == "x"
+    assert extract_partial_json_string('{"a": "x\\u04', "a") == "x"
+    assert extract_partial_json_string('{"a": "x\\u0416\\"', "a") == 'xЖ"'
+
+
+def test_section_parser_emits_sections_as_they_close():
+    """Каждый раздел возвращается из feed в том фрагменте, где закрылось его значение."""
+    parser = JSONSectionParser()
+
+    assert parser.feed('```json\n{"match_analysis": "Готово", "cover') == [("match_analysis", "Готово")]
+    assert parser.feed('_letter": "Уважаемый\\nработода') == []
+    assert parser.partial("cover_letter") == "Уважаемый\nработода"
+    assert parser.feed('тель \\ud83d\\ude00", "score": 8') == [("cover_letter", "Уважаемый\nработодатель \U0001f600")]
+    assert parser.feed(', "tags": ["a", "]"]}\n```') == [("score", "8"), ("tags", '["a", "]"]')]
+    assert parser.done
+    assert parser.partial("match_analysis") == "Готово"
+    assert parser.partial("hr_call_plan") is None
+
+
+def test_section_parser_matches_json_loads_for_any_split():
+    """Результат не зависит от того, как ответ разбит на фрагменты."""
+    data = {"match_analysis": 'Кавычки " и \\ слэш', "cover_letter": "Строка\nЖ\u00e9"}
+    text = json.dumps(data)
+    for size in (1, 2, 3, 7):
+        parser = JSONSectionParser()
+        for i in range(0, len(text), size):
+            parser.feed(text[i:i + size])
+        assert parser.sections == data
+
+
+async def test_client_streams_consolidated_analysis():
+    """Фрагменты потокового ответа складываются в тот же JSON, что и итоговый ответ."""
+    client = AIClient()
+    deltas = []
+
+    response = await client.get_consolidated_analysis("resume", "vacancy", on_delta=deltas.append)
+
+    assert len(deltas) > 1
+    assert json.loads("".join(deltas)) == response["json"]
+    assert extract_partial_json_string("".join(deltas), "cover_letter") == "Сопроводительное письмо (MOCK)"
@@ -0,0 +1,111 @@
+import pytest
+
+from ai import token_budget
+from ai.client import AIClient
+from ai.providers.mock import MockProvider
+
+VACANCY = """Python-разработчик
+от 200 000 ₽ на руки
+Обязанности:
+Разработка микросервисов на FastAPI и PostgreSQL
+Обязанности:
+Разработка микросервисов на FastAPI и PostgreSQL
+Требования:   опыт   работы   с   cookie-сессиями
+
+Принимаем куки-файлы в формате RFC 6265
+"""
+
+
+class WordEncoder:
+    """Кодировщик, считающий каждый символ отдельным токеном."""
+
+    def encode(self, text):
+        return list(text)
+
+    def decode(self, tokens):
+        return "".join(tokens)
+
+
+@pytest.fixture
+def char_encoder(monkeypatch):
+    monkeypatch.setattr(token_budget, "get_encoder", lambda: WordEncoder())
+
+
+def test_clean_text_keeps_content_and_short_repeats():
+    """Схлопываются пробелы и повторы длинных строк; заголовки и строки про cookie остаются."""
+    assert token_budget.clean_text(VACANCY).splitlines() == [
+        "Python-разработчик",
+        "от 200 000 ₽ на руки",
+        "Обязанности:",
+        "Разработка микросервисов на FastAPI и PostgreSQL",
+        "Обязанности:",
+        "Требования: опыт работы с cookie-сессиями",
+        "Принимаем куки-файлы в формате RFC 6265",
+    ]
+
+
+def test_truncate_to_tokens_cuts_on_line_boundary(char_encoder):
+    text = "первая строка\nвторая строка\nтретья строка"
+
+    assert token_budget.truncate_to_tokens(text, 20) == "первая строка"
+    assert token_budget.truncate_to_tokens(text, 1000) == text
+
+
+def test_count_tokens_falls_back_to_length(monkeypatch):
+    monkeypatch.setattr(token_budget, "get_encoder", lambda: None)
+
+    assert token_budget.count_tokens("a" * 10) == 3
+    assert token_budget.count_tokens("") == 0
+
+
+def test_prepare_inputs_applies_action_caps(char_encoder, monkeypatch):
+    """Поля обрезаются по лимитам действия, отчет содержит сэкономленные токены."""
+    monkeypatch.setitem(token_budget.INPUT_TOKEN_CAPS, "analysis", {"resume_text": 1000, "vacancy_text": 40})
+
+    inputs, report = token_budget.prepare_inputs("analysis", {"resume_text": "резюме", "vacancy_text": VACANCY})
+
+    assert inputs["resume_text"] == "резюме"
+    assert inputs["vacancy_text"] == "Python-разработчик\nот 200 000 ₽ на руки"
+    assert report.truncated == ["vacancy_text"]
+    assert report.original_tokens == len("резюме") + len(VACANCY)
+    assert report.final_tokens == len("резюме") + len(inputs["vacancy_text"])
+    assert report.saved_tokens == report.original_tokens - report.final_tokens
+
+
+async def test_client_sends_trimmed_text_and_reports_savings(monkeypatch, char_encoder):
+    """Клиент отправляет провайдеру очищенный текст и добавляет экономию в usage."""
+    monkeypatch.setattr("ai.client.AIProvider", MockProvider)
+    client = AIClient()
+    sent = []
+    original = MockProvider.verify_text
+
+    async def capture(self, text, prompt_template):
+        sent.append(text)
+        return await original(self, text, prompt_template)
+
+    monkeypatch.setattr(MockProvider, "verify_text", capture)
+
+    response = await client.verify_vacancy(VACANCY)
+
+    assert sent[0] == token_budget.clean_text(VACANCY)
+    assert response["usage"]["estimated_tokens_saved"] == len(VACANCY) - len(sent[0])
+    assert "tokens_saved" in response["usage"]
+
+
+def test_split_into_chunks_keeps_sections_together(char_encoder):
+    """Части собираются из целых разделов и не превышают лимит."""
+    text = "Опыт работы\n" + "а" * 30 + "\nОбразование\n" + "б" * 30 + "\nНавыки\nPython"
+
+    chunks = token_budget.split_into_chunks(text, 60)
+
+    assert chunks == ["Опыт работы\n" + "а" * 30, "Образование\n" + "б" * 30 + "\nНавыки\nPython"]
+    assert all(len(chunk) <= 60 for chunk in chunks)
+
+
+def test_split_into_chunks_splits_oversized_section(char_encoder):
+    text = "Требования:\n" + "\n".join(["строка требования"] * 6) + "\n" + "x" * 45
+
+    chunks = token_budget.split_into_chunks(text, 40)
+
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    assert "".join(chunks).replace("\n", "") == text.replace("\n", "")
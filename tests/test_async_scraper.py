@@ -0,0 +1,141 @@
+import asyncio
+
+import httpx
+
+from scraper.async_scraper import AsyncScraper, PageCache
+
+PAGE = "<html><body><main><h1>Python Developer</h1><script>x()</script></main></body></html>"
+
+
+def make_scraper(tmp_path, handler, **kwargs) -> AsyncScraper:
+    return AsyncScraper(cache=PageCache(str(tmp_path)), transport=httpx.MockTransport(handler), **kwargs)
+
+
+async def test_scrape_extracts_text(tmp_path):
+    scraper = make_scraper(tmp_path, lambda request: httpx.Response(200, text=PAGE))
+
+    text = await scraper.scrape("https://hh.ru/vacancy/1")
+
+    assert "Python Developer" in text
+    assert "x()" not in text
+    await scraper.aclose()
+
+
+async def test_etag_revalidation_returns_cached_page_on_304(tmp_path):
+    """Повторный запрос отправляет If-None-Match и при ответе 304 возвращает сохраненную страницу."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, text=PAGE, headers={"ETag": '"v1"', "Last-Modified": "Mon, 12 Oct 2026 10:00:00 GMT"})
+
+    scraper = make_scraper(tmp_path, handler)
+    first = await scraper.scrape("https://hh.ru/vacancy/1")
+    # Новый экземпляр читает кэш с диска
+    second_scraper = make_scraper(tmp_path, handler)
+    second = await second_scraper.scrape("https://hh.ru/vacancy/1")
+
+    assert first == second
+    assert requests[1].headers["If-Modified-Since"] == "Mon, 12 Oct 2026 10:00:00 GMT"
+    assert scraper.stats["downloaded"] == 1
+    assert second_scraper.stats["not_modified"] == 1
+    await scraper.aclose()
+    await second_scraper.aclose()
+
+
+async def test_fresh_page_is_not_requested_again(tmp_path):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, text=PAGE, headers={"Cache-Control": "max-age=600"})
+
+    scraper = make_scraper(tmp_path, handler)
+    await scraper.fetch("https://hh.ru/vacancy/1")
+    await scraper.fetch("https://hh.ru/vacancy/1")
+
+    assert len(calls) == 1
+    assert scraper.stats["fresh"] == 1
+    await scraper.aclose()
+
+
+async def test_no_store_responses_are_not_cached(tmp_path):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, text=PAGE, headers={"Cache-Control": "no-store", "ETag": '"v1"'})
+
+    scraper = make_scraper(tmp_path, handler)
+    await scraper.fetch("https://hh.ru/vacancy/1")
+    await scraper.fetch("https://hh.ru/vacancy/1")
+
+    assert len(calls) == 2
+    assert "If-None-Match" not in calls[1].headers
+    await scraper.aclose()
+
+
+async def test_per_host_concurrency_limit(tmp_path):
+    """Одновременно к одному хосту выполняется не больше per_host_limit запросов, к разным — независимо."""
+    active: dict[str, int] = {}
+    peak: dict[str, int] = {}
+
+    class SlowTransport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request):
+            host = request.url.host
+            active[host] = active.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), active[host])
+            await asyncio.sleep(0.02)
+            active[host] -= 1
+            return httpx.Response(200, text=PAGE)
+
+    scraper = AsyncScraper(cache=None, transport=SlowTransport(), per_host_limit=2)
+    urls = [f"https://hh.ru/vacancy/{i}" for i in range(6)] + [f"https://spb.hh.ru/vacancy/{i}" for i in range(2)]
+    results = await asyncio.gather(*(scraper.fetch(url) for url in urls))
+
+    assert all(results)
+    assert peak["hh.ru"] == 2
+    assert peak["spb.hh.ru"] == 2
+    await scraper.aclose()
+
+
+async def test_http_errors_return_none(tmp_path):
+    scraper = make_scraper(tmp_path, lambda request: httpx.Response(404))
+
+    assert await scraper.scrape("https://hh.ru/vacancy/404") is None
+    assert await scraper.scrape("not a url") is None
+    await scraper.aclose()
+
+
+async def test_oversized_pages_are_rejected(tmp_path):
+    """Страница больше лимита отбрасывается: по Content-Length сразу, без него — при чтении потока."""
+    sent = []
+
+    async def body():
+        for _ in range(100):
+            sent.append(1)
+            yield b"x" * 1024
+
+    def handler(request):
+        if request.url.path == "/declared":
+            return httpx.Response(200, content=b"x" * 4096)
+        return httpx.Response(200, content=body())
+
+    scraper = make_scraper(tmp_path, handler, max_bytes=2048)
+
+    assert await scraper.fetch("https://hh.ru/declared") is None
+    assert await scraper.fetch("https://hh.ru/streamed") is None
+    assert len(sent) < 100
+    await scraper.aclose()
+
+
+async def test_charset_is_taken_from_headers(tmp_path):
+    html = "<html><body><main>Разработчик</main></body></html>".encode("cp1251")
+    scraper = make_scraper(
+        tmp_path, lambda request: httpx.Response(200, content=html, headers={"Content-Type": "text/html; charset=windows-1251"})
+    )
+
+    assert await scraper.scrape("https://example.com/vacancy") == "Разработчик"
+    await scraper.aclose()
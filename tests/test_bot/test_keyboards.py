@@ -58,6 +58,22 @@ def test_vacancy_selection_keyboard():
     assert cancel_button.text == "Отмена"
     assert cancel_button.callback_data == "cancel_action"
 
+def test_vacancy_selection_keyboard_ranked_by_scores():
+    """Вакансии с оценками соответствия упорядочиваются по убыванию оценки, оценка видна на кнопке."""
+    vacancies = []
+    for vacancy_id, title in [(101, "Python Developer"), (102, "Data Scientist"), (103, "Без оценки")]:
+        vacancy = MagicMock()
+        vacancy.id = vacancy_id
+        vacancy.title = title
+        vacancies.append(vacancy)
+
+    keyboard = vacancy_selection_keyboard(vacancies, scores={101: 42, 102: 87})
+
+    buttons = [row[0] for row in keyboard.inline_keyboard[:3]]
+    assert [button.text for button in buttons] == ["87% · Data Scientist", "42% · Python Developer", "Без оценки"]
+    assert [button.callback_data for button in buttons] == ["vacancy_select_102", "vacancy_select_101", "vacancy_select_103"]
+
+
 # Используем параметризацию для тестирования различных состояний главного меню
 @pytest.mark.parametrize(
     "vacancy_count, has_resume, has_selected_vacancy, show_survey_button, expected_buttons, description",
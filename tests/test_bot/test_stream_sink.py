@@ -0,0 +1,100 @@
+import pytest
+from unittest.mock import AsyncMock
+from telegram.error import BadRequest, RetryAfter
+
+from bot.stream_sink import TelegramStreamSink, MAX_MESSAGE_LENGTH
+
+
+class FakeClock:
+    """Управляемые часы для проверки ограничения частоты правок."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+async def test_updates_are_throttled(clock):
+    """Промежуточные правки выполняются не чаще min_interval."""
+    message = AsyncMock()
+    sink = TelegramStreamSink(message, header="Заголовок", min_interval=1.5, clock=clock)
+
+    await sink.update("Первый")
+    await sink.update("Первый фрагмент")  # Слишком рано, правка пропускается
+    clock.now = 2.0
+    await sink.update("Первый фрагмент и второй")
+
+    assert [call.args[0] for call in message.edit_text.call_args_list] == [
+        "Заголовок\n\nПервый",
+        "Заголовок\n\nПервый фрагмент и второй",
+    ]
+    assert sink.has_output is True
+
+
+async def test_empty_update_counts_as_attempt(clock):
+    """Пустой текст не редактирует сообщение, но сдвигает время следующей попытки."""
+    message = AsyncMock()
+    sink = TelegramStreamSink(message, min_interval=1.0, clock=clock)
+
+    await sink.update(None)
+
+    message.edit_text.assert_not_called()
+    assert sink.ready() is False
+    assert sink.has_output is False
+
+
+async def test_finish_ignores_throttling_and_truncates(clock):
+    """Итоговый текст показывается сразу и обрезается до длины сообщения."""
+    message = AsyncMock()
+    sink = TelegramStreamSink(message, min_interval=10, clock=clock)
+    await sink.update("черновик")
+
+    assert await sink.finish("x" * (MAX_MESSAGE_LENGTH + 100)) is True
+
+    assert message.edit_text.call_count == 2
+    assert len(message.edit_text.call_args.args[0]) == MAX_MESSAGE_LENGTH
+
+
+async def test_retry_after_postpones_next_edit(clock):
+    """При RetryAfter следующая правка откладывается на указанное Telegram время."""
+    message = AsyncMock()
+    message.edit_text.side_effect = [RetryAfter(5), None]
+    sink = TelegramStreamSink(message, min_interval=1, clock=clock)
+
+    await sink.update("текст")
+    clock.now = 2.0
+    await sink.update("текст")
+    clock.now = 5.5
+    await sink.update("текст")
+
+    assert message.edit_text.call_count == 2
+    assert sink.has_output is True
+
+
+async def test_bad_request_is_not_fatal(clock):
+    """Ошибки вида 'message is not modified' не прерывают вывод."""
+    message = AsyncMock()
+    message.edit_text.side_effect = BadRequest("Message is not modified")
+    sink = TelegramStreamSink(message, min_interval=1, clock=clock)
+
+    await sink.update("текст")
+
+    assert sink.has_output is False
+
+
+async def test_finish_reports_failed_edit(clock):
+    """Если итоговый текст показать не удалось, finish возвращает False, а черновик остается."""
+    message = AsyncMock()
+    message.edit_text.side_effect = [None, RetryAfter(5), BadRequest("Message to edit not found")]
+    sink = TelegramStreamSink(message, min_interval=1, clock=clock)
+    await sink.update("черновик")
+
+    assert await sink.finish("итог") is False
+    assert await sink.finish("итог") is False
+    assert sink.has_output is True
@@ -0,0 +1,81 @@
+import asyncio
+import inspect
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import async_crud, crud, models
+from db.database import to_async_url, unit_of_work
+
+
+def test_every_crud_function_has_async_variant():
+    """Для каждой публичной функции crud есть асинхронный вариант с той же сигнатурой."""
+    public = [
+        name for name, func in inspect.getmembers(crud, inspect.isfunction)
+        if not name.startswith("_") and func.__module__ == crud.__name__
+    ]
+
+    for name in public:
+        variant = getattr(async_crud, name, None)
+        assert inspect.iscoroutinefunction(variant), name
+        assert inspect.signature(variant) == inspect.signature(getattr(crud, name))
+
+
+def test_to_async_url():
+    """Синхронные строки подключения получают асинхронный драйвер, явно указанный драйвер не меняется."""
+    assert to_async_url("sqlite:///bot.db") == "sqlite+aiosqlite:///bot.db"
+    assert to_async_url("postgresql://u:p@host/db") == "postgresql+asyncpg://u:p@host/db"
+    assert to_async_url("postgresql+psycopg://u:p@host/db") == "postgresql+psycopg://u:p@host/db"
+
+
+async def test_async_crud_roundtrip(async_db_session):
+    """Асинхронные функции работают с AsyncSession так же, как синхронные с Session."""
+    user = await async_crud.get_or_create_user(async_db_session, chat_id=12345)
+    assert (await async_crud.get_or_create_user(async_db_session, chat_id=12345)).id == user.id
+
+    initial = (await async_crud.get_user_balance(async_db_session, user.id)).balance
+    await async_crud.update_user_balance(async_db_session, user_id=user.id, amount=5, description="Пополнение")
+    vacancy = await async_crud.create_vacancy(
+        async_db_session, user_id=user.id, title="Python", file_path="/v.txt", source="file", text="Python, FastAPI"
+    )
+
+    assert [v.id for v in await async_crud.get_user_vacancies(async_db_session, user.id)] == [vacancy.id]
+    assert (await async_crud.find_duplicate_vacancy(async_db_session, user_id=user.id, text="Python, FastAPI")).id == vacancy.id
+    balance = await async_crud.get_user_balance(async_db_session, user.id)
+    # Атрибуты доступны после commit без повторной загрузки (expire_on_commit=False)
+    assert balance.balance == initial + 5
+
+
+async def test_unit_of_work_commits_once(async_db_session):
+    """Вызовы crud, в том числе во вложенном unit_of_work, фиксируются одним commit; при ошибке — откат."""
+    commits = []
+    event.listen(async_db_session.bind.sync_engine, "commit", lambda conn: commits.append(conn))
+
+    with patch("db.database.get_async_db", return_value=async_db_session):
+        async with unit_of_work() as db:
+            user = await async_crud.get_or_create_user(db, chat_id=12345)
+            async with unit_of_work() as nested:
+                assert nested is db
+                await async_crud.update_user_balance(nested, user_id=user.id, amount=5, description="Пополнение")
+
+            async def background_task():
+                async with unit_of_work() as own:
+                    return own
+
+            # Задача, запущенная из обработчика, наследует контекст, но получает свою сессию
+            own_session = MagicMock(spec=AsyncSession, info={})
+            with patch("db.database.get_async_db", return_value=own_session):
+                assert await asyncio.create_task(background_task()) is own_session
+            own_session.commit.assert_awaited_once()
+        assert len(commits) == 1
+
+        with pytest.raises(RuntimeError):
+            async with unit_of_work() as db:
+                await async_crud.create_utm_track(db, user_id=user.id, utm_source="promo")
+                raise RuntimeError("Ошибка обработчика")
+    assert len(commits) == 1
+
+    count = await async_db_session.run_sync(lambda session: session.query(models.UTMTrack).count())
+    assert count == 0
@@ -1,4 +1,5 @@
-from db import crud, models
+import pytest
+from db import crud, fingerprints, models
 
 def test_get_or_create_user(db_session):
     """Тестирует получение или создание пользователя."""
@@ -95,9 +96,11 @@ def test_create_ai_usage_log_with_relations(db_session):
         action="test_action",
         resume_id=resume.id,
         vacancy_id=vacancy.id,
+        cached_prompt_tokens=8,
     )
 
     assert log.id is not None
+    assert log.cached_prompt_tokens == 8
     assert log.user_id == user.id
     assert log.resume_id == resume.id
     assert log.vacancy_id == vacancy.id
@@ -148,6 +151,39 @@ def test_create_analysis_result(db_session):
     assert analysis2.hr_call_plan == "HR call plan text." # Новое значение добавилось
 
 
+def test_mark_analysis_charged_only_once(db_session):
+    """Анализ отмечается оплаченным только один раз."""
+    user = crud.get_or_create_user(db_session, chat_id=102)
+    resume = crud.create_resume(db_session, user_id=user.id, file_path="r.txt", source="s", title="T")
+    vacancy = crud.create_vacancy(db_session, user_id=user.id, title="V", file_path="v.txt", source="s")
+    analysis = crud.create_analysis_result(db_session, resume_id=resume.id, vacancy_id=vacancy.id, analysis_data={})
+    assert analysis.charged is False
+
+    assert crud.mark_analysis_charged(db_session, resume.id, vacancy.id) is True
+    assert crud.mark_analysis_charged(db_session, resume.id, vacancy.id) is False
+    db_session.refresh(analysis)
+    assert analysis.charged is True
+
+
+def test_mark_analysis_charged_without_flushed_row(db_session):
+    """Запись без flush и отсутствующая запись не дают бесплатного анализа."""
+    user = crud.get_or_create_user(db_session, chat_id=103)
+    resume = crud.create_resume(db_session, user_id=user.id, file_path="r.txt", source="s", title="T")
+    first = crud.create_vacancy(db_session, user_id=user.id, title="V1", file_path="v1.txt", source="s")
+    second = crud.create_vacancy(db_session, user_id=user.id, title="V2", file_path="v2.txt", source="s")
+    pending = models.AnalysisResult(resume_id=resume.id, vacancy_id=first.id)
+    db_session.add(pending)
+
+    assert crud.mark_analysis_charged(db_session, resume.id, first.id) is True
+    assert crud.mark_analysis_charged(db_session, resume.id, first.id) is False
+    db_session.refresh(pending)
+    assert pending.charged is True
+
+    assert crud.mark_analysis_charged(db_session, resume.id, second.id) is True
+    assert crud.mark_analysis_charged(db_session, resume.id, second.id) is False
+    assert crud.get_analysis_result(db_session, resume.id, second.id).charged is True
+
+
 def test_create_utm_track(db_session):
     """Тестирует создание записи отслеживания UTM-метки."""
     # 1. Создаем пользователя
@@ -212,3 +248,120 @@ def test_update_user_balance(db_session):
     assert transactions[0].amount == 10
     assert transactions[1].type == "withdrawal"
     assert transactions[1].amount == 3
+
+
+VACANCY_TEXT = (
+    "Senior Python-разработчик\nТребуемый опыт работы: 3–6 лет\nПолная занятость, полный день\n"
+    "Мы ищем опытного Python-разработчика в команду платежных сервисов.\n"
+    "Обязанности: разработка и поддержка микросервисов на FastAPI, проектирование API и схем данных, участие в код-ревью.\n"
+    "Требования: опыт коммерческой разработки на Python от 3 лет, уверенное знание PostgreSQL и Redis, "
+    "опыт работы с Kafka или RabbitMQ.\n"
+    "Мы предлагаем: официальное трудоустройство, ДМС со стоматологией, гибкий график и удаленную работу."
+)
+
+
+def test_create_vacancy_links_duplicates_to_existing(db_session):
+    """Точный и почти точный дубликат вакансии возвращают уже созданную запись, а не новую."""
+    user = crud.get_or_create_user(db_session, chat_id=123)
+    other_user = crud.get_or_create_user(db_session, chat_id=456)
+    original = crud.create_vacancy(
+        db_session, user_id=user.id, title="Python", file_path="/v1.txt", source="url", text=VACANCY_TEXT
+    )
+    assert original.content_hash and original.simhash is not None
+    assert len(original.signature_bands) > 0
+
+    # Тот же текст с другими пробелами и регистром
+    exact = crud.create_vacancy(
+        db_session, user_id=user.id, title="Copy", file_path="/v2.txt", source="file", text=VACANCY_TEXT.upper() + "  "
+    )
+    # Текст со страницы hh.ru с лишней строкой и мелкой правкой
+    near = crud.create_vacancy(
+        db_session, user_id=user.id, title="Near", file_path="/v3.txt", source="url",
+        text="Поделиться вакансией\n" + VACANCY_TEXT.replace("от 3 лет", "от 2 лет"),
+    )
+    different = crud.create_vacancy(
+        db_session, user_id=user.id, title="Sales", file_path="/v4.txt", source="file",
+        text="Менеджер по продажам в салон мебели. Консультирование клиентов, оформление договоров. Обучение.",
+    )
+    # Вакансии других пользователей не считаются дубликатами
+    foreign = crud.create_vacancy(
+        db_session, user_id=other_user.id, title="Python", file_path="/v5.txt", source="url", text=VACANCY_TEXT
+    )
+
+    assert exact.id == original.id
+    assert near.id == original.id
+    assert different.id != original.id
+    assert foreign.id != original.id
+    assert len(crud.get_user_vacancies(db_session, user_id=user.id)) == 2
+    assert crud.find_duplicate_vacancy(db_session, user_id=user.id, text="Совсем другой текст") is None
+
+
+def test_canonical_vacancy_is_shared_by_hh_id_and_content_hash(db_session):
+    """Каноническая вакансия создается один раз и находится по ID на hh.ru или хэшу текста."""
+    user1 = crud.get_or_create_user(db_session, chat_id=123)
+    user2 = crud.get_or_create_user(db_session, chat_id=456)
+
+    canonical = crud.get_or_create_canonical_vacancy(
+        db_session, file_path="/c1.txt", title="Python", source="https://hh.ru/vacancy/1", hh_id="1", content_hash="h1"
+    )
+    same = crud.get_or_create_canonical_vacancy(
+        db_session, file_path="/other.txt", title="Other", source="file", content_hash="h1"
+    )
+    assert same.id == canonical.id
+    assert crud.get_canonical_vacancy(db_session, hh_id="1").id == canonical.id
+    assert crud.get_canonical_vacancy(db_session, hh_id="2", content_hash="h1").id == canonical.id
+    assert crud.get_canonical_vacancy(db_session, hh_id="2") is None
+
+    for user in (user1, user2):
+        crud.create_vacancy(
+            db_session, user_id=user.id, title=canonical.title, file_path=canonical.file_path,
+            source=canonical.source, canonical_id=canonical.id,
+        )
+    db_session.refresh(canonical)
+    assert {vacancy.user_id for vacancy in canonical.vacancies} == {user1.id, user2.id}
+
+
+def test_create_vacancies_batch_is_atomic(db_session):
+    """Пакет вакансий, логи AI и списание баллов записываются в транзакции вызывающего кода; при ошибке она откатывается целиком."""
+    user = crud.get_or_create_user(db_session, chat_id=123)
+    initial_balance = crud.get_user_balance(db_session, user.id).balance
+    existing = crud.get_or_create_canonical_vacancy(db_session, file_path="/c.txt", title="Known", source="url", hh_id="1")
+    items = [
+        {"file_path": "/v1.txt", "source": "https://hh.ru/vacancy/2", "title": "Python", "text": VACANCY_TEXT, "hh_id": "2"},
+        {"file_path": "/c.txt", "source": "https://hh.ru/vacancy/1", "title": "Known", "text": "Known text", "canonical_id": existing.id},
+    ]
+    usage = {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15, "cost": 0.1, "action": "verify_vacancy"}
+
+    db_session.commit()
+
+    # Ошибка во втором элементе откатывает весь пакет
+    broken = [items[0], {"file_path": "/v3.txt", "source": "file", "title": "Broken"}]
+    with pytest.raises(KeyError):
+        crud.create_vacancies_batch(db_session, user.id, broken, usage_logs=[usage], charge_description="Загрузка вакансии")
+    db_session.rollback()
+    assert crud.get_user_vacancies(db_session, user.id) == []
+    assert crud.get_user_balance(db_session, user.id).balance == initial_balance
+    assert db_session.query(models.AIUsageLog).count() == 0
+
+    created = crud.create_vacancies_batch(db_session, user.id, items, usage_logs=[usage], charge_description="Загрузка вакансии")
+
+    assert [vacancy.title for vacancy in created] == ["Python", "Known"]
+    assert created[0].canonical.hh_id == "2" and created[0].signature_bands
+    assert created[1].canonical_id == existing.id
+    assert crud.get_user_balance(db_session, user.id).balance == initial_balance - 2
+    assert db_session.query(models.Transaction).filter_by(type="withdrawal").count() == 2
+    assert db_session.query(models.AIUsageLog).count() == 1
+
+
+def test_create_vacancies_batch_reuses_existing_canonical(db_session):
+    """Каноническая вакансия с тем же hh_id не дублируется, а переводится на новый файл."""
+    user = crud.get_or_create_user(db_session, chat_id=124)
+    stale = crud.get_or_create_canonical_vacancy(db_session, file_path="/missing.txt", title="Old", source="url", hh_id="7")
+    item = {"file_path": "/v7.txt", "source": "https://hh.ru/vacancy/7", "title": "Python", "text": VACANCY_TEXT, "hh_id": "7"}
+
+    created = crud.create_vacancies_batch(db_session, user.id, [item], charge_description="Загрузка вакансии")
+
+    assert created[0].canonical_id == stale.id
+    assert db_session.query(models.CanonicalVacancy).count() == 1
+    assert (stale.file_path, stale.title) == ("/v7.txt", "Python")
+    assert stale.content_hash == fingerprints.content_hash(VACANCY_TEXT)
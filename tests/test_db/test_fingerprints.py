@@ -0,0 +1,30 @@
+from db import fingerprints
+
+
+def test_content_hash_ignores_case_punctuation_and_spaces():
+    assert fingerprints.content_hash("Python-разработчик,  Москва") == fingerprints.content_hash("python разработчик москва")
+    assert fingerprints.content_hash("Python") != fingerprints.content_hash("Go")
+
+
+def test_simhash_distance_reflects_similarity():
+    text = " ".join(f"требование{i} опыт работы с системой{i}" for i in range(60))
+    edited = text.replace("требование5 ", "требование500 ") + " Откликнуться"
+    unrelated = " ".join(f"рецепт{i} борща со сметаной{i}" for i in range(60))
+
+    assert fingerprints.hamming_distance(fingerprints.simhash(text), fingerprints.simhash(edited)) <= fingerprints.MAX_DISTANCE
+    assert fingerprints.hamming_distance(fingerprints.simhash(text), fingerprints.simhash(unrelated)) > fingerprints.MAX_DISTANCE
+
+    fingerprint = fingerprints.Fingerprint.of(text)
+    assert fingerprint.is_near_duplicate(fingerprints.Fingerprint.of(edited))
+    assert fingerprint.is_near_duplicate(fingerprints.Fingerprint.of(text.upper()))
+    assert not fingerprint.is_near_duplicate(fingerprints.Fingerprint.of(unrelated))
+
+
+def test_bands_and_signed_roundtrip():
+    signature = (1 << 63) | 0xABCD
+    assert fingerprints.to_unsigned(fingerprints.to_signed(signature)) == signature
+    assert fingerprints.to_signed(signature) < 0
+
+    bands = fingerprints.bands(signature)
+    assert len(bands) == fingerprints.BANDS
+    assert bands[0] == 0xCD and bands[1] == 0xAB and bands[-1] == 0x80
@@ -0,0 +1,102 @@
+from pathlib import Path
+
+import pytest
+
+from scraper import extractors
+from scraper.extractors import GenericExtractor, HHExtractor, extract_page_text
+from scraper.hh_scraper import extract_text
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "html"
+
+
+def load(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+@pytest.fixture(params=["lxml", "bs4"])
+def parser_backend(request, monkeypatch):
+    """Извлекатель hh.ru должен работать и с lxml, и без него (через BeautifulSoup)."""
+    if request.param == "lxml":
+        pytest.importorskip("lxml")
+    else:
+        monkeypatch.setattr(extractors, "lxml", None)
+        monkeypatch.setattr(extractors, "BS4_PARSER", "html.parser")
+    return request.param
+
+
+def test_hh_vacancy_extracts_key_fields_only(parser_backend):
+    html = load("hh_vacancy.html")
+
+    text = extract_page_text(html, "https://hh.ru/vacancy/100000001")
+
+    lines = text.splitlines()
+    assert lines[0] == "Senior Python-разработчик (платежные сервисы)"
+    assert "Зарплата: от 300 000 до 400 000 ₽ на руки" in lines
+    assert "Требуемый опыт работы: 3–6 лет" in lines
+    assert "Опыт работы с Kafka или RabbitMQ" in lines
+    assert lines[-1] == "Ключевые навыки: Python, FastAPI, PostgreSQL, Redis, Kafka"
+    # Меню, похожие вакансии и подвал не попадают в текст
+    assert "Похожая вакансия" not in text
+    assert "Информация для соискателей" not in text
+    assert len(text) * 5 < len(extract_text(html))
+
+
+def test_hh_resume_extracts_key_fields(parser_backend):
+    text = extract_page_text(load("hh_resume.html"), "https://spb.hh.ru/resume/0123456789abcdef")
+
+    assert text.startswith("Senior Python Developer\nО кандидате: Мужчина, 32 года, Москва\nЗарплата: 350 000 ₽ на руки")
+    assert "Участвовал в разработке скоринговой системы." in text
+    assert "2015 МГТУ им. Н.Э. Баумана, Информатика и системы управления" in text
+    assert text.endswith("Ключевые навыки: Python, Django, FastAPI, PostgreSQL")
+    assert "Похожая вакансия" not in text
+
+
+def test_unknown_layout_falls_back_to_generic_extractor():
+    html = "<html><body><main><h1>Вакансия</h1><p>Описание</p></main></body></html>"
+
+    assert HHExtractor().extract(html, "https://hh.ru/vacancy/1") is None
+    assert extract_page_text(html, "https://hh.ru/vacancy/1") == "Вакансия\nОписание"
+
+
+def test_hh_extractor_matches_only_hh_hosts():
+    assert HHExtractor().matches("https://hh.ru/vacancy/1")
+    assert HHExtractor().matches("https://spb.hh.ru/vacancy/1")
+    assert not HHExtractor().matches("https://notahh.ru/vacancy/1")
+    assert extract_page_text("<html><body>Text</body></html>", "https://example.com/") == "Text"
+
+
+def test_failing_extractor_is_skipped():
+    class Broken(GenericExtractor):
+        name = "broken"
+
+        def extract(self, html, url):
+            raise ValueError("boom")
+
+    assert extract_page_text("<body>Text</body>", "https://example.com/", [Broken(), GenericExtractor()]) == "Text"
+
+
+def test_generic_extractor_strips_page_chrome():
+    """Навигация, баннер cookie, подвал и блок похожих вакансий удаляются только из текста страницы."""
+    html = """<html><body>
+        <p>Войти</p><p>Создать резюме</p>
+        <h1>Python-разработчик</h1><p>от 200 000 ₽ на руки</p>
+        <p>Обязанности:</p><p>Поддержка cookie-сессий в API</p><p>Требования:</p><p>Знание PostgreSQL</p>
+        <p>Откликнуться</p><p>Мы используем файлы cookie, чтобы сайт работал лучше</p>
+        <p>Похожие вакансии</p><p>Java-разработчик</p><p>© 2025 Группа компаний HeadHunter</p>
+    </body></html>"""
+
+    assert extract_page_text(html, "https://example.com/vacancy").splitlines() == [
+        "Python-разработчик",
+        "от 200 000 ₽ на руки",
+        "Обязанности:",
+        "Поддержка cookie-сессий в API",
+        "Требования:",
+        "Знание PostgreSQL",
+    ]
+
+
+def test_tail_marker_at_the_top_does_not_drop_content():
+    """Заголовок блока в начале текста не обрезает основной контент."""
+    text = "Похожие вакансии\nPython-разработчик\nТребования"
+
+    assert extractors.strip_page_chrome(text) == text
@@ -1,19 +1,35 @@
+import asyncio
+
 import pytest
+import pytest_asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.exc import IntegrityError
 
+from bot import messages
 from bot.handlers import analysis
+from db import async_crud, models
+from db.models import Base
 from ai.actions import ACTION_REGISTRY
 
+
+@pytest.fixture(autouse=True)
+def no_distillation():
+    """Мок-клиенты AI в этих тестах не готовят выжимки: анализ идет по полным текстам."""
+    with patch('bot.handlers.analysis.ANALYSIS_DISTILLATION_ENABLED', False):
+        yield
+
+
 @pytest.mark.anyio
 @patch('bot.handlers.analysis.read_text_from_file')
 @patch('bot.handlers.analysis.save_text_to_file')
 @patch('bot.handlers.analysis.get_ai_client')
 @patch('bot.handlers.analysis.models')
-@patch('bot.handlers.analysis.crud')
-@patch('bot.handlers.analysis.get_db')
+@patch('bot.handlers.analysis.crud', new_callable=AsyncMock)
+@patch('bot.handlers.analysis.unit_of_work')
 @patch('builtins.open', new_callable=MagicMock)
 async def test_perform_analysis_new_analysis_success(
-    mock_open, mock_get_db, mock_crud, mock_models, mock_get_ai,
+    mock_open, mock_unit_of_work, mock_crud, mock_models, mock_get_ai,
     mock_save_text, mock_read_text, update_mock, context_mock
 ):
     """
@@ -24,8 +40,10 @@ async def test_perform_analysis_new_analysis_success(
     action = "analyze_match"
     context_mock.user_data['selected_vacancy_id'] = vacancy_id
 
-    mock_db = MagicMock()
-    mock_get_db.return_value = iter([mock_db])
+    mock_db = MagicMock(spec=AsyncSession)
+    persist_db = MagicMock(spec=AsyncSession)
+    # Первый unit_of_work открывает обработчик, второй — сохранение разделов в фоне
+    mock_unit_of_work.return_value.__aenter__.side_effect = [mock_db, persist_db]
 
     mock_crud.get_or_create_user.return_value = MagicMock(id=user_id)
     mock_crud.get_user_resume.return_value = MagicMock(id=resume_id, file_path="resume.txt")
@@ -34,6 +52,7 @@ async def test_perform_analysis_new_analysis_success(
     mock_crud.get_user_balance.return_value = MagicMock(balance=10)
 
     mock_ai_client = MagicMock()
+    mock_ai_client.get_consolidated_analysis = AsyncMock()
     mock_analysis_data = {
         "match_analysis": "Match analysis content.",
         "cover_letter": "Cover letter content.",
@@ -62,11 +81,20 @@ async def test_perform_analysis_new_analysis_success(
     mock_save_text.assert_any_call("Match analysis content.", "analysis_results")
     mock_save_text.assert_any_call("Cover letter content.", "analysis_results")
 
+    # Запись анализа создается и фиксируется до запуска, а не отдельным объектом на каждый запуск
+    mock_models.AnalysisResult.assert_called_once_with(resume_id=resume_id, vacancy_id=vacancy_id)
+    mock_db.add.assert_called_once_with(mock_models.AnalysisResult.return_value)
+    # Разделы сохраняются через собственную сессию фоновой задачи, а не через сессию обработчика
+    saved_paths = {
+        "match_analysis": "storage/analysis_results/Match.txt",
+        "cover_letter": "storage/analysis_results/Cover.txt",
+    }
+    mock_crud.create_analysis_result.assert_any_await(persist_db, resume_id, vacancy_id, saved_paths)
     mock_analysis_result = mock_models.AnalysisResult.return_value
-    mock_db.add.assert_called_once_with(mock_analysis_result)
     assert mock_analysis_result.match_analysis == "storage/analysis_results/Match.txt"
     assert mock_analysis_result.cover_letter == "storage/analysis_results/Cover.txt"
-    mock_db.commit.assert_called_once()
+    # Запись анализа и списание балла фиксируются сразу, остальное — при выходе из unit_of_work
+    assert mock_db.commit.call_count == 2
 
     update_mock.callback_query.message.reply_text.assert_called()
     last_call_args = update_mock.callback_query.message.reply_text.call_args
@@ -75,10 +103,10 @@ async def test_perform_analysis_new_analysis_success(
 @pytest.mark.anyio
 @patch('bot.handlers.analysis.read_text_from_file')
 @patch('bot.handlers.analysis.get_ai_client')
-@patch('bot.handlers.analysis.crud')
-@patch('bot.handlers.analysis.get_db')
+@patch('bot.handlers.analysis.crud', new_callable=AsyncMock)
+@patch('bot.handlers.analysis.unit_of_work')
 async def test_perform_analysis_cached_result_success(
-    mock_get_db, mock_crud, mock_get_ai, mock_read_text, update_mock, context_mock
+    mock_unit_of_work, mock_crud, mock_get_ai, mock_read_text, update_mock, context_mock
 ):
     """
     Тестирует успешное получение результата анализа из кэша (файла).
@@ -87,8 +115,8 @@ async def test_perform_analysis_cached_result_success(
     action = "generate_letter"
     context_mock.user_data['selected_vacancy_id'] = vacancy_id
 
-    mock_db = MagicMock()
-    mock_get_db.return_value = iter([mock_db])
+    mock_db = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db
 
     mock_crud.get_or_create_user.return_value = MagicMock(id=user_id)
     mock_crud.get_user_resume.return_value = MagicMock(id=resume_id)
@@ -113,3 +141,465 @@ async def test_perform_analysis_cached_result_success(
     expected_header = action_details["response_header"]
     assert expected_header in last_call_args.kwargs['text']
     assert cached_content in last_call_args.kwargs['text']
+
+
+@pytest.mark.anyio
+@patch('bot.handlers.analysis.read_text_from_file')
+@patch('bot.handlers.analysis.save_text_to_file')
+@patch('bot.handlers.analysis.get_ai_client')
+@patch('bot.handlers.analysis.models')
+@patch('bot.handlers.analysis.crud', new_callable=AsyncMock)
+@patch('bot.handlers.analysis.unit_of_work')
+@patch('builtins.open', new_callable=MagicMock)
+async def test_perform_analysis_streams_requested_section(
+    mock_open, mock_unit_of_work, mock_crud, mock_models, mock_get_ai,
+    mock_save_text, mock_read_text, update_mock, context_mock
+):
+    """
+    Тестирует потоковый вывод: сообщение о прогрессе редактируется текстом
+    запрошенного раздела по мере генерации и в конце заменяется итоговым ответом.
+    """
+    action = "generate_letter"
+    context_mock.user_data['selected_vacancy_id'] = 20
+
+    mock_unit_of_work.return_value.__aenter__.return_value = MagicMock(spec=AsyncSession)
+    mock_crud.get_or_create_user.return_value = MagicMock(id=1)
+    mock_crud.get_user_resume.return_value = MagicMock(id=10, file_path="resume.txt")
+    mock_crud.get_vacancy_by_id.return_value = MagicMock(id=20, file_path="vacancy.txt")
+    mock_crud.get_analysis_result.return_value = None
+    mock_crud.get_user_balance.return_value = MagicMock(balance=10)
+    mock_open.return_value.read.return_value = "file content"
+    mock_save_text.return_value = "storage/analysis_results/letter.txt"
+    mock_read_text.return_value = "Уважаемый работодатель!"
+
+    progress_message = AsyncMock()
+    update_mock.callback_query.message.reply_text.return_value = progress_message
+
+    async def fake_analysis(resume_text, vacancy_text, on_delta=None):
+        for delta in ['{"cover_letter": "Уважаемый', ' работодатель!"}']:
+            await on_delta(delta)
+        return {"json": {"cover_letter": "Уважаемый работодатель!"}, "usage": {}}
+
+    mock_ai_client = MagicMock()
+    mock_ai_client.get_consolidated_analysis = AsyncMock(side_effect=fake_analysis)
+    mock_get_ai.return_value = mock_ai_client
+
+    await analysis._perform_analysis(update_mock, context_mock, action)
+
+    header = ACTION_REGISTRY[action]["response_header"]
+    edits = [call.args[0] for call in progress_message.edit_text.call_args_list]
+    assert edits[0] == f"{header}\n\nУважаемый"
+    assert edits[-1] == f"{header}\n\nУважаемый работодатель!"
+
+
+@pytest.mark.anyio
+@patch('bot.handlers.analysis.read_text_from_file')
+@patch('bot.handlers.analysis.save_text_to_file')
+@patch('bot.handlers.analysis.get_ai_client')
+@patch('bot.handlers.analysis.models')
+@patch('bot.handlers.analysis.crud', new_callable=AsyncMock)
+@patch('bot.handlers.analysis.unit_of_work')
+@patch('builtins.open', new_callable=MagicMock)
+async def test_perform_analysis_delivers_section_before_others_complete(
+    mock_open, mock_unit_of_work, mock_crud, mock_models, mock_get_ai,
+    mock_save_text, mock_read_text, update_mock, context_mock
+):
+    """
+    Тестирует, что каждый раздел сохраняется сразу после закрытия его значения,
+    а запрошенный раздел отправляется до окончания генерации остальных.
+    """
+    action = "analyze_match"
+    context_mock.user_data['selected_vacancy_id'] = 20
+
+    mock_db = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db
+    mock_crud.get_or_create_user.return_value = MagicMock(id=1)
+    mock_crud.get_user_resume.return_value = MagicMock(id=10, file_path="resume.txt")
+    mock_crud.get_vacancy_by_id.return_value = MagicMock(id=20, file_path="vacancy.txt")
+    mock_crud.get_analysis_result.return_value = None
+    mock_crud.get_user_balance.return_value = MagicMock(balance=10)
+    mock_open.return_value.read.return_value = "file content"
+    mock_save_text.side_effect = lambda text, subfolder: f"storage/{subfolder}/{text}.txt"
+
+    progress_message = AsyncMock()
+    update_mock.callback_query.message.reply_text.return_value = progress_message
+    header = ACTION_REGISTRY[action]["response_header"]
+    commits_at_delivery = []
+
+    async def fake_analysis(resume_text, vacancy_text, on_delta=None):
+        await on_delta('{"match_analysis": "Совпадение 80%", "cover_')
+        commits_at_delivery.append(mock_db.commit.call_count)
+        delivered = update_mock.callback_query.message.reply_text.call_args
+        assert delivered.kwargs["text"] == f"{header}\n\nСовпадение 80%"
+        await on_delta('letter": "Письмо"}')
+        return {"json": {"match_analysis": "Совпадение 80%", "cover_letter": "Письмо"}, "usage": {}}
+
+    mock_ai_client = MagicMock()
+    mock_ai_client.get_consolidated_analysis = AsyncMock(side_effect=fake_analysis)
+    mock_get_ai.return_value = mock_ai_client
+
+    await analysis._perform_analysis(update_mock, context_mock, action)
+
+    # К отправке раздела зафиксированы запись анализа и списание балла
+    assert commits_at_delivery == [2]
+    assert mock_db.commit.call_count == 2
+    assert mock_save_text.call_count == 2
+    mock_analysis_result = mock_models.AnalysisResult.return_value
+    assert mock_analysis_result.cover_letter == "storage/analysis_results/Письмо.txt"
+    mock_read_text.assert_not_called()
+    mock_crud.update_user_balance.assert_called_once()
+
+
+@pytest.mark.anyio
+@patch('bot.handlers.analysis.save_text_to_file')
+@patch('bot.handlers.analysis.get_ai_client')
+@patch('bot.handlers.analysis.models')
+@patch('bot.handlers.analysis.crud', new_callable=AsyncMock)
+@patch('bot.handlers.analysis.unit_of_work')
+@patch('builtins.open', new_callable=MagicMock)
+async def test_concurrent_actions_share_one_analysis_and_one_charge(
+    mock_open, mock_unit_of_work, mock_crud, mock_models, mock_get_ai, mock_save_text, context_mock
+):
+    """
+    Тестирует, что два действия для одной пары резюме/вакансия, запущенные
+    до завершения анализа, используют один запрос к AI и одно списание.
+    """
+    import asyncio
+    from telegram import Update
+
+    context_mock.user_data['selected_vacancy_id'] = 20
+    mock_unit_of_work.return_value.__aenter__.side_effect = lambda: MagicMock(spec=AsyncSession)
+    mock_crud.get_or_create_user.return_value = MagicMock(id=1)
+    mock_crud.get_user_resume.return_value = MagicMock(id=10, file_path="resume.txt")
+    mock_crud.get_vacancy_by_id.return_value = MagicMock(id=20, file_path="vacancy.txt")
+    mock_crud.get_analysis_result.return_value = None
+    mock_crud.get_user_balance.return_value = MagicMock(balance=10)
+    mock_open.return_value.read.return_value = "file content"
+    mock_save_text.side_effect = lambda text, subfolder: f"storage/{subfolder}/{text}.txt"
+
+    release = asyncio.Event()
+
+    async def slow_analysis(resume_text, vacancy_text, on_delta=None):
+        await release.wait()
+        await on_delta('{"match_analysis": "Анализ", "cover_letter": "Письмо"}')
+        return {"json": {"match_analysis": "Анализ", "cover_letter": "Письмо"}, "usage": {"total_tokens": 10}}
+
+    mock_ai_client = MagicMock()
+    mock_ai_client.get_consolidated_analysis = AsyncMock(side_effect=slow_analysis)
+    mock_get_ai.return_value = mock_ai_client
+
+    def make_update():
+        update = MagicMock(spec=Update)
+        update.effective_chat.id = 12345
+        update.callback_query = AsyncMock()
+        update.callback_query.message.reply_text = AsyncMock(return_value=AsyncMock())
+        return update
+
+    first, second = make_update(), make_update()
+    tasks = [
+        asyncio.create_task(analysis._perform_analysis(first, context_mock, "analyze_match")),
+        asyncio.create_task(analysis._perform_analysis(second, context_mock, "generate_letter")),
+    ]
+    await asyncio.sleep(0.01)
+    release.set()
+    await asyncio.gather(*tasks)
+
+    mock_ai_client.get_consolidated_analysis.assert_called_once()
+    mock_crud.update_user_balance.assert_called_once()
+    assert mock_save_text.call_count == 2
+
+    first_texts = [call.kwargs.get('text') for call in first.callback_query.message.reply_text.call_args_list]
+    second_texts = [call.kwargs.get('text') for call in second.callback_query.message.reply_text.call_args_list]
+    assert any(text and text.endswith("Анализ") for text in first_texts)
+    assert any(text and text.endswith("Письмо") for text in second_texts)
+
+
+@pytest.mark.anyio
+@patch('bot.handlers.analysis.read_text_from_file')
+@patch('bot.handlers.analysis.get_ai_client')
+@patch('bot.handlers.analysis.crud', new_callable=AsyncMock)
+@patch('bot.handlers.analysis.unit_of_work')
+async def test_prefetched_result_is_charged_on_first_open(
+    mock_unit_of_work, mock_crud, mock_get_ai, mock_read_text, update_mock, context_mock
+):
+    """
+    Тестирует, что заранее подготовленный анализ оплачивается при первом
+    открытии раздела без повторного обращения к AI.
+    """
+    action = "generate_letter"
+    context_mock.user_data['selected_vacancy_id'] = 20
+    mock_unit_of_work.return_value.__aenter__.return_value = MagicMock(spec=AsyncSession)
+    mock_crud.get_or_create_user.return_value = MagicMock(id=1)
+    mock_crud.get_user_resume.return_value = MagicMock(id=10)
+    mock_crud.get_vacancy_by_id.return_value = MagicMock(id=20)
+    mock_crud.get_user_balance.return_value = MagicMock(balance=5)
+    mock_crud.mark_analysis_charged.return_value = True
+    prefetched = MagicMock(charged=False, cover_letter="storage/analysis_results/letter.txt")
+    mock_crud.get_analysis_result.return_value = prefetched
+    mock_read_text.return_value = "Письмо"
+
+    await analysis._perform_analysis(update_mock, context_mock, action)
+
+    mock_get_ai.assert_not_called()
+    assert mock_crud.mark_analysis_charged.call_args.args[1:] == (10, 20)
+    mock_crud.update_user_balance.assert_called_once()
+    assert "Письмо" in update_mock.callback_query.message.reply_text.call_args.kwargs['text']
+
+
+@pytest.mark.anyio
+@patch('bot.handlers.analysis.read_text_from_file')
+@patch('bot.handlers.analysis.get_ai_client')
+@patch('bot.handlers.analysis.crud', new_callable=AsyncMock)
+@patch('bot.handlers.analysis.unit_of_work')
+async def test_prefetched_result_requires_balance(
+    mock_unit_of_work, mock_crud, mock_get_ai, mock_read_text, update_mock, context_mock
+):
+    """Тестирует, что без баланса заранее подготовленный раздел не выдается."""
+    from bot import messages
+
+    context_mock.user_data['selected_vacancy_id'] = 20
+    mock_unit_of_work.return_value.__aenter__.return_value = MagicMock(spec=AsyncSession)
+    mock_crud.get_or_create_user.return_value = MagicMock(id=1)
+    mock_crud.get_user_resume.return_value = MagicMock(id=10)
+    mock_crud.get_vacancy_by_id.return_value = MagicMock(id=20)
+    mock_crud.get_user_balance.return_value = MagicMock(balance=0)
+    mock_crud.get_analysis_result.return_value = MagicMock(charged=False, cover_letter="letter.txt")
+    mock_read_text.return_value = "Письмо"
+
+    await analysis._perform_analysis(update_mock, context_mock, "generate_letter")
+
+    mock_crud.update_user_balance.assert_not_called()
+    update_mock.callback_query.message.reply_text.assert_called_once_with(messages.OUT_OF_RUNS)
+
+
+@pytest.mark.anyio
+@patch('bot.handlers.analysis.save_text_to_file')
+@patch('bot.handlers.analysis.get_ai_client')
+@patch('bot.handlers.analysis.models')
+@patch('bot.handlers.analysis.crud', new_callable=AsyncMock)
+@patch('bot.handlers.analysis.unit_of_work')
+@patch('builtins.open', new_callable=MagicMock)
+async def test_prefetch_job_stores_uncharged_analysis(
+    mock_open, mock_unit_of_work, mock_crud, mock_models, mock_get_ai, mock_save_text
+):
+    """Тестирует, что задача заблаговременного анализа сохраняет разделы без списания балла."""
+    mock_db = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db
+    mock_crud.get_user_resume.return_value = MagicMock(id=10, file_path="resume.txt")
+    mock_crud.get_vacancy_by_id.return_value = MagicMock(id=20, file_path="vacancy.txt")
+    mock_crud.get_analysis_result.return_value = None
+    mock_crud.get_user_balance.return_value = MagicMock(balance=3)
+    mock_open.return_value.read.return_value = "file content"
+    mock_save_text.side_effect = lambda text, subfolder: f"storage/{subfolder}/{text}.txt"
+
+    mock_ai_client = MagicMock()
+    mock_ai_client.get_consolidated_analysis = AsyncMock(
+        return_value={"json": {"match_analysis": "Анализ"}, "usage": {"total_tokens": 10}}
+    )
+    mock_get_ai.return_value = mock_ai_client
+
+    job_context = MagicMock()
+    job_context.job.data = {"user_id": 1, "vacancy_id": 20}
+    await analysis.prefetch_analysis(job_context)
+
+    mock_ai_client.get_consolidated_analysis.assert_called_once()
+    mock_models.AnalysisResult.assert_called_once_with(resume_id=10, vacancy_id=20)
+    mock_crud.create_analysis_result.assert_awaited_once_with(
+        mock_db, 10, 20, {"match_analysis": "storage/analysis_results/Анализ.txt"}
+    )
+    assert mock_models.AnalysisResult.return_value.match_analysis == "storage/analysis_results/Анализ.txt"
+    mock_db.commit.assert_called_once()
+    mock_crud.update_user_balance.assert_not_called()
+    assert mock_crud.create_ai_usage_log.call_args.kwargs["action"] == "consolidated_analysis_prefetch"
+
+
+def test_schedule_analysis_prefetch_uses_job_queue():
+    """Тестирует постановку заблаговременного анализа в JobQueue."""
+    context = MagicMock()
+
+    assert analysis.schedule_analysis_prefetch(context, user_id=1, vacancy_id=20) is True
+    context.job_queue.run_once.assert_called_once()
+    assert context.job_queue.run_once.call_args.args[0] is analysis.prefetch_analysis
+    assert context.job_queue.run_once.call_args.kwargs["data"] == {"user_id": 1, "vacancy_id": 20}
+
+    context.job_queue = None
+    assert analysis.schedule_analysis_prefetch(context, user_id=1, vacancy_id=20) is False
+
+
+@pytest.mark.anyio
+@patch('bot.handlers.analysis.ANALYSIS_STRATEGY', 'on_demand')
+@patch('bot.handlers.analysis.save_text_to_file')
+@patch('bot.handlers.analysis.get_ai_client')
+@patch('bot.handlers.analysis.models')
+@patch('bot.handlers.analysis.crud', new_callable=AsyncMock)
+@patch('bot.handlers.analysis.unit_of_work')
+@patch('builtins.open', new_callable=MagicMock)
+async def test_on_demand_strategy_generates_only_requested_section(
+    mock_open, mock_unit_of_work, mock_crud, mock_models, mock_get_ai, mock_save_text,
+    update_mock, context_mock
+):
+    """Тестирует, что при генерации по запросу вызывается промпт только нужного раздела."""
+    context_mock.user_data['selected_vacancy_id'] = 20
+    mock_db = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db
+    mock_crud.get_or_create_user.return_value = MagicMock(id=1)
+    mock_crud.get_user_resume.return_value = MagicMock(id=10, file_path="resume.txt")
+    mock_crud.get_vacancy_by_id.return_value = MagicMock(id=20, file_path="vacancy.txt")
+    mock_crud.get_analysis_result.return_value = None
+    mock_crud.get_user_balance.return_value = MagicMock(balance=3)
+    mock_open.return_value.read.return_value = "file content"
+    mock_save_text.side_effect = lambda text, subfolder: f"storage/{subfolder}/{text}.txt"
+
+    mock_ai_client = MagicMock()
+    mock_ai_client.queue_status.return_value = MagicMock(depth=0)
+    mock_ai_client.generate_section = AsyncMock(
+        return_value={"text": "Письмо", "json": None, "usage": {"total_tokens": 10}}
+    )
+    mock_ai_client.get_consolidated_analysis = AsyncMock()
+    mock_get_ai.return_value = mock_ai_client
+
+    await analysis._perform_analysis(update_mock, context_mock, "generate_letter")
+
+    mock_ai_client.get_consolidated_analysis.assert_not_called()
+    mock_ai_client.generate_section.assert_called_once()
+    assert mock_ai_client.generate_section.call_args.args[0] == "cover_letter"
+    assert mock_models.AnalysisResult.return_value.cover_letter == "storage/analysis_results/Письмо.txt"
+    mock_crud.update_user_balance.assert_called_once_with(mock_db, user_id=1, amount=-1, description="Анализ: generate_letter")
+
+    log_kwargs = mock_crud.create_ai_usage_log.call_args.kwargs
+    assert log_kwargs["action"] == "section_analysis"
+    assert log_kwargs["strategy"] == "on_demand"
+    assert log_kwargs["latency_ms"] is not None
+    assert "Письмо" in update_mock.callback_query.message.reply_text.call_args.kwargs['text']
+
+
+async def test_ensure_analysis_result_reuses_row_created_concurrently(async_db_session):
+    """
+    Если запись анализа создал параллельный запрос между проверкой и вставкой, используется она,
+    а резюме и вакансия, загруженные в сессию обработчика, остаются доступны.
+    """
+    db = async_db_session
+    user = await async_crud.get_or_create_user(db, chat_id=1)
+    resume = await async_crud.create_resume(db, user_id=user.id, file_path="r.txt", source="file", title="Резюме")
+    vacancy = await async_crud.create_vacancy(db, user_id=user.id, file_path="v.txt", source="file", title="Вакансия")
+    existing = await async_crud.create_analysis_result(db, resume.id, vacancy.id, {})
+    await db.commit()
+
+    # Параллельный запрос вставляет запись сразу после того, как этот ее не нашел
+    get_analysis_result = async_crud.get_analysis_result
+    lookups = []
+
+    async def lookup(*args):
+        lookups.append(args)
+        return None if len(lookups) == 1 else await get_analysis_result(*args)
+
+    with patch.object(async_crud, "get_analysis_result", side_effect=lookup):
+        analysis_result = await analysis._ensure_analysis_result(db, resume.id, vacancy.id)
+
+    assert analysis_result.id == existing.id
+    # После полного отката атрибуты были бы просрочены и их чтение вне await падало бы с MissingGreenlet
+    assert (resume.title, vacancy.title) == ("Резюме", "Вакансия")
+
+
+@pytest_asyncio.fixture
+async def file_session_factory(tmp_path):
+    """
+    Фабрика асинхронных сессий над файловой SQLite: у каждого запроса своя сессия и свое соединение,
+    как в работающем боте (in-memory база с общим соединением этого не позволяет).
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'bot.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        yield async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    finally:
+        await engine.dispose()
+
+
+@patch('bot.handlers.analysis.ANALYSIS_STRATEGY', 'consolidated')
+@patch('bot.handlers.analysis.save_text_to_file', side_effect=lambda text, subfolder: f"storage/{subfolder}/{text}.txt")
+@patch('bot.handlers.analysis.get_ai_client')
+async def test_concurrent_taps_join_one_consolidated_run(mock_get_ai, mock_save_text, file_session_factory, tmp_path, context_mock):
+    """
+    Два быстрых нажатия для одной пары резюме/вакансия с реальной БД: второе подключается
+    к анализу первого — один запрос к AI, одна запись анализа, одна запись об использовании AI
+    и одно списание балла.
+    """
+    from telegram import Update
+
+    resume_file, vacancy_file = tmp_path / "resume.txt", tmp_path / "vacancy.txt"
+    resume_file.write_text("Резюме", encoding="utf-8")
+    vacancy_file.write_text("Вакансия", encoding="utf-8")
+    async with file_session_factory() as db:
+        user = await async_crud.get_or_create_user(db, chat_id=12345)
+        await async_crud.update_user_balance(db, user_id=user.id, amount=5, description="Пополнение")
+        await async_crud.create_resume(db, user_id=user.id, file_path=str(resume_file), source="file", title="Резюме")
+        vacancy = await async_crud.create_vacancy(db, user_id=user.id, file_path=str(vacancy_file), source="file", title="Вакансия")
+        balance_before = (await async_crud.get_user_balance(db, user.id)).balance
+        await db.commit()
+    context_mock.user_data['selected_vacancy_id'] = vacancy.id
+
+    release = asyncio.Event()
+
+    async def slow_analysis(resume_text, vacancy_text, on_delta=None):
+        await release.wait()
+        await on_delta('{"match_analysis": "Анализ", "cover_letter": "Письмо"}')
+        return {"json": {"match_analysis": "Анализ", "cover_letter": "Письмо"}, "usage": {"total_tokens": 10}}
+
+    mock_ai_client = MagicMock()
+    mock_ai_client.queue_status.return_value = MagicMock(depth=0)
+    mock_ai_client.get_consolidated_analysis = AsyncMock(side_effect=slow_analysis)
+    mock_get_ai.return_value = mock_ai_client
+
+    def make_update():
+        update = MagicMock(spec=Update)
+        update.effective_chat.id = 12345
+        update.callback_query = AsyncMock()
+        update.callback_query.message.reply_text = AsyncMock(return_value=AsyncMock())
+        return update
+
+    # Оба нажатия проходят проверку запущенного анализа до того, как любое из них создаст запись
+    both_checked = asyncio.Barrier(2)
+    ensure_analysis_result = analysis._ensure_analysis_result
+
+    async def ensure_after_both(db, resume_id, vacancy_id):
+        await both_checked.wait()
+        return await ensure_analysis_result(db, resume_id, vacancy_id)
+
+    first, second = make_update(), make_update()
+    with patch("db.database.get_async_db", side_effect=file_session_factory), \
+            patch("bot.handlers.analysis._ensure_analysis_result", side_effect=ensure_after_both):
+        tasks = [
+            asyncio.create_task(analysis._perform_analysis(first, context_mock, "analyze_match")),
+            asyncio.create_task(analysis._perform_analysis(second, context_mock, "generate_letter")),
+        ]
+        while not mock_ai_client.get_consolidated_analysis.called:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        release.set()
+        await asyncio.gather(*tasks)
+
+    mock_ai_client.get_consolidated_analysis.assert_called_once()
+    for update, text in ((first, "Анализ"), (second, "Письмо")):
+        replies = [call.kwargs.get("text") for call in update.callback_query.message.reply_text.call_args_list]
+        assert messages.ERROR_MESSAGE not in replies
+        assert any(reply and text in reply for reply in replies)
+    async with file_session_factory() as db:
+        assert (await async_crud.get_user_balance(db, user.id)).balance == balance_before - 1
+        assert await db.run_sync(lambda session: session.query(models.AnalysisResult).count()) == 1
+        # Использование AI логирует только нажатие, запустившее анализ
+        assert await db.run_sync(lambda session: session.query(models.AIUsageLog).count()) == 1
+
+
+@pytest.mark.anyio
+async def test_send_response_replies_when_final_edit_fails():
+    """Если заменить потоковый черновик итогом не удалось, первая часть отправляется отдельным сообщением."""
+    query = MagicMock()
+    query.message.reply_text = AsyncMock()
+    sink = MagicMock(has_output=True)
+    sink.finish = AsyncMock(return_value=False)
+
+    await analysis._send_response(query, sink, "Заголовок", "Итог")
+
+    sink.finish.assert_awaited_once_with("Заголовок\n\nИтог")
+    query.message.reply_text.assert_awaited_once_with(text="Заголовок\n\nИтог")
@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from telegram import Update, User as TUser, Chat
 from telegram.ext import CallbackContext
@@ -8,12 +9,12 @@ from bot.handlers.billing import balance, buy, handle_package_selection, POINT_P
 from db import crud, models
 
 @pytest.mark.asyncio
-@patch('bot.handlers.billing.get_db')
-@patch('bot.handlers.billing.crud')
-async def test_balance_command(mock_crud, mock_get_db, update_mock, context_mock):
+@patch('bot.handlers.billing.unit_of_work')
+@patch('bot.handlers.billing.crud', new_callable=AsyncMock)
+async def test_balance_command(mock_crud, mock_unit_of_work, update_mock, context_mock):
     """Тестирует команду /balance."""
-    mock_db = MagicMock()
-    mock_get_db.return_value = iter([mock_db])
+    mock_db = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db
     mock_crud.get_or_create_user.return_value = MagicMock(id=1)
     mock_crud.get_user_balance.return_value = MagicMock(balance=5)
 
@@ -32,12 +33,12 @@ async def test_buy_command(mock_keyboards, update_mock, context_mock):
     mock_keyboards.points_packages_keyboard.assert_called_once_with(POINT_PACKAGES)
 
 @pytest.mark.asyncio
-@patch('bot.handlers.billing.get_db')
-@patch('bot.handlers.billing.crud')
-async def test_package_selection(mock_crud, mock_get_db, update_mock, context_mock):
+@patch('bot.handlers.billing.unit_of_work')
+@patch('bot.handlers.billing.crud', new_callable=AsyncMock)
+async def test_package_selection(mock_crud, mock_unit_of_work, update_mock, context_mock):
     """Тестирует выбор и 'покупку' пакета баллов."""
-    mock_db = MagicMock()
-    mock_get_db.return_value = iter([mock_db])
+    mock_db = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db
     mock_user = MagicMock(id=1)
     mock_crud.get_or_create_user.return_value = mock_user
     mock_crud.get_user_balance.return_value = MagicMock(balance=30)
@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
@@ -27,16 +28,16 @@ def context_mock():
 
 @pytest.mark.anyio
 @patch('bot.handlers.common.keyboards', new_callable=MagicMock)
-@patch('bot.handlers.common.crud')
-@patch('bot.handlers.common.get_db')
-async def test_global_fallback_handler_with_resume(mock_get_db, mock_crud, mock_keyboards, update_mock, context_mock):
+@patch('bot.handlers.common.crud', new_callable=AsyncMock)
+@patch('bot.handlers.common.unit_of_work')
+async def test_global_fallback_handler_with_resume(mock_unit_of_work, mock_crud, mock_keyboards, update_mock, context_mock):
     """
     Тест: fallback-обработчик для пользователя, у которого уже есть резюме.
     Ожидание: Пользователя возвращает в главное меню.
     """
     # --- Mocks ---
-    mock_db_session = MagicMock()
-    mock_get_db.return_value = iter([mock_db_session])
+    mock_db_session = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db_session
 
     mock_user = MagicMock(id=1)
     mock_resume = MagicMock(id=10)
@@ -59,16 +60,16 @@ async def test_global_fallback_handler_with_resume(mock_get_db, mock_crud, mock_
 
 @pytest.mark.anyio
 @patch('bot.handlers.common.keyboards', new_callable=MagicMock)
-@patch('bot.handlers.common.crud')
-@patch('bot.handlers.common.get_db')
-async def test_global_fallback_handler_no_resume(mock_get_db, mock_crud, mock_keyboards, update_mock, context_mock):
+@patch('bot.handlers.common.crud', new_callable=AsyncMock)
+@patch('bot.handlers.common.unit_of_work')
+async def test_global_fallback_handler_no_resume(mock_unit_of_work, mock_crud, mock_keyboards, update_mock, context_mock):
     """
     Тест: fallback-обработчик для нового пользователя без резюме.
     Ожидание: Пользователю предлагается загрузить резюме.
     """
     # --- Mocks ---
-    mock_db_session = MagicMock()
-    mock_get_db.return_value = iter([mock_db_session])
+    mock_db_session = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db_session
 
     mock_user = MagicMock(id=1)
     mock_crud.get_or_create_user.return_value = mock_user
@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import patch, AsyncMock, MagicMock
+from sqlalchemy.ext.asyncio import AsyncSession
 from telegram import Document
 
 from bot.handlers.start import start
@@ -10,37 +11,34 @@ from db import crud, models
 
 
 @pytest.mark.anyio
-@patch("bot.handlers.vacancy.crud")
-@patch("bot.handlers.resume.crud")
-@patch("bot.handlers.start.crud")
+@patch("bot.handlers.vacancy.crud", new_callable=AsyncMock)
+@patch("bot.handlers.resume.crud", new_callable=AsyncMock)
+@patch("bot.handlers.start.crud", new_callable=AsyncMock)
 @patch("bot.handlers.vacancy.show_main_menu", new_callable=AsyncMock)
 @patch("bot.handlers.resume.show_main_menu", new_callable=AsyncMock)
-@patch("bot.handlers.start.get_db")
-@patch("bot.handlers.resume.get_db")
-@patch("bot.handlers.vacancy.get_db")
+@patch("bot.handlers.start.unit_of_work")
+@patch("bot.handlers.resume.unit_of_work")
+@patch("bot.handlers.vacancy.unit_of_work")
 async def test_conversation_flow(
-    mock_vacancy_get_db,
-    mock_resume_get_db,
-    mock_start_get_db,
+    mock_vacancy_unit_of_work,
+    mock_resume_unit_of_work,
+    mock_start_unit_of_work,
     mock_resume_show_main_menu,
     mock_vacancy_show_main_menu,
     mock_start_crud,
     mock_resume_crud,
     mock_vacancy_crud,
-    db_session,
     update_mock,
     context_mock,
 ):
     """
     Tests the conversation flow by calling handlers in sequence.
     """
-    # Mock get_db to be a generator that yields the test session
-    def db_session_generator():
-        yield db_session
-
-    mock_start_get_db.side_effect = db_session_generator
-    mock_resume_get_db.side_effect = db_session_generator
-    mock_vacancy_get_db.side_effect = db_session_generator
+    # All handlers share one mocked async session
+    db_session = MagicMock(spec=AsyncSession)
+    mock_start_unit_of_work.return_value.__aenter__.return_value = db_session
+    mock_resume_unit_of_work.return_value.__aenter__.return_value = db_session
+    mock_vacancy_unit_of_work.return_value.__aenter__.return_value = db_session
 
     # Mock crud methods for all handlers
     user = MagicMock(id=1, chat_id=12345)
@@ -80,6 +78,7 @@ async def test_conversation_flow(
         # 2. Upload resume -> AWAITING_VACANCY_UPLOAD
         mock_document = MagicMock(spec=Document)
         mock_document.file_name = "resume.txt"
+        mock_document.file_size = 12
         mock_file = AsyncMock()
         mock_file.download_as_bytearray.return_value = b"Resume text"
         mock_document.get_file.return_value = mock_file
@@ -93,6 +92,7 @@ async def test_conversation_flow(
 
         # 3. Upload vacancy -> MAIN_MENU
         mock_document.file_name = "vacancy.txt"
+        mock_document.file_size = 12
         mock_file.download_as_bytearray.return_value = b"Vacancy text"
         update_mock.message.document = mock_document
 
@@ -1,15 +1,16 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy.ext.asyncio import AsyncSession
 from bot.handlers.main_menu_helpers import show_main_menu
 from bot.handlers.resume import MAIN_MENU
 from bot import messages, keyboards
 from db import models
 
 @pytest.mark.anyio
-@patch('bot.handlers.main_menu_helpers.get_db')
-@patch('bot.handlers.main_menu_helpers.crud')
+@patch('bot.handlers.main_menu_helpers.unit_of_work')
+@patch('bot.handlers.main_menu_helpers.crud', new_callable=AsyncMock)
 @patch('bot.handlers.main_menu_helpers.keyboards')
-async def test_show_main_menu_with_selected_vacancy(mock_keyboards, mock_crud, mock_get_db):
+async def test_show_main_menu_with_selected_vacancy(mock_keyboards, mock_crud, mock_unit_of_work):
     """
     Тест: главное меню отображается корректно, когда вакансия выбрана.
     """
@@ -23,9 +24,9 @@ async def test_show_main_menu_with_selected_vacancy(mock_keyboards, mock_crud, m
     mock_vacancies = [models.Vacancy(id=1, user_id=1, title="Vacancy 1")]
     mock_selected_vacancy = models.Vacancy(id=1, user_id=1, title="Vacancy 1")
 
-    db_mock = MagicMock()
-    mock_get_db.return_value = iter([db_mock])
-    db_mock.query.return_value.filter_by.return_value.first.return_value = None
+    db_mock = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = db_mock
+    mock_crud.get_survey_answer.return_value = None
 
 
     mock_crud.get_or_create_user.return_value = mock_user
@@ -58,10 +59,10 @@ async def test_show_main_menu_with_selected_vacancy(mock_keyboards, mock_crud, m
     )
 
 @pytest.mark.anyio
-@patch('bot.handlers.main_menu_helpers.get_db')
-@patch('bot.handlers.main_menu_helpers.crud')
+@patch('bot.handlers.main_menu_helpers.unit_of_work')
+@patch('bot.handlers.main_menu_helpers.crud', new_callable=AsyncMock)
 @patch('bot.handlers.main_menu_helpers.keyboards')
-async def test_show_main_menu_no_selected_vacancy(mock_keyboards, mock_crud, mock_get_db):
+async def test_show_main_menu_no_selected_vacancy(mock_keyboards, mock_crud, mock_unit_of_work):
     """
     Тест: главное меню отображается корректно, когда вакансия не выбрана, но вакансии есть.
     """
@@ -74,9 +75,9 @@ async def test_show_main_menu_no_selected_vacancy(mock_keyboards, mock_crud, moc
     mock_resume = models.Resume(id=1, user_id=1, title="My Resume")
     mock_vacancies = [models.Vacancy(id=1, user_id=1, title="Vacancy 1")]
 
-    db_mock = MagicMock()
-    mock_get_db.return_value = iter([db_mock])
-    db_mock.query.return_value.filter_by.return_value.first.return_value = None
+    db_mock = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = db_mock
+    mock_crud.get_survey_answer.return_value = None
 
     mock_crud.get_or_create_user.return_value = mock_user
     mock_crud.get_user_resume.return_value = mock_resume
@@ -106,10 +107,10 @@ async def test_show_main_menu_no_selected_vacancy(mock_keyboards, mock_crud, moc
     )
 
 @pytest.mark.anyio
-@patch('bot.handlers.main_menu_helpers.get_db')
-@patch('bot.handlers.main_menu_helpers.crud')
+@patch('bot.handlers.main_menu_helpers.unit_of_work')
+@patch('bot.handlers.main_menu_helpers.crud', new_callable=AsyncMock)
 @patch('bot.handlers.main_menu_helpers.keyboards')
-async def test_show_main_menu_no_vacancies(mock_keyboards, mock_crud, mock_get_db):
+async def test_show_main_menu_no_vacancies(mock_keyboards, mock_crud, mock_unit_of_work):
     """
     Тест: главное меню отображается корректно, когда нет сохраненных вакансий.
     """
@@ -121,9 +122,9 @@ async def test_show_main_menu_no_vacancies(mock_keyboards, mock_crud, mock_get_d
     mock_user = models.User(id=1, chat_id=123)
     mock_resume = models.Resume(id=1, user_id=1, title="My Resume")
 
-    db_mock = MagicMock()
-    mock_get_db.return_value = iter([db_mock])
-    db_mock.query.return_value.filter_by.return_value.first.return_value = None
+    db_mock = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = db_mock
+    mock_crud.get_survey_answer.return_value = None
 
     mock_crud.get_or_create_user.return_value = mock_user
     mock_crud.get_user_resume.return_value = mock_resume
@@ -1,5 +1,7 @@
+import threading
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.handlers.menu import update_resume_request, select_vacancy, on_vacancy_selected
 from bot.handlers.states import SELECTING_VACANCY, MAIN_MENU, UPDATE_RESUME
@@ -27,12 +29,14 @@ async def test_update_resume_request(mock_keyboards, update_mock, context_mock):
 
 
 @pytest.mark.anyio
-@patch('bot.handlers.menu.get_db')
-@patch('bot.handlers.menu.crud')
+@patch('bot.handlers.menu.score_vacancies')
+@patch('bot.handlers.menu.unit_of_work')
+@patch('bot.handlers.menu.crud', new_callable=AsyncMock)
 @patch('bot.handlers.menu.keyboards')
-async def test_select_vacancy(mock_keyboards, mock_crud, mock_get_db, update_mock, context_mock):
+async def test_select_vacancy(mock_keyboards, mock_crud, mock_unit_of_work, mock_score_vacancies, update_mock, context_mock):
     """
-    Тест: обработчик 'select_vacancy' корректно показывает список вакансий.
+    Тест: обработчик 'select_vacancy' корректно показывает список вакансий,
+    упорядоченный по локальной оценке соответствия резюме.
     """
     mock_user = models.User(id=1, chat_id=12345)
     mock_vacancies = [models.Vacancy(id=1, title="Vacancy 1"), models.Vacancy(id=2, title="Vacancy 2")]
@@ -40,8 +44,14 @@ async def test_select_vacancy(mock_keyboards, mock_crud, mock_get_db, update_moc
     mock_crud.get_user_vacancies.return_value = mock_vacancies
     mock_keyboards.vacancy_selection_keyboard.return_value = "vacancy_selection_markup"
 
-    db_session = MagicMock()
-    mock_get_db.return_value = iter([db_session])
+    mock_unit_of_work.return_value.__aenter__.return_value = MagicMock(spec=AsyncSession)
+    scoring_threads = []
+
+    def score(resume, vacancies):
+        scoring_threads.append(threading.current_thread())
+        return {2: 80, 1: 40}
+
+    mock_score_vacancies.side_effect = score
 
     result = await select_vacancy(update_mock, context_mock)
 
@@ -51,7 +61,10 @@ async def test_select_vacancy(mock_keyboards, mock_crud, mock_get_db, update_moc
         messages.CHOOSE_VACANCY_FOR_ACTION,
         reply_markup="vacancy_selection_markup"
     )
-    mock_keyboards.vacancy_selection_keyboard.assert_called_once_with(mock_vacancies)
+    mock_score_vacancies.assert_called_once_with(mock_crud.get_user_resume.return_value, mock_vacancies)
+    # Оценка не блокирует цикл событий: она выполняется в отдельном потоке
+    assert scoring_threads and scoring_threads[0] is not threading.main_thread()
+    mock_keyboards.vacancy_selection_keyboard.assert_called_once_with(mock_vacancies, scores={2: 80, 1: 40})
 
 
 @pytest.mark.anyio
@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy.ext.asyncio import AsyncSession
 from telegram import Document, File
 from bot.handlers.resume import (
     handle_resume_file,
@@ -15,21 +16,22 @@ from db import crud
 @pytest.mark.anyio
 @patch('bot.handlers.resume.show_main_menu', new_callable=AsyncMock)
 @patch('bot.handlers.resume.process_document', new_callable=AsyncMock)
-@patch('bot.handlers.resume.crud')
-@patch('bot.handlers.resume.get_db')
+@patch('bot.handlers.resume.crud', new_callable=AsyncMock)
+@patch('bot.handlers.resume.unit_of_work')
 async def test_handle_resume_file_success(
-    mock_get_db, mock_crud, mock_process_document, mock_show_main_menu, update_mock, context_mock
+    mock_unit_of_work, mock_crud, mock_process_document, mock_show_main_menu, update_mock, context_mock
 ):
     """Тестирует успешную обработку файла резюме, когда сервис возвращает success."""
     # --- Mocks ---
-    mock_db = MagicMock()
-    mock_get_db.return_value = iter([mock_db])
+    mock_db = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db
     mock_crud.get_or_create_user.return_value = MagicMock(id=1, chat_id=12345)
     mock_crud.get_user_balance.return_value = MagicMock(balance=10)
     mock_process_document.return_value = (True, "Senior Python Developer") # Сервис успешен
 
     mock_document = MagicMock(spec=Document)
     mock_document.file_name = "resume.txt"
+    mock_document.file_size = 12
     mock_file = AsyncMock(spec=File)
     mock_file.download_as_bytearray.return_value = b"Resume text"
     mock_document.get_file.return_value = mock_file
@@ -50,21 +52,22 @@ async def test_handle_resume_file_success(
 
 @pytest.mark.anyio
 @patch('bot.handlers.resume.process_document', new_callable=AsyncMock)
-@patch('bot.handlers.resume.crud')
-@patch('bot.handlers.resume.get_db')
+@patch('bot.handlers.resume.crud', new_callable=AsyncMock)
+@patch('bot.handlers.resume.unit_of_work')
 async def test_handle_resume_file_failure(
-    mock_get_db, mock_crud, mock_process_document, update_mock, context_mock
+    mock_unit_of_work, mock_crud, mock_process_document, update_mock, context_mock
 ):
     """Тестирует обработку файла резюме, когда сервис возвращает failure."""
     # --- Mocks ---
-    mock_db = MagicMock()
-    mock_get_db.return_value = iter([mock_db])
+    mock_db = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db
     mock_crud.get_or_create_user.return_value = MagicMock(id=1, chat_id=12345)
     mock_crud.get_user_balance.return_value = MagicMock(balance=10)
     mock_process_document.return_value = (False, None) # Сервис провалился
 
     mock_document = MagicMock(spec=Document)
     mock_document.file_name = "resume.txt"
+    mock_document.file_size = 12
     mock_file = AsyncMock(spec=File)
     mock_file.download_as_bytearray.return_value = b"Resume text"
     mock_document.get_file.return_value = mock_file
@@ -84,17 +87,17 @@ async def test_handle_resume_file_failure(
 
 @pytest.mark.anyio
 @patch('bot.handlers.resume.show_main_menu', new_callable=AsyncMock)
-@patch('bot.handlers.resume.scrape_hh_url', return_value="Resume from URL")
+@patch('bot.handlers.resume.scrape_url', new_callable=AsyncMock, return_value="Resume from URL")
 @patch('bot.handlers.resume.process_document', new_callable=AsyncMock)
-@patch('bot.handlers.resume.crud')
-@patch('bot.handlers.resume.get_db')
+@patch('bot.handlers.resume.crud', new_callable=AsyncMock)
+@patch('bot.handlers.resume.unit_of_work')
 async def test_handle_resume_url_success(
-    mock_get_db, mock_crud, mock_process_document, mock_scrape, mock_show_main_menu, update_mock, context_mock
+    mock_unit_of_work, mock_crud, mock_process_document, mock_scrape, mock_show_main_menu, update_mock, context_mock
 ):
     """Тестирует успешную обработку URL резюме."""
     # --- Mocks ---
-    mock_db = MagicMock()
-    mock_get_db.return_value = iter([mock_db])
+    mock_db = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db
     mock_crud.get_or_create_user.return_value = MagicMock(id=1, chat_id=12345)
     mock_crud.get_user_balance.return_value = MagicMock(balance=10)
     mock_process_document.return_value = (True, "Scraped Developer")
@@ -104,7 +107,7 @@ async def test_handle_resume_url_success(
     result = await handle_resume_url(update_mock, context_mock)
 
     # --- Asserts ---
-    mock_scrape.assert_called_once_with("https://hh.ru/resume/123")
+    mock_scrape.assert_awaited_once_with("https://hh.ru/resume/123")
     mock_process_document.assert_called_once()
     mock_show_main_menu.assert_called_once()
     assert result == MAIN_MENU
@@ -125,12 +128,12 @@ async def test_handle_invalid_resume_input(update_mock, context_mock):
 @pytest.mark.asyncio
 @patch('bot.handlers.resume.show_main_menu', new_callable=AsyncMock)
 @patch('bot.handlers.resume.process_document', new_callable=AsyncMock)
-@patch('bot.handlers.resume.crud')
-@patch('bot.handlers.resume.get_db')
-async def test_handle_resume_file_deducts_point(mock_get_db, mock_crud, mock_process_document, mock_show_main_menu, update_mock, context_mock):
+@patch('bot.handlers.resume.crud', new_callable=AsyncMock)
+@patch('bot.handlers.resume.unit_of_work')
+async def test_handle_resume_file_deducts_point(mock_unit_of_work, mock_crud, mock_process_document, mock_show_main_menu, update_mock, context_mock):
     """Тестирует списание балла при загрузке резюме."""
-    mock_db = MagicMock()
-    mock_get_db.return_value = iter([mock_db])
+    mock_db = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db
     mock_user = MagicMock(id=1, chat_id=12345)
     mock_crud.get_or_create_user.return_value = mock_user
     mock_crud.get_user_balance.return_value = MagicMock(balance=5)
@@ -138,6 +141,7 @@ async def test_handle_resume_file_deducts_point(mock_get_db, mock_crud, mock_pro
 
     mock_document = MagicMock(spec=Document)
     mock_document.file_name = "resume.txt"
+    mock_document.file_size = 12
     mock_file = AsyncMock(spec=File)
     mock_file.download_as_bytearray.return_value = b"Resume text"
     mock_document.get_file.return_value = mock_file
@@ -146,3 +150,20 @@ async def test_handle_resume_file_deducts_point(mock_get_db, mock_crud, mock_pro
     await handle_resume_file(update_mock, context_mock)
 
     mock_crud.update_user_balance.assert_called_once_with(mock_db, user_id=mock_user.id, amount=-1, description="Загрузка резюме")
+
+
+@pytest.mark.anyio
+@patch('bot.handlers.resume.process_document', new_callable=AsyncMock)
+async def test_handle_resume_file_too_large_is_not_downloaded(mock_process_document, update_mock, context_mock):
+    """Файл больше лимита отклоняется по заявленному размеру, не скачиваясь."""
+    mock_document = MagicMock(spec=Document)
+    mock_document.file_name = "resume.txt"
+    mock_document.file_size = 50 * 1024 * 1024
+    update_mock.message.document = mock_document
+
+    result = await handle_resume_file(update_mock, context_mock)
+
+    assert result == AWAITING_RESUME_UPLOAD
+    mock_document.get_file.assert_not_called()
+    mock_process_document.assert_not_called()
+    assert "слишком большой" in update_mock.message.reply_text.call_args.args[0]
@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch, call, ANY
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.handlers.start import start
 from bot.handlers.states import AWAITING_RESUME_UPLOAD, AWAITING_VACANCY_UPLOAD, MAIN_MENU
@@ -9,18 +10,18 @@ from bot import messages, keyboards
 
 @pytest.mark.anyio
 @patch('bot.handlers.start.keyboards')
-@patch('bot.handlers.start.crud')
-@patch('bot.handlers.start.get_db')
-async def test_start_no_resume(mock_get_db, mock_crud, mock_keyboards, update_mock, context_mock):
+@patch('bot.handlers.start.crud', new_callable=AsyncMock)
+@patch('bot.handlers.start.unit_of_work')
+async def test_start_no_resume(mock_unit_of_work, mock_crud, mock_keyboards, update_mock, context_mock):
     """
     Тестирует команду /start, когда у пользователя еще нет резюме.
     """
     # --- Mocks Setup ---
-    mock_db = MagicMock()
+    mock_db = MagicMock(spec=AsyncSession)
     mock_user = models.User(id=1, chat_id=12345)
     mock_crud.get_or_create_user.return_value = mock_user
     mock_crud.get_user_resume.return_value = None  # No resume
-    mock_get_db.return_value = iter([mock_db])
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db
     mock_keyboards.cancel_keyboard.return_value = "cancel_keyboard_markup"
 
     # --- Call ---
@@ -41,21 +42,21 @@ async def test_start_no_resume(mock_get_db, mock_crud, mock_keyboards, update_mo
 
 @pytest.mark.anyio
 @patch('bot.handlers.start.keyboards')
-@patch('bot.handlers.start.crud')
-@patch('bot.handlers.start.get_db')
-async def test_start_with_resume_no_vacancies(mock_get_db, mock_crud, mock_keyboards, update_mock, context_mock):
+@patch('bot.handlers.start.crud', new_callable=AsyncMock)
+@patch('bot.handlers.start.unit_of_work')
+async def test_start_with_resume_no_vacancies(mock_unit_of_work, mock_crud, mock_keyboards, update_mock, context_mock):
     """
     Тестирует команду /start, когда у пользователя есть резюме, но нет вакансий.
     """
     # --- Mocks Setup ---
-    mock_db = MagicMock()
+    mock_db = MagicMock(spec=AsyncSession)
     mock_user = models.User(id=1, chat_id=12345)
     mock_resume = models.Resume(id=1, user_id=1, file_path="path", source="test", title="My Resume Title")
     mock_crud.get_or_create_user.return_value = mock_user
     mock_crud.get_user_resume.return_value = mock_resume
     mock_crud.get_user_vacancies.return_value = []  # No vacancies
     mock_crud.get_user_balance.return_value = MagicMock(balance=10)
-    mock_get_db.return_value = iter([mock_db])
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db
     mock_keyboards.cancel_keyboard.return_value = "cancel_keyboard_markup"
 
     # --- Call ---
@@ -81,21 +82,21 @@ async def test_start_with_resume_no_vacancies(mock_get_db, mock_crud, mock_keybo
 
 @pytest.mark.anyio
 @patch('bot.handlers.start.show_main_menu', new_callable=AsyncMock)
-@patch('bot.handlers.start.crud')
-@patch('bot.handlers.start.get_db')
-async def test_start_with_resume_and_vacancies(mock_get_db, mock_crud, mock_show_main_menu, update_mock, context_mock):
+@patch('bot.handlers.start.crud', new_callable=AsyncMock)
+@patch('bot.handlers.start.unit_of_work')
+async def test_start_with_resume_and_vacancies(mock_unit_of_work, mock_crud, mock_show_main_menu, update_mock, context_mock):
     """
     Тестирует команду /start, когда у пользователя есть и резюме, и вакансии.
     """
     # --- Mocks Setup ---
-    mock_db = MagicMock()
+    mock_db = MagicMock(spec=AsyncSession)
     mock_user = models.User(id=1, chat_id=12345)
     mock_resume = models.Resume(id=1, user_id=1, file_path="path", source="test", title="My Awesome Resume")
     mock_vacancy = models.Vacancy(id=1, user_id=1, title="DevOps", file_path="path", source="test")
     mock_crud.get_or_create_user.return_value = mock_user
     mock_crud.get_user_resume.return_value = mock_resume
     mock_crud.get_user_vacancies.return_value = [mock_vacancy]
-    mock_get_db.return_value = iter([mock_db])
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db
 
     # --- Call ---
     result = await start(update_mock, context_mock)
@@ -108,18 +109,18 @@ async def test_start_with_resume_and_vacancies(mock_get_db, mock_crud, mock_show
 
 
 @pytest.mark.anyio
-@patch('bot.handlers.start.crud')
-@patch('bot.handlers.start.get_db')
-async def test_start_with_deeplink_arg(mock_get_db, mock_crud, update_mock, context_mock):
+@patch('bot.handlers.start.crud', new_callable=AsyncMock)
+@patch('bot.handlers.start.unit_of_work')
+async def test_start_with_deeplink_arg(mock_unit_of_work, mock_crud, update_mock, context_mock):
     """
     Тестирует команду /start с deeplink аргументом (UTM-меткой).
     """
     # --- Mocks Setup ---
-    mock_db = MagicMock()
+    mock_db = MagicMock(spec=AsyncSession)
     mock_user = models.User(id=1, chat_id=12345)
     mock_crud.get_or_create_user.return_value = mock_user
     mock_crud.get_user_resume.return_value = None # Для простоты, пусть у пользователя нет резюме
-    mock_get_db.return_value = iter([mock_db])
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db
     context_mock.args = ["ads_google"] # Эмулируем deeplink ?start=ads_google
 
     # --- Call ---
@@ -2,30 +2,34 @@ import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from telegram import Update, User as TUser, Message, Chat, CallbackQuery, ReplyKeyboardRemove
 from telegram.ext import ConversationHandler, Application, ContextTypes
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.handlers.states import MAIN_MENU, AWAITING_SURVEY_ANSWER
 from bot.handlers.survey import start_survey, handle_survey_answer, cancel_survey
-from db import crud
 from db.models import User, Survey, SurveyAnswer
 
 @pytest.fixture
 def mock_db_session():
-    """Фикстура для мока сессии БД."""
-    db_session = MagicMock()
-    user = User(id=1, chat_id=12345)
+    """Фикстура для мока сессии БД: unit_of_work() обработчика возвращает ее же в async with."""
+    db_session = MagicMock(spec=AsyncSession)
+    db_session.__aenter__.return_value = db_session
+    return db_session
 
-    # Мокаем get_or_create_user, чтобы он возвращал нашего пользователя
-    with patch('db.crud.get_or_create_user', return_value=user):
-        # Мокаем create_survey_answer
-        with patch('db.crud.create_survey_answer', return_value=SurveyAnswer(id=1, user_id=1, survey_id=1, answer="Хорошо")):
-            yield db_session
+@pytest.fixture
+def crud():
+    """Фикстура для мока асинхронных функций CRUD обработчика опросов."""
+    with patch('bot.handlers.survey.crud', new_callable=AsyncMock) as mock_crud:
+        # get_or_create_user возвращает нашего пользователя
+        mock_crud.get_or_create_user.return_value = User(id=1, chat_id=12345)
+        mock_crud.create_survey_answer.return_value = SurveyAnswer(id=1, user_id=1, survey_id=1, answer="Хорошо")
+        yield mock_crud
 
 @pytest.mark.anyio
-async def test_start_survey_with_active_survey(mock_db_session):
+async def test_start_survey_with_active_survey(mock_db_session, crud):
     """Тест начала опроса при наличии активного опроса."""
     active_survey = Survey(id=1, question="Как дела?", options="Хорошо,Нормально,Плохо", is_active=True)
-    with patch('bot.handlers.survey.get_db', return_value=iter([mock_db_session])), \
-         patch('db.crud.get_active_survey', return_value=active_survey):
+    crud.get_active_survey.return_value = active_survey
+    with patch('bot.handlers.survey.unit_of_work', return_value=mock_db_session):
 
         update = AsyncMock(spec=Update)
         update.callback_query = AsyncMock(spec=CallbackQuery)
@@ -44,10 +48,10 @@ async def test_start_survey_with_active_survey(mock_db_session):
         assert result == AWAITING_SURVEY_ANSWER
 
 @pytest.mark.anyio
-async def test_start_survey_no_active_survey(mock_db_session):
+async def test_start_survey_no_active_survey(mock_db_session, crud):
     """Тест начала опроса при отсутствии активных опросов."""
-    with patch('bot.handlers.survey.get_db', return_value=iter([mock_db_session])), \
-         patch('db.crud.get_active_survey', return_value=None), \
+    crud.get_active_survey.return_value = None
+    with patch('bot.handlers.survey.unit_of_work', return_value=mock_db_session), \
          patch('bot.handlers.survey.show_main_menu', new_callable=AsyncMock) as mock_show_main_menu:
 
         update = AsyncMock(spec=Update)
@@ -64,9 +68,9 @@ async def test_start_survey_no_active_survey(mock_db_session):
         assert result == MAIN_MENU
 
 @pytest.mark.anyio
-async def test_handle_survey_answer(mock_db_session):
+async def test_handle_survey_answer(mock_db_session, crud):
     """Тест обработки ответа на опрос."""
-    with patch('bot.handlers.survey.get_db', return_value=iter([mock_db_session])), \
+    with patch('bot.handlers.survey.unit_of_work', return_value=mock_db_session), \
          patch('bot.handlers.survey.show_main_menu', new_callable=AsyncMock) as mock_show_main_menu:
 
         update = AsyncMock(spec=Update)
@@ -80,7 +84,7 @@ async def test_handle_survey_answer(mock_db_session):
 
         result = await handle_survey_answer(update, context)
 
-        crud.create_survey_answer.assert_called_once()
+        crud.create_survey_answer.assert_awaited_once()
         update.message.reply_text.assert_called_once()
         assert update.message.reply_text.call_args[0][0] == "Спасибо за ваш ответ!"
         assert isinstance(update.message.reply_text.call_args[1]['reply_markup'], ReplyKeyboardRemove)
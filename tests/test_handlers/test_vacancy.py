@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy.ext.asyncio import AsyncSession
 from telegram import Document, File
 from bot.handlers.vacancy import (
     handle_vacancy_file,
@@ -8,27 +9,31 @@ from bot.handlers.vacancy import (
 )
 from bot.handlers.states import AWAITING_VACANCY_UPLOAD, MAIN_MENU
 from bot import messages
+from services.bulk_ingestion import ADDED, DUPLICATE, FAILED, BulkVacancy
 
 # Фикстуры update_mock и context_mock из conftest.py используются неявно
 
 @pytest.mark.anyio
 @patch('bot.handlers.vacancy.show_main_menu', new_callable=AsyncMock)
 @patch('bot.handlers.vacancy.process_document', new_callable=AsyncMock)
-@patch('bot.handlers.vacancy.crud')
-@patch('bot.handlers.vacancy.get_db')
+@patch('bot.handlers.vacancy.crud', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.unit_of_work')
 async def test_handle_vacancy_file_success(
-    mock_get_db, mock_crud, mock_process_document, mock_show_main_menu, update_mock, context_mock
+    mock_unit_of_work, mock_crud, mock_process_document, mock_show_main_menu, update_mock, context_mock
 ):
     """Тестирует успешную обработку файла вакансии, когда сервис возвращает success."""
     # --- Mocks ---
-    mock_db = MagicMock()
-    mock_get_db.return_value = iter([mock_db])
+    mock_db = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db
     mock_crud.get_or_create_user.return_value = MagicMock(id=1, chat_id=12345)
     mock_crud.get_user_balance.return_value = MagicMock(balance=10)
+    mock_crud.get_canonical_vacancy.return_value = None
+    mock_crud.find_duplicate_vacancy.return_value = None
     mock_process_document.return_value = (True, MagicMock(id=99)) # Сервис успешен
 
     mock_document = MagicMock(spec=Document)
     mock_document.file_name = "vacancy.txt"
+    mock_document.file_size = 12
     mock_file = AsyncMock(spec=File)
     mock_file.download_as_bytearray.return_value = b"Vacancy text"
     mock_document.get_file.return_value = mock_file
@@ -48,21 +53,24 @@ async def test_handle_vacancy_file_success(
 
 @pytest.mark.anyio
 @patch('bot.handlers.vacancy.process_document', new_callable=AsyncMock)
-@patch('bot.handlers.vacancy.crud')
-@patch('bot.handlers.vacancy.get_db')
+@patch('bot.handlers.vacancy.crud', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.unit_of_work')
 async def test_handle_vacancy_file_failure(
-    mock_get_db, mock_crud, mock_process_document, update_mock, context_mock
+    mock_unit_of_work, mock_crud, mock_process_document, update_mock, context_mock
 ):
     """Тестирует обработку файла вакансии, когда сервис возвращает failure."""
     # --- Mocks ---
-    mock_db = MagicMock()
-    mock_get_db.return_value = iter([mock_db])
+    mock_db = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db
     mock_crud.get_or_create_user.return_value = MagicMock(id=1, chat_id=12345)
     mock_crud.get_user_balance.return_value = MagicMock(balance=10)
+    mock_crud.get_canonical_vacancy.return_value = None
+    mock_crud.find_duplicate_vacancy.return_value = None
     mock_process_document.return_value = (False, None) # Сервис провалился
 
     mock_document = MagicMock(spec=Document)
     mock_document.file_name = "vacancy.txt"
+    mock_document.file_size = 12
     mock_file = AsyncMock(spec=File)
     mock_file.download_as_bytearray.return_value = b"Vacancy text"
     mock_document.get_file.return_value = mock_file
@@ -82,19 +90,22 @@ async def test_handle_vacancy_file_failure(
 
 @pytest.mark.anyio
 @patch('bot.handlers.vacancy.show_main_menu', new_callable=AsyncMock)
-@patch('bot.handlers.vacancy.scrape_hh_url', return_value="Vacancy from URL")
+@patch('bot.handlers.vacancy.fetch_hh_vacancy', new_callable=AsyncMock, return_value=None)
+@patch('bot.handlers.vacancy.scrape_url', new_callable=AsyncMock, return_value="Vacancy from URL")
 @patch('bot.handlers.vacancy.process_document', new_callable=AsyncMock)
-@patch('bot.handlers.vacancy.crud')
-@patch('bot.handlers.vacancy.get_db')
+@patch('bot.handlers.vacancy.crud', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.unit_of_work')
 async def test_handle_vacancy_url_success(
-    mock_get_db, mock_crud, mock_process_document, mock_scrape, mock_show_main_menu, update_mock, context_mock
+    mock_unit_of_work, mock_crud, mock_process_document, mock_scrape, mock_fetch_api, mock_show_main_menu, update_mock, context_mock
 ):
     """Тестирует успешную обработку URL вакансии."""
     # --- Mocks ---
-    mock_db = MagicMock()
-    mock_get_db.return_value = iter([mock_db])
+    mock_db = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db
     mock_crud.get_or_create_user.return_value = MagicMock(id=1, chat_id=12345)
     mock_crud.get_user_balance.return_value = MagicMock(balance=10)
+    mock_crud.get_canonical_vacancy.return_value = None
+    mock_crud.find_duplicate_vacancy.return_value = None
     mock_process_document.return_value = (True, MagicMock(id=99))
     update_mock.message.text = "https://hh.ru/vacancy/123"
 
@@ -102,7 +113,8 @@ async def test_handle_vacancy_url_success(
     result = await handle_vacancy_url(update_mock, context_mock)
 
     # --- Asserts ---
-    mock_scrape.assert_called_once_with("https://hh.ru/vacancy/123")
+    mock_fetch_api.assert_awaited_once_with("123")
+    mock_scrape.assert_awaited_once_with("https://hh.ru/vacancy/123")
     mock_process_document.assert_called_once()
     mock_show_main_menu.assert_called_once()
     assert result == MAIN_MENU
@@ -118,3 +130,176 @@ async def test_handle_invalid_vacancy_input(update_mock, context_mock):
     update_mock.message.reply_text.assert_called_once()
     assert messages.VACANCY_INVALID_FORMAT in update_mock.message.reply_text.call_args.args[0]
     assert result == AWAITING_VACANCY_UPLOAD
+
+
+@pytest.mark.anyio
+@patch('bot.handlers.vacancy.schedule_analysis_prefetch')
+@patch('bot.handlers.vacancy.ANALYSIS_PREFETCH_ENABLED', True)
+@patch('bot.handlers.vacancy.show_main_menu', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.process_document', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.crud', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.unit_of_work')
+async def test_vacancy_upload_schedules_analysis_prefetch(
+    mock_unit_of_work, mock_crud, mock_process_document, mock_show_main_menu, mock_schedule, update_mock, context_mock
+):
+    """Тестирует, что при включенном prefetch после загрузки вакансии планируется анализ."""
+    mock_unit_of_work.return_value.__aenter__.return_value = MagicMock(spec=AsyncSession)
+    mock_crud.get_or_create_user.return_value = MagicMock(id=1, chat_id=12345)
+    mock_crud.get_user_balance.return_value = MagicMock(balance=10)
+    mock_crud.get_canonical_vacancy.return_value = None
+    mock_crud.find_duplicate_vacancy.return_value = None
+
+    async def process(**kwargs):
+        kwargs["context"].user_data['selected_vacancy_id'] = 99
+        return True, "Vacancy"
+
+    mock_process_document.side_effect = process
+    update_mock.message.text = "https://hh.ru/vacancy/1"
+
+    with patch('bot.handlers.vacancy.fetch_hh_vacancy', new_callable=AsyncMock, return_value=None), \
+            patch('bot.handlers.vacancy.scrape_url', new_callable=AsyncMock, return_value="Vacancy text"):
+        result = await handle_vacancy_url(update_mock, context_mock)
+
+    assert result == MAIN_MENU
+    mock_schedule.assert_called_once_with(context_mock, user_id=1, vacancy_id=99)
+
+
+@pytest.mark.anyio
+@patch('bot.handlers.vacancy.show_main_menu', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.process_document', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.crud', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.unit_of_work')
+async def test_duplicate_vacancy_is_selected_without_charge(
+    mock_unit_of_work, mock_crud, mock_process_document, mock_show_main_menu, update_mock, context_mock
+):
+    """Повторно загруженная вакансия выбирается вместо создания новой: без проверки AI и списания балла."""
+    mock_db = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db
+    mock_crud.get_or_create_user.return_value = MagicMock(id=1, chat_id=12345)
+    mock_crud.get_canonical_vacancy.return_value = None
+    mock_crud.find_duplicate_vacancy.return_value = MagicMock(id=7, title="Python Developer")
+
+    mock_document = MagicMock(spec=Document)
+    mock_document.file_name = "vacancy.txt"
+    mock_document.file_size = 12
+    mock_file = AsyncMock(spec=File)
+    mock_file.download_as_bytearray.return_value = b"Vacancy text"
+    mock_document.get_file.return_value = mock_file
+    update_mock.message.document = mock_document
+
+    result = await handle_vacancy_file(update_mock, context_mock)
+
+    assert result == MAIN_MENU
+    assert context_mock.user_data['selected_vacancy_id'] == 7
+    mock_crud.find_duplicate_vacancy.assert_called_once_with(mock_db, user_id=1, text="Vacancy text")
+    mock_process_document.assert_not_called()
+    mock_crud.update_user_balance.assert_not_called()
+    update_mock.message.reply_text.assert_any_call(messages.VACANCY_DUPLICATE.format(title="Python Developer"))
+    mock_show_main_menu.assert_called_once()
+
+
+@pytest.mark.anyio
+@patch('bot.handlers.vacancy.show_main_menu', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.read_text_from_file', return_value="Canonical vacancy text")
+@patch('bot.handlers.vacancy.scrape_url', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.process_document', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.crud', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.unit_of_work')
+async def test_known_hh_vacancy_is_not_scraped_again(
+    mock_unit_of_work, mock_crud, mock_process_document, mock_scrape, mock_read, mock_show_main_menu, update_mock, context_mock
+):
+    """Вакансия с hh.ru, уже загруженная другим пользователем, берется из канонических без скрейпинга."""
+    mock_db = MagicMock(spec=AsyncSession)
+    mock_unit_of_work.return_value.__aenter__.return_value = mock_db
+    mock_crud.get_or_create_user.return_value = MagicMock(id=1, chat_id=12345)
+    mock_crud.get_user_balance.return_value = MagicMock(balance=10)
+    mock_crud.find_duplicate_vacancy.return_value = None
+    canonical = MagicMock(id=5, file_path="storage/vacancies/c.txt")
+    mock_crud.get_canonical_vacancy.return_value = canonical
+    mock_process_document.return_value = (True, "Python Developer")
+    update_mock.message.text = "https://hh.ru/vacancy/123"
+
+    result = await handle_vacancy_url(update_mock, context_mock)
+
+    assert result == MAIN_MENU
+    mock_crud.get_canonical_vacancy.assert_called_once_with(mock_db, hh_id="123", content_hash=None)
+    mock_scrape.assert_not_called()
+    kwargs = mock_process_document.call_args.kwargs
+    assert kwargs["text"] == "Canonical vacancy text"
+    assert kwargs["canonical"] is canonical
+    assert kwargs["hh_id"] == "123"
+
+
+@pytest.mark.anyio
+@patch('bot.handlers.vacancy.show_main_menu', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.fetch_hh_vacancy', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.scrape_url', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.process_document', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.crud', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.unit_of_work')
+async def test_hh_vacancy_is_loaded_from_api(
+    mock_unit_of_work, mock_crud, mock_process_document, mock_scrape, mock_fetch_api, mock_show_main_menu,
+    update_mock, context_mock
+):
+    """Вакансия hh.ru берется из API: страница не скачивается, название передается без проверки AI."""
+    mock_unit_of_work.return_value.__aenter__.return_value = MagicMock(spec=AsyncSession)
+    mock_crud.get_or_create_user.return_value = MagicMock(id=1, chat_id=12345)
+    mock_crud.get_user_balance.return_value = MagicMock(balance=10)
+    mock_crud.get_canonical_vacancy.return_value = None
+    mock_crud.find_duplicate_vacancy.return_value = None
+    mock_fetch_api.return_value = MagicMock(hh_id="123", title="Python Developer", text="Python Developer\nОписание")
+    mock_process_document.return_value = (True, "Python Developer")
+    update_mock.message.text = "https://hh.ru/vacancy/123"
+
+    result = await handle_vacancy_url(update_mock, context_mock)
+
+    assert result == MAIN_MENU
+    mock_fetch_api.assert_awaited_once_with("123")
+    mock_scrape.assert_not_called()
+    kwargs = mock_process_document.call_args.kwargs
+    assert kwargs["text"] == "Python Developer\nОписание"
+    assert kwargs["known_title"] == "Python Developer"
+
+
+@pytest.mark.anyio
+@patch('bot.handlers.vacancy.show_main_menu', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.ingest_vacancies', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.process_document', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.crud', new_callable=AsyncMock)
+@patch('bot.handlers.vacancy.unit_of_work')
+async def test_several_urls_are_ingested_in_bulk(
+    mock_unit_of_work, mock_crud, mock_process_document, mock_ingest, mock_show_main_menu, update_mock, context_mock
+):
+    """Несколько ссылок в одном сообщении загружаются пакетом с прогрессом и отчетом в одном сообщении."""
+    mock_unit_of_work.return_value.__aenter__.return_value = MagicMock(spec=AsyncSession)
+    mock_crud.get_or_create_user.return_value = MagicMock(id=1, chat_id=12345)
+    progress_message = AsyncMock()
+    update_mock.message.reply_text.return_value = progress_message
+    update_mock.message.text = "https://hh.ru/vacancy/1\nhttps://hh.ru/vacancy/2 https://hh.ru/vacancy/3"
+
+    async def ingest(db, user_id, urls, on_progress):
+        await on_progress("download", len(urls), len(urls))
+        return [
+            BulkVacancy(url=urls[0], title="Python", status=ADDED, vacancy_id=10),
+            BulkVacancy(url=urls[1], title="Java", status=DUPLICATE, vacancy_id=4),
+            BulkVacancy(url=urls[2], status=FAILED),
+        ]
+
+    mock_ingest.side_effect = ingest
+
+    result = await handle_vacancy_url(update_mock, context_mock)
+
+    assert result == MAIN_MENU
+    mock_process_document.assert_not_called()
+    assert mock_ingest.call_args.kwargs["urls"] == [
+        "https://hh.ru/vacancy/1", "https://hh.ru/vacancy/2", "https://hh.ru/vacancy/3",
+    ]
+    progress_message.edit_text.assert_any_call(
+        messages.BULK_PROGRESS.format(stage=messages.BULK_STAGE_DOWNLOAD, done=3, total=3)
+    )
+    report = progress_message.edit_text.call_args.args[0]
+    assert messages.BULK_VACANCIES_RESULT.format(total=3, added=1) in report
+    assert messages.BULK_ITEM_DUPLICATE.format(title="Java") in report
+    assert messages.BULK_ITEM_FAILED.format(url="https://hh.ru/vacancy/3") in report
+    assert context_mock.user_data['selected_vacancy_id'] == 10
+    mock_show_main_menu.assert_called_once()
@@ -0,0 +1,75 @@
+import pytest
+
+from scraper.async_scraper import AsyncScraper, PageCache
+from scraper.hh_api import API_HEADERS, fetch_hh_vacancy, format_salary, vacancy_to_text
+from tests.fakes.hh_api_server import FakeHHAPIServer
+
+
+@pytest.fixture
+def hh_api():
+    with FakeHHAPIServer() as server:
+        yield server
+
+
+async def test_fetch_vacancy_maps_structured_fields(hh_api, tmp_path):
+    scraper = AsyncScraper(cache=PageCache(str(tmp_path)))
+
+    vacancy = await fetch_hh_vacancy("100000001", scraper=scraper, base_url=hh_api.base_url)
+
+    assert vacancy.hh_id == "100000001"
+    assert vacancy.title == "Senior Python-разработчик (платежные сервисы)"
+    lines = vacancy.text.splitlines()
+    assert lines[0] == "Senior Python-разработчик (платежные сервисы)"
+    assert "Компания: ООО «Финтех Решения»" in lines
+    assert "Город: Москва" in lines
+    assert "Зарплата: от 300 000 до 400 000 ₽ на руки" in lines
+    assert lines[-1].startswith("Ключевые навыки: Python")
+    # HTML описания превращается в текст
+    assert "<" not in vacancy.text
+    # Запрос к API идентифицирует приложение и запрашивает JSON, а не HTML
+    headers = hh_api.requests[0]["headers"]
+    assert headers["Accept"] == "application/json"
+    assert headers["HH-User-Agent"] == API_HEADERS["HH-User-Agent"]
+    await scraper.aclose()
+
+
+async def test_vacancy_without_salary_and_skills(hh_api, tmp_path):
+    scraper = AsyncScraper(cache=PageCache(str(tmp_path)))
+
+    vacancy = await fetch_hh_vacancy("100000002", scraper=scraper, base_url=hh_api.base_url)
+
+    assert vacancy.title == "Менеджер по продажам"
+    assert "Зарплата" not in vacancy.text
+    assert "Ключевые навыки" not in vacancy.text
+    await scraper.aclose()
+
+
+async def test_unknown_vacancy_returns_none(hh_api, tmp_path):
+    scraper = AsyncScraper(cache=PageCache(str(tmp_path)))
+
+    assert await fetch_hh_vacancy("999", scraper=scraper, base_url=hh_api.base_url) is None
+    await scraper.aclose()
+
+
+async def test_repeated_fetch_is_conditional(hh_api, tmp_path):
+    """Повторный запрос той же вакансии отправляет If-None-Match и получает 304 без тела."""
+    scraper = AsyncScraper(cache=PageCache(str(tmp_path)))
+
+    first = await fetch_hh_vacancy("100000001", scraper=scraper, base_url=hh_api.base_url)
+    second = await fetch_hh_vacancy("100000001", scraper=scraper, base_url=hh_api.base_url)
+
+    assert first == second
+    assert "If-None-Match" not in hh_api.requests[0]["headers"]
+    assert hh_api.requests[1]["headers"]["If-None-Match"]
+    assert scraper.stats == {"fresh": 0, "not_modified": 1, "downloaded": 1}
+    await scraper.aclose()
+
+
+def test_format_salary():
+    assert format_salary({"from": 150000, "to": None, "currency": "RUR", "gross": True}) == "от 150 000 ₽ до вычета налогов"
+    assert format_salary({"from": None, "to": 5000, "currency": "USD", "gross": None}) == "до 5 000 $"
+    assert format_salary(None) == ""
+
+
+def test_vacancy_without_description_is_rejected():
+    assert vacancy_to_text({"id": "1", "name": "Python Developer", "description": ""}) is None
@@ -0,0 +1,190 @@
+import asyncio
+
+from services import analysis_service
+
+
+def make_request(chunks: list[str], release: asyncio.Event | None = None, calls: list | None = None):
+    """Создает фейковый потоковый запрос к AI, отдающий заданные фрагменты."""
+    async def request(run):
+        if calls is not None:
+            calls.append(1)
+        if release:
+            await release.wait()
+        for chunk in chunks:
+            await run.feed(chunk)
+        return {"json": {"a": "A", "b": "B"}, "usage": {}}
+    return request
+
+
+async def test_start_analysis_coalesces_concurrent_requests():
+    """Повторный запуск для той же пары подключается к выполняющемуся анализу."""
+    release = asyncio.Event()
+    calls = []
+    persisted = []
+
+    run = analysis_service.start_analysis(1, 2, make_request(['{"a": "A", "b": "B"}'], release, calls), persisted.append)
+    assert analysis_service.get_running_analysis(1, 2) is run
+    assert analysis_service.start_analysis(1, 2, make_request([], calls=calls), persisted.append) is run
+
+    release.set()
+    await run.wait()
+    await asyncio.sleep(0)
+
+    assert calls == [1]
+    assert persisted == [{"a": "A", "b": "B"}]
+    assert analysis_service.get_running_analysis(1, 2) is None
+
+
+async def test_late_subscriber_receives_completed_sections():
+    """Подписчик, подключившийся позже, получает уже завершенные разделы."""
+    release = asyncio.Event()
+    run = analysis_service.start_analysis(3, 4, make_request(['{"a": "A", ', '"b": "B"}'], release), lambda s: None)
+    early, late = [], []
+
+    await run.subscribe(lambda key, value: early.append(key))
+    release.set()
+    await asyncio.sleep(0.01)
+    await run.subscribe(lambda key, value: late.append((key, value)))
+    await run.wait()
+
+    assert early == ["a", "b"]
+    assert late == [("a", "A"), ("b", "B")]
+
+
+async def test_non_streamed_sections_are_published_once_from_final_response():
+    """Разделы из итогового ответа публикуются, если поток их не содержал."""
+    persisted = []
+    run = analysis_service.start_analysis(5, 6, make_request([]), persisted.append)
+    received = []
+    await run.subscribe(lambda key, value: received.append(key))
+
+    await run.wait()
+
+    assert persisted == [{"a": "A", "b": "B"}]
+    assert received == ["a", "b"]
+
+
+async def test_failing_subscriber_does_not_break_analysis():
+    """Ошибка одного подписчика не мешает остальным и самому анализу."""
+    run = analysis_service.start_analysis(7, 8, make_request(['{"a": "A", "b": "B"}']), lambda s: None)
+    received = []
+
+    def broken(key, value):
+        raise RuntimeError("boom")
+
+    await run.subscribe(broken)
+    await run.subscribe(lambda key, value: received.append(key))
+
+    response = await run.wait()
+    assert response["json"] == {"a": "A", "b": "B"}
+    assert received == ["a", "b"]
+
+
+class FakeSectionClient:
+    """Фейковый AI-клиент: генерирует разделы по отдельным промптам с задержкой."""
+
+    def __init__(self, delay: float = 0.05, failing: tuple = ()):
+        self.delay = delay
+        self.failing = failing
+        self.sections = []
+        self.consolidated_calls = 0
+
+    async def generate_section(self, section, resume_text, vacancy_text, on_delta=None):
+        self.sections.append(section)
+        await asyncio.sleep(self.delay)
+        if section in self.failing:
+            return {"text": None, "json": None, "error": "boom", "usage": {}}
+        text = f"{section} готов"
+        for word in text.split(" "):
+            await on_delta(word)
+        return {"text": text, "json": None, "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15, "cost": 0.01}}
+
+    async def get_consolidated_analysis(self, resume_text, vacancy_text, on_delta=None):
+        self.consolidated_calls += 1
+        await on_delta('{"match_analysis": "M"}')
+        return {"json": {"match_analysis": "M"}, "usage": {}}
+
+
+async def test_parallel_strategy_generates_sections_concurrently():
+    """Стратегия parallel выполняет промпты разделов одновременно и суммирует статистику."""
+    client = FakeSectionClient(delay=0.05)
+    sections = ["match_analysis", "cover_letter", "hr_call_plan", "tech_interview_plan"]
+    persisted = []
+    request = analysis_service.build_request(analysis_service.PARALLEL, client, "r", "v", sections)
+    run = analysis_service.start_analysis(11, 12, request, persisted.append, strategy=analysis_service.PARALLEL)
+
+    response = await run.wait()
+
+    assert sorted(client.sections) == sorted(sections)
+    assert run.latency_ms < 150
+    assert response["json"] == {section: f"{section} готов" for section in sections}
+    assert response["usage"]["total_tokens"] == 60
+    assert response["usage"]["cost"] == 0.04
+    assert len(persisted) == 4
+    assert run.strategy == analysis_service.PARALLEL
+
+
+async def test_parallel_sections_are_persisted_and_delivered_one_at_a_time():
+    """Одновременно завершенные разделы сохраняются и доставляются по очереди, а не параллельно."""
+    client = FakeSectionClient(delay=0)
+    sections = ["match_analysis", "cover_letter", "hr_call_plan"]
+    active, overlaps = [], []
+
+    async def exclusive(*args):
+        overlaps.append(bool(active))
+        active.append(1)
+        await asyncio.sleep(0.01)
+        active.pop()
+
+    request = analysis_service.build_request(analysis_service.PARALLEL, client, "r", "v", sections)
+    run = analysis_service.start_analysis(17, 18, request, exclusive, strategy=analysis_service.PARALLEL)
+    await run.subscribe(exclusive)
+
+    await run.wait()
+
+    assert len(overlaps) == 6
+    assert not any(overlaps)
+
+
+async def test_section_strategy_reports_partial_text_and_errors():
+    """Частичный текст раздела доступен во время генерации; ошибка одного раздела не скрывает остальные."""
+    client = FakeSectionClient(delay=0, failing=("cover_letter",))
+    request = analysis_service.build_request(
+        analysis_service.PARALLEL, client, "r", "v", ["match_analysis", "cover_letter"]
+    )
+    run = analysis_service.start_analysis(13, 14, request, lambda s: None, strategy=analysis_service.PARALLEL)
+    partials = []
+    await run.subscribe(lambda key, value: None, lambda: partials.append(run.partial("match_analysis")))
+
+    response = await run.wait()
+
+    assert "match_analysis" in partials
+    assert response["json"] == {"match_analysis": "match_analysis готов"}
+    assert "error" not in response
+
+
+async def test_on_demand_run_is_scoped_to_one_section():
+    """Анализ по запросу выполняется в области одного раздела, а анализ всех разделов подходит любой области."""
+    client = FakeSectionClient()
+    scope = analysis_service.analysis_scope(analysis_service.ON_DEMAND, "cover_letter")
+    request = analysis_service.build_request(
+        analysis_service.ON_DEMAND, client, "r", "v", analysis_service.scope_sections(scope)
+    )
+    run = analysis_service.start_analysis(15, 16, request, lambda s: None, scope=scope, strategy=analysis_service.ON_DEMAND)
+
+    assert analysis_service.get_running_analysis(15, 16, "cover_letter") is run
+    assert analysis_service.get_running_analysis(15, 16, "hr_call_plan") is None
+    await run.wait()
+    assert client.sections == ["cover_letter"]
+
+    full = analysis_service.start_analysis(
+        15, 16, analysis_service.build_request(analysis_service.CONSOLIDATED, client, "r", "v", []), lambda s: None
+    )
+    assert analysis_service.get_running_analysis(15, 16, "hr_call_plan") is full
+    await full.wait()
+    assert client.consolidated_calls == 1
+
+
+def test_unknown_strategy_falls_back_to_consolidated():
+    assert analysis_service.resolve_strategy("parallel") == analysis_service.PARALLEL
+    assert analysis_service.resolve_strategy("bogus") == analysis_service.CONSOLIDATED
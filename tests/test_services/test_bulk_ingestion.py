@@ -0,0 +1,143 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from db import async_crud as crud
+from db import models
+from scraper.hh_api import HHVacancy
+from services import bulk_ingestion
+from services.bulk_ingestion import extract_vacancy_urls, ingest_vacancies, is_url_list
+
+PYTHON_TEXT = (
+    "Python-разработчик\nРазработка микросервисов на FastAPI, PostgreSQL, Redis. "
+    "Опыт коммерческой разработки от 3 лет, код-ревью, тестирование."
+)
+SALES_TEXT = "Менеджер по продажам\nКонсультирование клиентов в салоне мебели, оформление договоров, работа с CRM."
+JAVA_TEXT = "Java-разработчик\nSpring Boot, Kafka, микросервисная архитектура, Kubernetes, опыт от 5 лет."
+
+
+def test_extract_vacancy_urls():
+    text = "Вот: https://hh.ru/vacancy/1, https://example.com/x\nhttps://spb.hh.ru/vacancy/2 https://hh.ru/vacancy/1"
+
+    assert extract_vacancy_urls(text) == ["https://hh.ru/vacancy/1", "https://spb.hh.ru/vacancy/2"]
+    assert extract_vacancy_urls(text, max_urls=1) == ["https://hh.ru/vacancy/1"]
+    assert is_url_list("https://hh.ru/vacancy/1\n\n  https://hh.ru/vacancy/2  \n")
+    assert not is_url_list("Python-разработчик\nhttps://hh.ru/vacancy/1")
+
+
+@patch("services.bulk_ingestion.save_text_to_file", side_effect=lambda text, folder: f"storage/{folder}/{len(text)}.txt")
+@patch("services.bulk_ingestion.verify_vacancy_text", new_callable=AsyncMock)
+@patch("services.bulk_ingestion.scrape_url", new_callable=AsyncMock)
+@patch("services.bulk_ingestion.fetch_hh_vacancy", new_callable=AsyncMock)
+async def test_ingest_vacancies_stores_batch_in_one_transaction(
+    mock_fetch_api, mock_scrape, mock_verify, mock_save, async_db_session
+):
+    """Вакансии из API, со страниц и дубликаты обрабатываются за один проход; фиксирует их вызывающий код."""
+    user = await crud.get_or_create_user(async_db_session, chat_id=1)
+    await crud.update_user_balance(async_db_session, user_id=user.id, amount=10, description="Пополнение")
+    balance_before = (await crud.get_user_balance(async_db_session, user.id)).balance
+    await crud.create_vacancy(async_db_session, user_id=user.id, title="Java", file_path="/java.txt", source="file", text=JAVA_TEXT)
+
+    api = {"1": HHVacancy(hh_id="1", title="Python-разработчик", text=PYTHON_TEXT)}
+    mock_fetch_api.side_effect = lambda hh_id: api.get(hh_id)
+    pages = {"https://hh.ru/vacancy/2": SALES_TEXT, "https://hh.ru/vacancy/3": JAVA_TEXT, "https://hh.ru/vacancy/4": None}
+    mock_scrape.side_effect = lambda url: pages[url]
+    usage = {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2, "cost": 0.0, "action": "verify_vacancy"}
+    mock_verify.return_value = (True, "Менеджер по продажам", None, usage)
+    progress = []
+
+    async def on_progress(stage, done, total):
+        progress.append((stage, done, total))
+
+    # Функции crud выполняются на синхронной сессии внутри run_sync
+    with patch.object(async_db_session.sync_session, "commit", wraps=async_db_session.sync_session.commit) as commit:
+        items = await ingest_vacancies(
+            async_db_session, user.id, [f"https://hh.ru/vacancy/{i}" for i in range(1, 5)], on_progress=on_progress
+        )
+
+    assert [item.status for item in items] == [
+        bulk_ingestion.ADDED, bulk_ingestion.ADDED, bulk_ingestion.DUPLICATE, bulk_ingestion.FAILED,
+    ]
+    # Пакет записан через flush, транзакцией владеет обработчик (unit_of_work)
+    assert commit.call_count == 0
+    await async_db_session.commit()
+    # Вакансия из API не проверяется, проверяется только скачанная страница
+    mock_verify.assert_awaited_once_with(user.id, SALES_TEXT)
+    assert {vacancy.title for vacancy in await crud.get_user_vacancies(async_db_session, user.id)} == {
+        "Java", "Python-разработчик", "Менеджер по продажам",
+    }
+    assert (await crud.get_canonical_vacancy(async_db_session, hh_id="1")).title == "Python-разработчик"
+    assert (await crud.get_user_balance(async_db_session, user.id)).balance == balance_before - 2
+    assert await async_db_session.run_sync(lambda session: session.query(models.AIUsageLog).count()) == 1
+    assert progress[-1] == (bulk_ingestion.STAGE_VERIFY, 1, 1)
+    assert (bulk_ingestion.STAGE_DOWNLOAD, 4, 4) in progress
+
+
+@patch("services.bulk_ingestion.save_text_to_file", return_value="storage/vacancies/new.txt")
+@patch("services.bulk_ingestion.fetch_hh_vacancy", new_callable=AsyncMock)
+async def test_ingest_vacancies_reuses_canonical_with_unreadable_file(mock_fetch_api, mock_save, async_db_session):
+    """Если файл канонической вакансии не читается, она скачивается заново и переводится на новый файл без дубликата."""
+    user = await crud.get_or_create_user(async_db_session, chat_id=1)
+    stale = await crud.get_or_create_canonical_vacancy(
+        async_db_session, file_path="/missing.txt", title="Python-разработчик", source="https://hh.ru/vacancy/1", hh_id="1"
+    )
+    mock_fetch_api.return_value = HHVacancy(hh_id="1", title="Python-разработчик", text=PYTHON_TEXT)
+
+    items = await ingest_vacancies(async_db_session, user.id, ["https://hh.ru/vacancy/1"])
+
+    assert [item.status for item in items] == [bulk_ingestion.ADDED]
+    vacancies = await crud.get_user_vacancies(async_db_session, user.id)
+    assert [vacancy.canonical_id for vacancy in vacancies] == [stale.id]
+    assert await async_db_session.run_sync(lambda session: session.query(models.CanonicalVacancy).count()) == 1
+    assert (await crud.get_canonical_vacancy(async_db_session, hh_id="1")).file_path == "storage/vacancies/new.txt"
+
+
+@patch("services.bulk_ingestion.verify_vacancy_text", new_callable=AsyncMock)
+@patch("services.bulk_ingestion.scrape_url", new_callable=AsyncMock)
+@patch("services.bulk_ingestion.fetch_hh_vacancy", new_callable=AsyncMock, return_value=None)
+async def test_ingest_vacancies_bounds_parallelism_and_balance(mock_fetch_api, mock_scrape, mock_verify, async_db_session):
+    """Одновременно скачивается не больше concurrency страниц; вакансии сверх баланса не проверяются AI."""
+    user = await crud.get_or_create_user(async_db_session, chat_id=1)
+    balance = await crud.get_user_balance(async_db_session, user.id)
+    balance.balance = 1
+    await async_db_session.commit()
+    running, peak = 0, 0
+
+    async def scrape(url):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"https://hh.ru/vacancy/1": PYTHON_TEXT, "https://hh.ru/vacancy/2": SALES_TEXT}.get(url, JAVA_TEXT)
+
+    mock_scrape.side_effect = scrape
+    mock_verify.return_value = (False, None, None, None)
+
+    items = await ingest_vacancies(async_db_session, user.id, [f"https://hh.ru/vacancy/{i}" for i in range(1, 7)], concurrency=2)
+
+    assert peak == 2
+    assert items[0].status == bulk_ingestion.REJECTED
+    assert items[1].status == bulk_ingestion.NO_BALANCE
+    # Одинаковые страницы в пакете — дубликаты друг друга
+    assert [item.status for item in items[3:]] == [bulk_ingestion.DUPLICATE] * 3
+    assert mock_verify.await_count == 1
+    assert (await crud.get_user_balance(async_db_session, user.id)).balance == 1
+
+
+@patch("services.bulk_ingestion.save_text_to_file", side_effect=lambda text, folder: f"storage/{folder}/{len(text)}.txt")
+@patch("services.bulk_ingestion.verify_vacancy_text", new_callable=AsyncMock)
+@patch("services.bulk_ingestion.scrape_url", new_callable=AsyncMock)
+@patch("services.bulk_ingestion.fetch_hh_vacancy", new_callable=AsyncMock, return_value=None)
+async def test_ingest_vacancies_detects_near_duplicates_within_batch(mock_fetch_api, mock_scrape, mock_verify, mock_save, async_db_session):
+    """Почти одинаковые страницы в одном пакете — дубликаты друг друга, как и среди загруженных ранее."""
+    user = await crud.get_or_create_user(async_db_session, chat_id=1)
+    balance_before = (await crud.get_user_balance(async_db_session, user.id)).balance
+    pages = {"https://hh.ru/vacancy/1": PYTHON_TEXT, "https://hh.ru/vacancy/2": "Поделиться вакансией\n" + PYTHON_TEXT}
+    mock_scrape.side_effect = lambda url: pages[url]
+    mock_verify.return_value = (True, "Python-разработчик", None, None)
+
+    items = await ingest_vacancies(async_db_session, user.id, list(pages))
+
+    assert [item.status for item in items] == [bulk_ingestion.ADDED, bulk_ingestion.DUPLICATE]
+    mock_verify.assert_awaited_once_with(user.id, PYTHON_TEXT)
+    assert (await crud.get_user_balance(async_db_session, user.id)).balance == balance_before - 1
@@ -1,13 +1,13 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
-from services.document_service import process_document
+from services.document_service import process_document, verify_vacancy_text
 from db import models
 
 # Фикстуры update_mock и context_mock из conftest.py используются неявно
 
 @pytest.mark.anyio
 @patch('services.document_service.get_ai_client')
-@patch('services.document_service.crud')
+@patch('services.document_service.crud', new_callable=AsyncMock)
 @patch('services.document_service.save_text_to_file', return_value="some/path/resume.txt")
 async def test_process_document_resume_success(
     mock_save_text, mock_crud, mock_get_ai_client, update_mock, context_mock
@@ -15,7 +15,7 @@ async def test_process_document_resume_success(
     """Тестирует успешную обработку РЕЗЮМЕ через process_document."""
     # --- Mocks ---
     mock_db = MagicMock()
-    mock_ai_client = MagicMock()
+    mock_ai_client = AsyncMock()
     mock_ai_client.verify_resume.return_value = {
         "text": '{"is_resume": true, "title": "Test Resume"}',
         "usage": {"cost": 0.001, "total_tokens": 100, "prompt_tokens": 50, "completion_tokens": 50},
@@ -46,7 +46,7 @@ async def test_process_document_resume_success(
 
 @pytest.mark.anyio
 @patch('services.document_service.get_ai_client')
-@patch('services.document_service.crud')
+@patch('services.document_service.crud', new_callable=AsyncMock)
 @patch('services.document_service.save_text_to_file', return_value="some/path/vacancy.txt")
 async def test_process_document_vacancy_success(
     mock_save_text, mock_crud, mock_get_ai_client, update_mock, context_mock
@@ -54,7 +54,7 @@ async def test_process_document_vacancy_success(
     """Тестирует успешную обработку ВАКАНСИИ через process_document."""
     # --- Mocks ---
     mock_db = MagicMock()
-    mock_ai_client = MagicMock()
+    mock_ai_client = AsyncMock()
     # Мокируем метод для вакансии
     mock_ai_client.verify_vacancy.return_value = {
         "text": '{"is_vacancy": true, "title": "Test Vacancy"}',
@@ -91,14 +91,14 @@ async def test_process_document_vacancy_success(
 
 @pytest.mark.anyio
 @patch('services.document_service.get_ai_client')
-@patch('services.document_service.crud')
+@patch('services.document_service.crud', new_callable=AsyncMock)
 async def test_process_document_ai_verification_fails(
     mock_crud, mock_get_ai_client, update_mock, context_mock
 ):
     """Тестирует случай, когда AI-валидация документа проваливается."""
     # --- Mocks ---
     mock_db = MagicMock()
-    mock_ai_client = MagicMock()
+    mock_ai_client = AsyncMock()
     mock_ai_client.verify_resume.return_value = {"text": '{"is_resume": false}'}
     mock_get_ai_client.return_value = mock_ai_client
     mock_user = models.User(id=1)
@@ -119,3 +119,152 @@ async def test_process_document_ai_verification_fails(
     assert title is None
     mock_crud.create_resume.assert_not_called()
     mock_crud.create_vacancy.assert_not_called()
+
+
+@pytest.mark.anyio
+@patch('services.document_service.get_ai_client')
+@patch('services.document_service.crud', new_callable=AsyncMock)
+@patch('services.document_service.save_text_to_file', return_value="some/path/resume.txt")
+async def test_process_document_obvious_resume_skips_ai(
+    mock_save_text, mock_crud, mock_get_ai_client, update_mock, context_mock
+):
+    """Очевидное резюме принимается локальным классификатором без запроса к AI и сохраняется после дешевой очистки."""
+    mock_ai_client = AsyncMock()
+    mock_get_ai_client.return_value = mock_ai_client
+    text = (
+        "Иванов Иван\nМужчина, 30 лет\nЖелаемая должность: Python-разработчик\n"
+        "Опыт работы\n2019 — по настоящее время, ООО «Софт»\nРазработал сервис платежей.\n"
+        "Образование\nМГУ, 2018\nКлючевые навыки\nPython, SQL"
+    )
+    repeated = "Скачать резюме в PDF или отправить по электронной почте"
+    raw_text = f"{repeated}\n\n  " + text.replace("Python, SQL", "Python,   SQL") + f"\n\n{repeated}"
+
+    success, title = await process_document(
+        update=update_mock, context=context_mock, db=MagicMock(), user_id=1,
+        text=raw_text, source="upload", doc_type="resume",
+    )
+
+    assert success is True
+    assert title == "Python-разработчик"
+    mock_ai_client.verify_resume.assert_not_called()
+    mock_crud.create_ai_usage_log.assert_not_called()
+    mock_save_text.assert_called_once_with(f"{repeated}\n{text}", "resumes")
+    mock_crud.create_resume.assert_called_once()
+
+
+@pytest.mark.anyio
+@patch('services.document_service.get_ai_client')
+@patch('services.document_service.crud', new_callable=AsyncMock)
+@patch('services.document_service.save_text_to_file')
+async def test_process_document_vacancy_uploaded_as_resume_is_rejected(
+    mock_save_text, mock_crud, mock_get_ai_client, update_mock, context_mock
+):
+    """Очевидная вакансия, загруженная как резюме, отклоняется без запроса к AI."""
+    mock_ai_client = AsyncMock()
+    mock_get_ai_client.return_value = mock_ai_client
+    text = (
+        "Python-разработчик\nТребуемый опыт работы: 3–6 лет\nПолная занятость, полный день\n"
+        "Обязанности:\nРазработка сервисов\nТребования:\nPython от 3 лет\n"
+        "Мы предлагаем:\nДМС, официальное трудоустройство"
+    )
+
+    success, title = await process_document(
+        update=update_mock, context=context_mock, db=MagicMock(), user_id=1,
+        text=text, source="upload", doc_type="resume",
+    )
+
+    assert (success, title) == (False, None)
+    mock_ai_client.verify_resume.assert_not_called()
+    mock_save_text.assert_not_called()
+
+
+@pytest.mark.anyio
+@patch('services.document_service.get_ai_client')
+@patch('services.document_service.crud', new_callable=AsyncMock)
+@patch('services.document_service.save_text_to_file', return_value="some/path/vacancy.txt")
+async def test_process_document_vacancy_registers_canonical(
+    mock_save_text, mock_crud, mock_get_ai_client, update_mock, context_mock
+):
+    """Проверенная вакансия регистрируется как каноническая и связывается с вакансией пользователя."""
+    mock_ai_client = AsyncMock()
+    mock_ai_client.verify_vacancy.return_value = {"text": '{"is_vacancy": true, "title": "Test Vacancy"}', "usage": {}}
+    mock_get_ai_client.return_value = mock_ai_client
+    mock_crud.get_or_create_canonical_vacancy.return_value = models.CanonicalVacancy(id=5)
+    mock_crud.create_vacancy.return_value = models.Vacancy(id=99)
+
+    success, _ = await process_document(
+        update=update_mock, context=context_mock, db=MagicMock(), user_id=1,
+        text="Vacancy text", source="https://hh.ru/vacancy/42", doc_type="vacancy", hh_id="42",
+    )
+
+    assert success is True
+    assert mock_crud.get_or_create_canonical_vacancy.call_args.kwargs["hh_id"] == "42"
+    assert mock_crud.create_vacancy.call_args.kwargs["canonical_id"] == 5
+
+
+@pytest.mark.anyio
+@patch('services.document_service.get_ai_client')
+@patch('services.document_service.crud', new_callable=AsyncMock)
+@patch('services.document_service.save_text_to_file')
+async def test_process_document_canonical_vacancy_skips_verification(
+    mock_save_text, mock_crud, mock_get_ai_client, update_mock, context_mock
+):
+    """Вакансия, уже проверенная для другого пользователя, не проверяется AI и не сохраняется в новый файл."""
+    mock_ai_client = AsyncMock()
+    mock_get_ai_client.return_value = mock_ai_client
+    canonical = models.CanonicalVacancy(id=5, title="Python Developer", file_path="storage/vacancies/c.txt")
+    mock_crud.create_vacancy.return_value = models.Vacancy(id=99)
+
+    success, title = await process_document(
+        update=update_mock, context=context_mock, db=MagicMock(), user_id=2,
+        text="Vacancy text", source="https://hh.ru/vacancy/42", doc_type="vacancy", canonical=canonical,
+    )
+
+    assert (success, title) == (True, "Python Developer")
+    mock_ai_client.verify_vacancy.assert_not_called()
+    mock_save_text.assert_not_called()
+    mock_crud.create_ai_usage_log.assert_not_called()
+    mock_crud.get_or_create_canonical_vacancy.assert_not_called()
+    kwargs = mock_crud.create_vacancy.call_args.kwargs
+    assert kwargs["file_path"] == "storage/vacancies/c.txt" and kwargs["canonical_id"] == 5
+    assert context_mock.user_data['selected_vacancy_id'] == 99
+
+
+@pytest.mark.anyio
+@patch('services.document_service.get_ai_client')
+@patch('services.document_service.crud', new_callable=AsyncMock)
+@patch('services.document_service.save_text_to_file', return_value="some/path/vacancy.txt")
+async def test_process_document_vacancy_from_api_skips_verification(
+    mock_save_text, mock_crud, mock_get_ai_client, update_mock, context_mock
+):
+    """Вакансия из API hh.ru сохраняется с полученным названием без проверки AI."""
+    mock_ai_client = AsyncMock()
+    mock_get_ai_client.return_value = mock_ai_client
+    mock_crud.get_or_create_canonical_vacancy.return_value = models.CanonicalVacancy(id=5)
+    mock_crud.create_vacancy.return_value = models.Vacancy(id=99)
+
+    success, title = await process_document(
+        update=update_mock, context=context_mock, db=MagicMock(), user_id=1, text="Python Developer\nОписание",
+        source="https://hh.ru/vacancy/42", doc_type="vacancy", hh_id="42", known_title="Python Developer",
+    )
+
+    assert (success, title) == (True, "Python Developer")
+    mock_ai_client.verify_vacancy.assert_not_called()
+    mock_save_text.assert_called_once()
+    assert mock_crud.create_vacancy.call_args.kwargs["title"] == "Python Developer"
+
+
+@pytest.mark.anyio
+@patch('services.document_service.get_ai_client')
+async def test_verify_vacancy_text_cleans_text_accepted_locally(mock_get_ai_client):
+    """Вакансия, принятая локальным классификатором, возвращается после дешевой очистки без запроса к AI."""
+    text = (
+        "Python-разработчик\n\nЗарплата от 200 000   руб.\nТребуемый опыт работы: 3–6 лет\nОбязанности\n"
+        "Разработка сервисов\nТребования\nPython, SQL\nУсловия\nУдаленная работа\nОткликнуться"
+    )
+
+    is_valid, title, body, usage_log = await verify_vacancy_text(1, text)
+
+    assert (is_valid, title, usage_log) == (True, "Python-разработчик", None)
+    assert body == text.replace("\n\n", "\n").replace("200 000   руб.", "200 000 руб.")
+    mock_get_ai_client.assert_not_called()
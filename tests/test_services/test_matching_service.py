@@ -0,0 +1,31 @@
+from db import models
+from services.matching_service import score_vacancies
+
+
+def _write(tmp_path, name: str, text: str) -> str:
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_score_vacancies_scores_readable_vacancies(tmp_path):
+    resume = models.Resume(id=1, file_path=_write(tmp_path, "resume.txt", "Python-разработчик. Python, Django, PostgreSQL"))
+    python_vacancy = models.Vacancy(
+        id=10, file_path=_write(tmp_path, "v1.txt", "Ищем Python-разработчика. Требования: Python, Django")
+    )
+    sales_vacancy = models.Vacancy(
+        id=11, file_path=_write(tmp_path, "v2.txt", "Менеджер по продажам мебели, консультирование клиентов")
+    )
+    missing = models.Vacancy(id=12, file_path=str(tmp_path / "missing.txt"))
+
+    scores = score_vacancies(resume, [python_vacancy, sales_vacancy, missing])
+
+    assert set(scores) == {10, 11}
+    assert scores[10] > scores[11]
+
+
+def test_score_vacancies_without_resume_file(tmp_path):
+    resume = models.Resume(id=1, file_path=str(tmp_path / "missing.txt"))
+    vacancy = models.Vacancy(id=10, file_path=_write(tmp_path, "v1.txt", "Python"))
+
+    assert score_vacancies(resume, [vacancy]) == {}
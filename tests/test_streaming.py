@@ -0,0 +1,62 @@
+import codecs
+
+import pytest
+
+from scraper.streaming import BoundedDecoder, PayloadTooLarge, decode_upload, ensure_size, read_chunks
+
+TEXT = "Вакансия: Python-разработчик, зарплата от 300 000 ₽"
+
+
+def chunked(data: bytes, size: int = 3):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+def test_multibyte_characters_split_across_chunks():
+    assert read_chunks(chunked(TEXT.encode("utf-8")), max_bytes=1024) == TEXT
+
+
+def test_charset_priority_bom_header_meta():
+    # BOM важнее заголовка
+    data = codecs.BOM_UTF16_LE + TEXT.encode("utf-16-le")
+    assert read_chunks(chunked(data), 1024, "text/html; charset=windows-1251") == TEXT
+    # Заголовок Content-Type
+    assert read_chunks(chunked("Привет".encode("cp1251")), 1024, "text/html; charset=windows-1251") == "Привет"
+    # <meta charset> в начале HTML, если в заголовке кодировки нет
+    html = '<html><head><meta charset="windows-1251"></head><body>Привет</body></html>'
+    assert "Привет" in read_chunks(chunked(html.encode("cp1251")), 1024, "text/html", sniff_meta=True)
+
+
+def test_stream_is_aborted_once_limit_is_exceeded():
+    consumed = []
+
+    def chunks():
+        for _ in range(100):
+            consumed.append(1)
+            yield b"x" * 100
+
+    with pytest.raises(PayloadTooLarge):
+        read_chunks(chunks(), max_bytes=250)
+    assert len(consumed) == 3
+
+
+def test_decoder_reports_detected_encoding():
+    decoder = BoundedDecoder(1024, "text/plain; charset=koi8-r")
+    decoder.feed("Тест".encode("koi8-r"))
+    assert decoder.finish() == "Тест"
+    assert decoder.encoding == "koi8-r"
+
+
+def test_decode_upload():
+    assert decode_upload(codecs.BOM_UTF8 + TEXT.encode("utf-8"), 1024) == TEXT
+    with pytest.raises(UnicodeDecodeError):
+        decode_upload("Резюме".encode("cp1251"), 1024)
+    with pytest.raises(PayloadTooLarge):
+        decode_upload(b"x" * 2048, 1024)
+
+
+def test_ensure_size():
+    ensure_size(None, 10)
+    ensure_size("10", 10)
+    ensure_size("not a number", 10)
+    with pytest.raises(PayloadTooLarge):
+        ensure_size("11", 10)